@@ -6,10 +6,19 @@ import com.iflytek.rpa.robot.entity.dto.RobotExecuteRecordsBatchDeleteDto;
 import com.iflytek.rpa.robot.service.RobotExecuteRecordService;
 import com.iflytek.rpa.starter.exception.NoLoginException;
 import com.iflytek.rpa.starter.utils.response.AppResponse;
+import java.io.File;
+import java.io.IOException;
+import javax.servlet.http.HttpServletRequest;
 import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.core.io.FileSystemResource;
+import org.springframework.core.io.Resource;
+import org.springframework.http.HttpHeaders;
+import org.springframework.http.MediaType;
+import org.springframework.http.ResponseEntity;
 import org.springframework.web.bind.annotation.PostMapping;
 import org.springframework.web.bind.annotation.RequestBody;
 import org.springframework.web.bind.annotation.RequestMapping;
+import org.springframework.web.bind.annotation.RequestParam;
 import org.springframework.web.bind.annotation.RestController;
 
 /**
@@ -85,6 +94,50 @@ public class RobotExecuteRecordController {
     //        return robotExecuteRecordService.saveExecuteLog(recordDto);
     //    }
 
+    /**
+     * 分块上传机器人执行日志(gzip压缩的jsonl), 按字节偏移续传
+     *
+     * @param robotId
+     * @param executeId
+     * @param offset 本块在完整日志中的起始偏移
+     * @param size 完整日志的字节数
+     * @param finalChunk 是否最后一块
+     * @param request 请求体为gzip压缩的日志块
+     * @return 服务端已接收的偏移
+     * @throws NoLoginException
+     * @throws IOException
+     */
+    @PostMapping("/upload-log")
+    public AppResponse<?> uploadExecuteLog(
+            @RequestParam("robotId") String robotId,
+            @RequestParam("executeId") String executeId,
+            @RequestParam("offset") Long offset,
+            @RequestParam("size") Long size,
+            @RequestParam(value = "final", defaultValue = "0") Integer finalChunk,
+            HttpServletRequest request)
+            throws NoLoginException, IOException {
+        return robotExecuteRecordService.uploadExecuteLog(
+                robotId, executeId, offset, size, finalChunk == 1, request.getInputStream());
+    }
+
+    /**
+     * 下载完整的机器人执行日志(jsonl)
+     *
+     * @param recordDto
+     * @return
+     * @throws NoLoginException
+     */
+    @PostMapping("/download-log")
+    public ResponseEntity<Resource> downloadExecuteLog(@RequestBody ExecuteRecordDto recordDto)
+            throws NoLoginException {
+        File logFile = robotExecuteRecordService.getExecuteLogFile(recordDto);
+        return ResponseEntity.ok()
+                .header(HttpHeaders.CONTENT_DISPOSITION, "attachment; filename=" + logFile.getName())
+                .contentType(MediaType.parseMediaType("application/x-ndjson"))
+                .contentLength(logFile.length())
+                .body(new FileSystemResource(logFile));
+    }
+
     /**
      * 批量删除机器人执行记录
      *
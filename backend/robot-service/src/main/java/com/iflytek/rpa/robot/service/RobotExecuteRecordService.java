@@ -7,6 +7,9 @@ import com.iflytek.rpa.robot.entity.dto.ExecuteRecordDto;
 import com.iflytek.rpa.robot.entity.dto.RobotExecuteRecordsBatchDeleteDto;
 import com.iflytek.rpa.starter.exception.NoLoginException;
 import com.iflytek.rpa.starter.utils.response.AppResponse;
+import java.io.File;
+import java.io.IOException;
+import java.io.InputStream;
 import java.util.List;
 
 /**
@@ -25,6 +28,12 @@ public interface RobotExecuteRecordService extends IService<RobotExecuteRecord>
 
     AppResponse<?> saveExecuteResult(ExecuteRecordDto recordDto, String currentRobotId) throws NoLoginException;
 
+    AppResponse<?> uploadExecuteLog(
+            String robotId, String executeId, Long offset, Long size, boolean finalChunk, InputStream body)
+            throws NoLoginException, IOException;
+
+    File getExecuteLogFile(ExecuteRecordDto recordDto) throws NoLoginException;
+
     Integer countRobotTotalNumOfExecuted(List<String> startAndEndOfDay, String lastProcessedId);
 
     Integer countTerminalTotalNumOfExecuted(List<String> startAndEndOfDay, String lastProcessedId);
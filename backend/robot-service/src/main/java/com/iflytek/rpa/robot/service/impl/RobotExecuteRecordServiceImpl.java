@@ -5,6 +5,7 @@ import static com.iflytek.rpa.robot.constants.RobotConstant.ROBOT_RESULT_EXECUTE
 import com.baomidou.mybatisplus.core.metadata.IPage;
 import com.baomidou.mybatisplus.extension.plugins.pagination.Page;
 import com.baomidou.mybatisplus.extension.service.impl.ServiceImpl;
+import com.google.common.util.concurrent.Striped;
 import com.iflytek.rpa.base.annotation.RobotVersionAnnotation;
 import com.iflytek.rpa.monitor.entity.RobotMonitorDto;
 import com.iflytek.rpa.monitor.service.HisDataEnumService;
@@ -16,17 +17,30 @@ import com.iflytek.rpa.robot.entity.dto.ExecuteRecordDto;
 import com.iflytek.rpa.robot.entity.dto.RobotExecuteRecordsBatchDeleteDto;
 import com.iflytek.rpa.robot.service.RobotExecuteRecordService;
 import com.iflytek.rpa.starter.exception.NoLoginException;
+import com.iflytek.rpa.starter.exception.ServiceException;
 import com.iflytek.rpa.starter.utils.response.AppResponse;
 import com.iflytek.rpa.starter.utils.response.ErrorCodeEnum;
 import com.iflytek.rpa.task.dao.ScheduleTaskDao;
 import com.iflytek.rpa.utils.*;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.IOException;
+import java.io.InputStream;
 import java.math.BigDecimal;
+import java.nio.ByteBuffer;
+import java.nio.channels.FileChannel;
+import java.nio.file.StandardOpenOption;
 import java.util.ArrayList;
 import java.util.Date;
+import java.util.HashMap;
 import java.util.List;
+import java.util.Map;
+import java.util.concurrent.locks.Lock;
+import java.util.zip.GZIPInputStream;
 import lombok.extern.slf4j.Slf4j;
 import org.apache.commons.lang3.StringUtils;
 import org.springframework.beans.factory.annotation.Autowired;
+import org.springframework.beans.factory.annotation.Value;
 import org.springframework.stereotype.Service;
 import org.springframework.util.CollectionUtils;
 
@@ -59,6 +73,19 @@ public class RobotExecuteRecordServiceImpl extends ServiceImpl<RobotExecuteRecor
     @Autowired
     private IdWorker idWorker;
 
+    @Value("${robot.execute-log.path:./execute-log}")
+    private String executeLogPath;
+
+    /**
+     * 单个日志块解压后的最大字节数
+     */
+    private static final long MAX_LOG_CHUNK = 16 * 1024 * 1024;
+
+    /**
+     * 按执行ID加锁, 同一次执行的日志块串行写入, 不同执行之间互不阻塞
+     */
+    private final Striped<Lock> executeLogLocks = Striped.lazyWeakLock(1024);
+
     @Override
     public AppResponse<?> recordList(ExecuteRecordDto recordDto) throws NoLoginException {
         IPage<RobotExecuteRecord> pages = new Page<>();
@@ -105,6 +132,106 @@ public class RobotExecuteRecordServiceImpl extends ServiceImpl<RobotExecuteRecor
         return AppResponse.success(executeLog);
     }
 
+    @Override
+    public AppResponse<?> uploadExecuteLog(
+            String robotId, String executeId, Long offset, Long size, boolean finalChunk, InputStream body)
+            throws NoLoginException, IOException {
+        if (StringUtils.isBlank(robotId) || StringUtils.isBlank(executeId)) {
+            return AppResponse.error(ErrorCodeEnum.E_PARAM, "机器人ID或执行ID为空");
+        }
+        if (null == offset || null == size || offset < 0 || offset > size) {
+            return AppResponse.error(ErrorCodeEnum.E_PARAM, "日志偏移错误");
+        }
+        String tenantId = TenantUtils.getTenantId();
+        RobotExecuteRecord record = getUserExecuteRecord(executeId);
+        if (null == record || !robotId.equals(record.getRobotId())) {
+            return AppResponse.error(ErrorCodeEnum.E_PARAM, "执行记录不存在");
+        }
+
+        // 先解压到内存, 超过声明的日志大小或单块上限时不写入
+        long limit = Math.min(size - offset, MAX_LOG_CHUNK);
+        ByteArrayOutputStream chunk = new ByteArrayOutputStream();
+        try (InputStream in = new GZIPInputStream(body)) {
+            byte[] buf = new byte[64 * 1024];
+            int len;
+            while ((len = in.read(buf)) != -1) {
+                if (chunk.size() + len > limit) {
+                    return AppResponse.error(ErrorCodeEnum.E_PARAM, "日志大小超出声明");
+                }
+                chunk.write(buf, 0, len);
+            }
+        }
+
+        // 日志按 租户/执行ID 落盘, 文件长度即已接收的偏移
+        File logFile = executeLogFile(tenantId, executeId);
+        File parent = logFile.getParentFile();
+        if (!parent.exists() && !parent.mkdirs()) {
+            return AppResponse.error(ErrorCodeEnum.E_SERVICE, "日志目录创建失败");
+        }
+        Lock lock = executeLogLocks.get(executeId);
+        lock.lock();
+        try {
+            long received = logFile.exists() ? logFile.length() : 0L;
+            // 偏移不一致时不写入, 返回已接收的偏移由客户端从该位置重传
+            if (offset == received) {
+                try (FileChannel channel = FileChannel.open(
+                        logFile.toPath(), StandardOpenOption.CREATE, StandardOpenOption.WRITE)) {
+                    try {
+                        ByteBuffer buffer = ByteBuffer.wrap(chunk.toByteArray());
+                        long position = received;
+                        while (buffer.hasRemaining()) {
+                            position += channel.write(buffer, position);
+                        }
+                    } catch (IOException e) {
+                        // 写入失败时回滚到本块之前, 不留下半块数据
+                        channel.truncate(received);
+                        throw e;
+                    }
+                }
+                received = logFile.length();
+            }
+            if (finalChunk && received >= size) {
+                log.info("执行日志上传完成, executeId: {}, size: {}", executeId, received);
+            }
+            Map<String, Object> data = new HashMap<>();
+            data.put("offset", received);
+            return AppResponse.success(data);
+        } finally {
+            lock.unlock();
+        }
+    }
+
+    @Override
+    public File getExecuteLogFile(ExecuteRecordDto recordDto) throws NoLoginException {
+        String executeId = recordDto.getExecuteId();
+        if (StringUtils.isBlank(executeId)) {
+            throw new ServiceException(ErrorCodeEnum.E_PARAM.getCode(), "执行ID为空");
+        }
+        if (null == getUserExecuteRecord(executeId)) {
+            throw new ServiceException(ErrorCodeEnum.E_PARAM.getCode(), "执行记录不存在");
+        }
+        File logFile = executeLogFile(TenantUtils.getTenantId(), executeId);
+        if (!logFile.isFile()) {
+            throw new ServiceException(ErrorCodeEnum.E_SERVICE.getCode(), "执行日志不存在");
+        }
+        return logFile;
+    }
+
+    /**
+     * 当前用户的执行记录
+     */
+    private RobotExecuteRecord getUserExecuteRecord(String executeId) throws NoLoginException {
+        ExecuteRecordDto recordDto = new ExecuteRecordDto();
+        recordDto.setExecuteId(executeId);
+        recordDto.setCreatorId(UserUtils.nowUserId());
+        recordDto.setTenantId(TenantUtils.getTenantId());
+        return robotExecuteRecordDao.getExecuteRecord(recordDto);
+    }
+
+    private File executeLogFile(String tenantId, String executeId) {
+        return new File(new File(executeLogPath, tenantId), executeId + ".jsonl");
+    }
+
     @Override
     @RobotVersionAnnotation(clazz = ExecuteRecordDto.class)
     public AppResponse<?> saveExecuteResult(ExecuteRecordDto recordDto, String currentRobotId) throws NoLoginException {
@@ -3,7 +3,6 @@
 from typing import Any
 from urllib.parse import urljoin
 
-import requests
 from astronverse.actionlib.atomic import atomicMg
 from astronverse.actionlib.error import PARAM_VERIFY_ERROR_FORMAT
 from astronverse.actionlib.types import typesMg
@@ -17,6 +16,10 @@ from astronverse.browser.error import (
 from astronverse.browser.error import (
     BaseException as BrowserBaseException,
 )
+from astronverse.browser_plugin.bridge import BridgeClient, get_client
+
+# 返回数据量大的命令, 请求压缩
+COMPRESS_KEYS = ["tableDataBatch", "simalarListBatch", "getTableData"]
 
 
 class Browser:
@@ -70,19 +73,16 @@ class Browser:
         )
 
     @staticmethod
-    def send_browser_rpc(req: dict, timeout: float = 0.0) -> Any:
-        """发送浏览器RPC请求。"""
+    def bridge_client() -> BridgeClient:
+        """浏览器桥接服务客户端, 复用长连接"""
         gateway_port = atomicMg.cfg().get("GATEWAY_PORT") or "13159"
         url = f"http://127.0.0.1:{gateway_port}"
-        return requests.post(
-            urljoin(
-                url,
-                "browser_connector",
-            )
-            + "/browser/transition",
-            json=req,
-            timeout=timeout,
-        )
+        return get_client(urljoin(url, "browser_connector"))
+
+    @staticmethod
+    def send_browser_rpc(req: dict, timeout: float = 0.0, compress: bool = False) -> Any:
+        """发送浏览器RPC请求。"""
+        return Browser.bridge_client().transition(req, timeout=timeout, compress=compress)
 
     def send_browser_extension(
         self,
@@ -101,11 +101,39 @@ class Browser:
                 "data_path": data_path,
             },
             timeout,
+            compress=key in COMPRESS_KEYS,
         )
 
+        if res.status_code != 200:
+            raise BrowserBaseException(BROWSER_EXTENSION_INSTALL_ERROR, "浏览器插件通信出错，请重试")
+        return self.__reply_data__(res.json())
+
+    def send_browser_extension_batch(
+        self,
+        browser_type: str,
+        commands: list,
+        timeout: float = None,
+    ) -> list:
+        """
+        批量发送浏览器扩展请求, 一次请求按顺序执行多个命令
+        @:param commands: [{"key": "", "data": {}}]
+        @:return: 每个命令的返回值, 任意一个命令失败时抛出异常
+        """
+        compress = any(command.get("key") in COMPRESS_KEYS for command in commands)
+        res = self.bridge_client().transition_batch(browser_type, commands, timeout=timeout, compress=compress)
         if res.status_code != 200:
             raise BrowserBaseException(BROWSER_EXTENSION_INSTALL_ERROR, "浏览器插件通信出错，请重试")
         data = res.json()
+        # 通信失败时后续命令不再执行, 结果以失败的命令结束
+        results = data.get("data") if data.get("code") == "0000" else [data]
+        for item in results:
+            if item.get("code") != "0000":
+                raise BrowserBaseException(BROWSER_EXTENSION_INSTALL_ERROR, item.get("msg"))
+        return [self.__reply_data__(item) for item in results]
+
+    @staticmethod
+    def __reply_data__(data: dict):
+        """解析桥接服务的回复, 插件返回错误时抛出异常"""
         if not data.get("data"):
             return "插件无返回消息"
         if data.get("data").get("code") == "5001":
@@ -52,13 +52,14 @@ from astronverse.browser.error import (
 )
 from astronverse.browser.js.base import BaseBuilder
 from astronverse.browser.js.chrome import CodeChromeBuilder
-from astronverse.browser.utils.table_filter import (
+from astronverse.input.code.screenshot import Screenshot
+from astronverse.tablefilter.table_filter import (
     DataFilter,
     page_values_merge,
     table_df_to_out,
     table_json_merge_values,
 )
-from astronverse.input.code.screenshot import Screenshot
+from astronverse.tablefilter.table_stream import TableStreamWriter, fingerprint
 
 if sys.platform == "win32":
     from astronverse.browser.core.core_win import BrowserCore
@@ -173,6 +174,79 @@ def extract_path_attributes(path_data):
     }
 
 
+def batch_page_values(browser_obj, batch_data, element_timeout):
+    """获取当前页的抓取数据"""
+    batch_element = batch_data.get("elementData")  # 抓取对象
+    table_element = batch_element["path"]  # 元素信息
+    if table_element["produceType"] == "table":
+        wait_data = batch_data
+        key = "tableDataBatch"
+    else:
+        # 相似元素对象
+        wait_data = {
+            "elementData": {
+                "version": batch_element["version"],
+                "type": batch_element["type"],
+                "app": batch_element["app"],
+                "picker_type": "ELEMENT",
+                "path": table_element,
+            }
+        }
+        key = "simalarListBatch"
+    wait = BrowserElement.wait_element(
+        browser_obj=browser_obj,
+        element_data=wait_data,
+        ele_status=WaitElementForStatusFlag.ElementExists,
+        element_timeout=int(element_timeout),
+    )
+    if not wait:
+        raise BaseException(WEB_GET_ELE_ERROR.format("请检查抓取元素"), "浏览器元素未找到！")
+    if key == "tableDataBatch":
+        Locator.locator(batch_element)
+    response = browser_obj.send_browser_extension(
+        browser_type=browser_obj.browser_type.value,
+        key=key,
+        data=table_element,
+    )
+    return response["values"]
+
+
+def batch_pages(browser_obj, batch_data, page_count, element_timeout, next_page, page_timeout, poll_interval=0.3):
+    """
+    逐页返回 (页码, 数据, 指纹)
+
+    翻页后轮询表格内容, 指纹变化且连续两次一致时认为新页已加载; 超时内容仍未变化说明已经到最后一页
+    """
+    values = batch_page_values(browser_obj, batch_data, element_timeout)
+    page_fp = fingerprint(values)
+    for page in range(1, page_count + 1):
+        yield page, values, page_fp
+        if page == page_count:
+            return
+        next_page()
+
+        last_fp = page_fp
+        deadline = time.time() + page_timeout
+        while True:
+            time.sleep(poll_interval)
+            try:
+                values = batch_page_values(browser_obj, batch_data, element_timeout)
+                new_fp = fingerprint(values)
+            except Exception as e:
+                # 翻页过程中表格可能暂时不存在
+                logger.info("翻页后获取数据失败: {}".format(e))
+                new_fp = page_fp
+            if new_fp != page_fp and new_fp == last_fp:
+                break
+            last_fp = new_fp
+            if time.time() > deadline:
+                if new_fp != page_fp:
+                    break
+                logger.info("翻页后表格内容没有变化, 第{}页结束抓取".format(page))
+                return
+        page_fp = new_fp
+
+
 class BrowserElement:
     """浏览器元素操作类，提供网页元素的各种操作方法。"""
 
@@ -840,15 +914,21 @@ class BrowserElement:
                     similar_count = data[0]["similarCount"]
                     if not data or len(data) <= 0:
                         break
+                    items = []
+                    finished = False
                     for di in data:
                         if count < start:
                             count += 1
                             continue
                         if 0 < end <= count:
-                            return
+                            finished = True
+                            break
                         count += 1
-                        if get_type == ElementGetAttributeHasSelfTypeFlag.GetElement:
-                            di_wrapper = {
+                        items.append(di)
+
+                    if get_type == ElementGetAttributeHasSelfTypeFlag.GetElement:
+                        for di in items:
+                            yield {
                                 "elementData": {
                                     "version": element_data["elementData"]["version"],
                                     "type": element_data["elementData"]["type"],
@@ -857,22 +937,28 @@ class BrowserElement:
                                     "path": di,
                                 }
                             }
-                            yield di_wrapper
-                            continue
-
-                        data = browser_obj.send_browser_extension(
-                            browser_type=browser_obj.browser_type.value,
-                            key="getElementAttrs",
-                            data={
-                                **di,  # 解包内部字典的内容
-                                "atomConfig": {
-                                    "operation": str(list(ElementGetAttributeHasSelfTypeFlag).index(get_type) - 1),
-                                    "attrName": attribute_name,
+                    elif items:
+                        # 这一批元素的属性一次请求获取
+                        operation = str(list(ElementGetAttributeHasSelfTypeFlag).index(get_type) - 1)
+                        commands = [
+                            {
+                                "key": "getElementAttrs",
+                                "data": {
+                                    **di,  # 解包内部字典的内容
+                                    "atomConfig": {
+                                        "operation": operation,
+                                        "attrName": attribute_name,
+                                    },
                                 },
-                            },
+                            }
+                            for di in items
+                        ]
+                        yield from browser_obj.send_browser_extension_batch(
+                            browser_type=browser_obj.browser_type.value,
+                            commands=commands,
                         )
-
-                        yield data
+                    if finished:
+                        return
                     if similar_count <= count:
                         break
 
@@ -1522,6 +1608,16 @@ class BrowserElement:
             ),
             # 是否输出表头
             atomicMg.param("output_head", required=False),
+            atomicMg.param(
+                "stream",
+                required=False,
+                dynamics=[
+                    DynamicsItem(
+                        key="$this.stream.show",
+                        expression="return $this.to_excel.value == true",
+                    )
+                ],
+            ),
         ],
         outputList=[
             atomicMg.param("table_pick", types="List"),
@@ -1553,82 +1649,76 @@ class BrowserElement:
         output_type: TablePickType = TablePickType.Row,
         output_head: bool = True,  # 是否输出表头
         output_filter_empty_col: bool = False,  # 是否过滤空列
+        stream: bool = False,  # 逐页写入文件, 支持断点续抓
     ):
-        """数据抓取（web）"""
-        table_list = []
+        """
+        数据抓取（web）
+
+        stream 为 True 时每页数据处理后直接追加写入文件并记录检查点, 失败后重新运行从检查点继续,
+        结果只写入文件, 不再返回表格数据
+        """
         batch_element = batch_data.get("elementData")  # 抓取对象
         table_element = batch_element["path"]  # 元素信息
         produce_type = table_element["produceType"]  # 抓取类型， produceType: table/similar
-        for i in range(1, page_count + 1):
-            # 获取表格内容, 二维数组
-            if produce_type == "table":
-                # 等待元素
-                wait = BrowserElement.wait_element(
-                    browser_obj=browser_obj,
-                    element_data=batch_data,
-                    ele_status=WaitElementForStatusFlag.ElementExists,
-                    element_timeout=int(element_timeout),
-                )
-                if not wait:
-                    raise BaseException(WEB_GET_ELE_ERROR.format("请检查抓取元素"), "浏览器元素未找到！")
-                # 定位
-                Locator.locator(batch_element)
-                # 发送给插件
-                response = browser_obj.send_browser_extension(
-                    browser_type=browser_obj.browser_type.value,
-                    key="tableDataBatch",
-                    data=table_element,
-                )
-                # 打印 response
-                # logger.info(f'table_element response: {response}')
-                table_values = response["values"]
-                table_list = page_values_merge(table_list, table_values, produce_type)
-            else:
-                # 相似元素对象
-                similar_element = batch_element["path"]
-                wait = BrowserElement.wait_element(
+        if not multi_page:
+            page_count = 1
+
+        if excel_path is None:
+            excel_path = f"{table_element['name']}.xlsx"
+        writer = None
+        if stream and to_excel:
+            if not excel_path.endswith((".xlsx", ".csv")):
+                raise Exception(f"{excel_path}表格文件路径错误，仅支持 .xlsx/.csv 文件")
+            # 抓取配置不变时才能续抓
+            writer = TableStreamWriter(excel_path, key=fingerprint(table_element), output_head=output_head)
+            if writer.resume():
+                logger.info(f"从检查点继续抓取: 已完成 {writer.page} 页, {writer.rows} 行")
+        elif to_excel and excel_path and not excel_path.endswith(".xlsx"):
+            raise Exception(f"{excel_path}表格文件路径错误，仅支持 .xlsx 文件")
+
+        def next_page():
+            # 点击翻页按钮元素,调用 上面的click 方法
+            try:
+                BrowserElement.click(
                     browser_obj=browser_obj,
-                    element_data={
-                        "elementData": {
-                            "version": batch_element["version"],
-                            "type": batch_element["type"],
-                            "app": batch_element["app"],
-                            "picker_type": "ELEMENT",
-                            "path": similar_element,
-                        }
-                    },
-                    ele_status=WaitElementForStatusFlag.ElementExists,
-                    element_timeout=int(element_timeout),
-                )
-                if not wait:
-                    raise BaseException(WEB_GET_ELE_ERROR.format("请检查抓取元素"), "浏览器元素未找到！")
-                response = browser_obj.send_browser_extension(
-                    browser_type=browser_obj.browser_type.value,
-                    key="simalarListBatch",
-                    data=similar_element,
+                    element_data=element_data,
+                    simulate_flag=simulate_flag,
+                    assistive_key=ButtonForAssistiveKeyFlag.Nothing,
+                    button_type=button_type,
+                    element_timeout=element_timeout,
                 )
-                # 打印 response
-                # logger.info(f'similar_element response: {response}')
-                similar_values = response["values"]
-                table_list = page_values_merge(table_list, similar_values, produce_type)
-
-            # 是否翻页
-            if page_count > 1 and multi_page:
-                # logger.info(f'翻页: {i} 页')
-                # 点击翻页按钮元素,调用 上面的click 方法
-                try:
-                    BrowserElement.click(
-                        browser_obj=browser_obj,
-                        element_data=element_data,
-                        simulate_flag=simulate_flag,
-                        assistive_key=ButtonForAssistiveKeyFlag.Nothing,
-                        button_type=button_type,
-                        element_timeout=element_timeout,
-                    )
-                except Exception:
-                    pass
-                # 等待 page_interval 秒
-                time.sleep(page_interval)
+            except Exception:
+                pass
+
+        table_list = []
+        pages = batch_pages(
+            browser_obj,
+            batch_data,
+            page_count,
+            element_timeout,
+            next_page,
+            page_timeout=max(page_interval, element_timeout),
+        )
+        for page, values, page_fp in pages:
+            if writer is None:
+                table_list = page_values_merge(table_list, values, produce_type)
+                continue
+            if page <= writer.page:
+                # 检查点之前的页只翻页不写入
+                continue
+            # 单页数据处理后追加写入
+            data_formated = table_json_merge_values(
+                data_json=table_element, values=page_values_merge([], values, produce_type)
+            )
+            data_filtered = DataFilter(data_json=data_formated).get_filtered_data()
+            writer.write(table_df_to_out(data_json=data_filtered), page_fp)
+
+        if writer is not None:
+            table_path = writer.finish(output_filter_empty_col)
+            logger.info(f"表格数据已保存到 {table_path}")
+            if output_type == TablePickType.Row:
+                return [], table_path
+            return {}, table_path
 
         # logger.info(f'表格数据: {table_list}')
         # 合并获取到的数据 到 table_element的 values 中
@@ -1648,11 +1738,6 @@ class BrowserElement:
 
         if to_excel:
             # 将table_list 转换为excel
-            # 检查 excel_path 是否为 .xlsx 文件
-            if excel_path and not excel_path.endswith(".xlsx"):
-                raise Exception(f"{excel_path}表格文件路径错误，仅支持 .xlsx 文件")
-            if excel_path is None:
-                excel_path = f"{table_element['name']}.xlsx"
             table_df_out.to_excel(excel_path, index=False, header=output_head)
             # logger.info(f'表格数据已保存到 {excel_path}')
             table_path = excel_path
@@ -9,3 +9,9 @@ class DatabaseType(Enum):
     SQLite = "SQLite"
     Access = "Access"
     DB2 = "DB2"
+
+
+class QueryOutputType(Enum):
+    CHUNK = "chunk"
+    CSV = "csv"
+    EXCEL = "excel"
@@ -1,5 +1,335 @@
+import csv
+import datetime
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
 from abc import ABC
+from collections.abc import Iterator
+from decimal import Decimal
+
+from astronverse.database import DatabaseType, QueryOutputType
+from astronverse.database.error import *
+from astronverse.database.pool import pool
+
+EXCEL_MAX_ROWS = 1048576
 
 
 class IDatabaseCore(ABC):
-    pass
+    """
+    数据库操作, 驱动按需导入, 只有用到的数据库需要安装对应驱动
+
+    平台相关的只有 odbc 驱动名称, 由 core_win/core_unix 指定
+    """
+
+    sqlserver_driver = "SQL Server"
+    access_driver = "Driver do Microsoft Access (*.mdb)"
+
+    # 检查空闲连接是否可用
+    ping_sql = {
+        DatabaseType.Oracle: "SELECT 1 FROM DUAL",
+        DatabaseType.DB2: "SELECT 1 FROM SYSIBM.SYSDUMMY1",
+    }
+
+    @staticmethod
+    def dsn(db_info_dict: dict, db_type: DatabaseType) -> str:
+        """连接池的key, 相同的连接信息复用连接"""
+        return "{}:{}".format(db_type.value, json.dumps(db_info_dict, sort_keys=True, ensure_ascii=False, default=str))
+
+    @classmethod
+    def connect(cls, db_info_dict: dict, db_type: DatabaseType = DatabaseType.MySQL):
+        db_info_dict = dict(db_info_dict)
+
+        def ping(db_conn) -> bool:
+            try:
+                cursor = db_conn.cursor()
+                try:
+                    cursor.execute(cls.ping_sql.get(db_type, "SELECT 1"))
+                    cursor.fetchall()
+                finally:
+                    cursor.close()
+                return True
+            except Exception:
+                return False
+
+        return pool.acquire(cls.dsn(db_info_dict, db_type), lambda: cls.new_connection(db_info_dict, db_type), ping)
+
+    @classmethod
+    def new_connection(cls, db_info_dict: dict, db_type: DatabaseType = DatabaseType.MySQL):
+        if db_type == DatabaseType.MySQL:
+            import pymysql
+
+            if db_info_dict.get("PORT", ""):
+                db_info_dict["port"] = int(db_info_dict.get("PORT", 3306))
+            return pymysql.connect(
+                host=db_info_dict["host"],
+                port=int(db_info_dict.get("port", 3306)),
+                user=db_info_dict["user"],
+                password=db_info_dict["password"],
+                database=db_info_dict["database"],
+                charset=db_info_dict.get("charset", "utf8").replace("-", ""),
+            )
+        elif db_type == DatabaseType.SQLServer:
+            import pyodbc
+
+            server = "{},{}".format(db_info_dict.get("host", ""), int(db_info_dict.get("port", 1433)))
+            # 连接字符串
+            conn_str = (
+                rf"DRIVER={{{cls.sqlserver_driver}}};"
+                rf"SERVER={server};"
+                rf"DATABASE={db_info_dict.get('database', '')};"
+                rf"UID={db_info_dict.get('user', '')};"
+                rf"PWD={db_info_dict.get('password', '')};"
+            )
+            # 连接数据库
+            return pyodbc.connect(conn_str)
+        elif db_type == DatabaseType.Oracle:
+            import cx_Oracle
+
+            if db_info_dict.get("service_type", "") == "service":
+                service = db_info_dict.get("service", "")
+            else:
+                service = db_info_dict.get("sid", "")
+            return cx_Oracle.connect(
+                user=db_info_dict.get("user", ""),
+                password=db_info_dict.get("password", ""),
+                dsn=f"{db_info_dict.get('host', '')}:{int(db_info_dict.get('port', 1521))}/{service}",
+            )
+        elif db_type == DatabaseType.PostgreSQL:
+            import psycopg2
+
+            return psycopg2.connect(
+                database=db_info_dict.get("database", ""),
+                user=db_info_dict.get("user", ""),
+                password=db_info_dict.get("password", ""),
+                host=db_info_dict.get("host", ""),
+                port=int(db_info_dict.get("port", 5432)),
+            )
+        elif db_type == DatabaseType.SQLite:
+            # 执行器可能在其他线程中调用原子能力
+            return sqlite3.connect(f"{db_info_dict.get('sqlite_path', '')}", check_same_thread=False)
+        elif db_type == DatabaseType.Access:
+            if not cls.access_driver:
+                raise BaseException(DB_TYPE_NOT_SUPPORT_FORMAT.format(db_type.value), "当前平台不支持该数据库类型")
+            import pyodbc
+
+            conn_str = (
+                rf"DRIVER={{{cls.access_driver}}};"
+                rf"DBQ={db_info_dict.get('access_path', '')};"
+                rf"PWD={db_info_dict.get('password', '')};"
+            )
+            return pyodbc.connect(conn_str)
+        elif db_type == DatabaseType.DB2:
+            import ibm_db_dbi
+
+            conn_str = (
+                f"DATABASE={db_info_dict.get('database', '')};"
+                f"HOSTNAME={db_info_dict.get('host', '')};"
+                f"PORT={int(db_info_dict.get('port', 50000))};"
+                "PROTOCOL=TCPIP;"
+                f"UID={db_info_dict.get('user', '')};"
+                f"PWD={db_info_dict.get('password', '')};"
+            )
+            return ibm_db_dbi.connect(conn_str, "", "")
+        else:
+            raise BaseException(DB_TYPE_NOT_SUPPORT_FORMAT.format(db_type), "找不到该数据库类型!")
+
+    @staticmethod
+    def disconnect(db_conn: object):
+        pool.release(db_conn)
+
+    @staticmethod
+    def execute(db_conn: object, sql_str: str) -> bool:
+        cursor = db_conn.cursor()
+        try:
+            cursor.execute(sql_str)
+            db_conn.commit()
+        except Exception:
+            db_conn.rollback()
+            return False
+        finally:
+            cursor.close()
+        return True
+
+    @staticmethod
+    def convert_value(value):
+        # 对查询结果的类型进行转换
+        if isinstance(value, datetime.datetime):
+            return value.strftime("%Y-%m-%d %H:%M:%S")
+        elif isinstance(value, datetime.date):
+            return value.strftime("%Y-%m-%d")
+        elif isinstance(value, Decimal):
+            # 这个用字符串，用float会造成精度丢失
+            return str(value)
+        return value
+
+    @classmethod
+    def iter_rows(cls, db_conn: object, sql_str: str, params=None, chunk_size: int = 1000) -> tuple:
+        """
+        执行查询, 返回 (列名, 每批行数据的迭代器), 每批用 fetchmany 读取 chunk_size 行
+        迭代结束后关闭游标
+        """
+        cursor = db_conn.cursor()
+        try:
+            if params:
+                cursor.execute(sql_str, params)
+            else:
+                cursor.execute(sql_str)
+        except Exception:
+            cursor.close()
+            raise
+        keys = [key[0] for key in cursor.description or []]
+
+        def chunks() -> Iterator[list]:
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield [tuple(cls.convert_value(value) for value in row) for row in rows]
+            finally:
+                cursor.close()
+
+        return keys, chunks()
+
+    @classmethod
+    def iter_query(cls, db_conn: object, sql_str: str, params=None, chunk_size: int = 1000) -> Iterator[list]:
+        """分批查询, 每批是 chunk_size 行的 [{列名: 值}], 查询语句立即执行, 错误不会延迟到循环中"""
+        keys, chunks = cls.iter_rows(db_conn, sql_str, params, chunk_size)
+        return ([dict(zip(keys, row)) for row in rows] for rows in chunks)
+
+    @classmethod
+    def query(cls, db_conn: object, sql_str: str, params=None) -> list:
+        res_list = []
+        for rows in cls.iter_query(db_conn, sql_str, params):
+            res_list.extend(rows)
+        return res_list
+
+    @classmethod
+    def query_to_file(
+        cls,
+        db_conn: object,
+        sql_str: str,
+        file_path: str,
+        output_type: QueryOutputType = QueryOutputType.CSV,
+        params=None,
+        chunk_size: int = 1000,
+    ) -> int:
+        """
+        查询结果分批直接写入 csv/xlsx 文件, 不在内存中保留全部数据, 返回行数
+        先写临时文件, 成功后替换, 查询失败不留下不完整的文件
+        """
+        keys, chunks = cls.iter_rows(db_conn, sql_str, params, chunk_size)
+        tmp_path = "{}.tmp".format(file_path)
+        count = 0
+        try:
+            if output_type == QueryOutputType.EXCEL:
+                from openpyxl import Workbook
+
+                wb = Workbook(write_only=True)
+                ws = wb.create_sheet()
+                ws.append(keys)
+                for rows in chunks:
+                    if count + len(rows) + 1 > EXCEL_MAX_ROWS:
+                        raise BaseException(EXCEL_ROWS_LIMIT_FORMAT.format(EXCEL_MAX_ROWS), "超过Excel最大行数")
+                    for row in rows:
+                        ws.append([value.hex() if isinstance(value, bytes) else value for value in row])
+                    count += len(rows)
+                with open(tmp_path, "wb") as f:
+                    wb.save(f)
+            else:
+                with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(keys)
+                    for rows in chunks:
+                        writer.writerows(rows)
+                        count += len(rows)
+            os.replace(tmp_path, file_path)
+        finally:
+            chunks.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return count
+
+    @staticmethod
+    def placeholder(db_conn: object, index: int) -> str:
+        """按驱动的 paramstyle 生成第 index 个参数的占位符"""
+        module = sys.modules.get(type(db_conn).__module__.split(".")[0])
+        paramstyle = getattr(module, "paramstyle", "qmark")
+        if paramstyle in ("format", "pyformat"):
+            return "%s"
+        if paramstyle in ("numeric", "named"):
+            return ":{}".format(index + 1)
+        return "?"
+
+    @staticmethod
+    def db_value(value):
+        """DataFrame 中的 numpy/pandas 类型转换为驱动支持的 python 类型, 空值转换为 None"""
+        if value is None or isinstance(value, (str, bytes)):
+            return value
+        if value != value:
+            # NaN/NaT
+            return None
+        if type(value).__module__ == "numpy":
+            return value.item()
+        if hasattr(value, "to_pydatetime"):
+            return value.to_pydatetime()
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False)
+        return value
+
+    @classmethod
+    def rows_from_data(cls, data) -> tuple:
+        """[{列名: 值}] 或 DataFrame, 转换为 (列名, 行数据的迭代器)"""
+        if hasattr(data, "columns") and hasattr(data, "itertuples"):
+            columns = [str(column) for column in data.columns]
+            rows = (tuple(cls.db_value(value) for value in row) for row in data.itertuples(index=False, name=None))
+            return columns, rows
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise BaseException(INSERT_DATA_ERROR_FORMAT.format(type(data).__name__), "插入数据格式错误")
+
+        # 所有行的列名, 保持出现顺序, 缺少的列为 None
+        columns = list(dict.fromkeys(key for row in data for key in row))
+        rows = (tuple(cls.db_value(row.get(column)) for column in columns) for row in data)
+        return columns, rows
+
+    @classmethod
+    def insert_rows(cls, db_conn: object, table_name: str, data, batch_size: int = 1000) -> int:
+        """
+        参数化批量插入, 每 batch_size 行调用一次 executemany, 全部成功后提交, 失败时回滚
+        返回插入的行数
+        """
+        columns, rows = cls.rows_from_data(data)
+        if not columns:
+            return 0
+        for name in [table_name] + columns:
+            # 表名和列名不能参数化, 只允许普通标识符, 防止注入
+            if not re.fullmatch(r"[\w$]+(\.[\w$]+)*", name):
+                raise BaseException(IDENTIFIER_ERROR_FORMAT.format(name), "表名或列名不合法")
+
+        sql_str = "INSERT INTO {} ({}) VALUES ({})".format(
+            table_name, ", ".join(columns), ", ".join(cls.placeholder(db_conn, i) for i in range(len(columns)))
+        )
+        cursor = db_conn.cursor()
+        if hasattr(cursor, "fast_executemany"):
+            # pyodbc 默认逐行发送
+            cursor.fast_executemany = True
+        count = 0
+        try:
+            while True:
+                batch = list(itertools.islice(rows, max(1, batch_size)))
+                if not batch:
+                    break
+                cursor.executemany(sql_str, batch)
+                count += len(batch)
+            db_conn.commit()
+        except Exception:
+            db_conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        return count
@@ -2,6 +2,6 @@ from astronverse.database.core import IDatabaseCore
 
 
 class DatabaseCore(IDatabaseCore):
-    @staticmethod
-    def print(msg: str = "") -> str:
-        return "linux {}".format(msg)
+    # 需要安装 unixODBC 和微软的 msodbcsql18, Access 没有linux驱动
+    sqlserver_driver = "ODBC Driver 18 for SQL Server"
+    access_driver = ""
@@ -1,8 +1,11 @@
 import platform
 import sys
+from typing import Any
 
+from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, AtomicLevel, DynamicsItem
 from astronverse.actionlib.atomic import atomicMg
-from astronverse.database import DatabaseType
+from astronverse.actionlib.utils import FileExistenceType, handle_existence
+from astronverse.database import DatabaseType, QueryOutputType
 from astronverse.database.core import IDatabaseCore
 from astronverse.database.error import *
 
@@ -22,7 +25,7 @@ class Database:
     @atomicMg.atomic(
         "Database",
         inputList=[
-            atomicMg.param("connect_info", types=dict),  # TODO 確定類型【目前用手動輸入Dict的方式】
+            atomicMg.param("connect_info", types="Dict"),  # TODO 確定類型【目前用手動輸入Dict的方式】
         ],
         outputList=[atomicMg.param("connect_db_obj", types="Any")],
     )
@@ -31,21 +34,95 @@ class Database:
         return connect_db_obj
 
     @staticmethod
-    @atomicMg.atomic("Database", inputList=[], outputList=[])
+    @atomicMg.atomic("Database", inputList=[atomicMg.param("database_obj", types="Any")], outputList=[])
     def disconnect_database(database_obj: object):
         DatabaseCore.disconnect(database_obj)
 
     @staticmethod
-    @atomicMg.atomic("Database", inputList=[], outputList=[])
+    @atomicMg.atomic("Database", inputList=[atomicMg.param("database_obj", types="Any")], outputList=[])
     def execute_sql(database_obj: object, sql: str):
         DatabaseCore.execute(database_obj, sql)
 
     @staticmethod
     @atomicMg.atomic(
         "Database",
-        inputList=[],
+        inputList=[atomicMg.param("database_obj", types="Any")],
         outputList=[atomicMg.param("query_db_result", types="Any")],
     )
     def query_sql(database_obj: object, sql: str):
-        query_db_result = DatabaseCore.execute(database_obj, sql)
+        query_db_result = DatabaseCore.query(database_obj, sql)
         return query_db_result
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Database",
+        inputList=[
+            atomicMg.param("database_obj", types="Any"),
+            atomicMg.param("chunk_size", required=False),
+            atomicMg.param(
+                "file_path",
+                formType=AtomicFormTypeMeta(
+                    type=AtomicFormType.INPUT_VARIABLE_PYTHON_FILE.value,
+                    params={"filters": [], "file_type": "file"},
+                ),
+                dynamics=[
+                    DynamicsItem(
+                        key="$this.file_path.show",
+                        expression="return $this.output_type.value != '{}'".format(QueryOutputType.CHUNK.value),
+                    )
+                ],
+            ),
+            atomicMg.param(
+                "exist_handle_type",
+                level=AtomicLevel.ADVANCED,
+                dynamics=[
+                    DynamicsItem(
+                        key="$this.exist_handle_type.show",
+                        expression="return $this.output_type.value != '{}'".format(QueryOutputType.CHUNK.value),
+                    )
+                ],
+            ),
+        ],
+        outputList=[atomicMg.param("query_batch_result", types="Any")],
+    )
+    def query_sql_batch(
+        database_obj: object,
+        sql: str,
+        output_type: QueryOutputType = QueryOutputType.CHUNK,
+        chunk_size: int = 1000,
+        file_path: str = "",
+        exist_handle_type: FileExistenceType = FileExistenceType.RENAME,
+    ) -> Any:
+        """
+        分批查询大量数据
+        :param output_type: chunk 返回分批迭代器, 每次循环得到 chunk_size 行; csv/excel 直接写入文件
+        :return: 分批迭代器 或 保存的文件路径
+        """
+        if output_type == QueryOutputType.CHUNK:
+            return DatabaseCore.iter_query(database_obj, sql, chunk_size=chunk_size)
+
+        if not file_path:
+            raise BaseException(FILE_PATH_EMPTY_FORMAT.format(file_path), "保存文件路径不能为空")
+        file_path = handle_existence(file_path, exist_handle_type)
+        if not file_path:
+            return ""
+        DatabaseCore.query_to_file(database_obj, sql, file_path, output_type, chunk_size=chunk_size)
+        return file_path
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Database",
+        inputList=[
+            atomicMg.param("database_obj", types="Any"),
+            atomicMg.param("data", types="Any"),
+            atomicMg.param("batch_size", required=False, level=AtomicLevel.ADVANCED),
+        ],
+        outputList=[atomicMg.param("insert_count", types="Int")],
+    )
+    def insert_rows(database_obj: object, table_name: str, data: Any = None, batch_size: int = 1000) -> int:
+        """
+        批量插入数据
+        :param data: 字典列表 [{列名: 值}] 或 DataFrame
+        :return: 插入的行数
+        """
+        return DatabaseCore.insert_rows(database_obj, table_name, data, batch_size)
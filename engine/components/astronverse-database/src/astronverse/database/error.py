@@ -4,3 +4,10 @@ from astronverse.baseline.i18n.i18n import _
 BaseException = BaseException
 
 MSG_EMPTY_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("消息为空") + ": {}")
+DB_TYPE_NOT_SUPPORT_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("不支持的数据库类型") + ": {}")
+FILE_PATH_EMPTY_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("保存文件路径不能为空") + ": {}")
+EXCEL_ROWS_LIMIT_FORMAT: ErrorCode = ErrorCode(
+    BizCode.LocalErr, _("查询结果超过Excel最大行数，请保存为CSV文件") + ": {}"
+)
+INSERT_DATA_ERROR_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("插入数据必须是字典列表或DataFrame") + ": {}")
+IDENTIFIER_ERROR_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("表名或列名不合法") + ": {}")
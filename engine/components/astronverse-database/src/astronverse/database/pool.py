@@ -0,0 +1,12 @@
+from astronverse.actionlib.pool import ConnectionPool
+
+
+class DatabasePool(ConnectionPool):
+    """数据库连接池, 按连接信息(dsn)复用连接, 断开连接时归还到池中"""
+
+    def reset(self, conn):
+        # 未提交的事务不能带给下一个使用者
+        conn.rollback()
+
+
+pool = DatabasePool()
@@ -0,0 +1,183 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+from astronverse.actionlib.utils import FileExistenceType
+from astronverse.database import DatabaseType, QueryOutputType
+from astronverse.database.database import Database
+from astronverse.database.error import BaseException
+from astronverse.database.pool import DatabasePool, pool
+from openpyxl import load_workbook
+
+
+class TestDatabase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.info = {"sqlite_path": os.path.join(self.temp_dir, "test.db")}
+        self.conn = Database.connect_database(connect_info=self.info, db_type=DatabaseType.SQLite)
+        Database.execute_sql(
+            database_obj=self.conn, sql="CREATE TABLE user (id INTEGER, name TEXT, score REAL, amount TEXT)"
+        )
+
+    def tearDown(self):
+        pool.close_all()
+        shutil.rmtree(self.temp_dir)
+
+    def insert(self, count: int):
+        data = [{"id": i, "name": "name-{}".format(i), "score": i / 2} for i in range(count)]
+        return Database.insert_rows(database_obj=self.conn, table_name="user", data=data, batch_size=7)
+
+    def test_pool_reuse(self):
+        Database.disconnect_database(database_obj=self.conn)
+        conn = Database.connect_database(connect_info=dict(self.info), db_type=DatabaseType.SQLite)
+        self.assertIs(conn, self.conn)
+
+        # 未断开时, 相同的连接信息新建连接
+        other = Database.connect_database(connect_info=self.info, db_type=DatabaseType.SQLite)
+        self.assertIsNot(other, conn)
+        Database.disconnect_database(database_obj=other)
+
+    def test_pool_drop_broken(self):
+        Database.disconnect_database(database_obj=self.conn)
+        self.conn.close()
+        conn = Database.connect_database(connect_info=self.info, db_type=DatabaseType.SQLite)
+        self.assertIsNot(conn, self.conn)
+        self.conn = conn
+
+    def test_pool_release_rollback(self):
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO user (id) VALUES (1)")
+        Database.disconnect_database(database_obj=self.conn)
+        conn = Database.connect_database(connect_info=self.info, db_type=DatabaseType.SQLite)
+        self.assertEqual(Database.query_sql(database_obj=conn, sql="SELECT * FROM user"), [])
+
+    def test_pool_max_idle(self):
+        test_pool = DatabasePool()
+        test_pool.max_idle = 1
+        conns = [test_pool.acquire("dsn", lambda: MockConn()) for _ in range(3)]
+        for conn in conns:
+            test_pool.release(conn)
+        self.assertEqual(len(test_pool.idle["dsn"]), 1)
+        self.assertEqual(sum(conn.closed for conn in conns), 2)
+
+        # 不是从池中获取的连接直接关闭
+        conn = MockConn()
+        self.assertFalse(test_pool.release(conn))
+        self.assertTrue(conn.closed)
+
+    def test_insert_and_query(self):
+        self.assertEqual(self.insert(20), 20)
+        rows = Database.query_sql(database_obj=self.conn, sql="SELECT id, name, score FROM user ORDER BY id")
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(rows[3], {"id": 3, "name": "name-3", "score": 1.5})
+
+    def test_insert_dataframe(self):
+        df = pd.DataFrame({"id": [1, 2], "name": ["a", None], "score": [0.5, float("nan")]})
+        self.assertEqual(Database.insert_rows(database_obj=self.conn, table_name="user", data=df), 2)
+        rows = Database.query_sql(database_obj=self.conn, sql="SELECT id, name, score FROM user ORDER BY id")
+        self.assertEqual(rows, [{"id": 1, "name": "a", "score": 0.5}, {"id": 2, "name": None, "score": None}])
+
+    def test_insert_rollback(self):
+        Database.execute_sql(database_obj=self.conn, sql="CREATE UNIQUE INDEX idx_id ON user (id)")
+        data = [{"id": i} for i in range(10)] + [{"id": 0}]
+        with self.assertRaises(Exception):
+            Database.insert_rows(database_obj=self.conn, table_name="user", data=data, batch_size=3)
+        self.assertEqual(Database.query_sql(database_obj=self.conn, sql="SELECT * FROM user"), [])
+
+    def test_insert_invalid(self):
+        with self.assertRaises(BaseException):
+            Database.insert_rows(database_obj=self.conn, table_name="user; DROP TABLE user", data=[{"id": 1}])
+        with self.assertRaises(BaseException):
+            Database.insert_rows(database_obj=self.conn, table_name="user", data=[{"id) --": 1}])
+        with self.assertRaises(BaseException):
+            Database.insert_rows(database_obj=self.conn, table_name="user", data="id")
+        self.assertEqual(Database.insert_rows(database_obj=self.conn, table_name="user", data=[]), 0)
+
+    def test_query_chunk(self):
+        self.insert(25)
+        chunks = Database.query_sql_batch(database_obj=self.conn, sql="SELECT id FROM user ORDER BY id", chunk_size=10)
+        sizes = []
+        ids = []
+        for rows in chunks:
+            sizes.append(len(rows))
+            ids.extend(row["id"] for row in rows)
+        self.assertEqual(sizes, [10, 10, 5])
+        self.assertEqual(ids, list(range(25)))
+
+        # 查询语句错误时立即报错
+        with self.assertRaises(Exception):
+            Database.query_sql_batch(database_obj=self.conn, sql="SELECT * FROM not_exist")
+
+    def test_query_to_csv(self):
+        self.insert(25)
+        Database.insert_rows(
+            database_obj=self.conn, table_name="user", data=[{"id": 100, "name": "中文", "amount": "1.10"}]
+        )
+        file_path = os.path.join(self.temp_dir, "user.csv")
+        res = Database.query_sql_batch(
+            database_obj=self.conn,
+            sql="SELECT id, name, amount FROM user ORDER BY id",
+            output_type=QueryOutputType.CSV,
+            chunk_size=10,
+            file_path=file_path,
+        )
+        self.assertEqual(res, file_path)
+        with open(file_path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["id", "name", "amount"])
+        self.assertEqual(len(rows), 27)
+        self.assertEqual(rows[-1], ["100", "中文", "1.10"])
+
+        # 同名文件
+        res = Database.query_sql_batch(
+            database_obj=self.conn,
+            sql="SELECT id FROM user",
+            output_type=QueryOutputType.CSV,
+            file_path=file_path,
+            exist_handle_type=FileExistenceType.RENAME,
+        )
+        self.assertEqual(res, os.path.join(self.temp_dir, "user_1.csv"))
+
+    def test_query_to_excel(self):
+        self.insert(25)
+        file_path = os.path.join(self.temp_dir, "user.xlsx")
+        Database.query_sql_batch(
+            database_obj=self.conn,
+            sql="SELECT id, name FROM user ORDER BY id",
+            output_type=QueryOutputType.EXCEL,
+            chunk_size=10,
+            file_path=file_path,
+        )
+        rows = list(load_workbook(file_path).active.values)
+        self.assertEqual(rows[0], ("id", "name"))
+        self.assertEqual(rows[1:], [(i, "name-{}".format(i)) for i in range(25)])
+
+    def test_query_to_file_error(self):
+        file_path = os.path.join(self.temp_dir, "user.csv")
+        with self.assertRaises(Exception):
+            Database.query_sql_batch(
+                database_obj=self.conn,
+                sql="SELECT * FROM not_exist",
+                output_type=QueryOutputType.CSV,
+                file_path=file_path,
+            )
+        self.assertEqual(os.listdir(self.temp_dir), ["test.db"])
+
+
+class MockConn:
+    def __init__(self):
+        self.closed = False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+if __name__ == "__main__":
+    unittest.main()
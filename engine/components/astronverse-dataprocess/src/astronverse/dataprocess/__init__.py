@@ -78,6 +78,14 @@ class SortMethodType(Enum):
     DESC = "desc"
 
 
+class JoinType(Enum):
+    """列表关联方式枚举。"""
+
+    INNER = "inner"
+    LEFT = "left"
+    ANTI = "anti"
+
+
 class ConcatStringType(Enum):
     """字符串拼接类型枚举。"""
 
@@ -8,7 +8,7 @@ from typing import Any
 
 from astronverse.actionlib import DynamicsItem
 from astronverse.actionlib.atomic import atomicMg
-from astronverse.dataprocess import DeleteMethodType, InsertMethodType, ListType, SortMethodType
+from astronverse.dataprocess import DeleteMethodType, InsertMethodType, JoinType, ListType, SortMethodType
 from astronverse.dataprocess.error import INVALID_INDEX_ERROR_FORMAT, INVALID_LIST_FORMAT_ERROR_FORMAT
 
 
@@ -45,6 +45,63 @@ def list_legal_check(list_data: list, index: str = "", allow_empty: bool = True)
     return list_data, index_int
 
 
+_DICT_KEY = object()
+_LIST_KEY = object()
+_TUPLE_KEY = object()
+_OBJECT_KEY = object()
+_SCALAR_TYPES = {str, int, float, bool, type(None)}
+
+
+def hash_key(value):
+    """
+    元素的哈希key, 相等的元素key相同
+    字典/列表等不可哈希的元素(如JSON数据)转换为等价的可哈希key
+    """
+    if isinstance(value, dict):
+        # 常见的字符串/数字直接使用, 减少递归调用
+        return _DICT_KEY, frozenset([(k, v if type(v) in _SCALAR_TYPES else hash_key(v)) for k, v in value.items()])
+    if isinstance(value, list):
+        return _LIST_KEY, tuple(v if type(v) in _SCALAR_TYPES else hash_key(v) for v in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        pass
+    if isinstance(value, tuple):
+        return _TUPLE_KEY, tuple(hash_key(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    # 其他不可哈希的对象只和自身相等
+    return _OBJECT_KEY, id(value)
+
+
+def unique_list(list_data) -> list:
+    """保持顺序去重, 保留第一次出现的元素"""
+    try:
+        return list(dict.fromkeys(list_data))
+    except TypeError:
+        pass
+    # 包含字典/列表等不可哈希的元素
+    seen = set()
+    result = []
+    for i in list_data:
+        key = hash_key(i)
+        if key not in seen:
+            seen.add(key)
+            result.append(i)
+    return result
+
+
+def row_key(row: dict, keys: list):
+    """列表关联时行的key, 缺少关联的键时返回 None"""
+    if not isinstance(row, dict):
+        raise ValueError("关联的列表元素必须是字典!")
+    try:
+        return hash_key(tuple(row[k] for k in keys))
+    except KeyError:
+        return None
+
+
 class ListProcess:
     """列表处理流程类。"""
 
@@ -190,6 +247,30 @@ class ListProcess:
         except ValueError:
             raise ValueError("列表中不存在该对象!")
 
+    @staticmethod
+    @atomicMg.atomic(
+        "ListProcess",
+        inputList=[
+            atomicMg.param("list_data", types="Any"),
+            atomicMg.param("values", types="Any"),
+        ],
+        outputList=[atomicMg.param("get_list_positions", types="List")],
+    )
+    def get_list_positions(list_data: list, values: list):
+        """
+        列表批量获取多项的位置, 只遍历一次列表建立索引, 不存在的项位置为 -1
+        """
+        try:
+            index = {}
+            for pos, value in enumerate(list_data):
+                index.setdefault(value, pos)
+            return [index.get(value, -1) for value in values]
+        except TypeError:
+            index = {}
+            for pos, value in enumerate(list_data):
+                index.setdefault(hash_key(value), pos)
+            return [index.get(hash_key(value), -1) for value in values]
+
     @staticmethod
     @atomicMg.atomic(
         "ListProcess",
@@ -299,9 +380,15 @@ class ListProcess:
     )
     def filter_elements_from_list(list_data_1: list, list_data_2: list):
         """
-        列表过滤
+        列表过滤, 保持原有顺序
         """
-        return [i for i in list_data_1 if i not in list_data_2]
+        try:
+            exclude = set(list_data_2)
+            return [i for i in list_data_1 if i not in exclude]
+        except TypeError:
+            # 包含字典/列表等不可哈希的元素
+            exclude = {hash_key(i) for i in list_data_2}
+            return [i for i in list_data_1 if hash_key(i) not in exclude]
 
     @staticmethod
     @atomicMg.atomic(
@@ -345,10 +432,9 @@ class ListProcess:
     )
     def get_unique_list(list_data: list):
         """
-        列表去重
+        列表去重, 保持原有顺序
         """
-        list_data = list(set(list_data))
-        return list_data
+        return unique_list(list_data)
 
     @staticmethod
     @atomicMg.atomic(
@@ -361,10 +447,68 @@ class ListProcess:
     )
     def get_common_elements_from_list(list_data_1: list, list_data_2: list):
         """
-        列表获取共同元素
+        列表获取共同元素, 按第一个列表的顺序去重
         """
-        list_result = list(set(list_data_1) & set(list_data_2))
-        return list_result
+        try:
+            include = set(list_data_2)
+            common = [i for i in list_data_1 if i in include]
+        except TypeError:
+            include = {hash_key(i) for i in list_data_2}
+            common = [i for i in list_data_1 if hash_key(i) in include]
+        return unique_list(common)
+
+    @staticmethod
+    @atomicMg.atomic(
+        "ListProcess",
+        inputList=[
+            atomicMg.param("list_data_1", types="Any"),
+            atomicMg.param("list_data_2", types="Any"),
+        ],
+        outputList=[atomicMg.param("joined_list_data", types="List")],
+    )
+    def join_list_by_key(
+        list_data_1: list, list_data_2: list, join_key: str = "", join_type: JoinType = JoinType.INNER
+    ):
+        """
+        按键关联两个字典列表, 多个键用逗号分隔
+        inner: 两个列表都有的行, 合并两边的字段, 同名字段保留第一个列表的值
+        left: 第一个列表的全部行, 没有关联上的行第二个列表的字段为 None
+        anti: 第一个列表中关联不上第二个列表的行
+        """
+        keys = [k.strip() for k in str(join_key).split(",") if k.strip()]
+        if not keys:
+            raise ValueError("请提供关联的键!")
+
+        index = {}
+        for row in list_data_2:
+            k = row_key(row, keys)
+            if k is not None:
+                index.setdefault(k, []).append(row)
+
+        result = []
+        if join_type == JoinType.ANTI:
+            for row in list_data_1:
+                k = row_key(row, keys)
+                if k is None or k not in index:
+                    result.append(row)
+            return result
+
+        right_columns = list(dict.fromkeys(name for row in list_data_2 for name in row))
+        for row in list_data_1:
+            k = row_key(row, keys)
+            matches = index.get(k) if k is not None else None
+            if matches:
+                for match in matches:
+                    merged = dict(row)
+                    for name, value in match.items():
+                        merged.setdefault(name, value)
+                    result.append(merged)
+            elif join_type == JoinType.LEFT:
+                merged = dict(row)
+                for name in right_columns:
+                    merged.setdefault(name, None)
+                result.append(merged)
+        return result
 
     @staticmethod
     @atomicMg.atomic(
@@ -0,0 +1,58 @@
+"""
+列表处理耗时基准: 旧的逐个查找实现 vs 哈希实现
+
+运行: python tests/benchmark_list.py [元素个数 ...]
+旧实现是 O(n*m), 只在 10000 个元素以内运行
+"""
+
+import random
+import sys
+import time
+
+from astronverse.dataprocess import JoinType
+from astronverse.dataprocess.list import ListProcess
+
+LEGACY_MAX = 10000
+
+
+def bench(name, func):
+    start = time.perf_counter()
+    func()
+    print("  {:40s} {:10.1f} ms".format(name, (time.perf_counter() - start) * 1000))
+
+
+def legacy_filter(list_data_1, list_data_2):
+    return [i for i in list_data_1 if i not in list_data_2]
+
+
+def main(sizes: list):
+    for n in sizes:
+        ids_1 = ["ID{:08d}".format(i) for i in random.sample(range(n * 2), n)]
+        ids_2 = ["ID{:08d}".format(i) for i in random.sample(range(n * 2), n)]
+        rows_1 = [{"id": i, "name": "name-{}".format(i), "tags": [n % 7]} for n, i in enumerate(ids_1)]
+        rows_2 = [{"id": i, "amount": len(i)} for i in ids_2]
+        print("{} elements".format(n))
+
+        if n <= LEGACY_MAX:
+            bench("filter (legacy)", lambda: legacy_filter(ids_1, ids_2))
+            bench("filter dicts (legacy)", lambda: legacy_filter(rows_1, rows_1[: n // 2]))
+        bench("filter", lambda: ListProcess.filter_elements_from_list(list_data_1=ids_1, list_data_2=ids_2))
+        bench(
+            "filter dicts",
+            lambda: ListProcess.filter_elements_from_list(list_data_1=rows_1, list_data_2=rows_1[: n // 2]),
+        )
+        bench("unique", lambda: ListProcess.get_unique_list(list_data=ids_1 + ids_2))
+        bench("unique dicts", lambda: ListProcess.get_unique_list(list_data=rows_1 + rows_1))
+        bench("common", lambda: ListProcess.get_common_elements_from_list(list_data_1=ids_1, list_data_2=ids_2))
+        bench("positions (1000 values)", lambda: ListProcess.get_list_positions(list_data=ids_1, values=ids_2[:1000]))
+        for join_type in JoinType:
+            bench(
+                "join {}".format(join_type.value),
+                lambda: ListProcess.join_list_by_key(
+                    list_data_1=rows_1, list_data_2=rows_2, join_key="id", join_type=join_type
+                ),
+            )
+
+
+if __name__ == "__main__":
+    main([int(i) for i in sys.argv[1:]] or [10000, 100000, 1000000])
@@ -1,6 +1,6 @@
 import unittest
 
-from astronverse.dataprocess import DeleteMethodType, InsertMethodType, ListType, SortMethodType
+from astronverse.dataprocess import DeleteMethodType, InsertMethodType, JoinType, ListType, SortMethodType
 from astronverse.dataprocess.list import ListProcess
 
 
@@ -139,6 +139,13 @@ class TestListProcess(unittest.TestCase):
         result = ListProcess.filter_elements_from_list(list_data_1=list1, list_data_2=list2)
         self.assertEqual(result, [1, 3, 5])
 
+    def test_filter_elements_from_list_unhashable(self):
+        """测试列表过滤 - 包含字典和列表"""
+        list1 = [{"id": 1, "tags": ["a"]}, {"id": 2}, [1, 2], 3, {"id": 1, "tags": ["a"]}]
+        list2 = [{"tags": ["a"], "id": 1}, [1, 2]]
+        result = ListProcess.filter_elements_from_list(list_data_1=list1, list_data_2=list2)
+        self.assertEqual(result, [{"id": 2}, 3])
+
     def test_reverse_list(self):
         """测试列表反转"""
         test_list = [1, 2, 3, 4, 5]
@@ -168,6 +175,73 @@ class TestListProcess(unittest.TestCase):
         # 注意：set操作后顺序可能不同，所以需要排序比较
         self.assertEqual(sorted(result), [3, 4, 5])
 
+    def test_get_unique_list_keep_order(self):
+        """测试列表去重 - 保持顺序, 包含字典"""
+        test_list = [3, 1, {"a": [1]}, 3, 2, {"a": [1]}, 1, {"a": [2]}]
+        result = ListProcess.get_unique_list(list_data=test_list)
+        self.assertEqual(result, [3, 1, {"a": [1]}, 2, {"a": [2]}])
+
+    def test_get_common_elements_keep_order(self):
+        """测试获取共同元素 - 按第一个列表的顺序"""
+        list1 = [5, 1, 4, 1, 3]
+        list2 = [1, 3, 5]
+        result = ListProcess.get_common_elements_from_list(list_data_1=list1, list_data_2=list2)
+        self.assertEqual(result, [5, 1, 3])
+
+        list1 = [{"id": 1}, {"id": 2}, {"id": 1}]
+        list2 = [{"id": 1}, "x"]
+        result = ListProcess.get_common_elements_from_list(list_data_1=list1, list_data_2=list2)
+        self.assertEqual(result, [{"id": 1}])
+
+    def test_get_list_positions(self):
+        """测试批量获取元素位置"""
+        test_list = ["a", "b", "a", "c"]
+        result = ListProcess.get_list_positions(list_data=test_list, values=["c", "a", "x"])
+        self.assertEqual(result, [3, 0, -1])
+
+        test_list = [{"id": 1}, [1], {"id": 2}]
+        result = ListProcess.get_list_positions(list_data=test_list, values=[{"id": 2}, [1], {"id": 3}])
+        self.assertEqual(result, [2, 1, -1])
+
+    def test_join_list_by_key(self):
+        """测试按键关联两个列表"""
+        users = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 3, "name": "c"}, {"name": "d"}]
+        orders = [{"id": 1, "amount": 10}, {"id": 1, "amount": 20}, {"id": 3, "amount": 30, "name": "x"}]
+
+        result = ListProcess.join_list_by_key(list_data_1=users, list_data_2=orders, join_key="id")
+        self.assertEqual(
+            result,
+            [
+                {"id": 1, "name": "a", "amount": 10},
+                {"id": 1, "name": "a", "amount": 20},
+                {"id": 3, "name": "c", "amount": 30},
+            ],
+        )
+
+        result = ListProcess.join_list_by_key(
+            list_data_1=users, list_data_2=orders, join_key="id", join_type=JoinType.LEFT
+        )
+        self.assertEqual(len(result), 5)
+        self.assertEqual(result[2], {"id": 2, "name": "b", "amount": None})
+        self.assertEqual(result[4], {"name": "d", "id": None, "amount": None})
+
+        result = ListProcess.join_list_by_key(
+            list_data_1=users, list_data_2=orders, join_key="id", join_type=JoinType.ANTI
+        )
+        self.assertEqual(result, [{"id": 2, "name": "b"}, {"name": "d"}])
+
+    def test_join_list_by_multiple_keys(self):
+        """测试按多个键关联"""
+        list1 = [{"a": 1, "b": 1}, {"a": 1, "b": 2}]
+        list2 = [{"a": 1, "b": 2, "c": "x"}]
+        result = ListProcess.join_list_by_key(list_data_1=list1, list_data_2=list2, join_key="a, b")
+        self.assertEqual(result, [{"a": 1, "b": 2, "c": "x"}])
+
+        with self.assertRaises(ValueError):
+            ListProcess.join_list_by_key(list_data_1=list1, list_data_2=list2, join_key="")
+        with self.assertRaises(ValueError):
+            ListProcess.join_list_by_key(list_data_1=[1, 2], list_data_2=list2, join_key="a")
+
     def test_get_value_from_list(self):
         """测试获取列表中的元素"""
         test_list = ["apple", "banana", "cherry", "date"]
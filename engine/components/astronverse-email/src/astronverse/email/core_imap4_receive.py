@@ -2,13 +2,26 @@
 基于 IMAP4 协议的邮件接收与解析工具类。
 """
 
+import base64
 import email
 import email.header
+import email.message
 import email.utils
 import imaplib
+import itertools
+import json
+import os
+import quopri
+import re
 from datetime import datetime
 from imaplib import IMAP4_SSL
 
+from astronverse.baseline.logger.logger import logger
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+FETCH_TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
 
 def decode_data(b, added_encode=None):
     """
@@ -34,19 +47,77 @@ def decode_data(b, added_encode=None):
     return None
 
 
+class StreamDecoder:
+    """分段解码 base64/quoted-printable, 每次只解码完整的部分, 剩余的留到下一段"""
+
+    def __init__(self, encoding):
+        self.encoding = (encoding or "").lower()
+        self.rest = b""
+
+    def feed(self, data: bytes) -> bytes:
+        data = self.rest + data
+        if self.encoding == "base64":
+            data = re.sub(rb"\s", b"", data)
+            end = len(data) // 4 * 4
+            self.rest = data[end:]
+            return base64.b64decode(data[:end])
+        if self.encoding == "quoted-printable":
+            end = data.rfind(b"\n") + 1
+            self.rest = data[end:]
+            return quopri.decodestring(data[:end])
+        self.rest = b""
+        return data
+
+    def flush(self) -> bytes:
+        data, self.rest = self.rest, b""
+        if self.encoding == "base64":
+            return base64.b64decode(data + b"=" * (-len(data) % 4)) if data else b""
+        if self.encoding == "quoted-printable":
+            return quopri.decodestring(data)
+        return data
+
+
+class LiteralSender:
+    """
+    imaplib 一条命令只自动发送一个字面量, 多个字面量时按服务器的续传请求依次发送
+    每段为: 字面量 + 下一个字面量之前的命令文本
+    """
+
+    def __init__(self, parts: list):
+        self.parts = list(parts)
+
+    def send(self, continuation) -> bytes:
+        return self.parts.pop(0) if self.parts else b""
+
+
 class EmailImap4Receive:
     """
     基于 IMAP4 协议的邮件接收与解析工具类。
     提供登录、邮件检索、解析、标记已读等功能。
     """
 
+    # 一次 FETCH 邮件头的邮件数
+    fetch_batch = 100
+    # 附件分段下载, 每段的字节数
+    chunk_size = 1024 * 1024
+    # 每个邮箱文件夹已接收到的 UID, 用于只接收新邮件
+    cursor_path = os.path.join("logs", "email_receive_cursor.json")
+
     def __init__(self):
         self.mail_handler: IMAP4_SSL
+        self.account = ""
+        self.folder = ""
+        self.uidvalidity = 0
+        self.uidnext = 0
 
-    def login(self, server, port: int, user, password):
+    def login(self, server, port: int, user, password, use_ssl: bool = True):
         """登录邮箱服务器"""
-        self.mail_handler = imaplib.IMAP4_SSL(server, port)
+        if use_ssl:
+            self.mail_handler = imaplib.IMAP4_SSL(server, port)
+        else:
+            self.mail_handler = imaplib.IMAP4(server, port)
         self.mail_handler.login(user, password)
+        self.account = "{}@{}:{}".format(user, server, port)
         self.__build_header__(user)
 
     def __build_header__(self, user):
@@ -77,7 +148,18 @@ class EmailImap4Receive:
         """
         选择收件箱（如“INBOX”，如果不知道可以调用showFolders）
         """
-        return self.mail_handler.select(selector)
+        res = self.mail_handler.select(selector)
+        self.folder = selector
+        self.uidvalidity = self.__response_code__("UIDVALIDITY")
+        self.uidnext = self.__response_code__("UIDNEXT")
+        return res
+
+    def __response_code__(self, name):
+        """SELECT 返回的 [UIDVALIDITY n] 等数值, 没有时为 0"""
+        try:
+            return int(self.mail_handler.response(name)[1][-1])
+        except (TypeError, ValueError, IndexError):
+            return 0
 
     def search(self, charset="utf-8", *criteria):
         """
@@ -211,6 +293,375 @@ class EmailImap4Receive:
             "attachments": attachments,
         }
 
-    def mask_as_read(self, num):
+    @staticmethod
+    def build_criteria(
+        unseen=False, since=None, min_uid=1, sender_text="", receiver_text="", theme_text="", content_text=""
+    ):
+        """
+        构建服务器端 SEARCH 条件
+        文本条件之间为 OR, 与本地过滤一致, 服务器按不区分大小写匹配, 结果会比本地过滤多, 最终以本地过滤为准
+        文本为 bytes, 由 uid_search 决定以引号字符串还是字面量发送
+        """
+        criteria = []
+        if min_uid > 1:
+            criteria += ["UID", "{}:*".format(min_uid)]
+        if unseen:
+            criteria.append("UNSEEN")
+        if since:
+            criteria += ["SINCE", "{}-{}-{}".format(since.day, MONTHS[since.month - 1], since.year)]
+        texts = [
+            (name, text.encode("utf-8"))
+            for name, text in (
+                ("FROM", sender_text),
+                ("TO", receiver_text),
+                ("SUBJECT", theme_text),
+                ("BODY", content_text),
+            )
+            if text
+        ]
+        for i, (name, text) in enumerate(texts):
+            # n 个条件的 OR: OR a OR b c
+            if i < len(texts) - 1:
+                criteria.append("OR")
+            criteria += [name, text]
+        return criteria or ["ALL"]
+
+    def uid_search(self, criteria: list):
+        """
+        UID SEARCH, 返回从小到大的 UID
+        有非 ASCII 文本时使用 CHARSET UTF-8, 非 ASCII 或带引号的文本以字面量发送
+        """
+        if any(isinstance(item, bytes) and not item.isascii() for item in criteria):
+            criteria = ["CHARSET", "UTF-8"] + criteria
+        parts = [b""]
+        for item in criteria:
+            if isinstance(item, str):
+                text, literal = item.encode("ascii"), None
+            elif item.isascii() and not re.search(rb'["\\\r\n]', item):
+                text, literal = b'"' + item + b'"', None
+            else:
+                text, literal = b"{%d}" % len(item), item
+            parts[-1] += (b" " if parts[-1] else b"") + text
+            if literal is not None:
+                parts.append(literal)
+
+        if len(parts) > 1:
+            self.mail_handler.literal = LiteralSender(parts[1:]).send
+        typ, data = self.mail_handler.uid("SEARCH", parts[0].decode("ascii"))
+        if typ != "OK":
+            raise imaplib.IMAP4.error("SEARCH failed: {}".format(data))
+        return sorted(int(uid) for uid in b" ".join(item for item in data if item).split())
+
+    def fetch(self, uids, items: str):
+        """UID FETCH, 返回每封邮件的 {数据项: 值}"""
+        uid_set = ",".join(str(uid) for uid in uids)
+        typ, data = self.mail_handler.uid("FETCH", uid_set, items)
+        if typ != "OK":
+            raise imaplib.IMAP4.error("FETCH failed: {}".format(data))
+        return self.__parse_fetch__(data)
+
+    @staticmethod
+    def __parse_fetch__(data):
+        """
+        解析 imaplib 的 FETCH 返回, data 中的 tuple 为 (以 {长度} 结尾的前缀, 字面量)
+        数据项名称为大写并去掉 <起始位置>, 列表解析为 list, NIL 为 None
+        """
+        tokens = []
+
+        def tokenize(line):
+            pos = 0
+            while True:
+                m = FETCH_TOKEN.match(line, pos)
+                if not m:
+                    return
+                pos = m.end()
+                if m.group(1):
+                    tokens.append(("(", None))
+                elif m.group(2):
+                    tokens.append((")", None))
+                elif m.group(3) is not None:
+                    tokens.append(("str", re.sub(rb"\\(.)", rb"\1", m.group(3))))
+                else:
+                    tokens.append(("atom", m.group(4)))
+
+        for item in data:
+            if isinstance(item, tuple):
+                tokenize(item[0])
+                if tokens and tokens[-1][0] == "atom" and tokens[-1][1].startswith(b"{"):
+                    tokens[-1] = ("str", item[1])
+            elif item:
+                tokenize(item)
+
+        def value(pos):
+            kind, val = tokens[pos]
+            if kind == "(":
+                items = []
+                pos += 1
+                while pos < len(tokens) and tokens[pos][0] != ")":
+                    val, pos = value(pos)
+                    items.append(val)
+                return items, pos + 1
+            if kind == "atom" and val.upper() == b"NIL":
+                return None, pos + 1
+            return val, pos + 1
+
+        messages = []
+        pos = 0
+        while pos < len(tokens):
+            val, pos = value(pos)
+            if isinstance(val, list):
+                messages.append(
+                    {
+                        re.sub(rb"<\d+>$", b"", val[i]).upper().decode(): val[i + 1]
+                        for i in range(0, len(val) - 1, 2)
+                        if isinstance(val[i], bytes)
+                    }
+                )
+        return messages
+
+    @staticmethod
+    def __walk_parts__(structure, section=""):
+        """
+        BODYSTRUCTURE 中的各个部分, 与 email 的 walk 一致会进入转发的邮件(message/rfc822)
+        返回 [{section, content_type, charset, encoding, disposition, filename}]
+        """
+        if not isinstance(structure, list) or not structure:
+            return []
+        if isinstance(structure[0], list):
+            parts = []
+            children = itertools.takewhile(lambda item: isinstance(item, list), structure)
+            for i, child in enumerate(children, 1):
+                parts += EmailImap4Receive.__walk_parts__(child, "{}.{}".format(section, i) if section else str(i))
+            return parts
+
+        def text(value):
+            return value.decode("utf-8", "ignore") if isinstance(value, bytes) else ""
+
+        def header(value, params):
+            """还原为邮件头, 参数为 [名称, 值, ...]"""
+            if isinstance(params, list):
+                value += "".join('; {}="{}"'.format(text(k), text(v)) for k, v in zip(params[::2], params[1::2]))
+            return value
+
+        content_type = "{}/{}".format(text(structure[0]), text(structure[1])).lower()
+        section = section or "1"
+        # 扩展字段的位置: text 多一个行数, message/rfc822 多信封、内容结构、行数
+        if content_type.startswith("text/"):
+            disposition_index = 9
+        elif content_type == "message/rfc822":
+            disposition_index = 11
+        else:
+            disposition_index = 8
+        disposition = structure[disposition_index] if len(structure) > disposition_index else None
+        # 按 email 的规则取文件名: Content-Disposition 的 filename, 其次 Content-Type 的 name
+        msg = email.message.Message()
+        msg["Content-Type"] = header(content_type, structure[2])
+        disposition_type = ""
+        if isinstance(disposition, list) and disposition:
+            disposition_type = text(disposition[0]).lower()
+            msg["Content-Disposition"] = header(disposition_type, disposition[1] if len(disposition) > 1 else None)
+        part = {
+            "section": section,
+            "content_type": content_type,
+            "charset": msg.get_content_charset(),
+            "encoding": text(structure[5]).lower() if len(structure) > 5 else "",
+            "disposition": disposition_type,
+            "filename": msg.get_filename(),
+        }
+
+        parts = [part]
+        if content_type == "message/rfc822" and len(structure) > 8:
+            inner = structure[8]
+            if isinstance(inner, list) and inner and isinstance(inner[0], list):
+                parts += EmailImap4Receive.__walk_parts__(inner, section)
+            else:
+                parts += EmailImap4Receive.__walk_parts__(inner, section + ".1")
+        return parts
+
+    @staticmethod
+    def __decode_part__(data, part):
+        """按传输编码和字符集解码一个文本部分"""
+        decoder = StreamDecoder(part["encoding"])
+        data = decoder.feed(data or b"") + decoder.flush()
+        return decode_data(data, part["charset"])
+
+    def fetch_headers(self, uids):
+        """只下载邮件头和 BODYSTRUCTURE, 返回 [{uid, msg, parts}], msg 为只有邮件头的 email 对象"""
+        res = []
+        for item in self.fetch(uids, "(UID BODYSTRUCTURE BODY.PEEK[HEADER])"):
+            if "UID" not in item or "BODY[HEADER]" not in item:
+                continue
+            res.append(
+                {
+                    "uid": int(item["UID"]),
+                    "msg": email.message_from_string(decode_data(item["BODY[HEADER]"]) or ""),
+                    "parts": self.__walk_parts__(item.get("BODYSTRUCTURE")),
+                }
+            )
+        return res
+
+    def fetch_sections(self, uid, sections, partial=""):
+        """下载指定的部分(不会标记为已读), partial 如 "<0.1024>", 返回 {段号: 内容}"""
+        items = " ".join("BODY.PEEK[{}]{}".format(section, partial) for section in sections)
+        for item in self.fetch([uid], "({})".format(items)):
+            if "UID" in item and int(item["UID"]) == uid:
+                return {section: item.get("BODY[{}]".format(section)) for section in sections}
+        return {}
+
+    def __load_text__(self, mail, content_types):
+        """下载并解码 content_types 的文本部分, 已下载过的不再下载, 没有该类型的部分时为 None"""
+        missing = [part for part in mail["parts"] if part["content_type"] in content_types and "text" not in part]
+        if missing:
+            data = self.fetch_sections(mail["uid"], [part["section"] for part in missing])
+            for part in missing:
+                part["text"] = self.__decode_part__(data.get(part["section"]), part) or ""
+        texts = [part["text"] for part in mail["parts"] if part["content_type"] in content_types]
+        return "".join(texts) if texts else None
+
+    def save_attachment(self, uid, part, file_path):
+        """分段下载附件, 边下载边解码写入文件, 内存中只保留一段"""
+        decoder = StreamDecoder(part["encoding"])
+        offset = 0
+        with open(file_path, "wb") as f:
+            while True:
+                partial = "<{}.{}>".format(offset, self.chunk_size)
+                data = self.fetch_sections(uid, [part["section"]], partial).get(part["section"]) or b""
+                f.write(decoder.feed(data))
+                offset += len(data)
+                if len(data) < self.chunk_size:
+                    break
+            f.write(decoder.flush())
+
+    def __cursor_key__(self):
+        return "{}/{}".format(self.account, self.folder)
+
+    def load_cursor(self):
+        """当前文件夹上次接收到的 UID, 没有记录或 UIDVALIDITY 变化时返回 None"""
+        try:
+            with open(self.cursor_path, encoding="utf-8") as f:
+                cursor = json.load(f).get(self.__cursor_key__())
+        except (OSError, ValueError):
+            return None
+        if not cursor or cursor.get("uidvalidity") != self.uidvalidity:
+            return None
+        return cursor.get("last_uid")
+
+    def save_cursor(self, last_uid):
+        try:
+            with open(self.cursor_path, encoding="utf-8") as f:
+                cursors = json.load(f)
+        except (OSError, ValueError):
+            cursors = {}
+        cursors[self.__cursor_key__()] = {"uidvalidity": self.uidvalidity, "last_uid": last_uid}
+        if os.path.dirname(self.cursor_path):
+            os.makedirs(os.path.dirname(self.cursor_path), exist_ok=True)
+        temp_path = self.cursor_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(cursors, f, ensure_ascii=False)
+        os.replace(temp_path, self.cursor_path)
+
+    def __match__(self, mail, sender_text, receiver_text, theme_text, content_text):
+        """本地过滤, 条件之间为 OR, 正文只在前面的条件都不满足时才下载"""
+        if not (sender_text or receiver_text or theme_text or content_text):
+            return True
+        msg = mail["msg"]
+        if sender_text and sender_text in " ".join([item for item in self.__get_sender_info__(msg) if item]):
+            return True
+        if receiver_text and receiver_text in " ".join([item for item in self.__get_receiver_info__(msg) if item]):
+            return True
+        subject = self.__get_subject_content__(msg)
+        if theme_text and subject and theme_text in subject:
+            return True
+        if content_text:
+            body = self.__load_text__(mail, ("text/plain",))
+            return bool(body) and content_text in body
+        return False
+
+    def receive(
+        self,
+        max_return_num=5,
+        unseen=False,
+        since=None,
+        sender_text="",
+        receiver_text="",
+        theme_text="",
+        content_text="",
+        only_new=False,
+        save_attachment_path="",
+        mask_as_read=False,
+    ):
+        """
+        接收当前文件夹的邮件, 按 UID 从小到大返回最多 max_return_num 封符合条件的邮件
+
+        1. 条件先交给服务器 SEARCH, 服务器不支持时(如不支持中文)只按状态和日期搜索, 文本在本地过滤
+        2. 候选邮件只下载邮件头和 BODYSTRUCTURE, 正文在过滤需要时或返回时才下载, 附件只在保存时下载
+        3. only_new 时只接收上次接收之后的新邮件, 位置按 账号+文件夹 记录在 cursor_path
+        """
+        cursor = self.load_cursor() if only_new else None
+        min_uid = cursor + 1 if cursor else 1
+        texts = {
+            "sender_text": sender_text,
+            "receiver_text": receiver_text,
+            "theme_text": theme_text,
+            "content_text": content_text,
+        }
+        try:
+            uids = self.uid_search(self.build_criteria(unseen, since, min_uid, **texts))
+        except imaplib.IMAP4.abort:
+            raise
+        except imaplib.IMAP4.error as e:
+            logger.info("server search failed, filter locally: {}".format(e))
+            uids = self.uid_search(self.build_criteria(unseen, since, min_uid))
+        # 没有不小于 min_uid 的邮件时 n:* 会返回最大的 UID
+        uids = [uid for uid in uids if uid >= min_uid]
+        logger.info("mail candidates: {}".format(len(uids)))
+
+        matched = []
+        for i in range(0, len(uids), self.fetch_batch):
+            for mail in self.fetch_headers(uids[i : i + self.fetch_batch]):
+                if len(matched) < max_return_num and self.__match__(mail, **texts):
+                    matched.append(mail)
+            if len(matched) >= max_return_num:
+                break
+
+        res = []
+        for mail in matched:
+            msg = mail["msg"]
+            attachments = [
+                part
+                for part in mail["parts"]
+                if part["disposition"] == "attachment"
+                and part["content_type"] not in ("text/plain", "text/html")
+                and part["filename"]
+            ]
+            for part in attachments:
+                de_name = email.header.decode_header(part["filename"])[0]
+                part["name"] = decode_data(de_name[0], de_name[1]) if de_name[1] is not None else de_name[0]
+                if save_attachment_path:
+                    self.save_attachment(mail["uid"], part, os.path.join(save_attachment_path, part["name"]))
+            if mask_as_read:
+                self.mask_as_read(mail["uid"])
+            res.append(
+                {
+                    "from": self.__get_sender_info__(msg),
+                    "to": self.__get_receiver_info__(msg),
+                    "subject": self.__get_subject_content__(msg),
+                    "body": self.__load_text__(mail, ("text/plain",)),
+                    "html": self.__load_text__(mail, ("text/html",)),
+                    "time": self.__get_email_time__(msg),
+                    "attachments": [part["name"] for part in attachments],
+                }
+            )
+
+        if only_new:
+            if len(matched) >= max_return_num:
+                # 达到返回数量, 之后的邮件留到下次
+                last_uid = matched[-1]["uid"]
+            else:
+                last_uid = max([self.uidnext - 1] + uids[-1:] + [cursor or 0])
+            self.save_cursor(last_uid)
+        return res
+
+    def mask_as_read(self, uid):
         """需要标注为已读"""
-        self.mail_handler.store(num, "+FLAGS", "\\Seen")
+        self.mail_handler.uid("STORE", str(uid), "+FLAGS", "(\\Seen)")
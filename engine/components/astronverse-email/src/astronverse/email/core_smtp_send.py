@@ -2,10 +2,14 @@
 
 import ast
 import copy
+import hashlib
 import mimetypes
 import os
+import queue
 import smtplib
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from email.encoders import encode_base64
 from email.header import Header, make_header
 from email.mime.base import MIMEBase
@@ -16,16 +20,78 @@ from typing import Union
 
 from astronverse.baseline.logger.logger import logger
 from astronverse.email.error import *
+from astronverse.email.pool import pool
+
+
+class RateLimiter:
+    """按每分钟发送数量限速, 多个线程共用, 发送时间均匀分布; rate 为 0 时不限速"""
+
+    def __init__(self, rate: int = 0):
+        self.interval = 60 / rate if rate and rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_time = 0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            send_time = max(now, self.next_time)
+            self.next_time = send_time + self.interval
+        if send_time > now:
+            time.sleep(send_time - now)
 
 
 class EmailSmtpSend:
     """smtp发送邮件"""
 
+    # 连接断开时重新连接后重发的次数
+    retry = 1
+
     def __init__(self):
         self.mail_handler: smtplib.SMTP | smtplib.SMTP_SSL
+        self.login_args = None
+
+    @classmethod
+    def connect(cls, server, port: int, user, password, use_ssl: bool = False, timeout=20):
+        """从连接池获取已登录的连接, 按 服务器+端口+账号 复用, 用完后调用 release 归还"""
+        key = (server, int(port), user, hashlib.sha256(str(password).encode("utf-8")).hexdigest(), bool(use_ssl))
+
+        def factory():
+            core = cls()
+            if not core.login(server, port, user, password, use_ssl, timeout):
+                core.close()
+                raise BaseException(LOGIN_FAIL_FORMAT.format(user), "登录失败")
+            return core
+
+        return pool.acquire(key, factory)
+
+    def release(self):
+        """归还到连接池"""
+        pool.release(self)
+
+    def ping(self) -> bool:
+        """NOOP 检查连接是否可用"""
+        try:
+            return self.mail_handler.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def close(self):
+        try:
+            self.mail_handler.quit()
+        except (smtplib.SMTPException, OSError):
+            self.mail_handler.close()
+
+    def reconnect(self):
+        """断开后重新连接并登录"""
+        self.close()
+        if not self.login(*self.login_args):
+            raise BaseException(LOGIN_FAIL_FORMAT.format(self.login_args[2]), "登录失败")
 
     def login(self, server, port: int, user, password, use_ssl: bool = False, timeout=20):
         """登录邮箱服务器"""
+        self.login_args = (server, port, user, password, use_ssl, timeout)
         if use_ssl:
             self.mail_handler = smtplib.SMTP_SSL(server, port, timeout=timeout)
         else:
@@ -82,7 +148,7 @@ class EmailSmtpSend:
         encode_base64(file_msg)  # 把附件编码
         return file_msg
 
-    def send(
+    def build_messages(
         self,
         user,
         user_name,
@@ -93,11 +159,15 @@ class EmailSmtpSend:
         content_is_html: bool = False,
         subject: str = "",
         attachment_path: str = "",
+        attachments: dict = None,
     ):
-        """发送邮件"""
+        """
+        生成要发送的邮件 [(所有收件人, 邮件)], 每个收件人(组)一封
+        attachments 为附件缓存 {路径: 附件}, 群发时同一个附件只读取、编码一次
+        """
         receiver_list, receiver_group_list = self.__handle_email_address__(receiver)
         if not receiver_list:
-            return False
+            return []
 
         cc_list, cc_group_list = self.__handle_email_address__(cc)
         if len(cc_list) == 1:
@@ -110,7 +180,10 @@ class EmailSmtpSend:
             bcc_group_list = [bcc_group_list[0]] * len(receiver_list)
 
         origin_content = copy.deepcopy(content)
+        if attachments is None:
+            attachments = {}
 
+        messages = []
         for i in range(len(receiver_list)):
             msg = MIMEMultipart()
             name, addr = parseaddr(f"{user_name} <{user}>")
@@ -127,13 +200,161 @@ class EmailSmtpSend:
             if attachment_path:
                 for item_path in attachment_path.split(","):
                     if item_path:
-                        msg.attach(self.__handle_attachment__(item_path))
+                        if item_path not in attachments:
+                            attachments[item_path] = self.__handle_attachment__(item_path)
+                        msg.attach(attachments[item_path])
+            messages.append((receiver_group_list[i] + cc_group_list[i] + bcc_group_list[i], msg))
+        return messages
+
+    def sendmail(self, user, recipients: list, msg_str: str):
+        """发送一封邮件, 连接断开时重新连接后重发"""
+        for i in range(self.retry + 1):
+            try:
+                return self.mail_handler.sendmail(user, recipients, msg_str)
+            except smtplib.SMTPServerDisconnected:
+                if i == self.retry:
+                    raise
+            except smtplib.SMTPResponseException as e:
+                # 421 服务端关闭连接
+                if e.smtp_code != 421 or i == self.retry:
+                    raise
+            except smtplib.SMTPException:
+                raise
+            except OSError:
+                if i == self.retry:
+                    raise
+            logger.info("smtp connection lost, reconnect")
+            self.reconnect()
+
+    def send(
+        self,
+        user,
+        user_name,
+        receiver: Union[str, list] = "",
+        cc: Union[str, list] = "",
+        bcc: Union[str, list] = "",
+        content: str = "",
+        content_is_html: bool = False,
+        subject: str = "",
+        attachment_path: str = "",
+    ):
+        """发送邮件"""
+        messages = self.build_messages(
+            user, user_name, receiver, cc, bcc, content, content_is_html, subject, attachment_path
+        )
+        if not messages:
+            return False
 
+        for recipients, msg in messages:
             try:
-                self.mail_handler.sendmail(
-                    user,
-                    receiver_group_list[i] + cc_group_list[i] + bcc_group_list[i],
-                    msg.as_string(),
-                )
+                self.sendmail(user, recipients, msg.as_string())
             except smtplib.SMTPException as e:
                 raise BaseException(LOGIN_FAIL_FORMAT.format(e), "发送失败{}".format(e))
+
+    @staticmethod
+    def render(text, row: dict):
+        """按替换表的规则替换模板: 列名为原文本, 单元格为替换文本"""
+        if not isinstance(text, str):
+            return text
+        for origin, value in row.items():
+            if origin:
+                text = text.replace(str(origin), "" if value is None else str(value))
+        return text
+
+    @staticmethod
+    def rows_from_table(data_table) -> list:
+        """[{列名: 值}] 或 第一行为列名的二维列表, 转换为 [{列名: 值}]"""
+        if isinstance(data_table, dict):
+            data_table = [data_table]
+        if not isinstance(data_table, list) or not data_table:
+            return []
+        if all(isinstance(row, dict) for row in data_table):
+            return data_table
+        if all(isinstance(row, (list, tuple)) for row in data_table):
+            header = [str(name) for name in data_table[0]]
+            return [dict(zip(header, row)) for row in data_table[1:]]
+        raise BaseException(PARAMETER_INVALID_FORMAT.format("data_table"), "数据表格式错误")
+
+    @classmethod
+    def send_batch(
+        cls,
+        login: dict,
+        user_name: str,
+        rows: list,
+        receiver_column: str,
+        template: dict,
+        connection_num: int = 3,
+        rate_limit: int = 0,
+    ) -> list:
+        """
+        群发邮件, 每行一封, 模板(主题、正文、抄送、密送、附件路径)按行替换
+        1. 使用连接池中的 connection_num 个连接并行发送, 每个连接连续发送, 不再每封邮件重新登录
+        2. rate_limit 为所有连接合计每分钟最多发送的数量, 0 为不限制
+        3. 单封邮件失败不影响其他邮件, 返回每行的结果 [{row, receiver, success, error, refused}]
+        4. 部分收件人被服务器拒收时该行失败, refused 为被拒收的收件人
+        """
+        user = login["user"]
+        tasks = queue.SimpleQueue()
+        for i in range(len(rows)):
+            tasks.put(i)
+        results = [None] * len(rows)
+        limiter = RateLimiter(rate_limit)
+        attachments = {}
+        errors = []
+
+        def result(i, success, error="", refused=None):
+            receiver = rows[i].get(receiver_column)
+            return {
+                "row": i + 1,
+                "receiver": "" if receiver is None else str(receiver),
+                "success": success,
+                "error": error,
+                "refused": refused or [],
+            }
+
+        def work():
+            try:
+                core = cls.connect(**login)
+            except Exception as e:
+                errors.append(str(e))
+                return
+            try:
+                while True:
+                    try:
+                        i = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    row = rows[i]
+                    params = {key: cls.render(value, row) for key, value in template.items()}
+                    try:
+                        messages = core.build_messages(
+                            user,
+                            user_name,
+                            receiver=str(row.get(receiver_column) or ""),
+                            attachments=attachments,
+                            **params,
+                        )
+                        if not messages:
+                            results[i] = result(i, False, "收件人为空")
+                            continue
+                        refused = []
+                        for recipients, msg in messages:
+                            limiter.wait()
+                            # 返回被拒收的收件人, 全部被拒收时抛出异常
+                            refused += (core.sendmail(user, recipients, msg.as_string()) or {}).keys()
+                        if refused:
+                            results[i] = result(i, False, "收件人被拒收: {}".format(", ".join(refused)), refused)
+                        else:
+                            results[i] = result(i, True)
+                    except Exception as e:
+                        logger.info("send mail error, row {}: {}".format(i + 1, e))
+                        refused = list(e.recipients) if isinstance(e, smtplib.SMTPRecipientsRefused) else []
+                        results[i] = result(i, False, str(e), refused)
+            finally:
+                core.release()
+
+        with ThreadPoolExecutor(max(1, min(connection_num, len(rows)))) as executor:
+            for _ in range(max(1, min(connection_num, len(rows)))):
+                executor.submit(work)
+        # 所有连接都登录失败时, 没有发送的行记录登录失败的原因
+        return [item or result(i, False, errors[-1] if errors else "") for i, item in enumerate(results)]
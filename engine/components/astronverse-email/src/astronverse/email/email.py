@@ -1,11 +1,12 @@
 """email原子能力"""
 
 import copy
+from datetime import datetime
 
 from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, AtomicLevel, DynamicsItem
 from astronverse.actionlib.atomic import atomicMg
-from astronverse.baseline.logger.logger import logger
-from astronverse.email import EmailSeenType, EmailServerType
+from astronverse.email import EmailServerType
+from astronverse.email.error import PARAMETER_INVALID_FORMAT, BaseException
 
 
 class Email:
@@ -78,8 +79,8 @@ class Email:
         }
         from astronverse.email.core_smtp_send import EmailSmtpSend
 
-        core = EmailSmtpSend()
-        core.login(
+        # 连接池中已登录的连接, 循环发送时复用
+        core = EmailSmtpSend.connect(
             server=mail_server_dict.get(mail_server),
             port=mail_port,
             user=sender_mail,
@@ -95,16 +96,120 @@ class Email:
                     content = content.replace(str(replace.get("origintext")), str(replace.get("replacetext")))  # type: ignore
         except Exception:
             pass
-        core.send(
-            user=sender_mail,
+        try:
+            core.send(
+                user=sender_mail,
+                user_name=send_name,
+                receiver=receiver,
+                cc=cc,
+                bcc=bcc,
+                content=content,
+                content_is_html=is_html,
+                subject=subject,
+                attachment_path=attachment_path,
+            )
+        finally:
+            core.release()
+
+    @staticmethod
+    @atomicMg.atomic(
+        "Email",
+        inputList=[
+            atomicMg.param("data_table", types="List"),
+            atomicMg.param("receiver_column", types="Str"),
+            atomicMg.param("cc", required=False),
+            atomicMg.param(
+                "content",
+                required=False,
+                formType=AtomicFormTypeMeta(type=AtomicFormType.CONTENTPASTE.value),
+            ),
+            atomicMg.param(
+                "attachment_path",
+                required=False,
+                formType=AtomicFormTypeMeta(
+                    type=AtomicFormType.INPUT_VARIABLE_PYTHON_FILE.value,
+                    params={"filters": [], "file_type": "files"},
+                ),
+            ),
+            atomicMg.param("bcc", required=False),
+            atomicMg.param("send_name", required=False),
+            atomicMg.param(
+                "other_mail_server",
+                dynamics=[
+                    DynamicsItem(
+                        key="$this.other_mail_server.show",
+                        expression="return $this.mail_server.value == '{}'".format(EmailServerType.OTHER.value),
+                    )
+                ],
+                required=False,
+            ),
+            atomicMg.param("mail_port", required=False),
+            atomicMg.param("connection_num", level=AtomicLevel.ADVANCED, required=False),
+            atomicMg.param("rate_limit", level=AtomicLevel.ADVANCED, required=False),
+        ],
+        outputList=[atomicMg.param("send_result", types="List")],
+    )
+    def send_email_batch(
+        data_table: list = None,
+        receiver_column: str = "",
+        cc: str = "",
+        subject: str = "",
+        is_html: bool = False,
+        content: str = "",
+        attachment_path: str = "",
+        mail_server: EmailServerType = EmailServerType.QQ,
+        other_mail_server: str = "",
+        mail_port: int = 465,
+        use_ssl: bool = True,
+        sender_mail: str = "",
+        send_name: str = "",
+        password: str = "",
+        bcc: str = "",
+        connection_num: int = 3,
+        rate_limit: int = 0,
+    ):
+        """
+        邮件群发原子能力
+        data_table: `list`, 每行一封邮件, [{列名: 值}] 或第一行为列名的二维列表
+        receiver_column: `str`, 收件人所在的列
+        主题、正文、抄送、密送、附件路径为模板, 按行替换: 列名为原文本, 该行的值为替换文本(同智能填充表)
+        connection_num: `int`, 同时使用的连接数
+        rate_limit: `int`, 每分钟最多发送的数量, 0 为不限制
+        返回每行的发送结果 [{row, receiver, success, error, refused}], refused 为被服务器拒收的收件人
+        """
+        mail_server_dict = {
+            EmailServerType.QQ: "smtp.qq.com",
+            EmailServerType.NETEASE_163: "smtp.163.com",
+            EmailServerType.NETEASE_126: "smtp.126.com",
+            EmailServerType.IFLYTEK: "mail.iflytek.com",
+            EmailServerType.OTHER: other_mail_server,
+        }
+        from astronverse.email.core_smtp_send import EmailSmtpSend
+
+        rows = EmailSmtpSend.rows_from_table(data_table)
+        if rows and not any(receiver_column in row for row in rows):
+            raise BaseException(PARAMETER_INVALID_FORMAT.format(receiver_column), "收件人列不存在")
+        return EmailSmtpSend.send_batch(
+            login={
+                "server": mail_server_dict.get(mail_server),
+                "port": mail_port,
+                "user": sender_mail,
+                "password": password,
+                "use_ssl": use_ssl,
+            },
             user_name=send_name,
-            receiver=receiver,
-            cc=cc,
-            bcc=bcc,
-            content=content,
-            content_is_html=is_html,
-            subject=subject,
-            attachment_path=attachment_path,
+            rows=rows,
+            receiver_column=receiver_column,
+            template={
+                "cc": cc,
+                "bcc": bcc,
+                "content": content,
+                "content_is_html": is_html,
+                "subject": subject,
+                "attachment_path": attachment_path,
+            },
+            connection_num=connection_num,
+            rate_limit=rate_limit,
         )
 
     @staticmethod
@@ -172,6 +277,12 @@ class Email:
             atomicMg.param("receiver_text", required=False, types="Str"),
             atomicMg.param("theme_text", required=False, types="Str"),
             atomicMg.param("content_text", required=False, types="Str"),
+            atomicMg.param("since_date", required=False, types="Str"),
+            atomicMg.param(
+                "only_new_flag",
+                formType=AtomicFormTypeMeta(type=AtomicFormType.CHECKBOX.value),
+                required=False,
+            ),
         ],
         outputList=[atomicMg.param("mail_list", types="Dict")],
     )
@@ -191,6 +302,8 @@ class Email:
         receiver_text: str = "",
         theme_text: str = "",
         content_text: str = "",
+        since_date: str = "",
+        only_new_flag: bool = False,
     ):
         """
         邮件接收原子能力
@@ -206,6 +319,8 @@ class Email:
         receiver_text: `str`, 通过接收者包含关键字进行过滤
         theme_text: `str`, 通过主题包含关键字进行过滤
         content_text: `str`, 通过内容包含关键字进行过滤
+        since_date: `str`, 只接收该日期(YYYY-MM-DD)及之后的邮件
+        only_new_flag: `bool`, 只接收上次接收之后的新邮件
 
         save_attachment_flag: `bool`, 是否保存附件
         save_attachment_path: `str`, 附件保存路径
@@ -215,6 +330,12 @@ class Email:
         # 初始化参数
         if max_return_num == 0:
             return []
+        since = None
+        if since_date:
+            try:
+                since = datetime.strptime(since_date, "%Y-%m-%d").date()
+            except ValueError:
+                raise BaseException(PARAMETER_INVALID_FORMAT.format(since_date), "日期格式应为YYYY-MM-DD")
 
         mail_server_dict = {
             EmailServerType.QQ.value: "imap.qq.com",
@@ -235,65 +356,16 @@ class Email:
         )
         core.select(selector=folder_name)
 
-        mail_ids = []
-        for num in core.search(
-            "utf-8",
-            EmailSeenType.ALL.value if not unseen_flag else EmailSeenType.UNSEEN.value,
-        )[1][0].split(b" "):
-            if not num or num == b"":
-                continue
-            try:
-                logger.info(f"mail id:{str(num)}")
-                mail_info = core.get_entire_mail_info(num)
-            except Exception as e:
-                logger.info(f"im error：{str(e)}")
-                continue
-            # 判断其id是否符合查询要求
-            if (
-                (not (sender_text or receiver_text or theme_text or content_text))
-                or sender_text
-                and mail_info["from"]
-                and sender_text in " ".join([item for item in mail_info["from"] if item])
-                or receiver_text
-                and mail_info["to"]
-                and receiver_text in " ".join([item for item in mail_info["to"] if item])
-                or theme_text
-                and mail_info["subject"]
-                and theme_text in mail_info["subject"]
-                or content_text
-                and mail_info["body"]
-                and content_text in mail_info["body"]
-            ):
-                logger.info(f"im append：{str(num)}")
-                mail_ids.append(num)
-            else:
-                logger.info(f"im continue：{str(num)}")
-                continue
-
-            # 满足最大返回条件即可结束
-            if len(mail_ids) == max_return_num:
-                break
-
-        logger.info(f"mail id:{mail_ids}")
-
-        # 获取邮件详细信息，并存储附件
-        return_mail_res = []
-        from pathlib import Path
-
-        for mail_id in mail_ids:
-            mail_info = core.get_entire_mail_info(mail_id)
-            # 判断是否需要保存附件
-            if save_attachment_flag:
-                for attachment in mail_info["attachments"]:
-                    if not attachment:
-                        continue
-                    file_path = Path(save_attachment_path) / attachment["name"]
-                    file_path.write_bytes(attachment["data"])
-            # 判断是否需要标注为已读
-            if mask_as_read_flag:
-                core.mask_as_read(mail_id)
-            mail_info["attachments"] = [
-                attachment["name"] for attachment in mail_info["attachments"] if attachment and attachment["name"]
-            ]
-            return_mail_res.append(mail_info)
-        return return_mail_res
+        # 条件交给服务器搜索, 候选邮件只下载邮件头, 正文和附件在需要时才下载
+        return core.receive(
+            max_return_num=max_return_num,
+            unseen=unseen_flag,
+            since=since,
+            sender_text=sender_text,
+            receiver_text=receiver_text,
+            theme_text=theme_text,
+            content_text=content_text,
+            only_new=only_new_flag,
+            save_attachment_path=save_attachment_path if save_attachment_flag else "",
+            mask_as_read=mask_as_read_flag,
+        )
@@ -7,3 +7,4 @@ BaseException = BaseException
 
 MSG_EMPTY_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("消息为空") + ": {}")
 LOGIN_FAIL_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("登录失败") + ": {}")
+PARAMETER_INVALID_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("参数异常") + ": {}")
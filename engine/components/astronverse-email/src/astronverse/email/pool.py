@@ -0,0 +1,17 @@
+from astronverse.actionlib.pool import ConnectionPool
+
+
+class SmtpPool(ConnectionPool):
+    """
+    SMTP 连接池, 按 服务器+端口+账号 复用已登录的连接, 循环发送邮件时不再每封邮件握手、登录一次;
+    空闲连接定时发送 NOOP 保活, 刚归还的连接直接复用, 发送失败时再重新连接
+    """
+
+    keepalive_interval = 30  # 空闲连接发送 NOOP 的间隔(秒), 避免被服务端断开
+    check_after = 5  # 空闲超过该时间(秒)的连接复用前先发送 NOOP 检查
+
+    def ping(self, conn) -> bool:
+        return conn.ping()
+
+
+pool = SmtpPool()
@@ -0,0 +1,107 @@
+"""
+邮件接收耗时基准: 旧的逐封下载整封邮件再过滤 vs 服务器搜索+只下载邮件头
+
+运行: python tests/benchmark_email.py [--count 50000]
+邮件服务器为 test_imap4_receive 中的本地 IMAP 服务器, 流量为服务器发送的字节数
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from astronverse.email.core_imap4_receive import EmailImap4Receive
+from test_imap4_receive import FakeImapServer, make_mail
+
+MAIL = (
+    "From: user{0}@example.com\r\nTo: me@example.com\r\nSubject: {1} {0}\r\n"
+    "Date: Fri, 10 Jan 2025 08:00:00 +0000\r\nContent-Type: text/plain; charset=utf-8\r\n\r\n{2}\r\n"
+)
+
+
+def connect(server: FakeImapServer) -> EmailImap4Receive:
+    core = EmailImap4Receive()
+    core.login("127.0.0.1", server.port, "me@example.com", "secret", use_ssl=False)
+    core.select("INBOX")
+    return core
+
+
+def legacy_receive(core: EmailImap4Receive, max_return_num: int, theme_text: str) -> list:
+    """原来 receive_email 的实现: 搜索全部邮件, 逐封下载整封邮件后过滤"""
+    mail_ids = []
+    for num in core.search("utf-8", "ALL")[1][0].split(b" "):
+        if not num:
+            continue
+        mail_info = core.get_entire_mail_info(num)
+        if mail_info["subject"] and theme_text in mail_info["subject"]:
+            mail_ids.append(num)
+        if len(mail_ids) == max_return_num:
+            break
+    return [core.get_entire_mail_info(num) for num in mail_ids]
+
+
+def bench(name: str, server: FakeImapServer, func):
+    server.sent = 0
+    core = connect(server)
+    start = time.perf_counter()
+    res = func(core)
+    cost = time.perf_counter() - start
+    core.mail_handler.logout()
+    print("  {:40s} {:8.2f} s {:10.1f} MB {:6d} mails".format(name, cost, server.sent / 1024 / 1024, len(res)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=50000)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    EmailImap4Receive.cursor_path = os.path.join(temp_dir, "cursor.json")
+    server = FakeImapServer()
+    try:
+        # 每 count/5 封中有一封主题为 report, 正文约 2KB
+        body = "x" * 2048
+        for i in range(args.count):
+            subject = "report" if i % (args.count // 5) == args.count // 5 - 1 else "news"
+            server.append(MAIL.format(i, subject, body).encode())
+        print("folder: {} mails".format(args.count))
+
+        bench("filter subject, legacy", server, lambda core: legacy_receive(core, 5, "report"))
+        bench("filter subject", server, lambda core: core.receive(max_return_num=5, theme_text="report"))
+        # 服务器不支持中文搜索时, 下载全部邮件的邮件头在本地过滤
+        server.utf8_search = False
+        bench(
+            "filter subject, local filter",
+            server,
+            lambda core: core.receive(max_return_num=5, theme_text="报告"),
+        )
+        server.utf8_search = True
+
+        # 第一次运行没有匹配的邮件, 之后只检查新邮件
+        bench(
+            "only new, first run",
+            server,
+            lambda core: core.receive(max_return_num=10, theme_text="nothing", only_new=True),
+        )
+        bench("only new, up to date", server, lambda core: core.receive(max_return_num=10, only_new=True))
+        for i in range(3):
+            server.append(make_mail(subject="new {}".format(i)))
+        bench("only new, 3 new mails", server, lambda core: core.receive(max_return_num=10, only_new=True))
+
+        # 大附件: 不保存时不下载, 保存时分段下载写入文件
+        server.append(make_mail(subject="attachment", attachments={"data.bin": os.urandom(20 * 1024 * 1024)}))
+        bench("attachment mail, legacy", server, lambda core: legacy_receive(core, 1, "attachment"))
+        bench("attachment mail", server, lambda core: core.receive(max_return_num=1, theme_text="attachment"))
+        bench(
+            "attachment mail, save attachment",
+            server,
+            lambda core: core.receive(max_return_num=1, theme_text="attachment", save_attachment_path=temp_dir),
+        )
+    finally:
+        server.close()
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+import bisect
+import datetime
+import email
+import email.header
+import email.policy
+import email.utils
+import os
+import quopri
+import re
+import shutil
+import socketserver
+import tempfile
+import threading
+import unittest
+from email.message import EmailMessage
+from pathlib import Path
+
+from astronverse.email.core_imap4_receive import EmailImap4Receive, StreamDecoder
+
+TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+
+
+def make_mail(
+    sender: str = "boss@example.com",
+    subject: str = "hello",
+    body: str = "body",
+    html: str = None,
+    attachments: dict = None,
+    date: datetime.datetime = None,
+    forward: EmailMessage = None,
+) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "me@example.com"
+    msg["Subject"] = subject
+    msg["Date"] = email.utils.format_datetime(date or datetime.datetime(2025, 1, 10, 8, 0, tzinfo=datetime.UTC))
+    msg.set_content(body, charset="utf-8", cte="base64")
+    if html is not None:
+        msg.add_alternative(html, subtype="html", charset="utf-8", cte="quoted-printable")
+    for name, data in (attachments or {}).items():
+        msg.add_attachment(data, maintype="application", subtype="octet-stream", filename=name)
+    if forward is not None:
+        msg.add_attachment(forward)
+    return msg.as_bytes(policy=email.policy.SMTP)
+
+
+def bodystructure(part) -> str:
+    """按 RFC 3501 生成 BODYSTRUCTURE, 只包含用到的字段"""
+    if part.is_multipart() and part.get_content_type() != "message/rfc822":
+        children = "".join(bodystructure(child) for child in part.get_payload())
+        return '({} "{}")'.format(children, part.get_content_subtype().upper())
+
+    def params(items) -> str:
+        values = []
+        for k, v in items:
+            if isinstance(v, tuple):
+                k, v = k + "*", email.utils.encode_rfc2231(email.utils.collapse_rfc2231_value(v), v[0])
+            values.append('"{}" "{}"'.format(k.upper(), v))
+        return "({})".format(" ".join(values)) if values else "NIL"
+
+    payload = part.get_payload()
+    if part.get_content_type() == "message/rfc822":
+        inner = payload[0]
+        size = len(inner.as_bytes())
+        fields = '"MESSAGE" "RFC822" NIL NIL NIL "7BIT" {} NIL {} 0'.format(size, bodystructure(inner))
+    else:
+        fields = '"{}" "{}" {} NIL NIL "{}" {}'.format(
+            part.get_content_maintype().upper(),
+            part.get_content_subtype().upper(),
+            params(part.get_params()[1:]),
+            part.get("Content-Transfer-Encoding", "7BIT").upper(),
+            len(payload.encode()),
+        )
+        if part.get_content_maintype() == "text":
+            fields += " {}".format(payload.count("\n"))
+    if part.get_content_disposition():
+        disposition = part.get_params(header="content-disposition")
+        fields += ' NIL ("{}" {})'.format(part.get_content_disposition().upper(), params(disposition[1:]))
+    return "({})".format(fields)
+
+
+def header_text(msg, name: str) -> str:
+    return str(email.header.make_header(email.header.decode_header(msg.get(name, ""))))
+
+
+def body_text(msg) -> str:
+    texts = []
+    for part in msg.walk():
+        if part.get_content_maintype() == "text":
+            texts.append(part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8"))
+    return "".join(texts)
+
+
+class FakeImapServer(socketserver.ThreadingTCPServer):
+    """
+    内存中的 IMAP 服务器, 实现邮件接收用到的命令, 包括序号和 UID 两种方式的 SEARCH/FETCH/STORE
+    commands 记录收到的命令, sent 为发送的字节数
+    utf8_search 为 False 时不支持 CHARSET UTF-8 的搜索
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeImapHandler)
+        self.utf8_search = True
+        self.uidvalidity = 1
+        self.uidnext = 1
+        self.messages = {}
+        self.uids = []
+        self.flags = {}
+        self.lock = threading.Lock()
+        self.commands = []
+        self.sent = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+
+    def append(self, raw: bytes, seen: bool = False) -> int:
+        with self.lock:
+            uid = self.uidnext
+            self.uidnext += 1
+            msg = email.message_from_bytes(raw)
+            self.messages[uid] = (raw, msg)
+            self.uids.append(uid)
+            self.flags[uid] = {"\\Seen"} if seen else set()
+        return uid
+
+    def reset(self, uidvalidity: int):
+        """重建文件夹, UID 从 1 开始"""
+        with self.lock:
+            self.uidvalidity = uidvalidity
+            self.uidnext = 1
+            self.messages = {}
+            self.uids = []
+            self.flags = {}
+
+    def count(self, prefix: str, text: str = "") -> int:
+        return sum(1 for command in self.commands if command.startswith(prefix) and text in command)
+
+
+class FakeImapHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True
+
+    def write(self, data: bytes):
+        self.wfile.write(data)
+        with self.server.lock:
+            self.server.sent += len(data)
+
+    def read_command(self):
+        """读取一条命令, 字面量按续传请求读取, 返回 (tag, 命令, 参数列表), 参数为 bytes"""
+        data = b""
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            line = line.rstrip(b"\r\n")
+            m = re.search(rb"\{(\d+)\}$", line)
+            if not m:
+                data += line
+                break
+            self.write(b"+ ready\r\n")
+            literal = self.rfile.read(int(m.group(1)))
+            data += line[: m.start()] + b'"' + re.sub(rb'(["\\])', rb"\\\1", literal) + b'"'
+        tokens = []
+        for m in TOKEN.finditer(data):
+            if m.group(3) is not None:
+                tokens.append(re.sub(rb"\\(.)", rb"\1", m.group(3)))
+            else:
+                tokens.append(m.group(0).strip())
+        tag, command, args = tokens[0].decode(), tokens[1].decode().upper(), tokens[2:]
+        if command == "UID":
+            command, args = "UID " + args[0].decode().upper(), args[1:]
+        self.server.commands.append("{} {}".format(command, b" ".join(args).decode("utf-8", "replace")))
+        return tag, command, args
+
+    def handle(self):
+        self.selected = False
+        self.write(b"* OK fake imap ready\r\n")
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            tag, command, args = command
+            if not self.command(tag, command, args):
+                return
+
+    def command(self, tag: str, command: str, args: list) -> bool:
+        server = self.server
+        if command == "CAPABILITY":
+            self.write(b"* CAPABILITY IMAP4rev1\r\n")
+        elif command in ("SELECT", "EXAMINE"):
+            with server.lock:
+                lines = [
+                    "* {} EXISTS".format(len(server.messages)),
+                    "* OK [UIDVALIDITY {}]".format(server.uidvalidity),
+                    "* OK [UIDNEXT {}]".format(server.uidnext),
+                ]
+            self.write(("\r\n".join(lines) + "\r\n").encode())
+        elif command in ("SEARCH", "UID SEARCH"):
+            if args[0].upper() == b"CHARSET":
+                if not server.utf8_search and args[1].upper() == b"UTF-8":
+                    self.write("{} NO [BADCHARSET] unsupported\r\n".format(tag).encode())
+                    return True
+                args = args[2:]
+            uids = self.search(args)
+            if command == "SEARCH":
+                uids = [self.seq(uid) for uid in uids]
+            self.write("* SEARCH {}\r\n".format(" ".join(map(str, uids))).encode())
+        elif command in ("FETCH", "UID FETCH"):
+            self.fetch(self.message_set(args[0], command == "UID FETCH"), args[1:])
+        elif command in ("STORE", "UID STORE"):
+            for uid in self.message_set(args[0], command == "UID STORE"):
+                with server.lock:
+                    server.flags[uid].add("\\Seen")
+        elif command == "LOGOUT":
+            self.write(b"* BYE\r\n")
+            self.write("{} OK\r\n".format(tag).encode())
+            return False
+        elif command not in ("LOGIN", "ID", "NOOP"):
+            self.write("{} BAD unknown command\r\n".format(tag).encode())
+            return True
+        self.write("{} OK {} completed\r\n".format(tag, command).encode())
+        return True
+
+    def seq(self, uid: int) -> int:
+        with self.server.lock:
+            return bisect.bisect_left(self.server.uids, uid) + 1
+
+    def message_set(self, value: bytes, by_uid: bool) -> list:
+        """序号或 UID 集合对应的 UID"""
+        with self.server.lock:
+            uids = list(self.server.uids)
+        res = []
+        for item in value.decode().split(","):
+            a, _, b = item.partition(":")
+            if by_uid:
+                high = (uids[-1] if uids else 0) if b == "*" else int(b or a)
+                res += uids[bisect.bisect_left(uids, int(a)) : bisect.bisect_right(uids, high)]
+            else:
+                high = len(uids) if b == "*" else int(b or a)
+                res += uids[int(a) - 1 : high]
+        return res
+
+    def search(self, args: list) -> list:
+        with self.server.lock:
+            messages = dict(self.server.messages)
+            flags = {uid: set(value) for uid, value in self.server.flags.items()}
+        args = list(args)
+
+        def criterion():
+            name = args.pop(0).upper()
+            if name == b"ALL":
+                return lambda uid: True
+            if name == b"UNSEEN":
+                return lambda uid: "\\Seen" not in flags[uid]
+            if name == b"SEEN":
+                return lambda uid: "\\Seen" in flags[uid]
+            if name == b"OR":
+                a, b = criterion(), criterion()
+                return lambda uid: a(uid) or b(uid)
+            value = args.pop(0)
+            if name == b"UID":
+                # 和真实服务器一样, n:* 在没有更大的 UID 时包含最大的 UID
+                found = set(self.message_set(value, True))
+                if value.endswith(b":*") and messages:
+                    found.add(max(messages))
+                return lambda uid: uid in found
+            if name == b"SINCE":
+                since = datetime.datetime.strptime(value.decode(), "%d-%b-%Y").date()
+                return lambda uid: email.utils.parsedate_to_datetime(messages[uid][1]["Date"]).date() >= since
+            text = value.decode("utf-8").lower()
+            if name == b"BODY":
+                return lambda uid: text in body_text(messages[uid][1]).lower()
+            header = {b"FROM": "From", b"TO": "To", b"SUBJECT": "Subject"}[name]
+            return lambda uid: text in header_text(messages[uid][1], header).lower()
+
+        criteria = []
+        while args:
+            criteria.append(criterion())
+        return [uid for uid in sorted(messages) if all(func(uid) for func in criteria)]
+
+    def fetch(self, uids: list, items: list):
+        for uid in uids:
+            with self.server.lock:
+                raw, msg = self.server.messages[uid]
+            out = [b"UID %d" % uid]
+            for item in items:
+                name = item.upper().decode()
+                if name in ("(", ")", "UID"):
+                    continue
+                if name == "FLAGS":
+                    with self.server.lock:
+                        out.append("FLAGS ({})".format(" ".join(sorted(self.server.flags[uid]))).encode())
+                    continue
+                if name == "BODYSTRUCTURE":
+                    out.append(b"BODYSTRUCTURE " + bodystructure(msg).encode())
+                    continue
+                if ".PEEK" not in name:
+                    with self.server.lock:
+                        self.server.flags[uid].add("\\Seen")
+                section = name.replace(".PEEK", "")
+                if section == "BODY[HEADER]":
+                    data = raw.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+                elif section in ("RFC822", "BODY[]"):
+                    data = raw
+                else:
+                    section, _, partial = section.partition("<")
+                    part = msg
+                    for i in section[5:-1].split("."):
+                        if part.get_content_type() == "message/rfc822":
+                            part = part.get_payload()[0]
+                        if part.is_multipart():
+                            part = part.get_payload()[int(i) - 1]
+                    data = part.get_payload().encode("utf-8", "surrogateescape")
+                    if partial:
+                        start, length = map(int, partial.rstrip(">").split("."))
+                        data = data[start : start + length]
+                        section += "<{}>".format(start)
+                out.append(b"%s {%d}\r\n%s" % (section.encode(), len(data), data))
+            self.write(b"* %d FETCH (%s)\r\n" % (self.seq(uid), b" ".join(out)))
+
+
+class TestImap4Receive(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.server = FakeImapServer()
+        EmailImap4Receive.cursor_path = os.path.join(self.temp_dir, "cursor.json")
+
+    def tearDown(self):
+        self.server.close()
+        shutil.rmtree(self.temp_dir)
+
+    def receive(self, folder: str = "INBOX", **kwargs) -> list:
+        core = EmailImap4Receive()
+        core.login("127.0.0.1", self.server.port, "me@example.com", "secret", use_ssl=False)
+        core.select(folder)
+        try:
+            return core.receive(**kwargs)
+        finally:
+            core.mail_handler.logout()
+
+    def test_build_criteria(self):
+        self.assertEqual(EmailImap4Receive.build_criteria(), ["ALL"])
+        self.assertEqual(
+            EmailImap4Receive.build_criteria(True, datetime.date(2025, 3, 5), 7, sender_text="boss"),
+            ["UID", "7:*", "UNSEEN", "SINCE", "5-Mar-2025", "FROM", b"boss"],
+        )
+        self.assertEqual(
+            EmailImap4Receive.build_criteria(sender_text="a", theme_text="b", content_text="报告"),
+            ["OR", "FROM", b"a", "OR", "SUBJECT", b"b", "BODY", "报告".encode()],
+        )
+
+    def test_stream_decoder(self):
+        # 随机字节经过quoted-printable编码后不一定能还原(如行尾空白、\r), 用固定文本并以标准库解码结果为准
+        binary = os.urandom(5000)
+        text = "".join("第{}行 a=b\tc ={}\r\n".format(i, "x" * (i % 90)) for i in range(200)).encode("utf-8")
+        for encoding, encoded, data in (
+            ("base64", email.base64mime.body_encode(binary).encode(), binary),
+            ("quoted-printable", quopri.encodestring(text), quopri.decodestring(quopri.encodestring(text))),
+        ):
+            decoder = StreamDecoder(encoding)
+            out = b"".join(decoder.feed(encoded[i : i + 333]) for i in range(0, len(encoded), 333))
+            self.assertEqual(out + decoder.flush(), data, encoding)
+
+    def test_header_first(self):
+        for i in range(20):
+            self.server.append(make_mail(subject="report {}".format(i) if i % 5 == 0 else "news {}".format(i)))
+        res = self.receive(max_return_num=3, theme_text="report")
+
+        self.assertEqual([mail["subject"] for mail in res], ["report 0", "report 5", "report 10"])
+        self.assertEqual(res[0]["from"], ("", "boss@example.com"))
+        self.assertEqual(res[0]["body"], "body\n")
+        self.assertIsNone(res[0]["html"])
+        self.assertEqual(res[0]["time"][:10], "2025-01-10")
+        # 条件交给服务器搜索, 只下载匹配邮件的邮件头和返回邮件的正文, 不下载整封邮件, 不标记已读
+        self.assertEqual(self.server.count("UID SEARCH", "SUBJECT report"), 1)
+        self.assertEqual(self.server.count("UID FETCH", "BODY.PEEK[HEADER]"), 1)
+        self.assertEqual(self.server.count("UID FETCH", "BODY.PEEK[1]"), 3)
+        self.assertEqual(self.server.count("FETCH", "RFC822") + self.server.count("UID FETCH", "BODY[]"), 0)
+        self.assertFalse(any(self.server.flags.values()))
+
+    def test_content_filter(self):
+        self.server.append(make_mail(subject="周报", body="本周进度"))
+        self.server.append(make_mail(sender="其他 <other@example.com>", body="包含 报告 的正文", html="<p>报告</p>"))
+        self.server.append(make_mail(body="nothing"))
+
+        for utf8_search in (True, False):
+            self.server.utf8_search = utf8_search
+            res = self.receive(max_return_num=5, theme_text="周报", content_text="报告")
+            self.assertEqual([mail["subject"] for mail in res], ["周报", "hello"], utf8_search)
+            self.assertEqual(res[1]["from"], ("其他", "other@example.com"))
+            self.assertEqual(res[1]["html"].strip(), "<p>报告</p>")
+        # 中文条件以字面量发送; 服务器不支持时只按状态搜索, 在本地过滤
+        self.assertEqual(self.server.count("UID SEARCH", "CHARSET UTF-8 OR SUBJECT 周报 BODY 报告"), 2)
+        self.assertEqual(self.server.count("UID SEARCH", "ALL"), 1)
+
+    def test_attachment(self):
+        data = os.urandom(200 * 1024)
+        forward = EmailMessage()
+        forward["Subject"] = "forwarded"
+        forward.set_content("inner")
+        forward.add_attachment(b"inner attachment", maintype="application", subtype="pdf", filename="inner.pdf")
+        self.server.append(make_mail(attachments={"数据.bin": data, "b.txt": b"x"}, forward=forward))
+        self.server.append(make_mail(subject="no attachment"))
+
+        EmailImap4Receive.chunk_size = 64 * 1024
+        try:
+            res = self.receive(max_return_num=5, save_attachment_path=self.temp_dir)
+        finally:
+            EmailImap4Receive.chunk_size = 1024 * 1024
+        self.assertEqual(res[0]["attachments"], ["数据.bin", "b.txt", "inner.pdf"])
+        self.assertEqual(res[1]["attachments"], [])
+        self.assertEqual(Path(self.temp_dir, "数据.bin").read_bytes(), data)
+        self.assertEqual(Path(self.temp_dir, "inner.pdf").read_bytes(), b"inner attachment")
+        # 附件分段下载
+        self.assertGreater(self.server.count("UID FETCH", "BODY.PEEK[2]<"), 4)
+
+        # 不保存附件时不下载附件
+        self.server.commands.clear()
+        self.receive(max_return_num=5)
+        self.assertEqual(self.server.count("UID FETCH", "BODY.PEEK[2]"), 0)
+
+    def test_only_new(self):
+        for i in range(5):
+            self.server.append(make_mail(subject="mail {}".format(i)))
+
+        def subjects(**kwargs) -> list:
+            return [mail["subject"] for mail in self.receive(max_return_num=3, only_new=True, **kwargs)]
+
+        self.assertEqual(subjects(), ["mail 0", "mail 1", "mail 2"])
+        self.assertEqual(subjects(), ["mail 3", "mail 4"])
+        self.assertEqual(subjects(), [])
+        self.server.append(make_mail(subject="mail 5"))
+        # 条件不满足的新邮件也不会再次检查
+        self.assertEqual(subjects(theme_text="other"), [])
+        self.server.append(make_mail(subject="mail 6"))
+        self.assertEqual(subjects(), ["mail 6"])
+        # 不同文件夹分别记录
+        self.assertEqual(subjects(folder="Archive"), ["mail 0", "mail 1", "mail 2"])
+
+        # 文件夹重建后 UID 失效, 重新接收
+        self.server.reset(2)
+        self.server.append(make_mail(subject="rebuilt"))
+        self.assertEqual(subjects(), ["rebuilt"])
+
+    def test_unseen_since_mask_as_read(self):
+        self.server.append(make_mail(subject="old", date=datetime.datetime(2024, 12, 1, tzinfo=datetime.UTC)))
+        self.server.append(make_mail(subject="read"), seen=True)
+        self.server.append(make_mail(subject="new"))
+
+        kwargs = {"max_return_num": 5, "unseen": True, "since": datetime.date(2025, 1, 1)}
+        res = self.receive(mask_as_read=True, **kwargs)
+        self.assertEqual([mail["subject"] for mail in res], ["new"])
+        self.assertEqual(self.server.flags[3], {"\\Seen"})
+        self.assertEqual(self.receive(**kwargs), [])
+        self.assertEqual(self.server.flags[1], set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+import email
+import email.policy
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from astronverse.email import EmailServerType
+from astronverse.email.core_smtp_send import EmailSmtpSend
+from astronverse.email.email import Email
+from astronverse.email.error import BaseException
+from astronverse.email.pool import SmtpPool, pool
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MailHandler:
+    """
+    aiosmtpd 的处理器, 记录收到的邮件、登录和 NOOP 次数
+    收件人包含 bad 时拒收, fail_data 为接下来 DATA 返回 421 的次数
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = []
+        self.logins = 0
+        self.noops = 0
+        self.fail_data = 0
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        with self.lock:
+            self.logins += 1
+        return AuthResult(success=auth_data.password == b"secret", handled=False)
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        with self.lock:
+            self.noops += 1
+        return "250 OK"
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if "bad" in address:
+            return "550 no such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            if self.fail_data:
+                self.fail_data -= 1
+                return "421 service not available, closing channel"
+            self.messages.append((list(envelope.rcpt_tos), email.message_from_bytes(envelope.content)))
+        return "250 Message accepted"
+
+
+def text_of(msg) -> str:
+    for part in msg.walk():
+        if part.get_content_maintype() == "text":
+            return part.get_payload(decode=True).decode("utf-8")
+    return ""
+
+
+class TestSmtpSend(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.handler = MailHandler()
+        self.port = free_port()
+        self.controller = Controller(
+            self.handler,
+            hostname="127.0.0.1",
+            port=self.port,
+            auth_require_tls=False,
+            authenticator=self.handler.authenticate,
+        )
+        self.controller.start()
+        self.login = {
+            "mail_server": EmailServerType.OTHER,
+            "other_mail_server": "127.0.0.1",
+            "mail_port": self.port,
+            "use_ssl": False,
+            "sender_mail": "me@example.com",
+            "password": "secret",
+        }
+
+    def tearDown(self):
+        pool.close_all()
+        self.controller.stop()
+        shutil.rmtree(self.temp_dir)
+
+    def test_send_email_reuse(self):
+        for i in range(5):
+            Email.send_email(receiver="user{}@example.com".format(i), subject="hello {}".format(i), **self.login)
+        self.assertEqual(len(self.handler.messages), 5)
+        self.assertEqual(self.handler.messages[4][0], ["user4@example.com"])
+        # 同一个账号只登录一次
+        self.assertEqual(self.handler.logins, 1)
+
+        # 其他密码不复用已登录的连接
+        with self.assertRaises(BaseException):
+            Email.send_email(receiver="a@example.com", **dict(self.login, password="wrong"))
+        self.assertGreater(self.handler.logins, 1)
+        self.assertEqual(len(self.handler.messages), 5)
+
+    def test_reconnect(self):
+        Email.send_email(receiver="a@example.com", **self.login)
+        core = pool.idle[next(iter(pool.idle))][0][0]
+
+        # 空闲连接被断开, 发送时重新连接后重发
+        core.mail_handler.sock.shutdown(socket.SHUT_RDWR)
+        Email.send_email(receiver="b@example.com", **self.login)
+        # 服务端返回 421 关闭连接
+        self.handler.fail_data = 1
+        Email.send_email(receiver="c@example.com", **self.login)
+        self.assertEqual(
+            [rcpt for rcpt, _ in self.handler.messages], [["a@example.com"], ["b@example.com"], ["c@example.com"]]
+        )
+        self.assertEqual(self.handler.logins, 3)
+        # 连续失败时不再重试
+        self.handler.fail_data = 2
+        with self.assertRaises(BaseException):
+            Email.send_email(receiver="d@example.com", **self.login)
+
+    def test_keepalive(self):
+        test_pool = SmtpPool()
+        test_pool.keepalive_interval = 0
+        key = ("127.0.0.1", self.port, "me@example.com")
+
+        def connect():
+            core = EmailSmtpSend()
+            core.login("127.0.0.1", self.port, "me@example.com", "secret")
+            return core
+
+        core = test_pool.acquire(key, connect)
+        test_pool.release(core)
+        test_pool.keepalive()
+        self.assertEqual(self.handler.noops, 1)
+        self.assertIs(test_pool.acquire(key, connect), core)
+        test_pool.release(core)
+
+        # 保活失败的连接关闭, 下次获取时重新连接
+        core.mail_handler.sock.shutdown(socket.SHUT_RDWR)
+        test_pool.keepalive()
+        self.assertEqual(test_pool.idle[key], [])
+        self.assertIsNot(test_pool.acquire(key, connect), core)
+        test_pool.close_all()
+
+    def test_send_batch(self):
+        attachment = os.path.join(self.temp_dir, "账单.txt")
+        Path(attachment).write_text("bill", encoding="utf-8")
+        rows = [{"{name}": "用户{}".format(i), "email": "user{}@example.com".format(i)} for i in range(20)]
+        rows[3]["email"] = "bad@example.com"
+        rows[5]["email"] = ""
+        rows[8]["email"] = "user8@example.com;bad8@example.com"
+
+        res = Email.send_email_batch(
+            data_table=rows,
+            receiver_column="email",
+            subject="{name}的账单",
+            content="尊敬的{name}: 您好",
+            attachment_path=attachment,
+            connection_num=3,
+            **self.login,
+        )
+        self.assertEqual([item["row"] for item in res], list(range(1, 21)))
+        self.assertEqual([i for i, item in enumerate(res) if not item["success"]], [3, 5, 8])
+        self.assertIn("no such user", res[3]["error"])
+        self.assertEqual(res[3]["refused"], ["bad@example.com"])
+        self.assertEqual(
+            res[0], {"row": 1, "receiver": "user0@example.com", "success": True, "error": "", "refused": []}
+        )
+        # 部分收件人被拒收, 其他收件人已经收到
+        self.assertEqual(res[8]["refused"], ["bad8@example.com"])
+        self.assertIn("bad8@example.com", res[8]["error"])
+
+        self.assertEqual(len(self.handler.messages), 18)
+        messages = {rcpt[0]: msg for rcpt, msg in self.handler.messages}
+        msg = messages["user7@example.com"]
+        self.assertEqual(str(email.header.make_header(email.header.decode_header(msg["Subject"]))), "用户7的账单")
+        self.assertEqual(text_of(msg), "尊敬的用户7: 您好")
+        self.assertEqual([part.get_payload(decode=True) for part in msg.walk() if part.get_filename()], [b"bill"])
+        # 最多 3 个连接, 每个连接只登录一次
+        self.assertLessEqual(self.handler.logins, 3)
+
+    def test_send_batch_table_and_rate(self):
+        table = [["email", "name"]] + [["user{}@example.com".format(i), "n{}".format(i)] for i in range(6)]
+        start = time.time()
+        res = Email.send_email_batch(
+            data_table=table, receiver_column="email", subject="name", rate_limit=600, **self.login
+        )
+        # 每分钟 600 封, 间隔 0.1 秒
+        self.assertGreaterEqual(time.time() - start, 0.45)
+        self.assertTrue(all(item["success"] for item in res))
+        self.assertEqual(
+            sorted(msg["Subject"] for _, msg in self.handler.messages), ["n{}".format(i) for i in range(6)]
+        )
+
+        with self.assertRaises(BaseException):
+            Email.send_email_batch(data_table=table, receiver_column="mail", **self.login)
+
+    def test_send_batch_login_fail(self):
+        rows = [{"email": "user{}@example.com".format(i)} for i in range(3)]
+        res = Email.send_email_batch(data_table=rows, receiver_column="email", **dict(self.login, password="wrong"))
+        self.assertEqual([item["success"] for item in res], [False] * 3)
+        self.assertTrue(all(item["error"] for item in res))
+        self.assertEqual(self.handler.messages, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
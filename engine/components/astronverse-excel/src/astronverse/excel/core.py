@@ -134,7 +134,7 @@ class IExcelCore(ABC):
                     left_element = IExcelCore._handle_row_input(left_element, used_row)
                     right_element = IExcelCore._handle_row_input(right_element, used_row)
                 else:
-                    left_element = IExcelCore._handle_column_input(element, used_col, True)
+                    left_element = IExcelCore._handle_column_input(left_element, used_col, True)
                     right_element = IExcelCore._handle_column_input(right_element, used_col, True)
                 for i in range(left_element, right_element + 1):
                     result.append(i)
@@ -1,7 +1,1044 @@
+import ast
+import datetime
+import os
+import shutil
+from decimal import Decimal
+
+from astronverse.excel import (
+    ApplicationType,
+    ClearType,
+    CloseRangeType,
+    ColumnDirectionType,
+    ColumnOutputType,
+    ColumnType,
+    CopySheetLocationType,
+    CopySheetType,
+    DeleteCellDirection,
+    EditRangeType,
+    EditType,
+    EnhancedInsertType,
+    FileExistenceType,
+    MoveSheetType,
+    ReadRangeType,
+    RowDirectionType,
+    RowType,
+    SaveType,
+    SearchRangeType,
+    SheetInsertType,
+    SheetRangeType,
+)
 from astronverse.excel.core import IExcelCore
+from astronverse.excel.error import (
+    EXCEL_PLATFORM_NOT_SUPPORT_FORMAT,
+    EXCEL_UNAVAILABLE_ERROR_FORMAT,
+    FILE_PATH_ERROR_FORMAT,
+    INPUT_DATA_ERROR_FORMAT,
+    BaseException,
+)
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.cell import range_boundaries
+
+# openpyxl 支持的文件格式
+SUPPORT_SUFFIX = (".xlsx", ".xlsm", ".xltx", ".xltm")
+
+
+class ExcelBook:
+    """
+    基于文件的工作簿, 不依赖Excel/WPS程序
+
+    三种状态:
+    1. 读取: 打开已有文件, 只读模式按需解析用到的sheet, 每个sheet只解析一次, 只保留值
+    2. 新建: 新建的工作簿只保存行数据, 保存时用只写模式流式写入
+    3. 编辑: 修改已有文件时才完整加载, 保留格式
+
+    读取状态下公式单元格返回文件中缓存的计算结果, 编辑状态下未修改的公式单元格同样返回该结果
+    """
+
+    def __init__(self, path: str = ""):
+        self.path = path
+        self.book = None  # 完整加载的工作簿, 编辑状态
+        self.reader = None  # 只读模式的工作簿, 读取状态
+        self.names = []  # sheet名称, 按顺序
+        self.active = 0  # 当前sheet的序号
+        self.rows = {}  # sheet名称 -> 行数据, 读取/新建状态
+        self.streamed = set()  # 读取状态下流式读取过的sheet
+        self.result_readers = None  # 编辑状态下原文件的 (公式, 计算结果) 只读工作簿
+        self.origins = {}  # 编辑状态下来自原文件的sheet -> 原sheet名称
+        self.results = {}  # 原sheet名称 -> {(行, 列): (公式, 计算结果)}
+
+    @classmethod
+    def open(cls, path: str):
+        book = cls(path)
+        book.reader = load_workbook(path, read_only=True, data_only=True)
+        book.names = list(book.reader.sheetnames)
+        book.active = book.reader.index(book.reader.active) if book.reader.active else 0
+        return book
+
+    @classmethod
+    def new(cls):
+        book = cls()
+        book.names = ["Sheet1"]
+        book.rows = {"Sheet1": []}
+        return book
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    def load(self) -> Workbook:
+        """切换到编辑状态"""
+        if self.book is None:
+            if self.reader is not None:
+                self.book = load_workbook(self.path, keep_vba=self.path.lower().endswith((".xlsm", ".xltm")))
+                # 保留原文件的只读工作簿, 保存时替换文件不影响已打开的句柄
+                self.result_readers = (load_workbook(self.path, read_only=True), self.reader)
+                self.origins = {ws: ws.title for ws in self.book.worksheets}
+                self.reader = None
+            else:
+                self.book = Workbook()
+                self.book.remove(self.book.active)
+                for name in self.names:
+                    ws = self.book.create_sheet(name)
+                    for row in self.rows[name]:
+                        ws.append(row)
+            self.book.active = self.active
+            self.rows = {}
+        return self.book
+
+    def prepare_edit(self):
+        """已有文件修改前需要完整加载, 新建的工作簿直接修改行数据"""
+        if self.book is None and self.reader is not None:
+            self.load()
+
+    def worksheet(self, name: str):
+        return self.load()[name]
+
+    def values(self, name: str):
+        """读取/新建状态下sheet的行数据, 第一次用到时解析; 编辑状态返回 None"""
+        if self.book is not None:
+            return None
+        if name not in self.rows:
+            ws = self.reader[name]
+            # 文件中记录的区域可能不准确, 以实际数据为准
+            ws.reset_dimensions()
+            self.rows[name] = [list(row) for row in ws.iter_rows(values_only=True)]
+        return self.rows[name]
+
+    def formula_results(self, ws) -> dict:
+        """编辑状态下 ws 中来自原文件的公式单元格 {(行, 列): (公式, 计算结果)}, 第一次用到时解析"""
+        title = self.origins.get(ws)
+        if title is None:
+            return {}
+        if title not in self.results:
+            formulas, results = (reader[title] for reader in self.result_readers)
+            formulas.reset_dimensions()
+            results.reset_dimensions()
+            self.results[title] = {
+                (cell.row, cell.column): (cell.value, result.value)
+                for row, result_row in zip(formulas.iter_rows(), results.iter_rows())
+                for cell, result in zip(row, result_row)
+                if cell.data_type == "f"
+            }
+        return self.results[title]
+
+    def used_size(self, name: str) -> tuple:
+        """已使用区域的最后一行和最后一列, 空sheet为 (1, 1)"""
+        rows = self.values(name)
+        if rows is None:
+            ws = self.book[name]
+            return ws.max_row, ws.max_column
+        return max(1, len(rows)), max([1] + [len(row) for row in rows])
+
+    def read_range(self, name: str, min_row: int, min_col: int, max_row: int, max_col: int) -> list:
+        """一次读取区域的值, 返回二维列表, 超出已使用区域的部分为 None"""
+        if self.reader is not None and name not in self.rows and name not in self.streamed:
+            # 第一次读取只解析到需要的行, 同一个sheet再次读取时才整体解析并缓存
+            self.streamed.add(name)
+            ws = self.reader[name]
+            return [
+                list(row)
+                for row in ws.iter_rows(
+                    min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col, values_only=True
+                )
+            ]
+        rows = self.values(name)
+        if rows is None:
+            ws = self.book[name]
+            results = self.formula_results(ws)
+            res = []
+            for row in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+                values = []
+                for cell in row:
+                    # 公式未修改时返回原文件中的计算结果, 和读取状态一致
+                    formula, result = results.get((cell.row, cell.column), (None, None))
+                    values.append(result if formula is not None and formula == cell.value else cell.value)
+                res.append(values)
+            return res
+        width = max_col - min_col + 1
+        res = []
+        for row in rows[min_row - 1 : max_row]:
+            row = row[min_col - 1 : max_col]
+            res.append(row + [None] * (width - len(row)))
+        res.extend([None] * width for _ in range(max_row - min_row + 1 - len(res)))
+        return res
+
+    def write_range(self, name: str, min_row: int, min_col: int, values: list):
+        """从 (min_row, min_col) 开始写入二维列表"""
+        self.prepare_edit()
+        rows = self.values(name)
+        if rows is None:
+            ws = self.book[name]
+            for i, row in enumerate(values):
+                for j, value in enumerate(row):
+                    ws.cell(row=min_row + i, column=min_col + j, value=value)
+            return
+        if len(rows) < min_row - 1 + len(values):
+            rows.extend([] for _ in range(min_row - 1 + len(values) - len(rows)))
+        for i, row in enumerate(values):
+            target = rows[min_row - 1 + i]
+            if len(target) < min_col - 1 + len(row):
+                target.extend([None] * (min_col - 1 + len(row) - len(target)))
+            target[min_col - 1 : min_col - 1 + len(row)] = row
+
+    def add_sheet(self, name: str, index: int, rows: list | None = None):
+        """在 index 位置新建sheet, 并设为当前sheet"""
+        self.prepare_edit()
+        if self.book is not None:
+            ws = self.book.create_sheet(name, index)
+            for row in rows or []:
+                ws.append(row)
+            self.book.active = ws
+        else:
+            self.rows[name] = [list(row) for row in rows or []]
+        self.names.insert(index, name)
+        self.active = index
+
+    def copy_sheet(self, name: str, new_name: str, index: int):
+        """当前工作簿内复制sheet, 编辑状态下同时复制格式"""
+        self.prepare_edit()
+        if self.book is None:
+            self.add_sheet(new_name, index, self.rows[name])
+            return
+        ws = self.book.copy_worksheet(self.book[name])
+        ws.title = new_name
+        self.names.append(new_name)
+        self.move_sheet(new_name, index)
+        self.book.active = self.book[new_name]
+        self.active = index
+
+    def remove_sheet(self, name: str):
+        if len(self.names) == 1:
+            raise ValueError("工作簿至少需要保留一个sheet")
+        self.prepare_edit()
+        if self.book is not None:
+            self.book.remove(self.book[name])
+        else:
+            self.rows.pop(name)
+        active_name = self.names[self.active]
+        self.names.remove(name)
+        if active_name in self.names:
+            self.active = self.names.index(active_name)
+        else:
+            self.active = min(self.active, len(self.names) - 1)
+        if self.book is not None:
+            self.book.active = self.active
+
+    def rename_sheet(self, name: str, new_name: str):
+        self.prepare_edit()
+        if self.book is not None:
+            self.book[name].title = new_name
+        else:
+            self.rows[new_name] = self.rows.pop(name)
+        self.names[self.names.index(name)] = new_name
+
+    def move_sheet(self, name: str, index: int):
+        """移动sheet到 index 位置"""
+        self.prepare_edit()
+        active_name = self.names[self.active]
+        old_index = self.names.index(name)
+        if self.book is not None:
+            self.book.move_sheet(name, index - old_index)
+        self.names.insert(index, self.names.pop(old_index))
+        self.active = self.names.index(active_name)
+        if self.book is not None:
+            self.book.active = self.active
+
+    def save(self, path: str = ""):
+        """保存到 path, 先写临时文件再替换, 保存失败不会损坏原文件"""
+        path = path or self.path
+        if not path:
+            raise BaseException(FILE_PATH_ERROR_FORMAT.format(path), "文件未保存过，请使用另存为！")
+        if self.book is None and self.reader is not None:
+            # 未修改过, 不需要重新生成
+            if os.path.abspath(path) != os.path.abspath(self.path):
+                shutil.copyfile(self.path, path)
+            self.path = path
+            return
+
+        tmp_path = "{}.tmp".format(path)
+        try:
+            if self.book is not None:
+                self.book.save(tmp_path)
+            else:
+                wb = Workbook(write_only=True)
+                for name in self.names:
+                    ws = wb.create_sheet(name)
+                    for row in self.rows[name]:
+                        ws.append(row)
+                wb.save(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.path = path
+
+    def close(self):
+        if self.reader is not None:
+            self.reader.close()
+        for reader in self.result_readers or ():
+            reader.close()
+        self.reader = None
+        self.result_readers = None
+        self.origins = {}
+        self.results = {}
+        self.book = None
+        self.rows = {}
 
 
 class ExcelCore(IExcelCore):
+    """
+    Linux 下基于 openpyxl 的实现, 直接读写文件, 不需要安装Excel/WPS
+
+    只支持数据读写和sheet操作, 依赖Excel程序的功能(格式设置、剪贴板、公式计算等)不支持
+    """
+
+    excel_obj = None
+    books = []  # 已打开的工作簿
+
+    def __getattr__(self, name):
+        # 其他原子能力依赖Excel程序
+        if name.startswith("_"):
+            raise AttributeError(name)
+        raise BaseException(EXCEL_PLATFORM_NOT_SUPPORT_FORMAT.format(name), "当前平台不支持该操作")
+
+    @staticmethod
+    def _check_suffix(file_path: str):
+        if not file_path.lower().endswith(SUPPORT_SUFFIX):
+            raise BaseException(
+                EXCEL_PLATFORM_NOT_SUPPORT_FORMAT.format(os.path.splitext(file_path)[1]),
+                "当前平台只支持xlsx/xlsm格式",
+            )
+
+    @staticmethod
+    def _check_password(password: str):
+        if password:
+            raise BaseException(EXCEL_PLATFORM_NOT_SUPPORT_FORMAT.format("password"), "当前平台不支持加密文件")
+
+    @staticmethod
+    def _get_sheet_name(excel: ExcelBook, sheet_name: str = "") -> str:
+        """
+        获取sheet名称, 支持名称或序号(从1开始), 为空时返回第一个sheet
+        """
+        sheet_names = excel.names
+        try:
+            sheet_name = int(sheet_name)
+            if str(sheet_name) in sheet_names:
+                return str(sheet_name)
+            elif sheet_name < 1 or sheet_name > len(sheet_names):
+                raise ValueError("输入的sheet名称不存在")
+            return sheet_names[sheet_name - 1]
+        except ValueError:
+            if sheet_name == "":
+                return sheet_names[0]
+            elif sheet_name not in sheet_names:
+                raise ValueError("输入的sheet名称不存在")
+        return sheet_name
+
+    @staticmethod
+    def _cell_value(value):
+        """写入的值转换为openpyxl支持的类型"""
+        if value is None or isinstance(
+            value, (str, int, float, Decimal, datetime.datetime, datetime.date, datetime.time)
+        ):
+            return value
+        return str(value)
+
+    @staticmethod
+    def _display_text(value) -> str:
+        """单元格显示的内容, 文件中没有渲染结果, 按常规格式转换"""
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "TRUE" if value else "FALSE"
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        if isinstance(value, datetime.datetime):
+            if value.time() == datetime.time():
+                return value.strftime("%Y/%m/%d")
+            return value.strftime("%Y/%m/%d %H:%M:%S")
+        if isinstance(value, datetime.date):
+            return value.strftime("%Y/%m/%d")
+        return str(value)
+
+    @staticmethod
+    def _format_content(content, trim_spaces: bool = False, replace_none: bool = True):
+        """清除字符串前后空格, 替换None为空字符串, 支持单个值、一维和二维列表"""
+
+        def handle(value):
+            if trim_spaces and isinstance(value, str):
+                return value.strip()
+            if replace_none and value is None:
+                return ""
+            return value
+
+        if isinstance(content, list):
+            return [[handle(v) for v in item] if isinstance(item, list) else handle(item) for item in content]
+        return handle(content)
+
+    @staticmethod
+    def _range_boundaries(data_range: str) -> tuple:
+        """A1:C3 -> (起始行, 起始列, 结束行, 结束列)"""
+        try:
+            min_col, min_row, max_col, max_row = range_boundaries(data_range.replace("$", "").upper())
+        except Exception:
+            raise ValueError("请输入正确的区域信息，如A1:B2")
+        return min_row, min_col, max_row, max_col
+
+    @classmethod
+    def open(
+        cls,
+        file_path: str = "",
+        default_application: ApplicationType = ApplicationType.DEFAULT,
+        visible_flag: bool = True,
+        password: str = "",
+        update_links: bool = True,
+    ) -> object:
+        """
+        打开Excel文件, 只读取sheet列表, sheet内容在用到时才解析
+        """
+        if not file_path:
+            raise LookupError("没有输入路径，请检查输入的Excel路径是否正确!")
+        cls._check_suffix(file_path)
+        cls._check_password(password)
+        excel = ExcelBook.open(file_path)
+        cls.books.append(excel)
+        return excel
+
+    @classmethod
+    def get_exist_excel(cls, file_name):
+        """
+        获取当前进程中已经打开的excel
+        """
+        for excel in cls.books:
+            if excel.name.find(file_name) >= 0:
+                return excel
+        raise Exception(f"不存在已打开的Excel文件:{file_name}")
+
+    @classmethod
+    def create(
+        cls,
+        file_path: str = "",
+        file_name: str = "",
+        default_application: ApplicationType = ApplicationType.EXCEL,
+        visible_flag: bool = True,
+        exist_handle_type: FileExistenceType = FileExistenceType.RENAME,
+        password: str = "",
+    ) -> tuple[object, str]:
+        """
+        Excel - 文档操作 - 创建
+        """
+        cls._check_password(password)
+        new_file_path = cls.handle_existence(os.path.join(file_path, file_name), exist_handle_type)
+        excel = ExcelBook.new()
+        if new_file_path:
+            try:
+                excel.save(new_file_path)
+            except Exception:
+                raise BaseException(EXCEL_UNAVAILABLE_ERROR_FORMAT.format(new_file_path), "")
+        cls.books.append(excel)
+        return excel, new_file_path
+
+    @classmethod
+    def _excel_save(cls, excel: ExcelBook, file_path, file_name, save_type, exist_handle_type):
+        if save_type == SaveType.SAVE_AS and file_path:
+            file_suffix = os.path.splitext(excel.name)[1] or ".xlsx"
+            if not file_name:
+                file_name = os.path.splitext(excel.name)[0] or "新建Excel文档"
+            dst_file = os.path.join(file_path, file_name + file_suffix)
+            new_file_path = cls.handle_existence(dst_file, exist_handle_type)
+            if new_file_path:
+                excel.save(new_file_path)
+        elif save_type == SaveType.SAVE:
+            excel.save()
+
+    @classmethod
+    def save(
+        cls,
+        excel: object,
+        file_path: str = "",
+        file_name: str = "",
+        save_type=SaveType.SAVE,
+        exist_handle_type: FileExistenceType = FileExistenceType.RENAME,
+        close_flag: bool = False,
+    ) -> object:
+        cls._excel_save(excel, file_path, file_name, save_type, exist_handle_type)
+        if close_flag:
+            cls._close(excel)
+
+    @classmethod
+    def _close(cls, excel: ExcelBook):
+        excel.close()
+        if excel in cls.books:
+            cls.books.remove(excel)
+
+    @classmethod
+    def close(
+        cls,
+        excel: object = None,
+        close_range_flag: CloseRangeType = CloseRangeType.ONE,
+        save_type=SaveType.SAVE,
+        file_path: str = "",
+        file_name: str = "",
+        exist_handle_type: FileExistenceType = FileExistenceType.RENAME,
+        pkill_flag: bool = False,
+    ):
+        if close_range_flag == CloseRangeType.ALL:
+            cls.close_all(save_type == SaveType.SAVE)
+            return
+        cls._excel_save(excel, file_path, file_name, save_type, exist_handle_type)
+        cls._close(excel)
+
+    @classmethod
+    def close_all(cls, save: bool = True):
+        """关闭所有已打开的工作簿, 未保存过的新建工作簿不保存"""
+        for excel in list(cls.books):
+            if save and excel.path:
+                excel.save()
+            cls._close(excel)
+
     @staticmethod
-    def print(msg: str = "") -> str:
-        return f"linux {msg}"
+    def get_worksheet_names(excel: object, sheet_range: SheetRangeType = SheetRangeType.ACTIVATED):
+        """
+        sheet_range: "0":当前sheet页名称; "1":所有sheet页名称
+        return:返回所有sheet名
+        """
+        if sheet_range == SheetRangeType.ALL:
+            return list(excel.names)
+        return excel.names[excel.active]
+
+    @classmethod
+    def read(
+        cls,
+        excel: object,
+        sheet_name: str = "",
+        start_col: str = "",
+        end_col: str = "",
+        read_range: ReadRangeType = ReadRangeType.CELL,
+        cell: str = "",
+        row: int = 1,
+        column: str = "",
+        start_row: int = 1,
+        end_row: int = 1,
+        read_display: bool = True,
+        trim_spaces: bool = False,
+        replace_none: bool = True,
+    ) -> object:
+        """
+        读取Excel内容, 每次读取都是一次取出整个区域
+        :param read_display: 是否读取单元格显示的内容, 按常规格式转换为字符串
+        :return: 单元格返回单个值, 行/列返回列表, 区域/全部返回二维列表
+        """
+        name = cls._get_sheet_name(excel, sheet_name)
+        if read_range == ReadRangeType.CELL or (
+            read_range == ReadRangeType.AREA
+            and not any(str(item).strip().startswith("-") for item in [start_row, end_row, start_col, end_col])
+        ):
+            # 不需要已使用区域, 避免解析整个sheet
+            used_row, used_col = 0, 0
+        else:
+            used_row, used_col = excel.used_size(name)
+
+        if read_range == ReadRangeType.CELL:
+            min_row, min_col, max_row, max_col = cls._range_boundaries(cell)
+            content = excel.read_range(name, min_row, min_col, max_row, max_col)
+            if min_row == max_row and min_col == max_col:
+                content = content[0][0]
+        elif read_range == ReadRangeType.ROW:
+            row = cls._handle_row_input(row, used_row)
+            content = excel.read_range(name, row, 1, row, used_col)[0]
+        elif read_range == ReadRangeType.COLUMN:
+            column = cls._handle_column_input(str(column).upper(), used_col, True)
+            content = [item[0] for item in excel.read_range(name, 1, column, used_row, column)]
+        elif read_range == ReadRangeType.AREA:
+            start_col = cls._handle_column_input(str(start_col).upper(), used_col, True)
+            end_col = cls._handle_column_input(str(end_col).upper(), used_col, True)
+            start_row = cls._handle_row_input(start_row, used_row)
+            end_row = cls._handle_row_input(end_row, used_row)
+            content = excel.read_range(name, start_row, start_col, end_row, end_col)
+        elif read_range == ReadRangeType.ALL:
+            content = excel.read_range(name, 1, 1, used_row, used_col)
+        else:
+            raise TypeError("错误的读取范围类型")
+
+        if read_display:
+            if isinstance(content, list):
+                content = [
+                    [cls._display_text(v) for v in item] if isinstance(item, list) else cls._display_text(item)
+                    for item in content
+                ]
+            else:
+                content = cls._display_text(content)
+        return cls._format_content(content, trim_spaces, replace_none)
+
+    @classmethod
+    def edit(
+        cls,
+        excel: object,
+        start_col: str = "",
+        start_row: str = "",
+        sheet_name: str = "",
+        edit_range: EditRangeType = EditRangeType.ROW,
+        value: list = [],
+        edit_type=EditType.OVERWRITE,
+    ):
+        """
+        编辑Excel文件中的单元格, 整行/整列/区域一次写入
+        """
+        name = cls._get_sheet_name(excel, sheet_name)
+        used_row, used_col = excel.used_size(name)
+        start_col = cls._handle_column_input(str(start_col).upper(), used_col, True)
+        start_row = cls._handle_row_input(start_row, used_row)
+
+        if edit_range == EditRangeType.ROW:
+            if edit_type == EditType.APPEND:
+                start_col = used_col + 1
+            values = [[cls._cell_value(v) for v in value]]
+        elif edit_range == EditRangeType.COLUMN:
+            if edit_type == EditType.APPEND:
+                start_row = used_row + 1
+            values = [[cls._cell_value(v)] for v in value]
+        elif edit_range == EditRangeType.AREA:
+            values = [
+                [cls._cell_value(v) for v in row] if isinstance(row, (list, tuple)) else [cls._cell_value(row)]
+                for row in value
+            ]
+        elif edit_range == EditRangeType.CELL:
+            values = [[cls._cell_value(value[0])]]
+        else:
+            raise TypeError("错误的写入范围类型")
+        excel.write_range(name, start_row, start_col, values)
+
+    @classmethod
+    def get_row_num(
+        cls,
+        excel,
+        sheet_name: str = "",
+        get_col_type: ColumnType = ColumnType.ALL,
+        col: str = "",
+    ):
+        name = cls._get_sheet_name(excel, sheet_name)
+        used_row, used_col = excel.used_size(name)
+        if get_col_type == ColumnType.ALL:
+            return used_row
+        elif get_col_type == ColumnType.ONE_COLUMN:
+            col = cls._handle_column_input(str(col).upper(), used_col, True)
+            rows = excel.read_range(name, 1, col, used_row, col)
+            for index in range(len(rows) - 1, -1, -1):
+                if rows[index][0] not in [None, ""]:
+                    return index + 1
+            return 0
+        return None
+
+    @classmethod
+    def get_col_num(
+        cls,
+        excel,
+        sheet_name: str = "",
+        get_row_type: RowType = RowType.ALL,
+        row: str = "",
+        output_type: ColumnOutputType = ColumnOutputType.NUMBER,
+    ):
+        """
+        read_range: 读取范围：0-整个sheet、1-指定行，默认值：0-整个sheet
+        row: 行号，支持负数
+        output_type:  输出列数格式：0-数字、1-字母，默认值：0-数字型
+        """
+        result_col = 0
+        name = cls._get_sheet_name(excel, sheet_name)
+        used_row, used_col = excel.used_size(name)
+        if get_row_type == RowType.ALL:
+            result_col = used_col
+        elif get_row_type == RowType.ONE_ROW:
+            row = cls._handle_row_input(row, used_row)
+            columns = excel.read_range(name, row, 1, row, used_col)[0]
+            for index in range(len(columns) - 1, -1, -1):
+                if columns[index] not in [None, ""]:
+                    result_col = index + 1
+                    break
+        if output_type == ColumnOutputType.NUMBER:
+            return result_col
+        elif output_type == ColumnOutputType.LETTER:
+            return cls._column_number_to_letter(result_col)
+        return None
+
+    @classmethod
+    def get_first_available_row(cls, excel: object, sheet_name: str = ""):
+        name = cls._get_sheet_name(excel, sheet_name)
+        used_row, used_col = excel.used_size(name)
+        for index, row in enumerate(excel.read_range(name, 1, 1, used_row, used_col)):
+            if all(value in [None, ""] for value in row):
+                return index + 1
+        return used_row + 1
+
+    @classmethod
+    def get_first_available_column(
+        cls,
+        excel: object,
+        sheet_name: str = "",
+        output_type: ColumnOutputType = ColumnOutputType.LETTER,
+    ):
+        name = cls._get_sheet_name(excel, sheet_name)
+        used_row, used_col = excel.used_size(name)
+        data = excel.read_range(name, 1, 1, used_row, used_col)
+        result_col = used_col + 1
+        for col in range(used_col):
+            if all(row[col] in [None, ""] for row in data):
+                result_col = col + 1
+                break
+        if output_type == ColumnOutputType.LETTER:
+            return cls._column_number_to_letter(result_col)
+        return result_col
+
+    @classmethod
+    def loop_content(
+        cls,
+        excel_obj,
+        sheet_name: str = "",
+        select_type: SearchRangeType = SearchRangeType.ROW,
+        start_row: str = "",
+        end_row: str = "",
+        start_col: str = "",
+        end_col: str = "",
+        real_text: bool = False,
+        cell_strip: bool = False,
+    ):
+        # select_type:1:循环行，2:循环列 3: 循环区域 4: 循环已使用
+        name = cls._get_sheet_name(excel_obj, sheet_name)
+        used_row, used_col = excel_obj.used_size(name)
+
+        if select_type in [SearchRangeType.ROW, SearchRangeType.AREA]:
+            start_row = cls._handle_row_input(start_row, used_row)
+            end_row = cls._handle_row_input(end_row, used_row)
+        else:
+            start_row, end_row = 1, used_row
+
+        if select_type in [SearchRangeType.COLUMN, SearchRangeType.AREA]:
+            start_col = cls._handle_column_input(str(start_col).upper(), used_col, True)
+            end_col = cls._handle_column_input(str(end_col).upper(), used_col, True)
+        else:
+            start_col, end_col = 1, used_col
+
+        content = excel_obj.read_range(name, start_row, start_col, end_row, end_col)
+        if real_text:
+            content = [[cls._display_text(v) for v in row] for row in content]
+        if cell_strip:
+            content = [[v.strip().replace("\n", "") if isinstance(v, str) else v for v in row] for row in content]
+
+        if select_type == SearchRangeType.COLUMN:
+            headers = cls.get_column_names(start_col, end_col)
+            return dict(zip(headers, [list(item) for item in zip(*content)]))
+        return dict(zip(range(start_row, end_row + 1), content))
+
+    @classmethod
+    def clear_content(
+        cls,
+        excel: object,
+        sheet_name: str = "",
+        cell_location: str = "",
+        select_type=ReadRangeType.CELL,
+        row: str = "",
+        col: str = "",
+        data_range: str = "",
+        clear_type=ClearType.CONTENT,
+    ):
+        """
+        清空单元格或区域内容
+        clear_type: 清除方式 0 清除内容 1 清除格式 2 清除全部
+        """
+        name = cls._get_sheet_name(excel, sheet_name)
+        ws = excel.worksheet(name)
+        used_row, used_col = ws.max_row, ws.max_column
+
+        if select_type == ReadRangeType.CELL:
+            ranges = [cls._range_boundaries(cell_location)]
+        elif select_type == ReadRangeType.AREA:
+            ranges = [cls._range_boundaries(data_range)]
+        elif select_type == ReadRangeType.ALL:
+            ranges = [(1, 1, used_row, used_col)]
+        elif select_type == ReadRangeType.ROW:
+            ranges = [
+                (item, 1, item, used_col) for item in cls._handle_multiple_inputs(str(row), used_row, used_col, True)
+            ]
+        elif select_type == ReadRangeType.COLUMN:
+            ranges = [
+                (1, item, used_row, item)
+                for item in cls._handle_multiple_inputs(str(col).upper(), used_row, used_col, False)
+            ]
+        else:
+            raise TypeError("错误的清除范围类型")
+
+        for min_row, min_col, max_row, max_col in ranges:
+            for cells in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+                for cell in cells:
+                    if clear_type in [ClearType.CONTENT, ClearType.ALL]:
+                        cell.value = None
+                    if clear_type in [ClearType.STYLE, ClearType.ALL]:
+                        cell.style = "Normal"
+        return excel
+
+    @classmethod
+    def delete_cell(
+        cls,
+        excel: object,
+        coordinate: str,
+        row: str = "",
+        col: str = "",
+        delete_range_excel=ReadRangeType.CELL,
+        data_region: str = "",
+        sheet_name: str = "",
+        direction: DeleteCellDirection = DeleteCellDirection.LOWER_MOVE_UP,
+    ):
+        """
+        excel删除内容
+        :param delete_range_excel: 删除方式 0：删除单元格 1：删除整行 2：删除整列 3:区域
+        :param direction: 合并方式 0：下方单元格上移 1：右方单元格左移
+        """
+        name = cls._get_sheet_name(excel, sheet_name)
+        ws = excel.worksheet(name)
+        used_row, used_col = ws.max_row, ws.max_column
+
+        if delete_range_excel in [ReadRangeType.CELL, ReadRangeType.AREA]:
+            min_row, min_col, max_row, max_col = cls._range_boundaries(
+                coordinate if delete_range_excel == ReadRangeType.CELL else data_region
+            )
+            for cells in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+                for cell in cells:
+                    cell.value = None
+            if direction == DeleteCellDirection.LOWER_MOVE_UP and max_row < used_row:
+                ws.move_range(
+                    "{}{}:{}{}".format(
+                        cls._column_number_to_letter(min_col),
+                        max_row + 1,
+                        cls._column_number_to_letter(max_col),
+                        used_row,
+                    ),
+                    rows=min_row - max_row - 1,
+                )
+            elif direction == DeleteCellDirection.RIGHT_MOVE_LEFT and max_col < used_col:
+                ws.move_range(
+                    "{}{}:{}{}".format(
+                        cls._column_number_to_letter(max_col + 1),
+                        min_row,
+                        cls._column_number_to_letter(used_col),
+                        max_row,
+                    ),
+                    cols=min_col - max_col - 1,
+                )
+        elif delete_range_excel == ReadRangeType.ROW:
+            rows = cls._handle_multiple_inputs(str(row), used_row, used_col, True)
+            for item in sorted(set(rows), reverse=True):
+                ws.delete_rows(item)
+        elif delete_range_excel == ReadRangeType.COLUMN:
+            cols = cls._handle_multiple_inputs(str(col).upper(), used_row, used_col, False)
+            for item in sorted(set(cols), reverse=True):
+                ws.delete_cols(item)
+        elif delete_range_excel == ReadRangeType.ALL:
+            for cells in ws.iter_rows():
+                for cell in cells:
+                    cell.value = None
+        else:
+            raise TypeError("错误的类型，仅支持按单元格，按行，按列删除。")
+        return excel
+
+    @classmethod
+    def insert_row_or_column(
+        cls,
+        excel: object,
+        sheet_name: str,
+        insert_type: EnhancedInsertType = EnhancedInsertType.ROW,
+        row: int = 1,
+        row_direction: RowDirectionType = RowDirectionType.LOWER,
+        col: int = 1,
+        col_direction: ColumnDirectionType = ColumnDirectionType.RIGHT,
+        blank_rows: bool = False,
+        insert_num: int = 1,
+        insert_content: str = "",
+    ):
+        """
+        插入行列, 不插入空行时按内容的行数插入并写入内容
+        insert_type： 0-指定行号插入行、1-指定列号插入列，2-行追加输入，3-列追加输入
+        """
+        name = cls._get_sheet_name(excel, sheet_name)
+        ws = excel.worksheet(name)
+        used_row, used_col = ws.max_row, ws.max_column
+
+        if not blank_rows:
+            if not isinstance(insert_content, list):
+                try:
+                    insert_content = ast.literal_eval(insert_content)
+                except (SyntaxError, ValueError) as e:
+                    raise BaseException(INPUT_DATA_ERROR_FORMAT.format(e), "")
+            if not isinstance(insert_content[0], list):
+                insert_content = [insert_content]
+            insert_num = len(insert_content)
+
+        if insert_type == EnhancedInsertType.ADD_ROWS:
+            row = used_row
+            row_direction = RowDirectionType.LOWER
+        elif insert_type == EnhancedInsertType.ADD_COLUMNS:
+            col = used_col
+            col_direction = ColumnDirectionType.RIGHT
+
+        if insert_type in [EnhancedInsertType.ROW, EnhancedInsertType.ADD_ROWS]:
+            row = cls._handle_row_input(row, used_row)
+            if row_direction == RowDirectionType.LOWER:
+                row = row + 1
+            ws.insert_rows(row, insert_num)
+            if not blank_rows:
+                cls.edit(excel, "", row, name, EditRangeType.AREA, insert_content)
+        elif insert_type in [EnhancedInsertType.COLUMN, EnhancedInsertType.ADD_COLUMNS]:
+            col = cls._handle_column_input(str(col).upper(), used_col, True)
+            if col_direction == ColumnDirectionType.RIGHT:
+                col = col + 1
+            ws.insert_cols(col, insert_num)
+            if not blank_rows:
+                # 每个子列表是一列
+                max_length = max(len(sublist) for sublist in insert_content)
+                filled_list = [sublist + [""] * (max_length - len(sublist)) for sublist in insert_content]
+                cls.edit(excel, col, 1, name, EditRangeType.AREA, [list(item) for item in zip(*filled_list)])
+
+
+class SheetCore(IExcelCore):
+    excel_obj = None
+
+    @staticmethod
+    def get_worksheet_names(excel: object, sheet_range: SheetRangeType = SheetRangeType.ACTIVATED):
+        return ExcelCore.get_worksheet_names(excel, sheet_range)
+
+    @staticmethod
+    def _check_new_name(excel: ExcelBook, sheet_name: str, is_cover: bool = False):
+        if sheet_name in excel.names and not is_cover:
+            raise ValueError("新sheet名称已存在")
+        if len(sheet_name) >= 31:
+            raise ValueError("sheet名称过长,需要小于31个字符")
+
+    @classmethod
+    def create_worksheet(
+        cls,
+        excel: object,
+        sheet_name: str,
+        insert_type: SheetInsertType = SheetInsertType.FIRST,
+        relative_sheet_name: str = "",
+    ):
+        """
+        创建sheet
+        """
+        cls._check_new_name(excel, sheet_name)
+        if insert_type == SheetInsertType.FIRST:
+            index = 0
+        elif insert_type == SheetInsertType.LAST:
+            index = len(excel.names)
+        else:
+            if (not relative_sheet_name) or (relative_sheet_name not in excel.names):
+                raise ValueError("参考sheet名称不存在")
+            index = excel.names.index(relative_sheet_name)
+            if insert_type == SheetInsertType.AFTER:
+                index += 1
+        excel.add_sheet(sheet_name, index)
+
+    @classmethod
+    def move_worksheet(
+        cls,
+        excel: object,
+        move_sheet: str,
+        move_to_sheet: str,
+        move_type: MoveSheetType = MoveSheetType.MOVE_AFTER,
+    ):
+        """
+        移动sheet
+        """
+        name = ExcelCore._get_sheet_name(excel, move_sheet)
+        if move_type == MoveSheetType.MOVE_TO_FIRST:
+            excel.move_sheet(name, 0)
+        elif move_type == MoveSheetType.MOVE_TO_LAST:
+            excel.move_sheet(name, len(excel.names) - 1)
+        elif move_to_sheet:
+            to_name = ExcelCore._get_sheet_name(excel, move_to_sheet)
+            if to_name == name:
+                return
+            names = [item for item in excel.names if item != name]
+            index = names.index(to_name)
+            if move_type == MoveSheetType.MOVE_AFTER:
+                index += 1
+            excel.move_sheet(name, index)
+
+    @classmethod
+    def delete_worksheet(cls, excel: object, del_sheet_name: str):
+        """
+        删除sheet
+        """
+        excel.remove_sheet(ExcelCore._get_sheet_name(excel, del_sheet_name))
+
+    @classmethod
+    def rename_worksheet(cls, excel: object, source_sheet_name: str, new_sheet_name: str):
+        """
+        重命名sheet
+        """
+        cls._check_new_name(excel, new_sheet_name)
+        excel.rename_sheet(ExcelCore._get_sheet_name(excel, source_sheet_name), new_sheet_name)
+
+    @classmethod
+    def copy_worksheet(
+        cls,
+        excel: object,
+        source_sheet_name: str,
+        new_sheet_name: str,
+        location: CopySheetLocationType = CopySheetLocationType.LAST,
+        copy_type: CopySheetType = CopySheetType.CURRENT_WORKBOOK,
+        other_excel_obj: object = "",
+        is_cover: bool = False,
+    ):
+        """
+        复制sheet, 复制到其他工作簿时只复制值
+        location: 位置，Before,After,First,Last,
+        copy_type: 复制类型 0 当前工作簿 1 其他工作簿 默认 0
+        """
+        name = ExcelCore._get_sheet_name(excel, source_sheet_name)
+        target = excel if copy_type == CopySheetType.CURRENT_WORKBOOK else other_excel_obj
+        cls._check_new_name(target, new_sheet_name, is_cover)
+        covered = ""
+        if is_cover and new_sheet_name in target.names:
+            if target is excel and new_sheet_name == name:
+                raise ValueError("复制sheet名称不能和原sheet相同")
+            # 复制完成后再删除被覆盖的sheet, 工作簿中可能只有这一个sheet
+            covered = "{}~".format(new_sheet_name)
+            while covered in target.names:
+                covered += "~"
+            target.rename_sheet(new_sheet_name, covered)
+
+        if location == CopySheetLocationType.FIRST:
+            index = 0
+        elif location == CopySheetLocationType.LAST:
+            index = len(target.names)
+        else:
+            # 当前工作簿相对原sheet, 其他工作簿相对当前sheet
+            relative = target.names.index(name) if target is excel else target.active
+            index = relative if location == CopySheetLocationType.BEFORE else relative + 1
+
+        if target is excel:
+            excel.copy_sheet(name, new_sheet_name, index)
+        else:
+            used_row, used_col = excel.used_size(name)
+            target.add_sheet(new_sheet_name, index, excel.read_range(name, 1, 1, used_row, used_col))
+        if covered:
+            target.remove_sheet(covered)
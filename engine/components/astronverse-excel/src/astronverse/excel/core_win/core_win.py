@@ -360,6 +360,24 @@ class ExcelCore(IExcelCore):
                 stderr=subprocess.DEVNULL,
             )
 
+    @staticmethod
+    def _range_values(worksheet, start_row, start_col, end_row, end_col) -> list:
+        """一次COM调用读取区域的值, 返回二维列表"""
+        values = worksheet.Range(worksheet.Cells(start_row, start_col), worksheet.Cells(end_row, end_col)).Value
+        if not isinstance(values, tuple):
+            # 单个单元格
+            return [[values]]
+        return [list(row) for row in values]
+
+    @staticmethod
+    def _set_range_values(worksheet, start_row, start_col, values: list):
+        """一次COM调用写入区域, values 为每行长度相同的二维列表"""
+        if not values or not values[0]:
+            return
+        end_row = start_row + len(values) - 1
+        end_col = start_col + len(values[0]) - 1
+        worksheet.Range(worksheet.Cells(start_row, start_col), worksheet.Cells(end_row, end_col)).Value = values
+
     @classmethod
     def read(
         cls,
@@ -414,13 +432,13 @@ class ExcelCore(IExcelCore):
             content = (
                 [worksheet.Cells(row, col).Text for col in range(1, used_col + 1)]
                 if read_display
-                else [worksheet.Cells(row, col).Value for col in range(1, used_col + 1)]
+                else cls._range_values(worksheet, row, 1, row, used_col)[0]
             )
         elif read_range == ReadRangeType.COLUMN:
             content = (
                 [worksheet.Cells(row, column).Text for row in range(1, used_row + 1)]
                 if read_display
-                else [worksheet.Cells(row, column).Value for row in range(1, used_row + 1)]
+                else [item[0] for item in cls._range_values(worksheet, 1, column, used_row, column)]
             )
         elif read_range == ReadRangeType.AREA:
             content = (
@@ -429,19 +447,13 @@ class ExcelCore(IExcelCore):
                     for row in range(start_row, end_row + 1)
                 ]
                 if read_display
-                else [
-                    [worksheet.Cells(row, col).Value for col in range(start_col, end_col + 1)]
-                    for row in range(start_row, end_row + 1)
-                ]
+                else cls._range_values(worksheet, start_row, start_col, end_row, end_col)
             )
         elif read_range == ReadRangeType.ALL:
             content = (
                 [[worksheet.Cells(row, col).Text for col in range(1, used_col + 1)] for row in range(1, used_row + 1)]
                 if read_display
-                else [
-                    [worksheet.Cells(row, col).Value for col in range(1, used_col + 1)]
-                    for row in range(1, used_row + 1)
-                ]
+                else cls._range_values(worksheet, 1, 1, used_row, used_col)
             )
 
         if trim_spaces:
@@ -504,18 +516,19 @@ class ExcelCore(IExcelCore):
         if edit_range == EditRangeType.ROW:
             if edit_type == EditType.APPEND:
                 start_col = used_range.Columns.Count + 1
-            for n in range(len(value)):
-                worksheet.Cells(start_row, start_col + n).Value = value[n]
+            cls._set_range_values(worksheet, start_row, start_col, [list(value)])
         elif edit_range == EditRangeType.COLUMN:
             if edit_type == EditType.APPEND:
                 start_row = used_range.Rows.Count + 1
-            for n in range(len(value)):
-                worksheet.Cells(start_row + n, start_col).Value = value[n]
+            cls._set_range_values(worksheet, start_row, start_col, [[item] for item in value])
         elif edit_range == EditRangeType.AREA:
-            for row in value:
-                for n in range(len(row)):
-                    worksheet.Cells(start_row, start_col + n).Value = row[n]
-                start_row += 1
+            if all(isinstance(row, list) and len(row) == len(value[0]) for row in value):
+                cls._set_range_values(worksheet, start_row, start_col, value)
+            else:
+                for row in value:
+                    for n in range(len(row)):
+                        worksheet.Cells(start_row, start_col + n).Value = row[n]
+                    start_row += 1
         elif edit_range == EditRangeType.CELL:
             worksheet.Cells(start_row, start_col).Value = value[0]
 
@@ -11,3 +11,4 @@ EXCEL_UNAVAILABLE_ERROR_FORMAT: ErrorCode = ErrorCode(
 )
 INPUT_DATA_ERROR_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("输入数据有误，请检查输入数据！") + ": {}")
 EXCEL_START_ROW_ERROR_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("起始行不能等于0，请输入大于0的整数！"))
+EXCEL_PLATFORM_NOT_SUPPORT_FORMAT: ErrorCode = ErrorCode(BizCode.LocalErr, _("当前平台不支持该操作") + ": {}")
@@ -4,7 +4,6 @@ import platform
 import sys
 
 import psutil
-import win32com
 from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, AtomicLevel, DynamicsItem
 from astronverse.actionlib.atomic import atomicMg
 from astronverse.actionlib.types import PATH
@@ -56,16 +55,17 @@ from astronverse.excel.error import (
 from astronverse.excel.excel_obj import ExcelObj
 
 if sys.platform == "win32":
+    import win32com.client
     from astronverse.excel.core_win.core_win import ExcelCore
     from astronverse.excel.core_win.sheet import SheetCore
 
     sheet_core: IExcelCore = SheetCore()
     excel_core: IExcelCore = ExcelCore()
 elif platform.system() == "Linux":
-    from astronverse.excel.core_unix import ExcelCore
+    from astronverse.excel.core_unix import ExcelCore, SheetCore
 
+    sheet_core: IExcelCore = SheetCore()
     excel_core: IExcelCore = ExcelCore()
-    sheet_core = None  # Linux 平台暂不支持 SheetCore
 else:
     raise NotImplementedError(f"Your platform ({platform.system()}) is not supported by clipboard")
 
@@ -325,6 +325,10 @@ class Excel:
         :return: None
         """
         try:
+            if close_range_flag == CloseRangeType.ALL and sys.platform != "win32":
+                # 关闭当前进程打开的所有工作簿
+                excel_core.close_all(save_type_all == SaveTypeAll.SAVE)
+                return None
             if close_range_flag == CloseRangeType.ALL:
                 # 获取所有打开的Excel进程
                 for proc in psutil.process_iter(["pid", "name"]):
@@ -1293,7 +1297,7 @@ class Excel:
             new_sheet_name,
             location,
             copy_type,
-            other_excel_obj,
+            other_excel_obj.obj if isinstance(other_excel_obj, ExcelObj) else other_excel_obj,
             is_cover,
         )
 
@@ -31,6 +31,9 @@ class ExcelObj:
 
     @typesMg.shortcut("ExcelObj", res_type="Int")
     def get_row_count(self) -> int:
+        if hasattr(self.obj, "used_size"):
+            # 基于文件的工作簿(Linux)
+            return self.obj.used_size(self.obj.names[self.obj.active])[0]
         ws_obj = self.get_active_sheet()
         used_col = ws_obj.Cells.SpecialCells(11).Column
         used_row = ws_obj.Cells.SpecialCells(11).Row
@@ -38,6 +41,13 @@ class ExcelObj:
 
     @typesMg.shortcut("ExcelObj", res_type="Int")
     def get_first_free_row(self) -> int:
+        if hasattr(self.obj, "used_size"):
+            name = self.obj.names[self.obj.active]
+            rows_count, cols_count = self.obj.used_size(name)
+            for row, values in enumerate(self.obj.read_range(name, 1, 1, rows_count, cols_count)):
+                if all(value in [None, ""] for value in values):
+                    return row + 1
+            return rows_count + 1
         ws = self.get_active_sheet()
         used_cell = ws.Cells.SpecialCells(11).Address.replace("$", "")
 
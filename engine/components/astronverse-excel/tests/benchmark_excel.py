@@ -0,0 +1,116 @@
+"""
+Linux Excel 读写耗时和内存基准: 完整加载+逐个单元格 vs 流式读写+整区域读写
+
+运行: python tests/benchmark_excel.py [--rows 100000] [--cols 20]
+每个用例在单独的进程中运行, 内存为进程峰值
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from astronverse.excel import EditRangeType, ReadRangeType
+from astronverse.excel.excel import Excel
+from openpyxl import Workbook, load_workbook
+
+
+def make_rows(rows: int, cols: int) -> list:
+    return [[r * cols + c if c % 2 else "v{}-{}".format(r, c) for c in range(cols)] for r in range(rows)]
+
+
+def legacy_write(path, rows):
+    wb = Workbook()
+    ws = wb.active
+    for r, row in enumerate(rows):
+        for c, value in enumerate(row):
+            ws.cell(row=r + 1, column=c + 1, value=value)
+    wb.save(path)
+
+
+def atom_write(path, rows):
+    excel, _ = Excel.create_excel(file_path=os.path.dirname(path), file_name="atom")
+    Excel.edit_excel(excel=excel, edit_range=EditRangeType.AREA, value=rows)
+    Excel.close_excel(excel=excel)
+
+
+def legacy_read(path, sheet_name):
+    ws = load_workbook(path)[sheet_name]
+    max_row, max_col = ws.max_row, ws.max_column
+    return [[ws.cell(row=r, column=c).value for c in range(1, max_col + 1)] for r in range(1, max_row + 1)]
+
+
+def atom_read(path, sheet_name):
+    excel = Excel.open_excel(file_path=path)
+    return Excel.read_excel(excel=excel, sheet_name=sheet_name, read_range=ReadRangeType.ALL, read_display=False)
+
+
+def atom_read_small(path, sheet_name):
+    excel = Excel.open_excel(file_path=path)
+    return Excel.read_excel(
+        excel=excel,
+        sheet_name=sheet_name,
+        read_range=ReadRangeType.AREA,
+        start_row=1,
+        end_row=10,
+        start_col="A",
+        end_col="C",
+        read_display=False,
+    )
+
+
+def run(queue, func, *args):
+    start = time.perf_counter()
+    func(*args)
+    cost = time.perf_counter() - start
+    queue.put((cost, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024))
+
+
+def bench(name, func, *args):
+    queue = multiprocessing.Queue()
+    p = multiprocessing.Process(target=run, args=(queue, func, *args))
+    p.start()
+    cost, memory = queue.get()
+    p.join()
+    print("  {:45s} {:8.2f} s {:8d} MB".format(name, cost, memory))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--cols", type=int, default=20)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        rows = make_rows(args.rows, args.cols)
+        print("{} x {}".format(args.rows, args.cols))
+
+        legacy_path = os.path.join(temp_dir, "legacy.xlsx")
+        bench("write: full workbook, per cell", legacy_write, legacy_path, rows)
+        bench("write: atoms, write-only streaming", atom_write, os.path.join(temp_dir, "atom.xlsx"), rows)
+
+        # 多个sheet的文件, 只读取最后一个
+        wb = Workbook(write_only=True)
+        for i in range(3):
+            ws = wb.create_sheet("s{}".format(i))
+            for row in rows:
+                ws.append(row)
+        multi_path = os.path.join(temp_dir, "multi.xlsx")
+        wb.save(multi_path)
+        del wb
+
+        bench("read: full load, per cell", legacy_read, legacy_path, "Sheet")
+        bench("read: atoms, read-only one pass", atom_read, legacy_path, "")
+        bench("read 1 of 3 sheets: full load, per cell", legacy_read, multi_path, "s2")
+        bench("read 1 of 3 sheets: atoms, lazy sheet", atom_read, multi_path, "s2")
+        bench("read A1:C10 of 3 sheets: atoms", atom_read_small, multi_path, "s0")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
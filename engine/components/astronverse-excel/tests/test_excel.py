@@ -0,0 +1,241 @@
+import datetime
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import TestCase
+
+from astronverse.excel import (
+    ClearType,
+    ColumnOutputType,
+    ColumnType,
+    CopySheetLocationType,
+    CopySheetType,
+    DeleteCellDirection,
+    EditRangeType,
+    FileExistenceType,
+    MoveSheetType,
+    ReadRangeType,
+    RowType,
+    SaveType,
+    SearchRangeType,
+    SheetInsertType,
+    SheetRangeType,
+)
+from astronverse.excel.core_unix import ExcelCore
+from astronverse.excel.error import BaseException
+from astronverse.excel.excel import Excel
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Font
+
+
+class TestExcel(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.temp_dir, "test.xlsx")
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "data"
+        ws.append(["id", "name", "date"])
+        ws.append([1, " a ", datetime.datetime(2024, 1, 2)])
+        ws.append([2, None, 1.5])
+        ws["A1"].font = Font(bold=True)
+        wb.create_sheet("other")["A1"] = "x"
+        wb.save(self.file_path)
+
+    def tearDown(self):
+        ExcelCore.close_all(save=False)
+        shutil.rmtree(self.temp_dir)
+
+    def open(self):
+        return Excel.open_excel(file_path=self.file_path)
+
+    def read(self, excel, read_range=ReadRangeType.ALL, **kwargs):
+        return Excel.read_excel(excel=excel, read_range=read_range, read_display=False, replace_none=False, **kwargs)
+
+    def test_read(self):
+        excel = self.open()
+        self.assertEqual(
+            self.read(excel),
+            [["id", "name", "date"], [1, " a ", datetime.datetime(2024, 1, 2)], [2, None, 1.5]],
+        )
+        self.assertEqual(self.read(excel, ReadRangeType.CELL, cell="b2"), " a ")
+        self.assertEqual(self.read(excel, ReadRangeType.ROW, row=-1), [2, None, 1.5])
+        self.assertEqual(self.read(excel, ReadRangeType.COLUMN, column="a"), ["id", 1, 2])
+        self.assertEqual(
+            self.read(excel, ReadRangeType.AREA, start_row=2, end_row=4, start_col="B", end_col="D"),
+            [[" a ", datetime.datetime(2024, 1, 2), None], [None, 1.5, None], [None, None, None]],
+        )
+        self.assertEqual(self.read(excel, ReadRangeType.CELL, cell="A1", sheet_name="2"), "x")
+
+        # 显示内容
+        self.assertEqual(
+            Excel.read_excel(excel=excel, read_range=ReadRangeType.ROW, row=2, trim_spaces=True),
+            ["1", "a", "2024/01/02"],
+        )
+        self.assertEqual(Excel.read_excel(excel=excel, read_range=ReadRangeType.ROW, row=3), ["2", "", "1.5"])
+
+        # 只解析用到的sheet, 第一次读取单元格只解析到需要的行, 未修改时保持只读模式
+        self.assertEqual(list(excel.obj.rows), ["data"])
+        self.assertEqual(excel.obj.streamed, {"other"})
+        self.assertIsNone(excel.obj.book)
+        self.assertEqual(self.read(excel, ReadRangeType.CELL, cell="A1", sheet_name="other"), "x")
+        self.assertEqual(list(excel.obj.rows), ["data", "other"])
+
+    def test_edit_keeps_style(self):
+        excel = self.open()
+        Excel.edit_excel(excel=excel, edit_range=EditRangeType.AREA, start_col="B", start_row="4", value=[[1, 2], [3]])
+        Excel.edit_excel(excel=excel, edit_range=EditRangeType.COLUMN, start_col="E", start_row="1", value="[7, 8]")
+        Excel.edit_excel(excel=excel, edit_range=EditRangeType.CELL, start_col="A", start_row="4", value={"a": 1})
+        self.assertEqual(self.read(excel, ReadRangeType.ROW, row=4), [str({"a": 1}), 1, 2, None, None])
+        Excel.save_excel(excel=excel)
+        Excel.close_excel(excel=excel, save_type_one=SaveType.ABORT)
+
+        ws = load_workbook(self.file_path)["data"]
+        self.assertTrue(ws["A1"].font.bold)
+        self.assertEqual([c.value for c in ws[5]], [None, 3, None, None, None])
+        self.assertEqual(ws["E2"].value, 8)
+
+    def test_formula_result(self):
+        # openpyxl 不计算公式, 手动写入Excel保存时缓存的计算结果
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "calc"
+        ws.append([1])
+        ws.append([2])
+        ws["A3"] = "=SUM(A1:A2)"
+        ws["A4"] = "=A1*10"
+        wb.save(self.file_path)
+        with zipfile.ZipFile(self.file_path) as src:
+            files = {name: src.read(name) for name in src.namelist()}
+        xml = files["xl/worksheets/sheet1.xml"].decode()
+        for formula, value in (("SUM(A1:A2)", 3), ("A1*10", 10)):
+            pattern = r"(<f>{}</f>)(<v\s*/>|<v></v>)?".format(re.escape(formula))
+            xml = re.sub(pattern, r"\g<1><v>{}</v>".format(value), xml)
+        files["xl/worksheets/sheet1.xml"] = xml.encode()
+        with zipfile.ZipFile(self.file_path, "w") as dst:
+            for name, data in files.items():
+                dst.writestr(name, data)
+
+        excel = self.open()
+        self.assertEqual(self.read(excel, ReadRangeType.COLUMN, column="A"), [1, 2, 3, 10])
+        self.assertIsNone(excel.obj.book)
+
+        # 编辑后未修改的公式仍返回计算结果, 新写入的公式按写入内容返回
+        Excel.edit_excel(excel=excel, edit_range=EditRangeType.CELL, start_col="B", start_row="1", value=5)
+        Excel.edit_excel(excel=excel, edit_range=EditRangeType.CELL, start_col="A", start_row="4", value="=A2*10")
+        Excel.rename_excel_worksheet(excel=excel, source_sheet_name="calc", new_sheet_name="renamed")
+        self.assertIsNotNone(excel.obj.book)
+        self.assertEqual(self.read(excel, ReadRangeType.CELL, cell="A3"), 3)
+        self.assertEqual(self.read(excel, ReadRangeType.COLUMN, column="A"), [1, 2, 3, "=A2*10"])
+        Excel.save_excel(excel=excel)
+        self.assertEqual(self.read(excel, ReadRangeType.CELL, cell="A3"), 3)
+
+    def test_create_and_save_as(self):
+        excel, path = Excel.create_excel(file_path=self.temp_dir, file_name="test")
+        self.assertEqual(path, os.path.join(self.temp_dir, "test_1.xlsx"))
+        rows = [[i, "name-{}".format(i)] for i in range(100)]
+        Excel.edit_excel(excel=excel, edit_range=EditRangeType.AREA, value=rows)
+        Excel.add_excel_worksheet(excel=excel, sheet_name="new", insert_type=SheetInsertType.LAST)
+        Excel.edit_excel(excel=excel, sheet_name="new", edit_range=EditRangeType.ROW, value=["a", "b"])
+        # 新建的工作簿不需要完整加载
+        self.assertIsNone(excel.obj.book)
+
+        Excel.save_excel(
+            excel=excel,
+            save_type=SaveType.SAVE_AS,
+            file_path=self.temp_dir,
+            file_name="other",
+            exist_handle_type=FileExistenceType.OVERWRITE,
+        )
+        wb = load_workbook(os.path.join(self.temp_dir, "other.xlsx"))
+        self.assertEqual(wb.sheetnames, ["Sheet1", "new"])
+        self.assertEqual([list(row) for row in wb["Sheet1"].values], rows)
+        self.assertEqual(list(wb["new"].values), [("a", "b")])
+        self.assertEqual(os.listdir(self.temp_dir).count("other.xlsx.tmp"), 0)
+
+    def test_row_col_num(self):
+        excel = self.open()
+        Excel.edit_excel(excel=excel, edit_range=EditRangeType.CELL, start_col="A", start_row="6", value="")
+        self.assertEqual(Excel.get_excel_row_num(excel=excel), 6)
+        self.assertEqual(Excel.get_excel_row_num(excel=excel, get_col_type=ColumnType.ONE_COLUMN, col="B"), 2)
+        self.assertEqual(
+            Excel.get_excel_col_num(
+                excel=excel, get_row_type=RowType.ONE_ROW, row="3", output_type=ColumnOutputType.LETTER
+            ),
+            "C",
+        )
+        self.assertEqual(Excel.get_excel_first_available_row(excel=excel), 4)
+        self.assertEqual(Excel.get_excel_first_available_col(excel=excel), "D")
+
+    def test_loop(self):
+        excel = self.open()
+        self.assertEqual(
+            Excel.loop_excel_content(excel=excel, select_type=SearchRangeType.COLUMN, start_col="A", end_col="B"),
+            {"A": ["id", 1, 2], "B": ["name", " a ", None]},
+        )
+        self.assertEqual(
+            Excel.loop_excel_content(excel=excel, select_type=SearchRangeType.ROW, start_row="2", end_row="-1"),
+            {2: [1, " a ", datetime.datetime(2024, 1, 2)], 3: [2, None, 1.5]},
+        )
+
+    def test_delete_clear_insert(self):
+        excel = self.open()
+        Excel.delete_excel_cell(excel=excel, delete_range_excel=ReadRangeType.CELL, coordinate="A2")
+        self.assertEqual(self.read(excel, ReadRangeType.COLUMN, column="A"), ["id", 2, None])
+        Excel.delete_excel_cell(
+            excel=excel,
+            delete_range_excel=ReadRangeType.CELL,
+            coordinate="A1",
+            direction=DeleteCellDirection.RIGHT_MOVE_LEFT,
+        )
+        self.assertEqual(self.read(excel, ReadRangeType.ROW, row=1), ["name", "date", None])
+        Excel.delete_excel_cell(excel=excel, delete_range_excel=ReadRangeType.COLUMN, col="b:c")
+        self.assertEqual(self.read(excel), [["name"], [2], [None]])
+
+        Excel.insert_excel_row_or_column(excel=excel, row=1, insert_content="[['x', 'y'], ['z']]")
+        self.assertEqual(self.read(excel, ReadRangeType.COLUMN, column="A"), ["name", "x", "z", 2, None])
+        Excel.clear_excel_content(excel=excel, sheet_name="", select_type=ReadRangeType.ROW, row="2,3")
+        self.assertEqual(self.read(excel, ReadRangeType.COLUMN, column="A"), ["name", None, None, 2, None])
+        Excel.clear_excel_content(excel=excel, sheet_name="", select_type=ReadRangeType.ALL, clear_type=ClearType.ALL)
+        self.assertFalse(excel.obj.worksheet("data")["A1"].font.bold)
+
+    def test_sheets(self):
+        excel = self.open()
+        Excel.add_excel_worksheet(excel=excel, sheet_name="first")
+        Excel.rename_excel_worksheet(excel=excel, source_sheet_name="other", new_sheet_name="renamed")
+        Excel.copy_excel_worksheet(
+            excel=excel, source_sheet_name="data", new_sheet_name="copy", location=CopySheetLocationType.BEFORE
+        )
+        self.assertEqual(Excel.get_excel_worksheet_names(excel=excel), "copy")
+        Excel.move_excel_worksheet(excel=excel, move_type=MoveSheetType.MOVE_TO_LAST, move_sheet="first")
+        Excel.delete_excel_worksheet(excel=excel, del_sheet_name="renamed")
+        self.assertEqual(
+            Excel.get_excel_worksheet_names(excel=excel, sheet_range=SheetRangeType.ALL), ["copy", "data", "first"]
+        )
+        self.assertEqual(self.read(excel, sheet_name="copy"), self.read(excel, sheet_name="data"))
+        with self.assertRaises(ValueError):
+            Excel.rename_excel_worksheet(excel=excel, source_sheet_name="copy", new_sheet_name="data")
+
+        other, _ = Excel.create_excel(file_path=self.temp_dir, file_name="other")
+        Excel.copy_excel_worksheet(
+            excel=excel,
+            source_sheet_name="data",
+            new_sheet_name="Sheet1",
+            copy_type=CopySheetType.OTHER_WORKBOOK,
+            other_excel_obj=other,
+            is_cover=True,
+        )
+        self.assertEqual(self.read(other, sheet_name="Sheet1"), self.read(excel, sheet_name="data"))
+
+    def test_not_support(self):
+        with self.assertRaises(BaseException):
+            Excel.excel_get_cell_color(excel=self.open(), coordinate="A1")
+        with self.assertRaises(BaseException):
+            Excel.create_excel(file_path=self.temp_dir, file_name="test", password="123")
+
+
+if __name__ == "__main__":
+    unittest.main()
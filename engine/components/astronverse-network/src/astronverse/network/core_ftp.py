@@ -1,5 +1,46 @@
+import calendar
 import ftplib
 import os
+import posixpath
+import queue
+import re
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from astronverse.network.error import *
+
+
+class FtpClient(ftplib.FTP):
+    """
+    记录登录信息的FTP连接, 传输时按同样的账号新建连接, 断线后重新连接登录
+    """
+
+    user = None
+    passwd = ""
+
+    def login(self, user="", passwd="", acct=""):
+        self.user, self.passwd = user, passwd
+        return super().login(user, passwd, acct)
+
+    def clone(self) -> "FtpClient":
+        conn = FtpClient(timeout=self.timeout, encoding=self.encoding)
+        conn.set_pasv(self.passiveserver)
+        conn.connect(self.host, self.port)
+        if self.user is not None:
+            conn.login(self.user, self.passwd)
+        return conn
+
+    def reconnect(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+        self.connect(self.host, self.port)
+        if self.user is not None:
+            super().login(self.user, self.passwd)
 
 
 class FtpCore:
@@ -8,7 +49,7 @@ class FtpCore:
         """
         创建FTP实例
         """
-        ftp_instance = ftplib.FTP()
+        ftp_instance = FtpClient()
         ftp_instance.encoding = "gbk"
         return ftp_instance
 
@@ -173,14 +214,16 @@ class FtpCore:
         return os.path.join(pwd, name)
 
     @staticmethod
-    def generate_name(ftp_instance, rename: str):
+    def generate_name(ftp_instance, rename: str, used=()):
         """
         为重名文件/文件夹生成副本
+        :param used: 已经分配出去但还未上传到服务器的名称
         """
+        exists = set(FtpCore.get_nlst(ftp_instance)) | set(used)
         base, extension = os.path.splitext(rename)
         counter = 1
         new_name = f"{base}({counter}){extension}"
-        while new_name in FtpCore.get_nlst(ftp_instance):
+        while new_name in exists:
             counter += 1
             new_name = f"{base}({counter}){extension}"
         return new_name
@@ -208,3 +251,379 @@ class FtpCore:
             return FtpCore.get_path(ftp_instance, dir_name)
         except ftplib.error_perm as e:
             raise ValueError(e)
+
+
+@dataclass
+class FtpJob:
+    """单个文件的传输任务"""
+
+    src: str
+    dst: str
+    size: int
+    mtime: float = 0  # 源文件修改时间
+    offset: int = 0  # 续传起点, 上传时为服务器上同一版本源文件留下的 .part 文件大小
+    transferred: int = 0  # 已传输的字节数
+    skip: bool = False  # 同步模式下目标文件未修改, 跳过
+    reported: float = 0  # 上次报告进度的时间
+
+
+class FtpTransfer:
+    """
+    FTP并行传输: 有上限的连接池, 多个文件并行传输, 大文件断点续传, 同步模式跳过未修改的文件
+
+    传入的连接是池中的第一个连接, 其余连接按同样的账号新建, 传输结束后关闭;
+    大文件先传输到 .part 文件, 完成后重命名, 断线后重新连接, 用 REST 从已传输的位置继续,
+    再次执行时也会从上次留下的 .part 文件继续; .part 文件名中记录源文件的大小和修改时间, 源文件变化后不再续传;
+    重新连接失败的连接不再使用, 由下一个任务新建连接替换
+    """
+
+    connection_num = 4  # 最多同时使用的连接数
+    retry = 3  # 断线后重新连接重试的次数
+    retry_interval = 1  # 重试间隔(秒), 依次递增
+    resume_size = 1024 * 1024  # 超过该大小的文件支持断点续传
+    block_size = 64 * 1024
+    progress_interval = 1  # 大文件传输中报告进度的间隔(秒)
+
+    def __init__(
+        self,
+        ftp_instance: ftplib.FTP,
+        connection_num: int = None,
+        sync: bool = False,
+        progress: Callable[[FtpJob, int, int], None] = None,
+    ):
+        """
+        @:param sync: 同步模式, 目标文件大小相同且不早于源文件时跳过
+        @:param progress: 进度回调 progress(job, 已完成文件数, 文件总数)
+        """
+        self.ftp_instance = ftp_instance
+        self.work_dir = ftp_instance.pwd()
+        if connection_num:
+            self.connection_num = connection_num
+        if not isinstance(ftp_instance, FtpClient):
+            # 不知道登录信息, 无法新建连接
+            self.connection_num = 1
+        self.sync = sync
+        self.progress = progress
+        self.lock = threading.Lock()
+        self.idle = queue.Queue()
+        self.idle.put(ftp_instance)
+        self.conns = [ftp_instance]
+        self.listing = {}  # 远程目录 -> {名称: (是否目录, 大小, 修改时间)}
+        self.done = 0
+        self.total = 0
+
+    def upload(self, items: list) -> list:
+        """
+        上传文件/文件夹
+        @:param items: [(本地路径, 远程绝对路径)]
+        """
+        jobs = []
+        for src, dst in items:
+            if not os.path.isdir(src):
+                jobs.append(self._upload_job(src, dst))
+                continue
+            for root, dirs, files in os.walk(src):
+                rel = os.path.relpath(root, src)
+                remote_dir = dst if rel == "." else posixpath.join(dst, *rel.split(os.sep))
+                self._make_remote_dir(remote_dir)
+                for name in files:
+                    jobs.append(self._upload_job(os.path.join(root, name), posixpath.join(remote_dir, name)))
+        self._run(jobs, self._upload, FTP_UPLOAD_FORMAT)
+        return jobs
+
+    def download(self, items: list) -> list:
+        """
+        下载文件/文件夹
+        @:param items: [(远程绝对路径, 本地路径)]
+        """
+        jobs = []
+        for src, dst in items:
+            item = self.list_dir(posixpath.dirname(src)).get(posixpath.basename(src))
+            if item is None:
+                raise BaseException(FILE_EXIST_FORMAT.format(src), "FTP服务器上不存在：{}".format(src))
+            if not item[0]:
+                jobs.append(FtpJob(src, dst, item[1], item[2]))
+                continue
+            dirs = [(src, dst)]
+            while dirs:
+                remote_dir, local_dir = dirs.pop()
+                os.makedirs(local_dir, exist_ok=True)
+                for name, (is_dir, size, mtime) in self.list_dir(remote_dir).items():
+                    if is_dir:
+                        dirs.append((posixpath.join(remote_dir, name), os.path.join(local_dir, name)))
+                    else:
+                        jobs.append(
+                            FtpJob(posixpath.join(remote_dir, name), os.path.join(local_dir, name), size, mtime)
+                        )
+        if self.sync:
+            for job in jobs:
+                if os.path.isfile(job.dst):
+                    st = os.stat(job.dst)
+                    job.skip = st.st_size == job.size and int(st.st_mtime) >= int(job.mtime)
+        self._run(jobs, self._download, FTP_DOWNLOAD_FORMAT)
+        return jobs
+
+    def list_dir(self, path: str) -> dict:
+        """
+        列出远程目录, 优先使用 MLSD 一次获取类型、大小和修改时间, 目录不存在时返回空
+        """
+        if path in self.listing:
+            return self.listing[path]
+        conn = self.ftp_instance
+        items = {}
+        try:
+            for name, facts in conn.mlsd(path, ["type", "size", "modify"]):
+                kind = facts.get("type", "").lower()
+                if kind in ("cdir", "pdir") or name in (".", ".."):
+                    continue
+                items[name] = (kind == "dir", int(facts.get("size", 0)), self._parse_time(facts.get("modify")))
+        except ftplib.error_perm as e:
+            if str(e)[:3] not in ("500", "502"):
+                # 目录不存在
+                self.listing[path] = items
+                return items
+            # 服务器不支持 MLSD, 逐个查询
+            conn.voidcmd("TYPE I")
+            for name in conn.nlst(path):
+                name = posixpath.basename(name)
+                full = posixpath.join(path, name)
+                try:
+                    size = conn.size(full)
+                except ftplib.error_perm:
+                    items[name] = (True, 0, 0)
+                    continue
+                try:
+                    mtime = self._parse_time(conn.voidcmd("MDTM " + full)[4:])
+                except ftplib.error_perm:
+                    mtime = 0
+                items[name] = (False, size, mtime)
+        self.listing[path] = items
+        return items
+
+    def close(self):
+        """关闭新建的连接, 传入的连接保留"""
+        for conn in self.conns:
+            if conn is self.ftp_instance:
+                continue
+            try:
+                conn.quit()
+            except Exception:
+                conn.close()
+        self.conns = [self.ftp_instance]
+
+    def _make_remote_dir(self, path: str):
+        parent, name = posixpath.split(path)
+        item = self.list_dir(parent).get(name)
+        if item is None:
+            try:
+                self.ftp_instance.mkd(path)
+            except ftplib.error_perm as e:
+                raise BaseException(FTP_CREATE_FORMAT.format(path), "FTP目录创建失败：{}".format(e))
+            self.listing[parent][name] = (True, 0, 0)
+            self.listing[path] = {}
+
+    def _upload_job(self, src: str, dst: str) -> FtpJob:
+        st = os.stat(src)
+        job = FtpJob(src, dst, st.st_size, st.st_mtime)
+        parent, name = posixpath.split(dst)
+        listing = self.list_dir(parent)
+        item = listing.get(name)
+        if self.sync and item and not item[0] and item[1] == job.size and item[2] >= int(job.mtime):
+            job.skip = True
+        elif job.size >= self.resume_size:
+            part_name = posixpath.basename(self._part_path(job))
+            part = listing.get(part_name)
+            if part and not part[0] and part[1] <= job.size:
+                job.offset = part[1]
+            # 源文件其他版本留下的 .part 文件不能续传, 删除
+            for stale in self._stale_parts(list(listing), name, part_name):
+                try:
+                    self.ftp_instance.delete(posixpath.join(parent, stale))
+                except ftplib.error_perm:
+                    pass
+                listing.pop(stale, None)
+        return job
+
+    def _run(self, jobs: list, func: Callable, error: ErrorCode):
+        self.done = 0
+        self.total = len(jobs)
+        for job in jobs:
+            if job.skip:
+                self._finish(job)
+        try:
+            with ThreadPoolExecutor(max_workers=self.connection_num) as executor:
+                futures = {executor.submit(self._transfer, func, job): job for job in jobs if not job.skip}
+                wait(futures, return_when=FIRST_EXCEPTION)
+                for future in futures:
+                    future.cancel()
+            for future, job in futures.items():
+                if not future.cancelled() and future.exception():
+                    e = future.exception()
+                    raise BaseException(error.format(job.src), "{}传输失败：{}".format(job.src, e)) from e
+        finally:
+            self.close()
+
+    def _transfer(self, func: Callable, job: FtpJob):
+        conn = self._acquire()
+        broken = False  # 重新连接失败
+        try:
+            for attempt in range(self.retry + 1):
+                try:
+                    if attempt:
+                        time.sleep(self.retry_interval * attempt)
+                        broken = True
+                        conn.reconnect()
+                        conn.cwd(self.work_dir)
+                        broken = False
+                    func(conn, job, attempt > 0)
+                    break
+                except (OSError, EOFError, ftplib.error_temp, ftplib.error_reply, ftplib.error_proto):
+                    if attempt == self.retry or not isinstance(conn, FtpClient):
+                        raise
+        finally:
+            if broken:
+                self._discard(conn)
+            else:
+                self.idle.put(conn)
+        self._finish(job)
+
+    def _acquire(self) -> ftplib.FTP:
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self._create()
+            if conn is None:
+                conn = self.idle.get()
+        if conn is not None:
+            return conn
+
+        # 丢弃的连接留下的空位, 新建连接替换
+        try:
+            conn = self.ftp_instance.clone()
+        except ftplib.all_errors:
+            # 空位留给其他等待的任务, 避免一直等待
+            self.idle.put(None)
+            raise
+        with self.lock:
+            self.conns.append(conn)
+        return conn
+
+    def _discard(self, conn: ftplib.FTP):
+        """丢弃重新连接失败的连接, 在池中留下空位"""
+        with self.lock:
+            if conn in self.conns:
+                self.conns.remove(conn)
+        if conn is not self.ftp_instance:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self.idle.put(None)
+
+    def _create(self):
+        """连接数未达到上限时新建连接, 否则返回 None"""
+        with self.lock:
+            create = len(self.conns) < self.connection_num
+            if create:
+                self.conns.append(None)
+        if create:
+            try:
+                conn = self.ftp_instance.clone()
+            except ftplib.all_errors:
+                # 超过服务器的连接数限制, 使用已有的连接
+                with self.lock:
+                    self.conns.remove(None)
+                    self.connection_num = len(self.conns)
+            else:
+                with self.lock:
+                    self.conns[self.conns.index(None)] = conn
+                return conn
+        return None
+
+    def _upload(self, conn: ftplib.FTP, job: FtpJob, resumed: bool):
+        part = job.size >= self.resume_size
+        tmp = self._part_path(job) if part else job.dst
+        offset = job.offset
+        if resumed and part:
+            conn.voidcmd("TYPE I")
+            try:
+                offset = conn.size(tmp)
+            except ftplib.error_perm:
+                offset = 0
+            if offset > job.size:
+                offset = 0
+        job.transferred = offset
+        job.reported = time.time()
+        with open(job.src, "rb") as fp:
+            fp.seek(offset)
+            conn.storbinary(
+                "STOR " + tmp, fp, self.block_size, lambda block: self._update(job, len(block)), rest=offset or None
+            )
+        if part:
+            try:
+                conn.rename(tmp, job.dst)
+            except ftplib.error_perm:
+                conn.delete(job.dst)
+                conn.rename(tmp, job.dst)
+
+    def _download(self, conn: ftplib.FTP, job: FtpJob, resumed: bool):
+        part = job.size >= self.resume_size
+        tmp = self._part_path(job) if part else job.dst
+        if part and not resumed:
+            # 源文件其他版本留下的 .part 文件不能续传, 删除
+            local_dir, name = os.path.split(job.dst)
+            for stale in self._stale_parts(os.listdir(local_dir or "."), name, os.path.basename(tmp)):
+                try:
+                    os.remove(os.path.join(local_dir, stale))
+                except OSError:
+                    pass
+        offset = os.path.getsize(tmp) if part and os.path.isfile(tmp) else 0
+        if offset > job.size:
+            offset = 0
+        job.transferred = offset
+        job.reported = time.time()
+        with open(tmp, "r+b" if offset else "wb") as fp:
+            fp.seek(offset)
+            fp.truncate()
+
+            def write(block):
+                fp.write(block)
+                self._update(job, len(block))
+
+            conn.retrbinary("RETR " + job.src, write, self.block_size, rest=offset or None)
+        if part:
+            os.replace(tmp, job.dst)
+        if job.mtime:
+            os.utime(job.dst, (job.mtime, job.mtime))
+
+    @staticmethod
+    def _part_path(job: FtpJob) -> str:
+        """续传的临时文件, 名称中记录源文件的大小和修改时间, 只从同一版本源文件留下的临时文件继续"""
+        return "{}.{}-{}.part".format(job.dst, job.size, int(job.mtime))
+
+    @staticmethod
+    def _stale_parts(names: list, name: str, current: str) -> list:
+        """同一个目标文件的其他临时文件, 包括源文件其他版本和旧格式(name.part)留下的"""
+        pattern = re.compile(re.escape(name) + r"(\.\d+-\d+)?\.part")
+        return [item for item in names if item != current and pattern.fullmatch(item)]
+
+    def _update(self, job: FtpJob, size: int):
+        job.transferred += size
+        if self.progress and time.time() - job.reported >= self.progress_interval:
+            job.reported = time.time()
+            self.progress(job, self.done, self.total)
+
+    def _finish(self, job: FtpJob):
+        with self.lock:
+            self.done += 1
+            done = self.done
+        if self.progress:
+            self.progress(job, done, self.total)
+
+    @staticmethod
+    def _parse_time(value: str) -> float:
+        """解析 MLSD/MDTM 返回的 UTC 时间 YYYYMMDDHHMMSS[.sss]"""
+        try:
+            return calendar.timegm(time.strptime(value.strip()[:14], "%Y%m%d%H%M%S"))
+        except (AttributeError, ValueError):
+            return 0
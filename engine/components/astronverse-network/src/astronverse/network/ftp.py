@@ -1,10 +1,13 @@
 import ftplib
 import os.path
+import posixpath
+import shutil
 
-from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, DynamicsItem
+from astronverse.actionlib import AtomicFormType, AtomicFormTypeMeta, AtomicLevel, DynamicsItem, ReportTip
 from astronverse.actionlib.atomic import atomicMg
+from astronverse.actionlib.report import report
 from astronverse.network import FileExistenceType, FileType, ListType, StateType
-from astronverse.network.core_ftp import FtpCore
+from astronverse.network.core_ftp import FtpCore, FtpJob, FtpTransfer
 from astronverse.network.error import *
 from astronverse.network.utils import (
     file_is_exist,
@@ -15,6 +18,22 @@ from astronverse.network.utils import (
 )
 
 
+def progress_reporter(action: str):
+    """按文件报告传输进度"""
+
+    def progress(job: FtpJob, done: int, total: int):
+        if job.skip:
+            state = "未修改，已跳过"
+        elif job.transferred < job.size:
+            state = "{:.0%}".format(job.transferred / job.size)
+            done += 1
+        else:
+            state = "完成"
+        report.info(ReportTip(msg_str="{}({}/{}) {} {}".format(action, done, total, job.src, state)))
+
+    return progress
+
+
 class FTP:
     @staticmethod
     @atomicMg.atomic(
@@ -347,6 +366,12 @@ class FTP:
                 formType=AtomicFormTypeMeta(type=AtomicFormType.SELECT.value),
                 required=False,
             ),
+            atomicMg.param(
+                "sync_flag",
+                formType=AtomicFormTypeMeta(type=AtomicFormType.CHECKBOX.value),
+                required=False,
+            ),
+            atomicMg.param("connection_num", level=AtomicLevel.ADVANCED, required=False),
         ],
         outputList=[
             atomicMg.param("upload_ftp_list", types="List"),
@@ -359,7 +384,15 @@ class FTP:
         file_path: str = "",
         folder_path: str = "",
         exist_type: FileExistenceType = FileExistenceType.RENAME,
+        sync_flag: bool = False,
+        connection_num: int = 4,
     ):
+        """
+        上传文件/文件夹至FTP服务器, 多个连接并行上传, 大文件断点续传
+        :param sync_flag: 同步模式, 已存在的文件/文件夹不按 exist_type 处理, 只上传有修改的文件
+        :param connection_num: 同时使用的连接数
+        :return: 上传后文件/文件夹路径列表
+        """
         if ftp_pwd:
             if not FtpCore.is_dir(ftp_instance, ftp_pwd):
                 if not FtpCore.create_dir(ftp_instance, ftp_pwd):
@@ -369,56 +402,53 @@ class FTP:
                     )
             FtpCore.change_working_dir(ftp_instance, ftp_pwd)
 
-        dst_list = FtpCore.get_nlst(ftp_instance)
+        dst_list = set(FtpCore.get_nlst(ftp_instance))
+        work_dir = FtpCore.get_working_dir(ftp_instance)
         upload_ftp_list = []
+        upload_items = []
+        given = {}  # 本次已分配的名称 -> upload_items 中的序号, 并行上传时同名输入不能写同一个远程文件
 
         if file_type == FileType.FILE:
-            file_list = get_file_list(file_path)
-            for file in file_list:
+            upload_list = get_file_list(file_path)
+            for file in upload_list:
                 if not file_is_exist(file):
                     raise BaseException(FILE_EXIST_FORMAT.format(file), "待上传文件不存在或格式错误")
-
-                file_name = os.path.basename(file)
-
-                if file_name in dst_list:
-                    if exist_type == FileExistenceType.CANCEL:
-                        return FtpCore.get_path(ftp_instance, file_name)
-                    elif exist_type == FileExistenceType.OVERWRITE:
-                        FtpCore.ftp_delete_file(ftp_instance, file_name)
-                    elif exist_type == FileExistenceType.RENAME:
-                        file_name = FtpCore.generate_name(ftp_instance, file_name)
-                    else:
-                        raise NotImplementedError()
-                try:
-                    dst_path = FtpCore.ftp_upload_file(ftp_instance, file, file_name)
-                except Exception as e:
-                    raise BaseException(FTP_UPLOAD_FORMAT.format(file), "文件上传失败，请检查FTP连接")
-                upload_ftp_list.append(dst_path)
-
         elif file_type == FileType.FOLDER:
-            folder_list = get_file_list(folder_path)
-            for folder in folder_list:
+            upload_list = get_file_list(folder_path)
+            for folder in upload_list:
                 if not folder_is_exist(folder):
                     raise BaseException(FOLDER_EXIST_FORMAT.format(folder), "待上传文件夹不存在")
-
-                folder_name = os.path.basename(folder)
-                if folder_name in dst_list:
-                    if exist_type == FileExistenceType.CANCEL:
-                        return FtpCore.get_path(ftp_instance, folder_name)
-                    elif exist_type == FileExistenceType.OVERWRITE:
-                        FtpCore.ftp_delete_dir(ftp_instance, folder_name)
-                    elif exist_type == FileExistenceType.RENAME:
-                        folder_name = FtpCore.generate_name(ftp_instance, folder_name)
-                    else:
-                        raise NotImplementedError()
-                try:
-                    dst_path = FtpCore.ftp_upload_dir(ftp_instance, folder, folder_name)
-                except Exception as e:
-                    raise BaseException(FTP_UPLOAD_FORMAT.format(folder), "文件上传失败，请检查FTP连接")
-                upload_ftp_list.append(dst_path)
         else:
             raise NotImplementedError()
 
+        for path in upload_list:
+            name = os.path.basename(path)
+            if name in given and (sync_flag or exist_type == FileExistenceType.OVERWRITE):
+                # 覆盖时同名输入只保留最后一个
+                upload_items[given[name]] = (path, posixpath.join(work_dir, name))
+                continue
+            if name in dst_list and not sync_flag:
+                if exist_type == FileExistenceType.CANCEL:
+                    upload_ftp_list.append(FtpCore.get_path(ftp_instance, name))
+                    continue
+                elif exist_type == FileExistenceType.OVERWRITE:
+                    if file_type == FileType.FILE:
+                        FtpCore.ftp_delete_file(ftp_instance, name)
+                    else:
+                        FtpCore.ftp_delete_dir(ftp_instance, name)
+                elif exist_type == FileExistenceType.RENAME:
+                    name = FtpCore.generate_name(ftp_instance, name, dst_list)
+                else:
+                    raise NotImplementedError()
+            dst_list.add(name)
+            given[name] = len(upload_items)
+            upload_items.append((path, posixpath.join(work_dir, name)))
+            upload_ftp_list.append(FtpCore.get_path(ftp_instance, name))
+
+        transfer = FtpTransfer(
+            ftp_instance, connection_num=connection_num, sync=sync_flag, progress=progress_reporter("FTP上传")
+        )
+        transfer.upload(upload_items)
         return upload_ftp_list
 
     @staticmethod
@@ -461,6 +491,12 @@ class FTP:
                 formType=AtomicFormTypeMeta(type=AtomicFormType.SELECT.value),
                 required=False,
             ),
+            atomicMg.param(
+                "sync_flag",
+                formType=AtomicFormTypeMeta(type=AtomicFormType.CHECKBOX.value),
+                required=False,
+            ),
+            atomicMg.param("connection_num", level=AtomicLevel.ADVANCED, required=False),
         ],
         outputList=[
             atomicMg.param("download_ftp_path", types="List"),
@@ -474,6 +510,8 @@ class FTP:
         dst_path: str = "",
         state_type: StateType = StateType.CREATE,
         exist_type: FileExistenceType = FileExistenceType.RENAME,
+        sync_flag: bool = False,
+        connection_num: int = 4,
     ):
         """
         从指定FTP服务器上下载文件/文件夹
@@ -484,6 +522,8 @@ class FTP:
         :param dst_path:    本地目录
         :param state_type:  目录不存在时   创建/提示并报错
         :param exist_type:   文件/文件夹存在时   覆盖/重命名/跳过
+        :param sync_flag:   同步模式, 已存在的文件/文件夹不按 exist_type 处理, 只下载有修改的文件
+        :param connection_num:   同时使用的连接数
         :return: 下载后文件/文件夹路径列表
         """
         if not folder_is_exist(dst_path):
@@ -498,74 +538,50 @@ class FTP:
         local_exist_list = get_exist_files(dst_path)
         work_dir = FtpCore.get_working_dir(ftp_instance)
         download_ftp_path = []
+        download_items = []
 
         if file_type == FileType.FILE:
-            download_file_list = get_file_list(download_file_name)
-            for file in download_file_list:
-                file_name = file
+            download_list = get_file_list(download_file_name)
+            for file in download_list:
                 if file not in ftp_list:
                     raise BaseException(
                         FILE_EXIST_FORMAT.format(file),
                         "当前目录中不存在指定下载文件：{}，请检查下载名称".format(file),
                     )
-                if file in local_exist_list:
-                    if exist_type == FileExistenceType.CANCEL:
-                        download_ftp_path.append(os.path.join(dst_path, file))
-                        continue
-                    elif exist_type == FileExistenceType.OVERWRITE:
-                        os.remove(os.path.join(dst_path, file))
-                    elif exist_type == FileExistenceType.RENAME:
-                        file_name = generate_local_name(local_exist_list, file)
-                    else:
-                        raise NotImplementedError()
-                try:
-                    download_file = FtpCore.ftp_download_file(
-                        ftp_instance,
-                        os.path.join(work_dir, file),
-                        os.path.join(dst_path, file_name),
-                    )
-                except Exception as e:
-                    raise BaseException(FTP_DOWNLOAD_FORMAT.format(file), "文件下载失败，请检查FTP连接")
-
-                download_ftp_path.append(download_file)
-
         elif file_type == FileType.FOLDER:
-            download_folder_list = get_file_list(download_folder_name)
-            for folder in download_folder_list:
+            download_list = get_file_list(download_folder_name)
+            for folder in download_list:
                 if folder not in ftp_list:
                     raise BaseException(
                         FOLDER_EXIST_FORMAT.format(folder),
                         "当前目录中不存在指定下载文件夹：{}，请检查下载名称".format(folder),
                     )
-                folder_new = folder
-                if folder in local_exist_list:
-                    if exist_type == FileExistenceType.CANCEL:
-                        download_ftp_path.append(os.path.join(dst_path, folder))
-                        continue
-                    elif exist_type == FileExistenceType.OVERWRITE:
-                        os.rmdir(os.path.join(dst_path, folder))
-                    elif exist_type == FileExistenceType.RENAME:
-                        folder_new = generate_local_name(local_exist_list, folder)
-                    else:
-                        raise NotImplementedError()
-
-                try:
-                    download_folder = FtpCore.ftp_download_dir(
-                        ftp_instance,
-                        os.path.join(work_dir, folder),
-                        os.path.join(dst_path, folder_new),
-                    )
-                except Exception as e:
-                    raise BaseException(
-                        FTP_DOWNLOAD_FORMAT.format(folder),
-                        "文件下载失败，请检查FTP连接",
-                    )
-
-                download_ftp_path.append(download_folder)
-
         else:
             raise NotImplementedError()
 
+        for name in download_list:
+            local_name = name
+            if name in local_exist_list and not sync_flag:
+                if exist_type == FileExistenceType.CANCEL:
+                    download_ftp_path.append(os.path.join(dst_path, name))
+                    continue
+                elif exist_type == FileExistenceType.OVERWRITE:
+                    if file_type == FileType.FILE:
+                        os.remove(os.path.join(dst_path, name))
+                    else:
+                        shutil.rmtree(os.path.join(dst_path, name))
+                elif exist_type == FileExistenceType.RENAME:
+                    local_name = generate_local_name(local_exist_list, name)
+                else:
+                    raise NotImplementedError()
+            download_items.append((posixpath.join(work_dir, name), os.path.join(dst_path, local_name)))
+            download_ftp_path.append(os.path.join(dst_path, local_name))
+
+        transfer = FtpTransfer(
+            ftp_instance, connection_num=connection_num, sync=sync_flag, progress=progress_reporter("FTP下载")
+        )
+        transfer.download(download_items)
+
         return download_ftp_path
 
     @staticmethod
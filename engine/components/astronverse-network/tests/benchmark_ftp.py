@@ -0,0 +1,110 @@
+"""
+FTP传输耗时基准: 旧的单连接逐个传输 vs 多连接并行传输, 以及同步模式再次传输
+
+运行: python tests/benchmark_ftp.py [--count 5000] [--large 3] [--large-size 64] [--latency 0.002]
+FTP服务器为 test_ftp 中的本地服务器, latency 为服务器每条回复前的等待时间(秒), 模拟网络延迟
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from astronverse.network.core_ftp import FtpClient, FtpCore, FtpTransfer
+from test_ftp import LocalFtpServer
+
+
+def make_files(path: str, count: int, large: int, large_size: int):
+    """count 个 1~4KB 的小文件, 每个目录 100 个, large 个 large_size MB 的大文件"""
+    for i in range(count):
+        sub = os.path.join(path, "small", "d{}".format(i // 100))
+        os.makedirs(sub, exist_ok=True)
+        Path(os.path.join(sub, "f{}.txt".format(i))).write_bytes(os.urandom(1024 * (1 + i % 4)))
+    os.makedirs(os.path.join(path, "large"), exist_ok=True)
+    for i in range(large):
+        Path(os.path.join(path, "large", "big{}.bin".format(i))).write_bytes(os.urandom(large_size * 1024 * 1024))
+
+
+def connect(server: LocalFtpServer) -> FtpClient:
+    ftp = FtpCore.create_ftp()
+    ftp.encoding = "utf-8"
+    FtpCore.ftp_connection(ftp, "127.0.0.1", server.port)
+    FtpCore.ftp_login(ftp, "user", "secret")
+    return ftp
+
+
+def bench(name: str, server: LocalFtpServer, func):
+    ftp = connect(server)
+    server.reset()
+    start = time.perf_counter()
+    func(ftp)
+    cost = time.perf_counter() - start
+    ftp.quit()
+    stats = server.stats
+    print(
+        "  {:36s} {:8.2f} s {:10.1f} MB {:6d} STOR {:6d} RETR".format(
+            name, cost, stats["bytes"] / 1024 / 1024, stats["stor"], stats["retr"]
+        )
+    )
+
+
+def run(server: LocalFtpServer, src: str, local: str, part: str):
+    def transfer(ftp, **kwargs):
+        return FtpTransfer(ftp, **kwargs)
+
+    src_part = os.path.join(src, part)
+    bench("upload, legacy", server, lambda ftp: FtpCore.ftp_upload_dir(ftp, src_part, "legacy_" + part))
+    bench("upload, 1 connection", server, lambda ftp: transfer(ftp, connection_num=1).upload([(src_part, "/" + part)]))
+    shutil.rmtree(os.path.join(server.root, part))
+    bench("upload, 4 connections", server, lambda ftp: transfer(ftp).upload([(src_part, "/" + part)]))
+    bench("upload, sync unchanged", server, lambda ftp: transfer(ftp, sync=True).upload([(src_part, "/" + part)]))
+
+    bench(
+        "download, legacy",
+        server,
+        lambda ftp: FtpCore.ftp_download_dir(ftp, "/" + part, os.path.join(local, "legacy_" + part)),
+    )
+    dst = os.path.join(local, part)
+    bench("download, 1 connection", server, lambda ftp: transfer(ftp, connection_num=1).download([("/" + part, dst)]))
+    shutil.rmtree(dst)
+    bench("download, 4 connections", server, lambda ftp: transfer(ftp).download([("/" + part, dst)]))
+    bench("download, sync unchanged", server, lambda ftp: transfer(ftp, sync=True).download([("/" + part, dst)]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--large", type=int, default=3)
+    parser.add_argument("--large-size", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    # 不输出服务器的日志
+    logging.getLogger("pyftpdlib").addHandler(logging.NullHandler())
+    logging.getLogger("pyftpdlib").propagate = False
+    cwd = os.getcwd()
+    temp_dir = tempfile.mkdtemp()
+    src = os.path.join(temp_dir, "src")
+    local = os.path.join(temp_dir, "local")
+    root = os.path.join(temp_dir, "server")
+    os.makedirs(local)
+    os.makedirs(root)
+    make_files(src, args.count, args.large, args.large_size)
+    server = LocalFtpServer(root, latency=args.latency)
+    server.root = root
+    try:
+        print("{} small files, latency {} s".format(args.count, args.latency))
+        run(server, src, local, "small")
+        print("{} x {} MB large files, latency {} s".format(args.large, args.large_size, args.latency))
+        run(server, src, local, "large")
+    finally:
+        server.close()
+        os.chdir(cwd)
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+import ftplib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from astronverse.actionlib.report import IReport, report
+from astronverse.network import FileExistenceType, FileType
+from astronverse.network.core_ftp import FtpClient, FtpCore, FtpJob, FtpTransfer
+from astronverse.network.error import BaseException
+from astronverse.network.ftp import FTP
+from pyftpdlib.authorizers import DummyAuthorizer
+from pyftpdlib.handlers import DTPHandler, FTPHandler
+from pyftpdlib.ioloop import IOLoop
+from pyftpdlib.servers import ThreadedFTPServer
+
+
+class DropDTPHandler(DTPHandler):
+    """统计上传下载文件的字节数, 传输超过 drop_after 字节时断开连接"""
+
+    def handle_read(self):
+        before = self.tot_bytes_received
+        super().handle_read()
+        self.check(self.tot_bytes_received - before)
+
+    handle_read_event = handle_read
+
+    def send(self, data):
+        sent = super().send(data)
+        self.check(sent)
+        return sent
+
+    def check(self, size):
+        if self.file_obj is None:
+            return
+        stats = self.cmd_channel.stats
+        with stats["lock"]:
+            stats["bytes"] += size
+            stats["transferred"] += size
+            if not stats["drops"] or stats["transferred"] < stats["drop_after"]:
+                return
+            stats["drops"] -= 1
+            stats["transferred"] = 0
+        self.cmd_channel.close()
+
+
+class LocalFtpServer:
+    """
+    本地 FTP 服务器, 每个连接一个线程
+    stats: 登录次数、STOR/RETR 次数、数据连接传输的字节数; drops 次传输超过 drop_after 字节后断开连接
+    latency: 每条命令回复前等待的时间(秒), 模拟网络延迟
+    """
+
+    def __init__(self, root: str, latency: float = 0):
+        self.stats = {"lock": threading.Lock(), "logins": 0, "stor": 0, "retr": 0, "bytes": 0}
+        self.stats.update(transferred=0, drops=0, drop_after=0)
+        stats = self.stats
+
+        class Handler(FTPHandler):
+            dtp_handler = DropDTPHandler
+            use_sendfile = False
+            banner = "ready"
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.stats = stats
+
+            def respond(self, resp, logfun=None):
+                if latency:
+                    time.sleep(latency)
+                super().respond(resp)
+
+            def on_login(self, username):
+                with stats["lock"]:
+                    stats["logins"] += 1
+
+            def ftp_STOR(self, file, mode="w"):
+                with stats["lock"]:
+                    stats["stor"] += 1
+                return super().ftp_STOR(file, mode)
+
+            def ftp_RETR(self, file):
+                with stats["lock"]:
+                    stats["retr"] += 1
+                return super().ftp_RETR(file)
+
+        authorizer = DummyAuthorizer()
+        authorizer.add_user("user", "secret", root, perm="elradfmwMT")
+        Handler.authorizer = authorizer
+        self.server = ThreadedFTPServer(("127.0.0.1", 0), Handler, ioloop=IOLoop())
+        self.server.poll_timeout = 0.05
+        self.port = self.server.address[1]
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        # 在服务线程中关闭, 避免其他线程关闭套接字后文件描述符被复用
+        while not self.stopped:
+            self.server.serve_forever(timeout=0.05, blocking=False, handle_exit=False)
+        self.server.close_all()
+
+    def close(self):
+        self.stopped = True
+        self.thread.join()
+
+    def reset(self):
+        with self.stats["lock"]:
+            self.stats.update(logins=0, stor=0, retr=0, bytes=0, transferred=0)
+
+
+def make_tree(path: str, count: int = 12):
+    """生成多层目录的小文件"""
+    for i in range(count):
+        sub = os.path.join(path, "d{}".format(i % 3), "s{}".format(i % 2))
+        os.makedirs(sub, exist_ok=True)
+        Path(os.path.join(sub, "f{}.txt".format(i))).write_bytes(("file {}\n".format(i) * (i + 1)).encode())
+    os.makedirs(os.path.join(path, "empty"), exist_ok=True)
+
+
+def read_tree(path: str) -> dict:
+    files = {}
+    for root, dirs, names in os.walk(path):
+        rel = os.path.relpath(root, path)
+        for name in dirs:
+            files[os.path.join(rel, name)] = None
+        for name in names:
+            files[os.path.join(rel, name)] = Path(os.path.join(root, name)).read_bytes()
+    return files
+
+
+class Collector(IReport):
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message):
+        self.messages.append(message.msg_str)
+
+    warning = error = info
+
+
+class TestFtpTransfer(unittest.TestCase):
+    def setUp(self):
+        # pyftpdlib 处理 CWD 时会切换进程的工作目录
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "server")
+        self.local = os.path.join(self.temp_dir, "local")
+        os.makedirs(self.root)
+        os.makedirs(self.local)
+        self.server = LocalFtpServer(self.root)
+        self.ftp = FTP.ftp_create(host="127.0.0.1", port=self.server.port, name="user", password="secret")
+        self.ftp.encoding = "utf-8"
+        # 服务端回复登录成功后才记录登录次数, 等待处理完成
+        self.ftp.voidcmd("NOOP")
+        self.retry_interval = FtpTransfer.retry_interval
+        FtpTransfer.retry_interval = 0
+        self.collector = Collector()
+        report.set_code(self.collector)
+
+    def tearDown(self):
+        report.set_code(None)
+        FtpTransfer.retry_interval = self.retry_interval
+        self.ftp.close()
+        self.server.close()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.temp_dir)
+
+    def test_upload_download_folder(self):
+        src = os.path.join(self.local, "data")
+        make_tree(src)
+        self.server.reset()
+        res = FTP.ftp_upload(ftp_instance=self.ftp, file_type=FileType.FOLDER, ftp_pwd="backup", folder_path=src)
+        self.assertEqual(res, ["/backup/data"])
+        self.assertEqual(read_tree(os.path.join(self.root, "backup", "data")), read_tree(src))
+        # 并行上传, 传入的连接之外最多新建 3 个连接
+        self.assertLessEqual(self.server.stats["logins"], 3)
+        self.assertEqual(self.server.stats["stor"], 12)
+        self.assertEqual(FtpCore.get_working_dir(self.ftp), "/backup")
+        self.assertEqual(len(self.collector.messages), 12)
+        self.assertTrue(self.collector.messages[-1].startswith("FTP上传(12/12)"))
+
+        dst = os.path.join(self.local, "down")
+        res = FTP.ftp_download(
+            ftp_instance=self.ftp, file_type=FileType.FOLDER, download_folder_name="data", dst_path=dst
+        )
+        self.assertEqual(res, [os.path.join(dst, "data")])
+        self.assertEqual(read_tree(os.path.join(dst, "data")), read_tree(src))
+        # 保留服务器上的修改时间
+        remote = os.path.join(self.root, "backup", "data", "d1", "s1", "f1.txt")
+        local = os.path.join(dst, "data", "d1", "s1", "f1.txt")
+        self.assertEqual(int(os.stat(local).st_mtime), int(os.stat(remote).st_mtime))
+
+        # 已存在时创建副本
+        res = FTP.ftp_download(
+            ftp_instance=self.ftp, file_type=FileType.FOLDER, download_folder_name="data", dst_path=dst
+        )
+        self.assertEqual(res, [os.path.join(dst, "data(1)")])
+        self.assertEqual(read_tree(os.path.join(dst, "data(1)")), read_tree(src))
+
+    def test_upload_download_files(self):
+        paths = []
+        for i in range(3):
+            paths.append(os.path.join(self.local, "文件{}.txt".format(i)))
+            Path(paths[-1]).write_bytes(b"x" * i)
+        res = FTP.ftp_upload(ftp_instance=self.ftp, file_type=FileType.FILE, file_path=",".join(paths))
+        self.assertEqual(res, ["/文件0.txt", "/文件1.txt", "/文件2.txt"])
+        self.assertEqual(sorted(os.listdir(self.root)), ["文件0.txt", "文件1.txt", "文件2.txt"])
+
+        # 已存在时跳过的文件也在结果中
+        res = FTP.ftp_upload(
+            ftp_instance=self.ftp, file_type=FileType.FILE, file_path=paths[2], exist_type=FileExistenceType.CANCEL
+        )
+        self.assertEqual(res, ["/文件2.txt"])
+
+        dst = os.path.join(self.local, "down")
+        res = FTP.ftp_download(ftp_instance=self.ftp, download_file_name="文件1.txt,文件2.txt", dst_path=dst)
+        self.assertEqual(res, [os.path.join(dst, "文件1.txt"), os.path.join(dst, "文件2.txt")])
+        self.assertEqual(Path(res[1]).read_bytes(), b"xx")
+
+    def test_upload_same_name(self):
+        paths = []
+        for i in range(2):
+            os.makedirs(os.path.join(self.local, str(i)))
+            paths.append(os.path.join(self.local, str(i), "x.txt"))
+            Path(paths[-1]).write_bytes(str(i).encode())
+        # 同名输入分别上传为副本, 不会并行写同一个远程文件
+        res = FTP.ftp_upload(ftp_instance=self.ftp, file_type=FileType.FILE, file_path=",".join(paths))
+        self.assertEqual(res, ["/x.txt", "/x(1).txt"])
+        self.assertEqual(Path(self.root, "x.txt").read_bytes(), b"0")
+        self.assertEqual(Path(self.root, "x(1).txt").read_bytes(), b"1")
+
+        # 覆盖时只上传最后一个
+        self.server.reset()
+        res = FTP.ftp_upload(
+            ftp_instance=self.ftp,
+            file_type=FileType.FILE,
+            file_path=",".join(reversed(paths)),
+            exist_type=FileExistenceType.OVERWRITE,
+        )
+        self.assertEqual(res, ["/x.txt"])
+        self.assertEqual(self.server.stats["stor"], 1)
+        self.assertEqual(Path(self.root, "x.txt").read_bytes(), b"0")
+
+    def test_sync(self):
+        src = os.path.join(self.local, "data")
+        make_tree(src)
+        FTP.ftp_upload(ftp_instance=self.ftp, file_type=FileType.FOLDER, folder_path=src)
+
+        # 没有修改时不再上传
+        self.server.reset()
+        self.collector.messages.clear()
+        res = FTP.ftp_upload(ftp_instance=self.ftp, file_type=FileType.FOLDER, folder_path=src, sync_flag=True)
+        self.assertEqual(res, ["/data"])
+        self.assertEqual(self.server.stats["stor"], 0)
+        self.assertEqual(self.server.stats["logins"], 0)
+        self.assertTrue(all("已跳过" in msg for msg in self.collector.messages))
+
+        # 只上传修改过的文件, 已存在的文件夹合并
+        changed = os.path.join(src, "d0", "s0", "f0.txt")
+        Path(changed).write_bytes(b"changed content")
+        Path(os.path.join(src, "new.txt")).write_bytes(b"new")
+        FTP.ftp_upload(ftp_instance=self.ftp, file_type=FileType.FOLDER, folder_path=src, sync_flag=True)
+        self.assertEqual(self.server.stats["stor"], 2)
+        self.assertEqual(read_tree(os.path.join(self.root, "data")), read_tree(src))
+
+        dst = os.path.join(self.local, "down")
+        FTP.ftp_download(ftp_instance=self.ftp, file_type=FileType.FOLDER, download_folder_name="data", dst_path=dst)
+        self.server.reset()
+        FTP.ftp_download(
+            ftp_instance=self.ftp, file_type=FileType.FOLDER, download_folder_name="data", dst_path=dst, sync_flag=True
+        )
+        self.assertEqual(self.server.stats["retr"], 0)
+        # 服务器上修改后重新下载
+        Path(os.path.join(self.root, "data", "new.txt")).write_bytes(b"newer")
+        FTP.ftp_download(
+            ftp_instance=self.ftp, file_type=FileType.FOLDER, download_folder_name="data", dst_path=dst, sync_flag=True
+        )
+        self.assertEqual(self.server.stats["retr"], 1)
+        self.assertEqual(read_tree(os.path.join(dst, "data")), read_tree(src) | {"./new.txt": b"newer"})
+
+    def test_resume_after_drop(self):
+        data = os.urandom(3 * 1024 * 1024 + 123)
+        src = os.path.join(self.local, "big.bin")
+        Path(src).write_bytes(data)
+
+        # 上传 1MB 后连接断开, 重新连接后从断开的位置继续
+        self.server.reset()
+        self.server.stats.update(drops=1, drop_after=1024 * 1024)
+        FTP.ftp_upload(ftp_instance=self.ftp, file_path=src)
+        self.assertEqual(Path(os.path.join(self.root, "big.bin")).read_bytes(), data)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "big.bin.part")))
+        self.assertLess(self.server.stats["bytes"], len(data) + 512 * 1024)
+        self.assertEqual(self.server.stats["stor"], 2)
+
+        dst = os.path.join(self.local, "down")
+        self.server.reset()
+        self.server.stats.update(drops=2, drop_after=1024 * 1024)
+        FTP.ftp_download(ftp_instance=self.ftp, download_file_name="big.bin", dst_path=dst)
+        self.assertEqual(Path(os.path.join(dst, "big.bin")).read_bytes(), data)
+        self.assertLess(self.server.stats["bytes"], len(data) + 512 * 1024)
+        self.assertEqual(self.server.stats["retr"], 3)
+        # 传入的连接断开后也重新连接
+        self.assertEqual(FtpCore.get_working_dir(self.ftp), "/")
+
+    def test_resume_next_run(self):
+        data = os.urandom(2 * 1024 * 1024)
+        Path(os.path.join(self.root, "big.bin")).write_bytes(data)
+        src = os.path.join(self.local, "big.bin")
+        Path(src).write_bytes(data)
+
+        # 上次下载中断留下的 .part 文件, 文件名中记录源文件的大小和修改时间
+        dst = os.path.join(self.local, "down")
+        os.makedirs(dst)
+        part = "big.bin.{}-{}.part".format(len(data), int(os.stat(os.path.join(self.root, "big.bin")).st_mtime))
+        Path(os.path.join(dst, part)).write_bytes(data[: 1536 * 1024])
+        self.server.reset()
+        FTP.ftp_download(ftp_instance=self.ftp, download_file_name="big.bin", dst_path=dst)
+        self.assertEqual(Path(os.path.join(dst, "big.bin")).read_bytes(), data)
+        self.assertEqual(self.server.stats["bytes"], 512 * 1024)
+        self.assertEqual(os.listdir(dst), ["big.bin"])
+
+        # 上次上传中断留下的 .part 文件
+        os.makedirs(os.path.join(self.root, "up"))
+        part = "big.bin.{}-{}.part".format(len(data), int(os.stat(src).st_mtime))
+        Path(os.path.join(self.root, "up", part)).write_bytes(data[: 1024 * 1024])
+        self.server.reset()
+        FTP.ftp_upload(ftp_instance=self.ftp, ftp_pwd="up", file_path=src)
+        self.assertEqual(Path(os.path.join(self.root, "up", "big.bin")).read_bytes(), data)
+        self.assertEqual(self.server.stats["bytes"], 1024 * 1024)
+        self.assertEqual(os.listdir(os.path.join(self.root, "up")), ["big.bin"])
+
+    def test_resume_source_changed(self):
+        data = os.urandom(2 * 1024 * 1024)
+        Path(os.path.join(self.root, "big.bin")).write_bytes(data)
+        src = os.path.join(self.local, "big.bin")
+        Path(src).write_bytes(data)
+        mtime = int(os.stat(src).st_mtime)
+
+        # 源文件修改前留下的 .part 文件(大小相同, 修改时间不同)和旧格式的 .part 文件不续传, 重新完整传输
+        dst = os.path.join(self.local, "down")
+        os.makedirs(dst)
+        Path(os.path.join(dst, "big.bin.{}-{}.part".format(len(data), mtime - 100))).write_bytes(b"x" * 1024 * 1024)
+        Path(os.path.join(dst, "big.bin.part")).write_bytes(b"x" * 1024 * 1024)
+        self.server.reset()
+        FTP.ftp_download(ftp_instance=self.ftp, download_file_name="big.bin", dst_path=dst)
+        self.assertEqual(Path(os.path.join(dst, "big.bin")).read_bytes(), data)
+        self.assertEqual(self.server.stats["bytes"], len(data))
+        self.assertEqual(os.listdir(dst), ["big.bin"])
+
+        os.makedirs(os.path.join(self.root, "up"))
+        Path(os.path.join(self.root, "up", "big.bin.{}-{}.part".format(len(data) - 1, mtime))).write_bytes(b"x")
+        self.server.reset()
+        FTP.ftp_upload(ftp_instance=self.ftp, ftp_pwd="up", file_path=src)
+        self.assertEqual(Path(os.path.join(self.root, "up", "big.bin")).read_bytes(), data)
+        self.assertEqual(self.server.stats["bytes"], len(data))
+        self.assertEqual(os.listdir(os.path.join(self.root, "up")), ["big.bin"])
+
+    def test_reconnect_fail(self):
+        """重新连接失败的连接不再放回池中, 下次获取时新建连接替换"""
+        transfer = FtpTransfer(self.ftp, connection_num=1)
+
+        def fail(conn, job, resumed):
+            raise EOFError("connection lost")
+
+        def reconnect():
+            raise ConnectionRefusedError("connection refused")
+
+        self.ftp.reconnect = reconnect
+        with self.assertRaises(ConnectionRefusedError):
+            transfer._transfer(fail, FtpJob("a.txt", "/a.txt", 1))
+        conn = transfer._acquire()
+        self.assertIsNot(conn, self.ftp)
+        self.assertEqual(conn.pwd(), "/")
+        transfer.close()
+
+    def test_retry_exhausted(self):
+        src = os.path.join(self.local, "data")
+        make_tree(src, 4)
+        self.server.stats.update(drops=100, drop_after=1)
+        with self.assertRaises(BaseException):
+            FTP.ftp_upload(ftp_instance=self.ftp, file_type=FileType.FOLDER, folder_path=src)
+
+    def test_plain_connection(self):
+        # 不记录登录信息的连接只使用这一个连接传输
+        ftp = ftplib.FTP()
+        ftp.connect("127.0.0.1", self.server.port)
+        ftp.login("user", "secret")
+        ftp.voidcmd("NOOP")
+        src = os.path.join(self.local, "data")
+        make_tree(src)
+        self.server.reset()
+        FtpTransfer(ftp, connection_num=4).upload([(src, "/data")])
+        self.assertEqual(self.server.stats["logins"], 0)
+        self.assertEqual(read_tree(os.path.join(self.root, "data")), read_tree(src))
+        self.assertIsInstance(self.ftp, FtpClient)
+        ftp.quit()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,14 +2,10 @@ import base64
 import io
 
 import cv2
-import numpy as np
 import pyautogui
-from astronverse.vision.cv_match import AnchorMatch
+from astronverse.vision.cv_engine import match_engine
 from PIL import Image
 
-desktop_filepath = "desktop.png"
-desktop_filepath_match = "desktop_filepath_match.png"
-
 
 class CvCore:
     def __init__(self):
@@ -25,44 +21,20 @@ class CvCore:
 
     @staticmethod
     def match_imgs(input_data=None, match_similarity=0.95, canny_flag=False):
-        match = AnchorMatch()
-        if input_data is None:
-            raise ValueError("input_data cannot be None")
-        data = input_data.get("elementData")
-
-        # data = input_data
-        target_img = CvCore.base64_to_image(data["img"]["self"])
-        center_coords_aim = f"{data['pos']['self_x']},{data['pos']['self_y']}"
-
-        if data["img"]["parent"]:
-            anchor_img = CvCore.base64_to_image(data["img"]["parent"])
-            center_coords_anchor = f"{data['pos']['parent_x']},{data['pos']['parent_y']}"
-        else:
-            anchor_img = None
-            center_coords_anchor = ""
-
-        match_img = pyautogui.screenshot(region=None)
-        match_img.save(desktop_filepath_match)
-        ratio_w = match_img.width / data["sr"]["screen_w"]
-        ratio_h = match_img.height / data["sr"]["screen_h"]
-        ratio = f"{ratio_w},{ratio_h}"
-        match_img = np.array(match_img)
+        match_box, _ = match_engine.match(input_data, match_similarity=match_similarity, canny_flag=canny_flag)
+        return match_box
 
-        result = match.process_image(
-            match_img,
-            target_img,
-            anchor_img,
-            center_coords_aim=center_coords_aim,
-            center_coords_anchor=center_coords_anchor,
-            canny_flag=canny_flag,
-            ratio=ratio,
-            match_similarity=match_similarity,
+    @staticmethod
+    def match_imgs_batch(input_list=None, match_similarity=0.95, canny_flag=False, workers=4):
+        """一次截图匹配多个图像, 返回 [(box, score), ...]"""
+        return match_engine.match_many(
+            input_list or [], match_similarity=match_similarity, canny_flag=canny_flag, workers=workers
         )
-        if result is None or not isinstance(result, (list, tuple)) or len(result) != 2:
-            raise ValueError("match.process_image did not return a valid (out_img, match_box) tuple")
-        out_img, match_box = result
-        cv2.imwrite(desktop_filepath, out_img)
-        return match_box
+
+    @staticmethod
+    def wait_imgs(input_data=None, exist=True, match_similarity=0.95, wait_time=10):
+        """等待图像出现或消失, 画面没有变化时跳过匹配"""
+        return match_engine.wait(input_data, exist=exist, match_similarity=match_similarity, wait_time=wait_time)
 
     @staticmethod
     def base64_to_image(base64_str):
@@ -365,26 +365,9 @@ class CV:
         :param wait_time: 等待时间
         :return: 图像是否存在的结果
         """
-        start_time = time.time()
-
-        while True:
-            target_rect = CvCore.match_imgs(input_data, match_similarity)
-
-            if exist_type == ExistType.EXIST:
-                if target_rect is not None:
-                    return True
-            elif exist_type == ExistType.NOT_EXIST:
-                if target_rect is None:
-                    return True
-            else:
-                raise NotImplementedError()
-
-            if time.time() - start_time > wait_time:
-                break
-
-            time.sleep(0.5)
-
-        return False
+        if exist_type not in [ExistType.EXIST, ExistType.NOT_EXIST]:
+            raise NotImplementedError()
+        return CvCore.wait_imgs(input_data, exist_type == ExistType.EXIST, match_similarity, wait_time)
 
     # @staticmethod
     # @atomicMg.atomic("CV")
@@ -424,31 +407,43 @@ class CV:
         :param match_similarity: 匹配相似度
         :return: 等待结果
         """
-        start_time = time.time()
+        if wait_type not in [WaitType.APPEAR, WaitType.DISAPPEAR]:
+            raise NotImplementedError()
 
         if wait_type == WaitType.DISAPPEAR:
             target_rect = CvCore.match_imgs(input_data, match_similarity)
             if not target_rect:
                 raise BaseException(TARGET_EXISTS_ERROR, "当前界面元素不存在，无法判断消失状态")
 
-        while True:
-            target_rect = CvCore.match_imgs(input_data, match_similarity)
+        return CvCore.wait_imgs(input_data, wait_type == WaitType.APPEAR, match_similarity, wait_time)
 
-            if wait_type == WaitType.APPEAR:
-                if target_rect is not None:
-                    return True
-            elif wait_type == WaitType.DISAPPEAR:
-                if target_rect is None:
-                    return True
-            else:
-                raise NotImplementedError()
-
-            if time.time() - start_time > wait_time:
-                break
-
-            time.sleep(0.5)
+    @staticmethod
+    @atomicMg.atomic(
+        "CV",
+        inputList=[
+            atomicMg.param("input_list", types="List"),
+            atomicMg.param(
+                "match_similarity",
+                formType=AtomicFormTypeMeta(AtomicFormType.SLIDER.value),
+                required=False,
+            ),
+        ],
+        outputList=[atomicMg.param("match_images_result", types="List")],
+    )
+    def match_images(input_list: list, match_similarity: float = 0.95):
+        """
+        批量查找图像, 一次截图匹配所有目标
+        :param input_list: 目标图像列表
+        :param match_similarity: 匹配相似度
+        :return: 与输入顺序一致的匹配结果 [{"exist": 是否存在, "box": [x, y, w, h], "score": 相似度}]
+        """
+        if not input_list:
+            raise BaseException(IMAGE_LIST_EMPTY_ERROR, "图像列表为空")
 
-        return False
+        res = []
+        for box, score in CvCore.match_imgs_batch(input_list, match_similarity):
+            res.append({"exist": box is not None, "box": list(box) if box else None, "score": round(score, 4)})
+        return res
 
     @staticmethod
     @atomicMg.atomic(
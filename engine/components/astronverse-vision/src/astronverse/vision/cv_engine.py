@@ -0,0 +1,394 @@
+import base64
+import hashlib
+import io
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from astronverse.actionlib.logger import logger
+from PIL import Image
+
+desktop_filepath = "desktop.png"
+desktop_filepath_match = "desktop_filepath_match.png"
+
+
+class Template:
+    """解码、缩放、灰度化后的模板图片"""
+
+    def __init__(self, gray: np.ndarray, key: str):
+        self.gray = gray
+        self.key = key
+        self.h, self.w = gray.shape[:2]
+        self.__half__ = None
+
+    @property
+    def half(self) -> np.ndarray:
+        """金字塔上一层(缩小一半)"""
+        if self.__half__ is None:
+            self.__half__ = cv2.resize(self.gray, (self.w // 2, self.h // 2), interpolation=cv2.INTER_AREA)
+        return self.__half__
+
+
+class TemplateCache:
+    """按图片hash缓存解码后的模板, LRU淘汰"""
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def digest(b64: str) -> str:
+        return hashlib.sha1(b64.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def decode(b64: str) -> np.ndarray:
+        image = Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGB")
+        return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+
+    def get(self, b64: str, rw: float = 1.0, rh: float = 1.0, canny: bool = False):
+        if not b64:
+            return None
+        digest = self.digest(b64)
+        key = "{}:{:.4f}:{:.4f}:{}".format(digest, rw, rh, int(canny))
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        gray = self.decode(b64)
+        if rw != 1 or rh != 1:
+            w, h = int(gray.shape[1] * rw), int(gray.shape[0] * rh)
+            gray = cv2.resize(gray, (max(w, 1), max(h, 1)), interpolation=cv2.INTER_CUBIC)
+        if canny:
+            gray = cv2.Canny(gray, 50, 250)
+        template = Template(gray, digest)
+
+        with self.lock:
+            self.cache[key] = template
+            if len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+        return template
+
+
+class Frame:
+    """一帧屏幕截图, 只保存在内存中, 灰度图和金字塔按需生成"""
+
+    def __init__(self, rgb: np.ndarray = None, gray: np.ndarray = None):
+        self.rgb = rgb
+        self.gray = gray if gray is not None else cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        self.h, self.w = self.gray.shape[:2]
+        self.__half__ = None
+        self.__canny__ = None
+
+    @classmethod
+    def capture(cls, region=None) -> "Frame":
+        # 延迟导入, 无桌面环境下也可以使用匹配功能
+        import pyautogui
+
+        return cls(rgb=np.array(pyautogui.screenshot(region=region)))
+
+    @property
+    def half(self) -> np.ndarray:
+        if self.__half__ is None:
+            self.__half__ = cv2.resize(self.gray, (self.w // 2, self.h // 2), interpolation=cv2.INTER_AREA)
+        return self.__half__
+
+    @property
+    def canny(self) -> np.ndarray:
+        if self.__canny__ is None:
+            self.__canny__ = cv2.Canny(self.gray, 50, 250)
+        return self.__canny__
+
+
+class ChangeDetector:
+    """
+    帧差检测: 和上次匹配时的画面比较, 判断是否需要重新匹配
+
+    指定区域时只比较该区域, 否则比较缩小后的整帧; 与上次匹配时的画面比较而不是上一帧, 缓慢的渐变也能累计出来
+    """
+
+    scale = 4  # 整帧比较时的缩小倍数
+    diff_threshold = 12  # 灰度差超过该值视为变化
+
+    def __init__(self):
+        self.base = None
+        self.region = None
+
+    def thumb(self, frame: Frame, region=None) -> np.ndarray:
+        if region is not None:
+            x, y, w, h = region
+            return frame.gray[y : y + h, x : x + w]
+        size = (max(1, frame.w // self.scale), max(1, frame.h // self.scale))
+        return cv2.resize(frame.gray, size, interpolation=cv2.INTER_AREA)
+
+    def changed(self, frame: Frame) -> bool:
+        if self.base is None:
+            return True
+        cur = self.thumb(frame, self.region)
+        if cur.shape != self.base.shape:
+            return True
+        return int(cv2.absdiff(cur, self.base).max()) > self.diff_threshold
+
+    def reset(self, frame: Frame, region=None):
+        """记录本次匹配时的画面"""
+        self.region = region
+        self.base = self.thumb(frame, region).copy()
+
+
+def best_match(image: np.ndarray, template: np.ndarray, method=cv2.TM_CCOEFF_NORMED):
+    """返回 (最高分, 位置), 图片比模板小时返回 (-1, None)"""
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return -1.0, None
+    res = cv2.matchTemplate(image, template, method)
+    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return float(max_val), max_loc
+
+
+class MatchEngine:
+    """
+    模板匹配引擎
+
+    1. 模板的解码、缩放、灰度结果按图片hash缓存
+    2. 截图只保存在内存中, 开启debug时才写文件
+    3. 优先在上次匹配到的位置附近(ROI)查找, 找不到再全屏查找; TM_CCORR_NORMED 几乎处处得分都高, 不走ROI和金字塔
+    4. 全屏查找使用图像金字塔: 先在缩小一半的图上找候选位置, 再回到原图的候选位置附近精确匹配, 取得分最高的候选;
+       缩小后的图对不齐像素, 相似的元素可能排在目标前面, 粗匹配没有明确结果时退回原图全图匹配
+    """
+
+    roi_margin = 0.5  # ROI在目标宽高基础上向外扩展的比例
+    pyramid_min_size = 24  # 模板短边不小于该值才使用金字塔
+    pyramid_candidates = 3  # 粗匹配保留的候选数量
+    pyramid_slack = 0.15  # 粗匹配的阈值放宽
+    pyramid_margin = 0.04  # 候选得分接近、精确匹配低于粗匹配或接近阈值时, 粗匹配结果不可信
+    anchor_expand = 1 / 5  # 锚点定位后目标查找范围的扩展比例
+    wait_min_interval = 0.1  # 等待时画面变化后的轮询间隔
+    wait_max_interval = 1.0  # 画面静止时轮询间隔逐渐增加到该值
+
+    def __init__(self):
+        self.templates = TemplateCache()
+        self.lock = threading.Lock()
+        self.last_loc = OrderedDict()
+        self.debug = os.environ.get("ASTRON_VISION_DEBUG", "") not in ["", "0"]
+        self.counter = {"match": 0, "roi": 0, "pyramid": 0, "full": 0, "skipped": 0, "cost": 0.0}
+
+    def stats(self) -> dict:
+        res = dict(self.counter)
+        res["ms_per_match"] = round(res["cost"] * 1000 / res["match"], 3) if res["match"] else 0
+        return res
+
+    def __count__(self, name: str, value=1):
+        with self.lock:
+            self.counter[name] += value
+
+    def __remember__(self, key: str, loc):
+        with self.lock:
+            self.last_loc[key] = loc
+            self.last_loc.move_to_end(key)
+            if len(self.last_loc) > 256:
+                self.last_loc.popitem(last=False)
+
+    def __forget__(self, key: str):
+        with self.lock:
+            self.last_loc.pop(key, None)
+
+    def __refine__(self, gray: np.ndarray, template: np.ndarray, x: int, y: int, pad: int, method):
+        """在原图 (x, y) 附近精确匹配"""
+        h, w = template.shape[:2]
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(gray.shape[1], x + w + pad), min(gray.shape[0], y + h + pad)
+        score, loc = best_match(gray[y0:y1, x0:x1], template, method)
+        if loc is None:
+            return -1.0, None
+        return score, (x0 + loc[0], y0 + loc[1])
+
+    def search(self, frame: Frame, template: Template, threshold: float, canny=False, method=cv2.TM_CCOEFF_NORMED):
+        """
+        在整帧中查找模板, 返回 (box, score), 未找到时box为None
+        """
+        gray = frame.canny if canny else frame.gray
+        h, w = template.h, template.w
+
+        # 1. 上次位置附近, 只有 TM_CCOEFF_NORMED 的得分足以区分附近的错误位置
+        loc = self.last_loc.get(template.key) if method == cv2.TM_CCOEFF_NORMED else None
+        if loc is not None:
+            pad = int(max(w, h) * self.roi_margin) + 2
+            score, pos = self.__refine__(gray, template.gray, loc[0], loc[1], pad, method)
+            if pos is not None and score >= threshold:
+                self.__count__("roi")
+                self.__remember__(template.key, pos)
+                return (pos[0], pos[1], w, h), score
+
+        # 2. 金字塔粗匹配 + 原图精确匹配
+        pos = None
+        if not canny and method == cv2.TM_CCOEFF_NORMED and min(w, h) >= self.pyramid_min_size:
+            self.__count__("pyramid")
+            res = cv2.matchTemplate(frame.half, template.half, method)
+            best, peaks = (-1.0, None), []
+            for _ in range(self.pyramid_candidates):
+                _, val, _, (cx, cy) = cv2.minMaxLoc(res)
+                peaks.append(val)
+                if val < threshold - self.pyramid_slack:
+                    break
+                score, pos = self.__refine__(gray, template.gray, cx * 2, cy * 2, 4, method)
+                if pos is not None and score > best[0]:
+                    best = (score, pos)
+                # 抑制该候选附近, 继续找下一个
+                res[max(0, cy - h // 4) : cy + h // 4 + 1, max(0, cx - w // 4) : cx + w // 4 + 1] = -1
+            score, pos = best
+            margin = self.pyramid_margin
+            if (
+                pos is None
+                or (len(peaks) > 1 and peaks[1] >= peaks[0] - margin)
+                or score < peaks[0] - margin
+                or score < threshold + margin
+            ):
+                pos = None
+        if pos is None:
+            # 3. 小模板、TM_CCORR_NORMED 或粗匹配没有明确结果时直接全图匹配
+            self.__count__("full")
+            score, pos = best_match(gray, template.gray, method)
+
+        if pos is not None and score >= threshold:
+            self.__remember__(template.key, pos)
+            return (pos[0], pos[1], w, h), score
+        self.__forget__(template.key)
+        return None, score
+
+    @staticmethod
+    def element_data(input_data) -> dict:
+        if input_data is None:
+            raise ValueError("input_data cannot be None")
+        data = input_data.get("elementData")
+        if isinstance(data, str):
+            data = json.loads(data)
+        return data
+
+    def match(self, input_data, match_similarity=0.95, canny_flag=False, frame: Frame = None):
+        """
+        按拾取数据匹配目标, 返回 (box, score), 未找到时box为None
+
+        有锚点时先全屏查找锚点, 再在锚点相对位置附近查找目标
+        """
+        start = time.perf_counter()
+        data = self.element_data(input_data)
+        if frame is None:
+            frame = Frame.capture()
+        rw = frame.w / data["sr"]["screen_w"]
+        rh = frame.h / data["sr"]["screen_h"]
+
+        target_threshold = 0.40 if canny_flag else match_similarity
+        target = self.templates.get(data["img"]["self"], rw, rh, canny_flag)
+        if target is None:
+            raise ValueError("请选择目标元素")
+
+        box, score = None, -1.0
+        anchor = self.templates.get(data["img"].get("parent"), rw, rh, canny_flag)
+        if anchor is not None:
+            # 要求锚点在屏幕显示且唯一
+            anchor_threshold = 0.6 if canny_flag else 0.9
+            anchor_box, _ = self.search(frame, anchor, anchor_threshold, canny_flag, cv2.TM_CCORR_NORMED)
+            if anchor_box is not None:
+                dis_x = (int(float(data["pos"]["self_x"])) - int(float(data["pos"]["parent_x"]))) * rw
+                dis_y = (int(float(data["pos"]["self_y"])) - int(float(data["pos"]["parent_y"]))) * rh
+                x0 = max(0, math.ceil(anchor_box[0] + dis_x - target.w * self.anchor_expand))
+                y0 = max(0, math.ceil(anchor_box[1] + dis_y - target.h * self.anchor_expand))
+                x1 = math.ceil(anchor_box[0] + dis_x + target.w * (1 + self.anchor_expand))
+                y1 = math.ceil(anchor_box[1] + dis_y + target.h * (1 + self.anchor_expand))
+                gray = frame.canny if canny_flag else frame.gray
+                score, loc = best_match(gray[y0:y1, x0:x1], target.gray)
+                if loc is not None and score >= target_threshold:
+                    box = (x0 + loc[0], y0 + loc[1], target.w, target.h)
+                else:
+                    # 锚点位置不可信, 下次重新全屏查找
+                    self.__forget__(anchor.key)
+        else:
+            box, score = self.search(frame, target, target_threshold, canny_flag)
+
+        self.__count__("match")
+        self.__count__("cost", time.perf_counter() - start)
+        if self.debug:
+            self.dump(frame, box)
+        return box, score
+
+    def match_many(self, input_list: list, match_similarity=0.95, canny_flag=False, frame: Frame = None, workers=4):
+        """
+        一次截图匹配多个目标, 按输入顺序返回 [(box, score), ...]
+
+        截图和灰度转换只做一次; workers > 1 时多个模板在线程池中并行匹配(OpenCV匹配时会释放GIL)
+        """
+        if frame is None:
+            frame = Frame.capture()
+        # 预先生成, 避免多个线程重复计算
+        _ = frame.canny if canny_flag else frame.half
+
+        def func(input_data):
+            return self.match(input_data, match_similarity, canny_flag, frame)
+
+        if workers <= 1 or len(input_list) <= 1:
+            return [func(input_data) for input_data in input_list]
+        with ThreadPoolExecutor(max_workers=min(workers, len(input_list))) as pool:
+            return list(pool.map(func, input_list))
+
+    def around(self, box, frame: Frame):
+        """目标附近区域, 用于帧差检测"""
+        if box is None:
+            return None
+        x, y, w, h = box
+        pad = int(max(w, h) * self.roi_margin) + 2
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        return x0, y0, min(frame.w, x + w + pad) - x0, min(frame.h, y + h + pad) - y0
+
+    def wait(self, input_data, exist=True, match_similarity=0.95, wait_time=10, canny_flag=False, capture=None) -> bool:
+        """
+        等待目标出现(exist=True)或消失, 超时返回False
+
+        画面和上次匹配时相比没有变化时跳过匹配, 目标已找到时只检测目标附近区域;
+        画面静止时轮询间隔逐渐变长, 有变化后恢复
+        """
+        capture = capture or Frame.capture
+        detector = ChangeDetector()
+        interval = self.wait_min_interval
+        start = time.time()
+        matched, skipped = 0, 0
+        while True:
+            frame = capture()
+            if detector.changed(frame):
+                box, _ = self.match(input_data, match_similarity, canny_flag, frame)
+                matched += 1
+                if (box is not None) == exist:
+                    res = True
+                    break
+                detector.reset(frame, self.around(box, frame))
+                interval = self.wait_min_interval
+            else:
+                skipped += 1
+                interval = min(interval * 2, self.wait_max_interval)
+
+            remain = wait_time - (time.time() - start)
+            if remain <= 0:
+                res = False
+                break
+            time.sleep(min(interval, remain))
+
+        self.__count__("skipped", skipped)
+        logger.info("图像等待结束: result={} matched={} skipped={}".format(res, matched, skipped))
+        return res
+
+    @staticmethod
+    def dump(frame: Frame, box):
+        """debug: 保存截图和匹配结果"""
+        image = cv2.cvtColor(frame.rgb, cv2.COLOR_RGB2BGR) if frame.rgb is not None else frame.gray.copy()
+        cv2.imwrite(desktop_filepath_match, image)
+        if box is not None:
+            cv2.rectangle(image, (box[0], box[1]), (box[0] + box[2], box[1] + box[3]), (0, 255, 0), 2)
+        cv2.imwrite(desktop_filepath, image)
+
+
+match_engine = MatchEngine()
@@ -10,3 +10,4 @@ MOUSE_CLICK_ERROR = ErrorCode(BizCode.LocalErr, _("鼠标点击失败"))
 MOUSE_HOVER_ERROR = ErrorCode(BizCode.LocalErr, _("鼠标悬停失败"))
 CV_INPUT_ERROR = ErrorCode(BizCode.LocalErr, _("输入文本失败"))
 TARGET_EXISTS_ERROR = ErrorCode(BizCode.LocalErr, _("当前界面目标元素不存在"))
+IMAGE_LIST_EMPTY_ERROR = ErrorCode(BizCode.LocalErr, _("图像列表为空，请传入拾取的图像元素列表"))
@@ -0,0 +1,97 @@
+"""
+图像匹配耗时基准: 旧的 AnchorMatch 流程 vs MatchEngine
+
+运行: python tests/benchmark_cv_engine.py [次数] [录制的截图目录]
+截图目录下放 fixtures.json: [{"screen": "a.png", "box": [x, y, w, h]}, ...], box 为目标在截图中的位置;
+不传目录时使用生成的模拟桌面
+"""
+
+import base64
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from astronverse.vision.cv_engine import Frame, MatchEngine
+from astronverse.vision.cv_match import AnchorMatch
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(__file__))
+from test_cv_engine import fake_desktop, pick  # noqa: E402
+
+
+def load_fixtures(path: str = None) -> list:
+    if not path:
+        rgb = fake_desktop(w=1920, h=1080)
+        return [(rgb, (700, 400, 120, 40)), (rgb, (1500, 800, 48, 48)), (rgb, (100, 900, 200, 30))]
+    with open(os.path.join(path, "fixtures.json"), encoding="utf-8") as f:
+        items = json.load(f)
+    res = []
+    for item in items:
+        bgr = cv2.imread(os.path.join(path, item["screen"]))
+        res.append((cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB), tuple(item["box"])))
+    return res
+
+
+def legacy(rgb, input_data, tmp_dir):
+    """旧流程: 每次解码模板, 截图落盘, 全屏匹配, 结果落盘"""
+    data = input_data["elementData"]
+    target_img = Image.open(io.BytesIO(base64.b64decode(data["img"]["self"])))
+    Image.fromarray(rgb).save(os.path.join(tmp_dir, "desktop_filepath_match.png"))
+    out_img, box = AnchorMatch().process_image(
+        rgb, target_img, None, center_coords_aim="", center_coords_anchor="", ratio="1,1", match_similarity=0.9
+    )
+    cv2.imwrite(os.path.join(tmp_dir, "desktop.png"), out_img)
+    return box
+
+
+def bench(name, func, number):
+    func()
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    print("{:28s} {:8.2f} ms/match".format(name, (time.perf_counter() - start) * 1000 / number))
+
+
+def main(number: int = 20, path: str = None):
+    fixtures = load_fixtures(path)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for rgb, box in fixtures:
+            input_data = pick(rgb, box)
+            print("screen {}x{} target {}".format(rgb.shape[1], rgb.shape[0], box))
+
+            bench("legacy", lambda: legacy(rgb, input_data, tmp_dir), number)
+
+            def engine_full():
+                # 每次新建引擎, 没有ROI缓存
+                engine = MatchEngine()
+                engine.templates = shared.templates
+                return engine.match(input_data, match_similarity=0.9, frame=Frame(rgb=rgb))
+
+            shared = MatchEngine()
+            bench("engine (pyramid, no roi)", engine_full, number)
+
+            engine = MatchEngine()
+            bench("engine (roi hit)", lambda: engine.match(input_data, 0.9, frame=Frame(rgb=rgb)), number)
+
+            moved = np.roll(rgb, 400, axis=1)
+            engine.match(input_data, 0.9, frame=Frame(rgb=rgb))
+            start = time.perf_counter()
+            engine.match(input_data, 0.9, frame=Frame(rgb=moved))
+            print("{:28s} {:8.2f} ms/match".format("engine (roi miss -> full)", (time.perf_counter() - start) * 1000))
+
+        # 多个目标: 每个目标单独截图转换 vs 一次截图批量匹配
+        rgb = fixtures[0][0]
+        input_list = [pick(rgb, box) for _, box in fixtures]
+        print("batch of {} targets".format(len(input_list)))
+        bench("separate", lambda: [MatchEngine().match(d, 0.9, frame=Frame(rgb=rgb)) for d in input_list], number)
+        bench("batch", lambda: MatchEngine().match_many(input_list, 0.9, frame=Frame(rgb=rgb), workers=1), number)
+        bench("batch (threads)", lambda: MatchEngine().match_many(input_list, 0.9, frame=Frame(rgb=rgb)), number)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20, sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,174 @@
+import base64
+from unittest import TestCase
+
+import cv2
+import numpy as np
+from astronverse.vision.cv_engine import Frame, MatchEngine
+
+
+def fake_desktop(seed=0, w=1280, h=720):
+    """生成带色块和文字的模拟桌面截图(RGB)"""
+    rng = np.random.default_rng(seed)
+    img = np.full((h, w, 3), 235, np.uint8)
+    for _ in range(200):
+        x, y = int(rng.integers(0, w - 40)), int(rng.integers(0, h - 20))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3))
+        cv2.rectangle(img, (x, y), (x + int(rng.integers(10, 200)), y + int(rng.integers(8, 60))), color, -1)
+    for i in range(80):
+        x, y = int(rng.integers(0, w - 200)), int(rng.integers(20, h))
+        cv2.putText(img, "item {} abc".format(i), (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (20, 20, 20), 1)
+    return img
+
+
+def to_b64(rgb):
+    return base64.b64encode(cv2.imencode(".png", cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))[1].tobytes()).decode()
+
+
+def pick(rgb, box, anchor_box=None):
+    x, y, w, h = box
+    data = {
+        "img": {"self": to_b64(rgb[y : y + h, x : x + w]), "parent": ""},
+        "pos": {"self_x": x, "self_y": y, "parent_x": "", "parent_y": ""},
+        "sr": {"screen_w": rgb.shape[1], "screen_h": rgb.shape[0]},
+    }
+    if anchor_box:
+        ax, ay, aw, ah = anchor_box
+        data["img"]["parent"] = to_b64(rgb[ay : ay + ah, ax : ax + aw])
+        data["pos"]["parent_x"], data["pos"]["parent_y"] = ax, ay
+    return {"elementData": data}
+
+
+class TestMatchEngine(TestCase):
+    def setUp(self):
+        self.rgb = fake_desktop()
+        self.frame = Frame(rgb=self.rgb)
+        self.engine = MatchEngine()
+
+    def test_match_pyramid_then_roi(self):
+        input_data = pick(self.rgb, (500, 300, 120, 40))
+        box, score = self.engine.match(input_data, frame=self.frame)
+        self.assertEqual(box, (500, 300, 120, 40))
+        self.assertGreaterEqual(score, 0.95)
+        self.assertEqual(self.engine.counter["pyramid"], 1)
+
+        box, _ = self.engine.match(input_data, frame=Frame(rgb=self.rgb))
+        self.assertEqual(box, (500, 300, 120, 40))
+        self.assertEqual(self.engine.counter["roi"], 1)
+
+    def test_match_small_template(self):
+        cv2.circle(self.rgb, (208, 108), 6, (200, 30, 30), -1)
+        cv2.line(self.rgb, (200, 100), (215, 115), (10, 10, 120), 2)
+        box, _ = self.engine.match(pick(self.rgb, (200, 100, 16, 16)), frame=Frame(rgb=self.rgb))
+        self.assertEqual(box, (200, 100, 16, 16))
+        self.assertEqual(self.engine.counter["full"], 1)
+
+    def test_match_moved(self):
+        input_data = pick(self.rgb, (500, 300, 120, 40))
+        self.engine.match(input_data, frame=self.frame)
+
+        # 目标移动到别处, ROI找不到时退回全屏
+        moved = self.rgb.copy()
+        moved[600:640, 900:1020] = self.rgb[300:340, 500:620]
+        moved[300:340, 500:620] = 235
+        box, _ = self.engine.match(input_data, frame=Frame(rgb=moved))
+        self.assertEqual(box, (900, 600, 120, 40))
+
+    def test_match_similar_rows(self):
+        # 目标上下是几乎相同的行, 目标在缩小后的图上对不齐, 粗匹配得分排在相似行后面
+        x, y, w, h = 501, 301, 120, 40
+        rng = np.random.default_rng(0)
+        for dy in (-90, -45, 45, 90):
+            row = self.rgb[y : y + h, x : x + w].astype(int) + rng.integers(-6, 6, (h, w, 3))
+            self.rgb[y + dy + 1 : y + dy + 1 + h, x + 1 : x + 1 + w] = np.clip(row, 0, 255).astype(np.uint8)
+        box, score = self.engine.match(pick(self.rgb, (x, y, w, h)), frame=Frame(rgb=self.rgb))
+        self.assertEqual(box, (x, y, w, h))
+        self.assertGreaterEqual(score, 0.999)
+        self.assertEqual(self.engine.counter["full"], 1)
+
+    def test_match_not_exist(self):
+        input_data = pick(self.rgb, (500, 300, 120, 40))
+        blank = np.full_like(self.rgb, 235)
+        box, _ = self.engine.match(input_data, frame=Frame(rgb=blank))
+        self.assertIsNone(box)
+
+    def test_match_anchor(self):
+        input_data = pick(self.rgb, (500, 300, 120, 40), anchor_box=(420, 200, 60, 30))
+        box, _ = self.engine.match(input_data, frame=self.frame)
+        self.assertEqual(box, (500, 300, 120, 40))
+        # 锚点使用 TM_CCORR_NORMED, 总是在原图上全图查找
+        self.assertEqual(self.engine.counter["pyramid"], 0)
+        self.assertEqual(self.engine.counter["full"], 1)
+
+    def test_match_anchor_moved(self):
+        input_data = pick(self.rgb, (500, 300, 120, 40), anchor_box=(420, 200, 60, 30))
+        box, _ = self.engine.match(input_data, frame=self.frame)
+        self.assertEqual(box, (500, 300, 120, 40))
+
+        # 锚点和目标一起移动, 旧位置附近的锚点相关性仍然很高, 不能沿用上次的位置
+        moved = self.rgb.copy()
+        moved[500:540, 800:920] = self.rgb[300:340, 500:620]
+        moved[400:430, 720:780] = self.rgb[200:230, 420:480]
+        moved[300:340, 500:620] = 235
+        moved[200:230, 420:480] = 235
+        for _ in range(2):
+            box, _ = self.engine.match(input_data, frame=Frame(rgb=moved))
+            self.assertEqual(box, (800, 500, 120, 40))
+        self.assertEqual(MatchEngine().match(input_data, frame=Frame(rgb=moved))[0], (800, 500, 120, 40))
+
+    def test_match_many(self):
+        boxes = [(500, 300, 120, 40), (100, 100, 60, 30), (900, 500, 80, 40)]
+        input_list = [pick(self.rgb, box) for box in boxes]
+        input_list.append(pick(fake_desktop(seed=1), (500, 300, 120, 40)))
+        for workers in [1, 4]:
+            res = MatchEngine().match_many(input_list, 0.9, frame=Frame(rgb=self.rgb), workers=workers)
+            self.assertEqual([box for box, _ in res], boxes + [None])
+
+    def test_template_cache(self):
+        b64 = pick(self.rgb, (500, 300, 120, 40))["elementData"]["img"]["self"]
+        t1 = self.engine.templates.get(b64)
+        t2 = self.engine.templates.get(b64)
+        self.assertIs(t1, t2)
+        self.assertIsNot(t1, self.engine.templates.get(b64, 0.5, 0.5))
+
+
+class TestMatchEngineWait(TestCase):
+    def setUp(self):
+        self.rgb = fake_desktop()
+        self.input_data = pick(self.rgb, (500, 300, 120, 40))
+        self.engine = MatchEngine()
+        self.engine.wait_min_interval = 0.01
+        self.engine.wait_max_interval = 0.02
+
+    def frames(self, *items):
+        """按顺序返回截图, 用完后一直返回最后一张"""
+        items = list(items)
+
+        def capture():
+            return Frame(rgb=items.pop(0) if len(items) > 1 else items[0])
+
+        return capture
+
+    def test_wait_static_skip(self):
+        blank = np.full_like(self.rgb, 235)
+        res = self.engine.wait(self.input_data, exist=True, wait_time=0.2, capture=self.frames(blank))
+        self.assertFalse(res)
+        self.assertEqual(self.engine.counter["match"], 1)
+        self.assertGreater(self.engine.counter["skipped"], 0)
+
+    def test_wait_appear(self):
+        blank = np.full_like(self.rgb, 235)
+        capture = self.frames(blank, blank, blank, self.rgb)
+        self.assertTrue(self.engine.wait(self.input_data, exist=True, wait_time=2, capture=capture))
+        self.assertEqual(self.engine.counter["match"], 2)
+        self.assertEqual(self.engine.counter["skipped"], 2)
+
+    def test_wait_disappear_roi(self):
+        # 目标附近以外的变化不触发匹配
+        other = self.rgb.copy()
+        other[600:700, 900:1100] = 0
+        gone = other.copy()
+        gone[300:340, 500:620] = 235
+        capture = self.frames(self.rgb, other, other, gone)
+        self.assertTrue(self.engine.wait(self.input_data, exist=False, wait_time=2, capture=capture))
+        self.assertEqual(self.engine.counter["match"], 2)
+        self.assertEqual(self.engine.counter["skipped"], 2)
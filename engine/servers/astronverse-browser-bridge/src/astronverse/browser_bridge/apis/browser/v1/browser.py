@@ -2,7 +2,7 @@ import asyncio
 
 from astronverse.browser_bridge.apis.context import ServiceContext, get_svc
 from astronverse.browser_bridge.apis.response import CustomResponse
-from astronverse.browser_bridge.apis.ws_route import error_to_base_error, wsmg
+from astronverse.browser_bridge.apis.ws_route import error_format, error_to_base_error, wsmg
 from astronverse.browser_bridge.error import *
 from astronverse.websocket_server.ws_service import BaseMsg
 from fastapi import APIRouter, Depends, Request
@@ -10,18 +10,19 @@ from fastapi import APIRouter, Depends, Request
 router = APIRouter()
 
 
-@router.post("/transition")
-async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
-    req_data = await request.json()
-    key = req_data.get("key", "")
-    data = req_data.get("data", {})
-    data_path = req_data.get("data_path", "")
-    time_out_ws = req_data.get("time_out", 10)
+def command_data(command: dict):
+    """命令数据, data 为空时读取 data_path 文件内容"""
+    data = command.get("data", {})
+    data_path = command.get("data_path", "")
     if data_path and not data:
         with open(data_path, encoding="utf-8") as file:
             # 读取文件内容
             data = file.read()
-    browser_type = req_data.get("browser_type", "")
+    return data
+
+
+async def send_to_browser(browser_type: str, key: str, data, time_out_ws) -> dict:
+    """发送给浏览器插件, 等待插件回复"""
     if (not key) or (not data) or (not browser_type):
         raise BaseException(
             PARAMETER_ERROR_FORMAT.format((key, data, browser_type)),
@@ -36,8 +37,8 @@ async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
         channel="browser", key=key, uuid="$root$", send_uuid="${}$".format(browser_type), need_ack=False, data=data
     ).init()
 
-    # 回调事件
-    def callback(watch_msg: BaseMsg = None, e: Exception = None):
+    # 回调事件, 在事件循环中直接执行
+    async def callback(watch_msg: BaseMsg = None, e: Exception = None):
         nonlocal wait, res, res_e
         if watch_msg:
             res = watch_msg.data
@@ -55,11 +56,50 @@ async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
     await wait.wait()
     if res_e:
         raise error_to_base_error(res_e)
+    return res
+
+
+@router.post("/transition")
+async def transition(request: Request, svc: ServiceContext = Depends(get_svc)):
+    req_data = await request.json()
+    res = await send_to_browser(
+        req_data.get("browser_type", ""), req_data.get("key", ""), command_data(req_data), req_data.get("time_out", 10)
+    )
 
     # 正常回复
     return CustomResponse.tojson(res)
 
 
+@router.post("/transition_batch")
+async def transition_batch(request: Request, svc: ServiceContext = Depends(get_svc)):
+    """
+    批量转发: commands 按顺序发送给插件, 全部完成后一次返回每个命令的结果
+    stop_on_error 为 True 时某个命令通信失败后不再执行后续命令
+    """
+    req_data = await request.json()
+    browser_type = req_data.get("browser_type", "")
+    commands = req_data.get("commands", [])
+    stop_on_error = req_data.get("stop_on_error", True)
+    if (not browser_type) or (not commands) or (not isinstance(commands, list)):
+        raise BaseException(
+            PARAMETER_ERROR_FORMAT.format((browser_type, commands)),
+            "error: PARAMETER ERROR FORMAT {}".format((browser_type, commands)),
+        )
+
+    results = []
+    for command in commands:
+        try:
+            res = await send_to_browser(
+                browser_type, command.get("key", ""), command_data(command), command.get("time_out", 10)
+            )
+            results.append(CustomResponse(CODE_OK.code.value, CODE_OK.message, res).__dict__)
+        except Exception as e:
+            results.append(error_format(e))
+            if stop_on_error:
+                break
+    return CustomResponse.tojson(results)
+
+
 @router.get("/health")
 async def health():
     return "ok"
@@ -2,9 +2,11 @@ from astronverse.browser_bridge.apis import ws_route
 from astronverse.browser_bridge.apis.browser.v1 import browser
 from astronverse.browser_bridge.apis.context import get_svc
 from astronverse.browser_bridge.apis.response import http_base_exception, http_exception
+from astronverse.browser_bridge.config import HttpSettings
 from astronverse.browser_bridge.error import BaseException
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 
 def handler(app: FastAPI):
@@ -16,6 +18,8 @@ def handler(app: FastAPI):
     app.add_middleware(
         CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"]
     )
+    # 大的返回值(如表格抓取数据)在客户端声明支持时压缩
+    app.add_middleware(GZipMiddleware, minimum_size=HttpSettings.gzip_minimum_size)
 
     # 绑定websocket路由
     app.include_router(ws_route.router, prefix="/ws", tags=["ws"], dependencies=[Depends(get_svc)])
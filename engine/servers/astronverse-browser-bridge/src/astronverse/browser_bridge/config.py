@@ -17,6 +17,8 @@ class HttpSettings:
     app_host: str = "0.0.0.0"
     app_port: int = 9082
     gateway_port: int = 13159
+    # 返回值超过该大小(字节)且客户端支持时使用gzip压缩, 本机通信1M以下压缩反而更慢
+    gzip_minimum_size: int = 1024 * 1024
 
 
 @Config(type=dict(app_settings=AppSettings, http_settings=HttpSettings))
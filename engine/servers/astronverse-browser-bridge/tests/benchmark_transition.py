@@ -0,0 +1,74 @@
+"""
+桥接服务转发耗时: 每次新建连接 vs 长连接, 多次请求 vs 批量请求, 大数据压缩
+
+运行: python tests/benchmark_transition.py [次数]
+使用 test_transition 中的模拟插件, 只包含 http + websocket 转发本身的耗时
+"""
+
+import os
+import sys
+import time
+
+import requests
+from astronverse.browser_plugin.bridge import BridgeClient
+
+sys.path.insert(0, os.path.dirname(__file__))
+from test_transition import FakeExtension, start_bridge  # noqa: E402
+
+
+def bench(name, func, number):
+    func()
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    print("{:36s} {:8.2f} ms".format(name, (time.perf_counter() - start) * 1000 / number))
+
+
+def main(number: int = 200):
+    port = start_bridge()
+    extension = FakeExtension(port)
+    extension.start()
+    url = "http://127.0.0.1:{}".format(port)
+    client = BridgeClient(url)
+    path = {"xpath": "//div[@id='main']/table/tbody/tr[1]", "cssSelector": "#main > table"}
+    time.sleep(0.5)
+
+    def post(key, data=path):
+        # 旧的调用方式: 每次请求新建连接
+        return requests.post(url + "/browser/transition", json={"browser_type": "chrome", "key": key, "data": data})
+
+    def single(key, data=path):
+        return client.transition({"browser_type": "chrome", "key": key, "data": data})
+
+    print("single command")
+    bench("new connection", lambda: post("checkElement"), number)
+    bench("keep-alive", lambda: single("checkElement"), number)
+
+    print("locate: scrollIntoView + checkElement")
+    bench("2 requests, new connection", lambda: [post("scrollIntoView"), post("checkElement")], number)
+    commands = [{"key": "scrollIntoView", "data": path}, {"key": "checkElement", "data": path}]
+    bench("batch, keep-alive", lambda: client.transition_batch("chrome", commands), number)
+
+    print("similar elements: 20 x getElementAttrs")
+    bench("20 requests, new connection", lambda: [post("getElementAttrs") for _ in range(20)], number // 10)
+    commands = [{"key": "getElementAttrs", "data": path}] * 20
+    bench("batch, keep-alive", lambda: client.transition_batch("chrome", commands), number // 10)
+
+    for rows in [10000, 200000]:
+        data = {"rows": rows}
+        size = len(single("bigTable", data).content)
+        print("tableDataBatch {} rows, {:.1f} KB".format(rows, size / 1024))
+        bench("identity", lambda: single("bigTable", data).json(), number // 20)
+        bench(
+            "gzip",
+            lambda: client.transition(
+                {"browser_type": "chrome", "key": "bigTable", "data": data}, compress=True
+            ).json(),
+            number // 20,
+        )
+
+    extension.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
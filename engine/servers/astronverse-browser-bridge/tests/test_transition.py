@@ -0,0 +1,150 @@
+import base64
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import uvicorn
+import websocket
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.browser_bridge.start import app
+from astronverse.browser_plugin.bridge import BridgeClient
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("browser_bridge")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_bridge() -> int:
+    """后台线程启动桥接服务, 返回端口"""
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return port
+
+
+class FakeExtension(threading.Thread):
+    """
+    模拟浏览器插件: 连接桥接服务的websocket, 收到消息后回复 {"key": key, "data": data}
+    key 为 bigTable 时回复 data["rows"] 行的表格数据
+    """
+
+    def __init__(self, port: int, browser_type: str = "chrome"):
+        super().__init__(daemon=True)
+        token = base64.b64encode("${}$".format(browser_type).encode("utf-8")).decode("utf-8")
+        self.ws = websocket.create_connection("ws://127.0.0.1:{}/ws?token={}".format(port, token))
+        self.received = []
+
+    def reply_data(self, msg: dict):
+        if msg["key"] == "bigTable":
+            rows = msg["data"]["rows"]
+            return {"values": [{"title": "col", "value": ["cell-{}".format(i % 50) for i in range(rows)]}]}
+        return {"key": msg["key"], "data": msg["data"]}
+
+    def run(self):
+        try:
+            while True:
+                msg = json.loads(self.ws.recv())
+                if not msg.get("need_reply"):
+                    continue
+                self.received.append(msg["key"])
+                reply = {
+                    "reply_event_id": msg["event_id"],
+                    "channel": msg["channel"],
+                    "key": msg["key"],
+                    "uuid": msg["send_uuid"],
+                    "send_uuid": msg["uuid"],
+                    "data": {"code": "0000", "msg": "", "data": self.reply_data(msg)},
+                }
+                self.ws.send(json.dumps(reply))
+        except Exception:
+            pass
+
+    def close(self):
+        self.ws.close()
+
+
+class TestTransition(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.port = start_bridge()
+        cls.extension = FakeExtension(cls.port)
+        cls.extension.start()
+        cls.client = BridgeClient("http://127.0.0.1:{}".format(cls.port))
+        # 等待插件连接完成
+        for _ in range(100):
+            if cls.client.transition({"browser_type": "chrome", "key": "ping", "data": {"a": 1}}, 5).json()["data"]:
+                break
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.extension.close()
+
+    def test_transition(self):
+        res = self.client.transition({"browser_type": "chrome", "key": "getUrl", "data": {"a": 1}}, 5).json()
+        self.assertEqual(res["code"], "0000")
+        self.assertEqual(res["data"]["data"], {"key": "getUrl", "data": {"a": 1}})
+
+    def test_batch(self):
+        commands = [{"key": "scrollIntoView", "data": {"i": 1}}, {"key": "checkElement", "data": {"i": 2}}]
+        res = self.client.transition_batch("chrome", commands, 5).json()
+        self.assertEqual(res["code"], "0000")
+        self.assertEqual(
+            [item["data"]["data"] for item in res["data"]],
+            [{"key": "scrollIntoView", "data": {"i": 1}}, {"key": "checkElement", "data": {"i": 2}}],
+        )
+        self.assertEqual(self.extension.received[-2:], ["scrollIntoView", "checkElement"])
+
+    def test_batch_error(self):
+        # 没有连接的浏览器, 通信失败
+        commands = [{"key": "a", "data": {"i": 1}}, {"key": "b", "data": {"i": 2}}]
+        res = self.client.transition_batch("firefox", commands, 5).json()
+        self.assertEqual(res["code"], "0000")
+        self.assertEqual(len(res["data"]), 1)
+        self.assertNotEqual(res["data"][0]["code"], "0000")
+
+        res = self.client.transition_batch("firefox", commands, 5, stop_on_error=False).json()
+        self.assertEqual(len(res["data"]), 2)
+
+        res = self.client.transition_batch("chrome", [], 5).json()
+        self.assertNotEqual(res["code"], "0000")
+
+    def test_compress(self):
+        req = {"browser_type": "chrome", "key": "bigTable", "data": {"rows": 200000}}
+        plain = self.client.transition(req, 5)
+        self.assertIsNone(plain.headers.get("content-encoding"))
+
+        compressed = self.client.transition(req, 5, compress=True)
+        self.assertEqual(compressed.headers.get("content-encoding"), "gzip")
+        self.assertEqual(compressed.json(), plain.json())
+        self.assertLess(int(compressed.headers["content-length"]), int(plain.headers["content-length"]) / 5)
+
+        # 小的返回值不压缩
+        small = self.client.transition({"browser_type": "chrome", "key": "getUrl", "data": {"a": 1}}, 5, True)
+        self.assertIsNone(small.headers.get("content-encoding"))
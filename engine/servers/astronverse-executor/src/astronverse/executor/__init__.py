@@ -71,6 +71,7 @@ class ProcessInfo:
             "process_name": self.process_name,
             "breakpoint": list(self.breakpoint),
             "process_meta": self.process_meta,
+            "import_python": sorted(self.import_python),
         }
 
     @classmethod
@@ -82,6 +83,7 @@ class ProcessInfo:
         instance.process_name = data.get("process_name", "")
         instance.breakpoint = set(data.get("breakpoint", []))
         instance.process_meta = data.get("process_meta", [])
+        instance.import_python = set(data.get("import_python", []))
         return instance
 
 
@@ -163,6 +165,8 @@ class ExecPosition(Enum):
     CRONTAB = "CRONTAB"
     # 执行器运行
     EXECUTOR = "EXECUTOR"
+    # 远程下发
+    DISPATCH = "DISPATCH"
 
 
 class ExecuteStatus(Enum):
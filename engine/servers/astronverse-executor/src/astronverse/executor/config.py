@@ -31,12 +31,35 @@ class Config:
     # 组件生成目录
     gen_component_path: str = "{}/astron_extension/".format(platform_python_venv_run_dir(sys.executable))
 
+    # 增量代码生成缓存[流程未变化时跳过解析和写文件]
+    gen_code_cache: bool = True
+
+    # 工程数据并发获取的线程数
+    storage_max_workers: int = 8
+
+    # 已发布版本(计划任务/执行器/远程下发)的本地快照
+    storage_snapshot: bool = True
+    storage_snapshot_path: str = "{}/astron_snapshot/".format(platform_python_venv_run_dir(sys.executable))
+
+    # 非调试且没有断点时不经过bdb, 直接导入生成代码运行
+    release_fast_path: bool = True
+
+    # 等待ws连接期间并发预导入原子能力模块
+    preload_modules: bool = True
+
     # 主入口脚本文件名
     main_file_name: str = "main.py"
 
     # 日志存储位置
     log_path: str = "./logs/"
 
+    # 运行日志单个文件最大字节数, 超过后滚动
+    report_max_size: int = 10 * 1024 * 1024
+
+    # 运行日志批量写入: 缓冲字节数/间隔秒数
+    report_flush_size: int = 64 * 1024
+    report_flush_interval: float = 0.5
+
     # package cache
     package_cache_dir: str = "./pip_cache/"
 
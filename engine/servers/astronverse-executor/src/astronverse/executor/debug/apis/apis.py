@@ -16,7 +16,8 @@ def close(msg: BaseMsg, svc):
     return {"status": "ok"}
 
 
-@wsmg.event("flow", "add_break")
+# 断点和单步/继续命令有先后依赖, 同一个连接上按接收顺序处理
+@wsmg.event("flow", "add_break", ordered=True)
 async def add_break_list(msg: BaseMsg, svc):
     break_list = msg.data.get("break_list")
 
@@ -28,7 +29,7 @@ async def add_break_list(msg: BaseMsg, svc):
     return {"status": "ok"}
 
 
-@wsmg.event("flow", "clear_break")
+@wsmg.event("flow", "clear_break", ordered=True)
 async def clear_bradk(msg: BaseMsg, svc):
     break_list = msg.data.get("break_list")
 
@@ -40,15 +41,24 @@ async def clear_bradk(msg: BaseMsg, svc):
     return {"status": "ok"}
 
 
-@wsmg.event("flow", "continue")
+@wsmg.event("flow", "continue", ordered=True)
 def debug_continue(msg: BaseMsg, svc):
     if svc:
         svc.debug_handler.cmd_continue()
     return {"status": "ok"}
 
 
-@wsmg.event("flow", "next")
+@wsmg.event("flow", "next", ordered=True)
 def debug_next(msg: BaseMsg, svc):
     if svc:
         svc.debug_handler.cmd_next()
     return {"status": "ok"}
+
+
+@wsmg.event("flow", "variable")
+def debug_variable(msg: BaseMsg, svc):
+    if svc:
+        return svc.debug_handler.get_variable(
+            msg.data.get("name", ""), msg.data.get("offset", 0), msg.data.get("limit", 100)
+        )
+    return {}
@@ -10,6 +10,7 @@ from astronverse.websocket_server.ws_service import WsManager, AsyncOnce
 from websockets import ServerConnection
 
 from astronverse.executor import ExecuteStatus
+from astronverse.executor.debug.report import TipMessage
 from astronverse.executor.error import *
 from astronverse.executor.logger import logger
 
@@ -82,8 +83,8 @@ class Ws:
         return True
 
     @staticmethod
-    async def send_text(conn: Conn, msg: str):
-        await conn.send_text(msg)
+    async def send_text(conn: Conn, msg: str, key: str = None):
+        await conn.send_text(msg, key)
 
     async def send_report(self, q: queue.Queue):
         async def inner_send_report():
@@ -103,13 +104,11 @@ class Ws:
                     continue
 
                 try:
-                    # 如果只是tip链接就有优化的空间
-                    if not self.is_open_web_link:
-                        # 消息太多直接抛弃, 快速抛弃
-                        if q.qsize() > drop_max_size:
-                            for i in range(drop_max_size - drop_min_size):
-                                msg = q.get()
-                                pass
+                    # 只有低优先级的消息(指令开始)可以抛弃和覆盖, 流程状态、错误、结果等消息都按顺序发送
+                    is_low = isinstance(msg, TipMessage)
+                    # 如果只是tip链接就有优化的空间, 消息太多直接抛弃, 快速抛弃
+                    if is_low and not self.is_open_web_link and q.qsize() > drop_max_size:
+                        continue
 
                     # 都需要发送
                     data = json.loads(msg)
@@ -134,15 +133,18 @@ class Ws:
                         ]
                     if is_send_tip and wsmg.conns.get("$executor_tip$"):
                         # tip达到抛弃的下沿就直接抛弃，并计算抛弃数量30个就吐出1个
-                        if q.qsize() > drop_min_size and drop_num < 30:
+                        if is_low and q.qsize() > drop_min_size and drop_num < 30:
                             tasks_2 = []
                             drop_num += 1
                         else:
-                            drop_num = 0
+                            if is_low:
+                                drop_num = 0
                             self.BASE_MSG.send_uuid = "$executor_tip$"
                             self.BASE_MSG.init().data = data
+                            # 右下角只展示最新的指令, 还没发出去的旧指令直接覆盖; 其他消息不覆盖
+                            key = "tip" if is_low else None
                             tasks_2 = [
-                                asyncio.create_task(self.send_text(v2, self.BASE_MSG.tojson()))
+                                asyncio.create_task(self.send_text(v2, self.BASE_MSG.tojson(), key=key))
                                 for v2 in wsmg.conns[self.BASE_MSG.send_uuid]
                             ]
                     tasks = tasks_1 + tasks_2
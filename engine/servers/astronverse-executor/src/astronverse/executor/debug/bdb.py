@@ -1,9 +1,11 @@
 import bdb
 import importlib
 import os
+import reprlib
 import sys
 import glob
 import threading
+import time
 from collections import defaultdict
 from typing import List, Callable
 
@@ -39,6 +41,22 @@ class CustomBdb(bdb.Bdb):
         # 强制中断标志
         self._force_stop = False
 
+        # 耗时统计
+        self.timing = {}
+
+        # 代码对象 -> 该代码对象内的断点行号, 断点变化时清空
+        self._code_breaks = {}
+        self._run_thread_id = None
+
+        # 暂停时的变量, 按需序列化
+        self.current_vars = {}
+        self.var_max_len = 1000
+        self._var_repr = reprlib.Repr()
+        self._var_repr.maxstring = self.var_max_len
+        self._var_repr.maxother = self.var_max_len
+        self._var_repr.maxlist = self._var_repr.maxtuple = self._var_repr.maxdict = 50
+        self._var_repr.maxset = self._var_repr.maxfrozenset = self._var_repr.maxdeque = 50
+
     def _load_all_maps(self):
         """加载project目录下所有.py文件的.map文件"""
         py_files = glob.glob(os.path.join(self.project_dir, "*.py"))
@@ -94,6 +112,63 @@ class CustomBdb(bdb.Bdb):
             return path
         return os.path.join(self.project_dir, path)
 
+    def _code_break_lines(self, code) -> frozenset:
+        """当前代码对象内包含的断点行号"""
+        lines = self._code_breaks.get(code)
+        if lines is None:
+            breaks = self.breaks.get(self.canonic(code.co_filename))
+            if breaks:
+                lines = frozenset(line for _, _, line in code.co_lines() if line in breaks)
+            else:
+                lines = frozenset()
+            self._code_breaks[code] = lines
+        return lines
+
+    def _is_continue(self) -> bool:
+        """是否处于继续运行(非单步)状态"""
+        return self.botframe is not None and self.stoplineno == -1 and not self.quitting
+
+    def trace_dispatch(self, frame, event, arg):
+        """
+        继续运行时的快速路径:
+        1. 只有代码对象内有断点的帧才安装行跟踪
+        2. 非断点行直接跳过, 不经过bdb的完整判断
+        单步时退回bdb的默认逻辑, 行跟踪按需安装
+        """
+        if self._is_continue():
+            if event == "line":
+                if frame.f_lineno not in self._code_break_lines(frame.f_code):
+                    return self.trace_dispatch
+            elif event == "call":
+                if not self._code_break_lines(frame.f_code):
+                    return None
+        return super().trace_dispatch(frame, event, arg)
+
+    def break_anywhere(self, frame):
+        """只在代码对象内有断点时才需要跟踪该帧"""
+        return bool(self._code_break_lines(frame.f_code))
+
+    def set_break(self, filename, lineno, temporary=False, cond=None, funcname=None):
+        res = super().set_break(filename, lineno, temporary=temporary, cond=cond, funcname=funcname)
+        self._code_breaks.clear()
+        self._retrace_frames()
+        return res
+
+    def clear_break(self, filename, lineno):
+        res = super().clear_break(filename, lineno)
+        self._code_breaks.clear()
+        return res
+
+    def _retrace_frames(self):
+        """运行中新增断点时, 为已经在栈上且包含断点的帧补装行跟踪"""
+        if self._run_thread_id is None:
+            return
+        frame = sys._current_frames().get(self._run_thread_id)
+        while frame is not None and frame is not self.botframe:
+            if frame.f_trace is None and self._code_break_lines(frame.f_code):
+                frame.f_trace = self.trace_dispatch
+            frame = frame.f_back
+
     def set_breakpoint(self, filename: str, flow_line: int, cond=None):
         """设置断点 - 支持多文件"""
         abs_path = self._to_abs_path(filename)
@@ -109,13 +184,8 @@ class CustomBdb(bdb.Bdb):
             self.clear_break(abs_path, py_line)
             break
 
-    def cmd_start(self, g_v=None, l_v=None):
-        """启动调试 - 在project目录下运行"""
-
-        # 重置强制中断标志
-        self._force_stop = False
-
-        # 确保project目录在sys.path中
+    def _prepare_sys_path(self):
+        """确保project目录在sys.path中"""
         if self.ext_dir not in sys.path:
             sys.path.insert(0, self.ext_dir)
         if self.project_dir not in sys.path:
@@ -123,6 +193,15 @@ class CustomBdb(bdb.Bdb):
 
         if os.path.dirname(self.project_dir) not in sys.path:
             sys.path.insert(0, os.path.dirname(self.project_dir))
+
+    def cmd_start(self, g_v=None, l_v=None):
+        """启动调试 - 在project目录下运行"""
+
+        # 重置强制中断标志
+        self._force_stop = False
+        self._run_thread_id = threading.get_ident()
+
+        self._prepare_sys_path()
         # 切换到project目录
         original_cwd = os.getcwd()
         os.chdir(self.project_dir)
@@ -151,7 +230,45 @@ class CustomBdb(bdb.Bdb):
             code = compile(source, self.main_file, "exec")
 
             # 运行代码
-            self.err_handler(self.run)(code, g_v_exec, l_v_exec)
+            start_time = time.perf_counter()
+            try:
+                self.err_handler(self.run)(code, g_v_exec, l_v_exec)
+            finally:
+                self.timing["run"] = time.perf_counter() - start_time
+        except Exception as e:
+            self._handle_exception(e)
+        finally:
+            os.chdir(original_cwd)
+
+    def cmd_release_start(self, g_v=None):
+        """非调试启动 - 不安装trace函数, 直接导入生成代码(使用已编译的pyc)运行"""
+
+        # 重置强制中断标志
+        self._force_stop = False
+
+        self._prepare_sys_path()
+        # 切换到project目录
+        original_cwd = os.getcwd()
+        os.chdir(self.project_dir)
+
+        try:
+            package_name = os.path.basename(self.project_dir)
+            args = (g_v or {}).get("_args", {})
+
+            def run():
+                start_time = time.perf_counter()
+                try:
+                    module = importlib.import_module("{}.main".format(package_name))
+                finally:
+                    self.timing["import"] = time.perf_counter() - start_time
+
+                start_time = time.perf_counter()
+                try:
+                    module.main(args)
+                finally:
+                    self.timing["run"] = time.perf_counter() - start_time
+
+            self.err_handler(run)()
         except Exception as e:
             self._handle_exception(e)
         finally:
@@ -161,14 +278,62 @@ class CustomBdb(bdb.Bdb):
         """继续执行"""
         self.set_continue()
         self.paused = False
+        self.current_vars = {}
         self._go_event.set()
 
     def cmd_next(self):
         """单步执行"""
         self.set_next(self.current_frame)
         self.paused = False
+        self.current_vars = {}
         self._go_event.set()
 
+    def _var_str(self, v) -> str:
+        """限长的变量字符串, 容器只展开前面的部分元素"""
+        if isinstance(v, str):
+            v_str = v
+        elif isinstance(v, (list, tuple, set, frozenset, dict)):
+            v_str = self._var_repr.repr(v)
+        else:
+            v_str = str(v)
+        if len(v_str) > self.var_max_len:
+            v_str = v_str[: self.var_max_len] + "..."
+        return v_str
+
+    def _var_info(self, v) -> dict:
+        try:
+            v_str = self._var_str(v)
+            v_type = type(v).__name__.capitalize()
+        except Exception as e:
+            v_str = v
+            v_type = "Any"
+        info = {"value": v_str, "types": v_type}
+        try:
+            info["size"] = len(v)
+        except Exception:
+            pass
+        return info
+
+    def cmd_variable(self, name: str, offset: int = 0, limit: int = 100) -> dict:
+        """分页获取暂停时变量的完整内容"""
+        if name not in self.current_vars:
+            return {"name": name, "total": 0, "items": []}
+        v = self.current_vars[name]
+        offset = max(int(offset), 0)
+        limit = max(int(limit), 1)
+        if isinstance(v, str):
+            return {"name": name, "total": len(v), "items": v[offset : offset + limit]}
+        if isinstance(v, dict):
+            items = list(v.items())[offset : offset + limit]
+            return {"name": name, "total": len(v), "items": [[self._var_str(k), self._var_str(i)] for k, i in items]}
+        if isinstance(v, (list, tuple)):
+            return {"name": name, "total": len(v), "items": [self._var_str(i) for i in v[offset : offset + limit]]}
+        if hasattr(v, "iloc") and hasattr(v, "__len__"):
+            # DataFrame/Series 按行分页
+            return {"name": name, "total": len(v), "items": str(v.iloc[offset : offset + limit])}
+        v_str = str(v)
+        return {"name": name, "total": len(v_str), "items": v_str[offset : offset + limit]}
+
     def cmd_force_stop(self):
         """强制中断执行"""
         self._force_stop = True
@@ -211,18 +376,13 @@ class CustomBdb(bdb.Bdb):
         project_filename = self._to_project_path(filename)
         flow_line = self._to_flow_line(basename, py_line)
 
+        # 变量只生成限长的摘要, 完整内容通过 cmd_variable 分页获取
         merged_vars = {}
         local_vars = frame.f_locals if hasattr(frame, "f_locals") else {}
         gv_obj = frame.f_globals.get("gv", {}) if hasattr(frame, "f_globals") else {}
-        for k, v in {**gv_obj, **local_vars}.items():
-            if not k.startswith("__"):
-                try:
-                    v_str = str(v)
-                    v_type = type(v).__name__.capitalize()
-                except Exception as e:
-                    v_str = v
-                    v_type = "Any"
-                merged_vars[k] = {"value": v_str, "types": v_type}
+        self.current_vars = {k: v for k, v in {**gv_obj, **local_vars}.items() if not k.startswith("__")}
+        for k, v in self.current_vars.items():
+            merged_vars[k] = self._var_info(v)
         self.notify(reason, file=project_filename, line=flow_line, py_line=py_line, merged_vars=merged_vars)
 
         # 阻塞等待用户操作
@@ -105,7 +105,12 @@ class Debug:
             for p in params:
                 args[p.get("varName")] = p.get("varValue")
         shared = {"_args": args}
-        self.bdb.cmd_start(g_v=shared)
+        if self.svc.conf.release_fast_path and not self.svc.debug_model and not self.bdb.get_all_breaks():
+            # 非调试且没有断点, 不需要bdb
+            self.bdb.cmd_release_start(g_v=shared)
+        else:
+            self.bdb.cmd_start(g_v=shared)
+        self.svc.timing.update(self.bdb.timing)
         return shared.get("_args", {})
 
     def cmd_continue(self):
@@ -116,6 +121,10 @@ class Debug:
         """单步执行"""
         return self.bdb.cmd_next()
 
+    def get_variable(self, name: str, offset: int = 0, limit: int = 100) -> dict:
+        """分页获取变量"""
+        return self.bdb.cmd_variable(name, offset, limit)
+
     def set_breakpoint(self, filename, flow_line: int):
         """设置断点 - 支持多文件"""
         if self.svc.debug_model:
@@ -11,7 +11,7 @@ from astronverse.executor.debug.debug import Debug
 from astronverse.executor.debug.package import Package
 from astronverse.executor.debug.recording import RecordingTool
 from astronverse.executor.debug.report import Report
-from astronverse.executor.debug.tools import LogTool
+from astronverse.executor.debug.tools import LogTool, PreloadTool
 from astronverse.executor.error import (
     MSG_TASK_EXECUTION_END,
     MSG_TASK_EXECUTION_ERROR,
@@ -38,10 +38,12 @@ class DebugSvc:
         report.set_code(self.report)
         self.log_tool = LogTool(self)
         self.recording_tool = RecordingTool(self)
+        self.preload_tool = PreloadTool(self)
 
         # 运行时
         self.debug_model = debug_model
         self.debug_handler: Optional[Debug] = None
+        self.timing = {}
 
         # 退出锁
         self.sys_exit_lock = threading.Lock()
@@ -83,6 +85,7 @@ class DebugSvc:
                             result=status,
                             data=data,
                             msg_str=MSG_TASK_EXECUTION_END,
+                            timing=self.timing or None,
                         )
                     )
                 elif status == ExecuteStatus.CANCEL:
@@ -99,7 +102,11 @@ class DebugSvc:
                         reason = MSG_TASK_EXECUTION_ERROR
                     self.report.info(
                         ReportFlow(
-                            log_type=ReportType.Flow, result=status, status=ReportFlowStatus.TASK_ERROR, msg_str=reason
+                            log_type=ReportType.Flow,
+                            result=status,
+                            status=ReportFlowStatus.TASK_ERROR,
+                            msg_str=reason,
+                            timing=self.timing or None,
                         )
                     )
                 else:
@@ -1,9 +1,10 @@
 import json
 import os
+import threading
 import time
 from dataclasses import asdict
 from enum import Enum
-from queue import Queue
+from queue import Full, Queue
 
 from astronverse.actionlib import (
     ReportCode,
@@ -15,6 +16,87 @@ from astronverse.actionlib import (
     ReportUser,
 )
 from astronverse.actionlib.report import IReport
+from astronverse.executor.logger import logger
+
+
+class ReportFileWriter:
+    """
+    运行日志文件的后台写入
+
+    1. 机器人线程只把日志行放进缓冲区, 由后台线程批量写入
+    2. 缓冲超过 flush_size 或距离上次写入超过 flush_interval 时刷新
+    3. 文件超过 max_size 时滚动: 当前文件重命名为 {name}.{n}.txt, 新日志继续写入 {name}.txt
+    4. 以二进制写入utf-8编码后的内容, 不做换行转换, 记录的大小和文件实际大小一致
+    """
+
+    def __init__(self, file_path: str, max_size: int = 0, flush_size: int = 64 * 1024, flush_interval: float = 0.5):
+        self.file_path = file_path
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        self.file = open(self.file_path, "wb")
+        self.file_size = 0
+        self.rotate_num = 0
+
+        self.lock = threading.Lock()
+        self.buffer = []
+        self.buffer_size = 0
+        self.closed = False
+        self.flush_event = threading.Event()
+
+        self.thread = threading.Thread(target=self.__loop__, daemon=True)
+        self.thread.start()
+
+    def write(self, line: str):
+        data = line.encode("utf-8")
+        with self.lock:
+            if self.closed:
+                return
+            self.buffer.append(data)
+            self.buffer_size += len(data)
+            if self.buffer_size >= self.flush_size:
+                self.flush_event.set()
+
+    def __loop__(self):
+        while not self.closed:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("report flush error: {}".format(e))
+
+    def flush(self):
+        with self.lock:
+            if not self.buffer or self.file.closed:
+                return
+            lines, self.buffer, self.buffer_size = self.buffer, [], 0
+            for data in lines:
+                if self.max_size and self.file_size > 0 and self.file_size + len(data) > self.max_size:
+                    self.__rotate__()
+                self.file.write(data)
+                self.file_size += len(data)
+            self.file.flush()
+
+    def __rotate__(self):
+        self.file.close()
+        self.rotate_num += 1
+        name, ext = os.path.splitext(self.file_path)
+        os.replace(self.file_path, "{}.{}{}".format(name, self.rotate_num, ext))
+        self.file = open(self.file_path, "wb")
+        self.file_size = 0
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.closed = True
+            self.file.close()
+        self.flush_event.set()
+
+
+class TipMessage(str):  # noqa: FURB189 ws发送时需要 json.loads
+    """低优先级(指令开始)的ws消息, 队列满时可以丢弃"""
 
 
 class Report(IReport):
@@ -23,11 +105,16 @@ class Report(IReport):
     def __init__(self, svc):
         self.svc = svc
         self.queue = Queue(maxsize=1000)
+        self.drop_num = 0
+        self.drop_lock = threading.Lock()
         local_file_path = os.path.join(self.svc.conf.log_path, "report", self.svc.conf.project_id)
         if not os.path.exists(local_file_path):
             os.makedirs(local_file_path)
-        self.log_local_file = open(
-            os.path.join(str(local_file_path), "{}.txt".format(self.svc.conf.exec_id)), "w", encoding="utf-8"
+        self.log_local_file = ReportFileWriter(
+            os.path.join(str(local_file_path), "{}.txt".format(self.svc.conf.exec_id)),
+            max_size=self.svc.conf.report_max_size,
+            flush_size=self.svc.conf.report_flush_size,
+            flush_interval=self.svc.conf.report_flush_interval,
         )
 
         self.process = {}
@@ -45,6 +132,8 @@ class Report(IReport):
         self.last_line = 0
 
     def close(self):
+        if self.drop_num:
+            logger.warning("report queue full, dropped {} messages".format(self.drop_num))
         self.log_local_file.close()
 
     @staticmethod
@@ -54,23 +143,56 @@ class Report(IReport):
         else:
             return obj.__dict__
 
+    def __put__(self, ms: str, low_priority: bool):
+        """
+        放入ws发送队列
+        队列满时: 低优先级(指令开始)消息直接丢弃; 其他消息挤掉队列中最早的一条低优先级消息,
+        没有低优先级消息时阻塞等待, 流程状态、错误等消息不丢失
+        """
+        if low_priority:
+            try:
+                self.queue.put_nowait(TipMessage(ms))
+            except Full:
+                self.__drop__()
+            return
+
+        try:
+            self.queue.put_nowait(ms)
+            return
+        except Full:
+            pass
+        if self.__evict__():
+            self.__drop__()
+        self.queue.put(ms)
+
+    def __evict__(self) -> bool:
+        """移除队列中最早的一条低优先级消息, 同时减少未完成计数, 保证 queue.join() 不会一直等待"""
+        with self.queue.mutex:
+            for i, item in enumerate(self.queue.queue):
+                if isinstance(item, TipMessage):
+                    del self.queue.queue[i]
+                    self.queue.unfinished_tasks -= 1
+                    if self.queue.unfinished_tasks == 0:
+                        self.queue.all_tasks_done.notify_all()
+                    self.queue.not_full.notify()
+                    return True
+        return False
+
+    def __drop__(self):
+        with self.drop_lock:
+            self.drop_num += 1
+
     def __send__(self, filtered_dict):
+        # 只序列化一次, ws和文件共用
+        ms = json.dumps(filtered_dict, ensure_ascii=False, default=self.__json__)
+        is_tip = filtered_dict["log_type"] == ReportType.Tip or filtered_dict.get("tag", None) == "tip"
+
         if self.queue and self.svc.conf.open_log_ws:
-            ms = json.dumps(filtered_dict, ensure_ascii=False, default=self.__json__)
-            self.queue.put(ms, block=True, timeout=None)
+            self.__put__(ms, low_priority=filtered_dict.get("tag", None) == "tip")
 
-        if (
-            self.log_local_file
-            and (not self.log_local_file.closed)
-            and filtered_dict["log_type"] != ReportType.Tip
-            and filtered_dict.get("tag", None) != "tip"
-        ):
+        if self.log_local_file and (not self.log_local_file.closed) and not is_tip:
             # Tip数据不写入到日志里面, tag等于Tag也不写入到日志
-            message = json.dumps(
-                {"event_time": int(time.time()), "data": filtered_dict}, ensure_ascii=False, default=self.__json__
-            )
-            self.log_local_file.write(f"{message}\n")
-            self.log_local_file.flush()
+            self.log_local_file.write('{{"event_time": {}, "data": {}}}\n'.format(int(time.time()), ms))
 
     def __pre__(self, message):
         if (
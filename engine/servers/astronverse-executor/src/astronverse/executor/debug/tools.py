@@ -1,6 +1,10 @@
+import importlib
 import sys
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from astronverse.tools.tools import RpaTools
+from astronverse.executor.logger import logger
 from astronverse.executor.utils.utils import exec_run
 
 
@@ -31,3 +35,40 @@ class LogTool:
     def start(self):
         self.thread = threading.Thread(target=self.__tool__, daemon=True)
         self.thread.start()
+
+
+class PreloadTool:
+    """预导入生成代码用到的原子能力模块, 与ws连接等待并行, 缩短执行前的冷启动时间"""
+
+    def __init__(self, svc, max_workers: int = 4):
+        self.svc = svc
+        self.max_workers = max_workers
+        self.thread = None
+
+    def modules(self) -> list:
+        res = set()
+        for v in self.svc.ast_globals.process_info.values():
+            for line in v.import_python:
+                if line.startswith("import "):
+                    res.add(line[len("import ") :].strip())
+        return sorted(res)
+
+    @staticmethod
+    def _import(name: str):
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning("preload {} error: {}".format(name, e))
+
+    def __preload__(self):
+        start_time = time.perf_counter()
+        modules = self.modules()
+        if modules:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                list(pool.map(self._import, modules))
+        self.svc.timing["preload"] = time.perf_counter() - start_time
+        logger.info("preload {} modules {:.3f}s".format(len(modules), self.svc.timing["preload"]))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.__preload__, daemon=True)
+        self.thread.start()
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import py_compile
+
+from astronverse.executor.logger import logger
+
+# 生成逻辑变化时递增，使旧缓存全部失效
+CACHE_VERSION = "1"
+
+
+def _executor_version() -> str:
+    try:
+        from importlib_metadata import version as check_version
+
+        return check_version("astronverse-executor")
+    except Exception:
+        return ""
+
+
+def content_hash(*items) -> str:
+    """对任意json可序列化的数据计算稳定的hash"""
+
+    h = hashlib.sha256()
+    for item in items:
+        h.update(json.dumps(item, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class CodeCache:
+    """
+    增量代码生成缓存
+
+    以 (project_id, mode, version, process_id, 流程内容hash) 为key, 缓存流程生成的python代码、行号映射以及
+    生成过程中对解析树变量产生的副作用(import, 原子信息)。同时记录生成目录中每个文件的内容hash,
+    内容未变化时跳过写文件。
+    """
+
+    cache_dir_name = ".codegen"
+    manifest_name = "manifest.json"
+
+    def __init__(self, path: str, enable: bool = True):
+        self.enable = enable
+        self.path = path
+        self.cache_dir = os.path.join(path, self.cache_dir_name)
+        self.executor_version = _executor_version()
+
+        self.hit = 0
+        self.miss = 0
+        self.saved_time = 0.0
+        self.skip_write = 0
+
+        self.manifest = {}
+        if self.enable:
+            self.manifest = self._load_json(os.path.join(self.cache_dir, self.manifest_name)) or {}
+
+    @staticmethod
+    def _load_json(file_path: str):
+        if not os.path.exists(file_path):
+            return None
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning("codegen cache load error {}: {}".format(file_path, e))
+            return None
+
+    @staticmethod
+    def _dump_json(file_path: str, data):
+        tmp_path = "{}.tmp".format(file_path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+
+    def key(self, project_id: str, mode: str, version: str, process_id: str, *content) -> (str, str):
+        """返回 (缓存条目名, 内容hash), 每个流程只保留一个条目, 内容变化时覆盖"""
+
+        entry = content_hash(project_id, mode, version, process_id)
+        digest = content_hash(CACHE_VERSION, self.executor_version, *content)
+        return entry, digest
+
+    def get(self, key: (str, str)):
+        """获取缓存, 未命中返回None"""
+
+        if not self.enable:
+            return None
+        entry, digest = key
+        data = self._load_json(os.path.join(self.cache_dir, "{}.json".format(entry)))
+        if data is None or data.get("hash") != digest:
+            self.miss += 1
+            return None
+        self.hit += 1
+        self.saved_time += data.get("cost", 0)
+        return data
+
+    def set(self, key: (str, str), data: dict):
+        if not self.enable:
+            return
+        entry, digest = key
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._dump_json(os.path.join(self.cache_dir, "{}.json".format(entry)), {**data, "hash": digest})
+        except Exception as e:
+            logger.warning("codegen cache save error {}: {}".format(entry, e))
+
+    def write(self, file_name: str, content: str):
+        """写生成文件, 如果磁盘上的文件内容没有变化则跳过"""
+
+        file_path = os.path.join(self.path, file_name)
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if self.enable and self.manifest.get(file_name) == digest and os.path.exists(file_path):
+            self.skip_write += 1
+            return
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        self.manifest[file_name] = digest
+
+        if file_name.endswith(".py"):
+            # 预编译, 使用基于内容hash校验的pyc, 避免同一秒内重写相同大小的文件时误用旧的pyc
+            try:
+                py_compile.compile(
+                    file_path, doraise=True, invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH
+                )
+            except Exception as e:
+                logger.warning("codegen compile error {}: {}".format(file_path, e))
+
+    def save(self):
+        """保存文件清单并打印统计"""
+
+        if not self.enable:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._dump_json(os.path.join(self.cache_dir, self.manifest_name), self.manifest)
+        except Exception as e:
+            logger.warning("codegen cache manifest save error: {}".format(e))
+        logger.info(
+            "codegen cache {}: hit {} miss {} skip_write {} saved {:.3f}s".format(
+                self.path, self.hit, self.miss, self.skip_write, self.saved_time
+            )
+        )
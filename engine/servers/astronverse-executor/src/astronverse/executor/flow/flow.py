@@ -1,7 +1,9 @@
 import json
 import os
+import time
 
 from astronverse.executor.error import BaseException, SYNTAX_ERROR_FORMAT, PROCESS_ACCESS_ERROR_FORMAT
+from astronverse.executor.flow.cache import CodeCache
 from astronverse.executor.flow.syntax.lexer import Lexer
 from astronverse.executor.flow.syntax.parser import Parser
 from astronverse.executor.flow.syntax.ast import CodeLine
@@ -45,6 +47,8 @@ class Flow:
         end_line=0,
     ):
         os.makedirs(path, exist_ok=True)
+        cache = CodeCache(path, enable=self.svc.conf.gen_code_cache)
+        self.svc.storage.prefetch(project_id, mode, version)
 
         # 1. 获取全局变量
         global_var = self._global_display(project_id, mode, version)
@@ -85,18 +89,14 @@ class Flow:
                 process_index += 1
                 if is_main_process:
                     res, map_res = self._flow_display(
-                        project_id, mode, version, resource_id, name, start_line=line, end_line=end_line
+                        project_id, mode, version, resource_id, name, start_line=line, end_line=end_line, cache=cache
                     )
                 else:
-                    res, map_res = self._flow_display(project_id, mode, version, resource_id, name)
+                    res, map_res = self._flow_display(project_id, mode, version, resource_id, name, cache=cache)
 
                 self.svc.add_process_info(project_id, resource_id, category, name, file_name)
-                with open(os.path.join(path, file_name), "w", encoding="utf-8") as file:
-                    file.write(res)
-                    pass
-                with open(os.path.join(path, file_name.replace(".py", ".map")), "w", encoding="utf-8") as file:
-                    file.write(map_res)
-                    pass
+                cache.write(file_name, res)
+                cache.write(file_name.replace(".py", ".map"), map_res)
             elif category == "module":
                 file_name = ""
                 if process_id:
@@ -110,9 +110,7 @@ class Flow:
                 res = self._module_display(project_id, mode, version, resource_id, name)
 
                 self.svc.add_process_info(project_id, resource_id, category, name, file_name)
-                with open(os.path.join(path, file_name), "w", encoding="utf-8") as file:
-                    file.write(res)
-                    pass
+                cache.write(file_name, res)
             else:
                 raise NotImplementedError()
         if not main_process_name:
@@ -128,8 +126,7 @@ class Flow:
             global_code += f"gv[{k!r}] = {v}\n"
         tpl_content = tpl_content.replace("{{GLOBAL}}", global_code)
         package_py_content = tpl_content.replace("{{PACKAGE_PATH}}", repr(os.path.join(path, "package.json")))
-        with open(os.path.join(path, "package.py"), "w", encoding="utf-8") as file:
-            file.write(package_py_content)
+        cache.write("package.py", package_py_content)
 
         # 4. 生成package.json
         res = json.dumps(
@@ -138,14 +135,14 @@ class Flow:
             ensure_ascii=False,
             indent=4,
         )
-        with open(os.path.join(path, "package.json"), "w", encoding="utf-8") as file:
-            file.write(res)
+        cache.write("package.json", res)
 
         # 5. 生成__init__.py（使目录成为包，支持相对导入）
         init_py_path = os.path.join(path, "__init__.py")
         if not os.path.exists(init_py_path):
             with open(init_py_path, "w", encoding="utf-8") as file:
                 file.write("")
+        cache.save()
 
     def _requirement_display(self, project_id: str, mode: str, version: str):
         """
@@ -191,7 +188,15 @@ class Flow:
         return self.svc.storage.module_detail(project_id=project_id, mode=mode, version=version, module_id=module_id)
 
     def _flow_display(
-        self, project_id: str, mode: str, version: str, process_id: str, process_name: str, start_line=0, end_line=0
+        self,
+        project_id: str,
+        mode: str,
+        version: str,
+        process_id: str,
+        process_name: str,
+        start_line=0,
+        end_line=0,
+        cache: CodeCache = None,
     ):
         """
         流程生成 主流程 子流程
@@ -226,7 +231,24 @@ class Flow:
 
         self.svc.add_process_meta(project_id, process_id, process_meta)
 
-        # 2. 解析
+        # 2. 增量缓存: 流程内容、运行参数、全局变量都没有变化时直接复用上次的生成结果
+        cache_key = None
+        if cache and cache.enable:
+            param_list = self.svc.storage.param_list(
+                project_id=project_id, mode=mode, version=version, process_id=process_id
+            )
+            global_var = self.svc.ast_globals_dict[project_id].project_info.global_var
+            cache_key = cache.key(project_id, mode, version, process_id, new_flow_list, param_list, global_var)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                for import_line in cached.get("import_python", []):
+                    self.svc.add_import_python(project_id, process_id, import_line)
+                for atomic_key, params_name in cached.get("atomic_info", {}).items():
+                    self.svc.add_atomic_info(project_id, atomic_key, params_name)
+                return cached.get("code", ""), cached.get("map", "")
+        start_time = time.perf_counter()
+
+        # 3. 解析
         lexer = Lexer(flow_list=new_flow_list)
         parser = Parser(lexer=lexer)
         program = parser.parse_program()
@@ -250,4 +272,21 @@ class Flow:
                 code_lines.append(indent + code_line.code)
                 if code_line.line > 0:
                     map_list.append("{}:{}".format(i + 1, code_line.line))
-        return "\n".join(code_lines), ",".join(map_list)
+        code, map_res = "\n".join(code_lines), ",".join(map_list)
+
+        # 4. 写入缓存
+        if cache_key:
+            import_python = self.svc.get_import_python(project_id, process_id) or set()
+            atomic_keys = {v.get("key") for v in new_flow_list}
+            atomic_info = self.svc.ast_globals_dict[project_id].atomic_info
+            cache.set(
+                cache_key,
+                {
+                    "code": code,
+                    "map": map_res,
+                    "import_python": sorted(import_python),
+                    "atomic_info": {k: v.params_name for k, v in atomic_info.items() if k in atomic_keys},
+                    "cost": time.perf_counter() - start_time,
+                },
+            )
+        return code, map_res
@@ -3,7 +3,7 @@ from typing import Dict
 from astronverse.executor import AstGlobals, ProcessInfo, AtomicInfo, ComponentInfo
 from astronverse.executor.config import Config
 from astronverse.executor.flow.params import Param
-from astronverse.executor.flow.storage import IStorage, HttpStorage
+from astronverse.executor.flow.storage import IStorage, HttpStorage, SnapshotStorage
 from astronverse.executor.flow.syntax import IParam
 
 
@@ -15,6 +15,8 @@ class FlowSvc:
         # 工具类
         self.param: IParam = Param(self)
         self.storage: IStorage = HttpStorage(self)
+        if self.conf.storage_snapshot:
+            self.storage = SnapshotStorage(self.storage, self.conf.storage_snapshot_path)
 
         # 解析树变量
         self.ast_globals_dict: Dict[str, AstGlobals] = {}
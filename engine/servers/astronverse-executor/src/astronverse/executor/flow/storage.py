@@ -1,9 +1,15 @@
 import base64
+import copy
+import hashlib
 import json
+import os
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from json import JSONDecodeError
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 import requests
+from requests.adapters import HTTPAdapter
 from astronverse.executor.error import *
 from astronverse.executor.logger import logger
 
@@ -76,6 +82,11 @@ def merge_dicts(flow, full_flow):
 
 
 class IStorage(ABC):
+    @abstractmethod
+    def prefetch(self, project_id: str, mode: str, version: str):
+        """预取工程数据"""
+        pass
+
     @abstractmethod
     def process_list(self, project_id: str, mode: str, version: str) -> list:
         """获取工程的流程列表"""
@@ -116,17 +127,46 @@ class HttpStorage(IStorage):
     def __init__(self, svc):
         self.svc = svc
         self.gateway_port = self.svc.conf.gateway_port
+        self.max_workers = max(1, int(getattr(self.svc.conf, "storage_max_workers", 8)))
+
+        # 复用连接
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+
+        # 单次运行内的请求结果缓存
+        self.lock = threading.Lock()
+        self.memo = {}
+        self.atom_cache = {}
+
+    def __memo__(self, key: tuple, func: Callable[[], Any]) -> Any:
+        """相同的请求只发一次, 请求中的key由后来的调用等待结果, 返回副本防止调用方修改缓存"""
+
+        with self.lock:
+            future = self.memo.get(key)
+            owner = future is None
+            if owner:
+                future = self.memo[key] = Future()
+        if owner:
+            try:
+                future.set_result(func())
+            except Exception as e:
+                # 失败不缓存, 下次调用重新请求
+                with self.lock:
+                    self.memo.pop(key, None)
+                future.set_exception(e)
+        return copy.deepcopy(future.result())
 
     def __http__(self, shot_url: str, params: Optional[dict], data: Optional[dict], meta: str = "post") -> Any:
         """post 请求"""
         logger.debug("请求开始 {}:{}:{}".format(shot_url, params, data))
 
         if meta == "post":
-            response = requests.post(
+            response = self.session.post(
                 "http://127.0.0.1:{}{}".format(self.gateway_port, shot_url), json=data, params=params
             )
         else:
-            response = requests.get("http://127.0.0.1:{}{}".format(self.gateway_port, shot_url), params=params)
+            response = self.session.get("http://127.0.0.1:{}{}".format(self.gateway_port, shot_url), params=params)
         if response.status_code != 200:
             raise BaseException(
                 SERVER_ERROR_FORMAT.format(response.status_code), "服务器错误{}".format(response.status_code)
@@ -144,18 +184,101 @@ class HttpStorage(IStorage):
         except JSONDecodeError:
             return base64.b64encode(response.content).decode("utf-8")
 
-    def __process_json_full__(self, atom_list: list) -> list:
-        if len(atom_list) == 0:
-            return []
+    def __process_json_full__(self, atom_list: list) -> dict:
+        """获取原子能力的完整定义, 已获取过的不再重复请求"""
+
+        with self.lock:
+            missing = list(dict.fromkeys(k for k in atom_list if k not in self.atom_cache))
+        if missing:
+            res = self.__http__(
+                "/api/robot/atom/getLatestAtomsByList",
+                None,
+                {
+                    "atomKeyList": missing,
+                },
+            )
+            full_dict = {}
+            for f in res:
+                if f:
+                    f = json.loads(f.get("atomContent"))
+                f["inputList"] = f.get("inputList", []) + common_advanced
+                full_dict[f.get("key")] = f
+            with self.lock:
+                self.atom_cache.update(full_dict)
+                for k in missing:
+                    self.atom_cache.setdefault(k, None)
+        with self.lock:
+            return {k: self.atom_cache[k] for k in atom_list if self.atom_cache.get(k) is not None}
+
+    def __process_json__(self, project_id: str, mode: str, version: str, process_id: str) -> list:
+        """获取流程的原始json"""
+
+        def fetch():
+            # 基础数据
+            data = {
+                "robotId": project_id,
+                "processId": process_id,
+            }
+            if mode:
+                data["mode"] = mode
+            if version:
+                data["robotVersion"] = int(version)
+
+            res = self.__http__("/api/robot/process/process-json", None, data)
+            try:
+                flow_list = json.loads(res)
+            except Exception as e:
+                raise BaseException(PROCESS_ACCESS_ERROR_FORMAT.format(process_id), "工程数据异常 {}".format(e))
+
+            for flow in flow_list:
+                # 兼容代码
+                if flow.get("key") == "Code.Process":
+                    flow.update({"key": "Script.process"})
+                if flow.get("key").startswith("Code.Component.") or flow.get("key").startswith("Script.component."):
+                    code_id = flow.get("key").split(".")[-1]
+                    flow.update(
+                        {
+                            "inputList": [{"key": "component", "value": code_id}] + flow.get("inputList", []),
+                            "key": "Script.component",
+                        }
+                    )
+                # 兼容结束
+            return flow_list
+
+        return self.__memo__(("process_json", project_id, mode, version, process_id), fetch)
+
+    def prefetch(self, project_id: str, mode: str, version: str):
+        """并发预取工程数据, 并把所有流程用到的原子能力合并成一次请求"""
 
-        res = self.__http__(
-            "/api/robot/atom/getLatestAtomsByList",
-            None,
-            {
-                "atomKeyList": atom_list,
-            },
-        )
-        return res
+        try:
+            process_list = self.process_list(project_id=project_id, mode=mode, version=version)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [
+                    pool.submit(self.global_list, project_id, mode, version),
+                    pool.submit(self.pip_list, project_id, mode, version),
+                    pool.submit(self.component_list, project_id, mode, version),
+                ]
+                process_futures = []
+                for process in process_list:
+                    resource_id = process.get("resourceId")
+                    category = process.get("resourceCategory")
+                    if category == "process":
+                        process_futures.append(
+                            pool.submit(self.__process_json__, project_id, mode, version, resource_id)
+                        )
+                        futures.append(pool.submit(self.param_list, project_id, mode, version, resource_id))
+                    elif category == "module":
+                        futures.append(pool.submit(self.module_detail, project_id, mode, version, resource_id))
+
+                atom_key_list = []
+                for future in process_futures:
+                    atom_key_list.extend(flow.get("key") for flow in future.result())
+                self.__process_json_full__(atom_key_list)
+                for future in futures:
+                    future.result()
+        except Exception as e:
+            # 预取失败不影响后续的正常获取流程
+            logger.warning("预取工程数据失败 {}: {}".format(project_id, e))
 
     def process_list(self, project_id: str, mode: str, version: str) -> list:
         """获取工程的流程列表"""
@@ -168,56 +291,23 @@ class HttpStorage(IStorage):
         if version:
             data["robotVersion"] = int(version)
 
-        return self.__http__("/api/robot/module/processModuleList", None, data)
+        return self.__memo__(
+            ("process_list", project_id, mode, version),
+            lambda: self.__http__("/api/robot/module/processModuleList", None, data),
+        )
 
     def process_detail(self, project_id: str, mode: str, version: str, process_id: str) -> list:
         """获取流程json"""
 
-        # 基础数据
-        data = {
-            "robotId": project_id,
-            "processId": process_id,
-        }
-        if mode:
-            data["mode"] = mode
-        if version:
-            data["robotVersion"] = int(version)
-
-        res = self.__http__("/api/robot/process/process-json", None, data)
-        try:
-            flow_list = json.loads(res)
-        except Exception as e:
-            raise BaseException(PROCESS_ACCESS_ERROR_FORMAT.format(process_id), "工程数据异常 {}".format(e))
+        flow_list = self.__process_json__(project_id, mode, version, process_id)
 
         # 附加数据
-        atom_key_list = []
-        for flow in flow_list:
-            # 兼容代码
-            if flow.get("key") == "Code.Process":
-                flow.update({"key": "Script.process"})
-            if flow.get("key").startswith("Code.Component.") or flow.get("key").startswith("Script.component."):
-                code_id = flow.get("key").split(".")[-1]
-                flow.update(
-                    {
-                        "inputList": [{"key": "component", "value": code_id}] + flow.get("inputList", []),
-                        "key": "Script.component",
-                    }
-                )
-            # 兼容结束
-            atom_key_list.append(flow.get("key"))
-
-        full = self.__process_json_full__(atom_key_list)
-        full_dict = {}
-        for f in full:
-            if f:
-                f = json.loads(f.get("atomContent"))
-            f["inputList"] = f.get("inputList", []) + common_advanced
-            full_dict[f.get("key")] = f
+        full_dict = self.__process_json_full__([flow.get("key") for flow in flow_list])
 
         # 合并
         for k, flow in enumerate(flow_list):
             if flow.get("key") in full_dict:
-                full_item = full_dict[flow.get("key")]
+                full_item = copy.deepcopy(full_dict[flow.get("key")])
                 flow_list[k] = merge_dicts(flow, full_item)
         return flow_list
 
@@ -231,7 +321,10 @@ class HttpStorage(IStorage):
         if version:
             data["robotVersion"] = int(version)
 
-        res = self.__http__("/api/robot/module/open", None, data)
+        res = self.__memo__(
+            ("module_detail", project_id, mode, version, module_id),
+            lambda: self.__http__("/api/robot/module/open", None, data),
+        )
         if res:
             return res.get("moduleContent", "")
         else:
@@ -249,7 +342,10 @@ class HttpStorage(IStorage):
         if version:
             data["robotVersion"] = int(version)
 
-        res = self.__http__("/api/robot/param/all", None, data)
+        res = self.__memo__(
+            ("param_list", project_id, mode, version, process_id),
+            lambda: self.__http__("/api/robot/param/all", None, data),
+        )
         if res and isinstance(res, str):
             res = json.loads(res)
         return res
@@ -265,7 +361,10 @@ class HttpStorage(IStorage):
         if version:
             params["robotVersion"] = int(version)
 
-        return self.__http__("/api/robot/global/all", params, None)
+        return self.__memo__(
+            ("global_list", project_id, mode, version),
+            lambda: self.__http__("/api/robot/global/all", params, None),
+        )
 
     def component_list(self, project_id: str, mode: str, version: str = "") -> list:
         params = {
@@ -275,7 +374,10 @@ class HttpStorage(IStorage):
             params["mode"] = mode
         if version:
             params["robotVersion"] = int(version)
-        return self.__http__("/api/robot/component-robot-use/component-use", None, params, meta="post")
+        return self.__memo__(
+            ("component_list", project_id, mode, version),
+            lambda: self.__http__("/api/robot/component-robot-use/component-use", None, params, meta="post"),
+        )
 
     def pip_list(self, project_id: str, mode: str, version: str = "") -> list:
         data = {
@@ -286,4 +388,124 @@ class HttpStorage(IStorage):
         if version:
             data["robotVersion"] = int(version)
 
-        return self.__http__("/api/robot/require/list", None, data)
+        return self.__memo__(
+            ("pip_list", project_id, mode, version),
+            lambda: self.__http__("/api/robot/require/list", None, data),
+        )
+
+
+class SnapshotStorage(IStorage):
+    """
+    已发布版本的本地快照
+
+    发布后的版本内容不会再变化, 首次获取后写入本地, 之后同一版本不再请求网关
+    """
+
+    snapshot_modes = ("CRONTAB", "EXECUTOR", "DISPATCH")
+
+    def __init__(self, storage: IStorage, path: str):
+        self.storage = storage
+        self.path = path
+
+    def __enable__(self, mode: str, version: str) -> bool:
+        return bool(version) and mode in self.snapshot_modes
+
+    def __file__(self, project_id: str, mode: str, version: str, name: str) -> str:
+        return os.path.join(self.path, str(project_id), "{}_{}".format(mode, version), "{}.json".format(name))
+
+    def __snapshot__(self, project_id: str, mode: str, version: str, name: str, func: Callable[[], Any]) -> Any:
+        if not self.__enable__(mode, version):
+            return func()
+
+        file_path = self.__file__(project_id, mode, version, name)
+        if os.path.exists(file_path):
+            try:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning("快照读取失败 {}: {}".format(file_path, e))
+
+        res = func()
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            tmp_path = "{}.tmp".format(file_path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(res, f, ensure_ascii=False)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            logger.warning("快照写入失败 {}: {}".format(file_path, e))
+        return res
+
+    @staticmethod
+    def __key__(*args) -> str:
+        return hashlib.md5("_".join(str(a) for a in args).encode("utf-8")).hexdigest()
+
+    def prefetch(self, project_id: str, mode: str, version: str):
+        if self.__enable__(mode, version) and os.path.exists(self.__file__(project_id, mode, version, "process_list")):
+            return
+        self.storage.prefetch(project_id, mode, version)
+
+    def process_list(self, project_id: str, mode: str, version: str) -> list:
+        return self.__snapshot__(
+            project_id,
+            mode,
+            version,
+            "process_list",
+            lambda: self.storage.process_list(project_id=project_id, mode=mode, version=version),
+        )
+
+    def process_detail(self, project_id: str, mode: str, version: str, process_id: str) -> list:
+        return self.__snapshot__(
+            project_id,
+            mode,
+            version,
+            self.__key__("process_detail", process_id),
+            lambda: self.storage.process_detail(
+                project_id=project_id, mode=mode, version=version, process_id=process_id
+            ),
+        )
+
+    def module_detail(self, project_id: str, mode: str, version: str, module_id: str) -> str:
+        return self.__snapshot__(
+            project_id,
+            mode,
+            version,
+            self.__key__("module_detail", module_id),
+            lambda: self.storage.module_detail(project_id=project_id, mode=mode, version=version, module_id=module_id),
+        )
+
+    def param_list(self, project_id: str, mode: str, version: str, process_id: str) -> list:
+        return self.__snapshot__(
+            project_id,
+            mode,
+            version,
+            self.__key__("param_list", process_id),
+            lambda: self.storage.param_list(project_id=project_id, mode=mode, version=version, process_id=process_id),
+        )
+
+    def global_list(self, project_id: str, mode: str, version: str = "") -> list:
+        return self.__snapshot__(
+            project_id,
+            mode,
+            version,
+            "global_list",
+            lambda: self.storage.global_list(project_id=project_id, mode=mode, version=version),
+        )
+
+    def component_list(self, project_id: str, mode: str, version: str = "") -> list:
+        return self.__snapshot__(
+            project_id,
+            mode,
+            version,
+            "component_list",
+            lambda: self.storage.component_list(project_id=project_id, mode=mode, version=version),
+        )
+
+    def pip_list(self, project_id: str, mode: str, version: str = "") -> list:
+        return self.__snapshot__(
+            project_id,
+            mode,
+            version,
+            "pip_list",
+            lambda: self.storage.pip_list(project_id=project_id, mode=mode, version=version),
+        )
@@ -67,6 +67,10 @@ def debug_start(args, conf):
     if Config.wait_tip_ws:
         svc.log_tool.start()
 
+    # 预导入原子能力模块[与ws连接等待并行]
+    if Config.preload_modules:
+        svc.preload_tool.start()
+
     # 生成日志
     svc.report.info(ReportFlow(log_type=ReportType.Flow, status=ReportFlowStatus.INIT, msg_str=MSG_FLOW_INIT_START))
     svc.report.info(
@@ -0,0 +1,86 @@
+"""
+预热执行器进程
+
+由调度器提前启动, 导入执行器依赖后在本地端口上等待任务分配, 收到启动参数后按正常流程运行
+启动: python -m astronverse.executor.worker --assign_port=端口 --idle_timeout=秒 --parent_pid=调度器进程
+"""
+
+import argparse
+import json
+import socket
+import sys
+import time
+
+import psutil
+
+
+def preload():
+    """导入执行器运行需要的模块"""
+    import requests  # noqa
+    import websockets  # noqa
+    from astronverse.executor import start  # noqa
+
+
+def wait_assign(port: int, idle_timeout: float, parent_pid: int = 0):
+    """
+    等待调度器分配任务, 返回执行器启动参数; 空闲超时或调度器退出时返回None
+
+    协议: 调度器连接后发送一行json(参数字典), 收到后回复 ok
+    """
+    end_time = time.time() + idle_timeout if idle_timeout > 0 else None
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if sys.platform != "win32":
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(("127.0.0.1", port))
+    server.listen(1)
+    server.settimeout(2)
+    try:
+        while True:
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                if end_time and time.time() > end_time:
+                    return None
+                if parent_pid and not psutil.pid_exists(parent_pid):
+                    return None
+                continue
+            with conn:
+                try:
+                    conn.settimeout(10)
+                    f = conn.makefile("rwb")
+                    line = f.readline().strip()
+                    if not line:
+                        # 端口探活的连接不会发送数据, 忽略
+                        continue
+                    params = json.loads(line.decode("utf-8"))
+                    f.write(b"ok\n")
+                    f.flush()
+                    break
+                except (OSError, ValueError):
+                    continue
+    finally:
+        server.close()
+    return ["--{}={}".format(k, v) for k, v in params.items()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="{} worker".format("executor"))
+    parser.add_argument("--assign_port", type=int, help="任务分配端口", required=True)
+    parser.add_argument("--idle_timeout", type=float, default=3600, help="空闲超时退出(秒)", required=False)
+    parser.add_argument("--parent_pid", type=int, default=0, help="调度器进程, 退出后跟随退出", required=False)
+    args = parser.parse_args()
+
+    preload()
+    argv = wait_assign(args.assign_port, args.idle_timeout, args.parent_pid)
+    if argv is None:
+        # 长时间没有分配任务或调度器已经退出, 释放资源
+        return
+
+    from astronverse.executor.start import start
+
+    sys.argv = [sys.argv[0]] + argv
+    start()
+
+
+if __name__ == "__main__":
+    main()
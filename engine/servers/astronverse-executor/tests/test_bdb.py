@@ -0,0 +1,180 @@
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.executor.debug.bdb import CustomBdb
+
+MAIN = """
+def loop(n):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+def target():
+    x = 1
+    y = 2  # break
+    z = x + y  # next
+    return z
+
+
+def wait_then(evt):
+    evt.wait()
+    w = 4  # runtime
+    return w
+
+
+def main(args):
+    loop(2000)
+    res = target()
+    if evt is not None:
+        res += wait_then(evt)
+    gv["res"] = res
+"""
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("executor")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def mark_line(mark: str) -> int:
+    """main.py 中带 # mark 注释的行号"""
+    for i, line in enumerate(MAIN.split("\n"), start=1):
+        if line.endswith("# {}".format(mark)):
+            return i
+    raise ValueError(mark)
+
+
+class CountingBdb(CustomBdb):
+    """记录进入bdb完整判断的行事件"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lines = Counter()
+
+    def dispatch_line(self, frame):
+        self.lines[frame.f_code.co_name] += 1
+        return super().dispatch_line(frame)
+
+
+class TestCustomBdb(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.project_dir = os.path.join(self.path, "project_bdb_test")
+        os.makedirs(self.project_dir)
+        with open(os.path.join(self.project_dir, "main.py"), "w", encoding="utf-8") as f:
+            f.write(MAIN)
+        self.events = queue.Queue()
+        self.bdb = CountingBdb(self.project_dir, self.path, self.notify, lambda func: func)
+        self.gv = {}
+        self.sys_path = list(sys.path)
+
+    def tearDown(self):
+        sys.path[:] = self.sys_path
+        shutil.rmtree(self.path)
+
+    def notify(self, reason, **kwargs):
+        self.events.put((reason, kwargs))
+
+    def start(self, evt=None) -> threading.Thread:
+        thread = threading.Thread(target=self.bdb.cmd_start, args=({"gv": self.gv, "evt": evt},), daemon=True)
+        thread.start()
+        return thread
+
+    def wait_frame(self, thread: threading.Thread, name: str) -> bool:
+        """等待线程运行到函数 name 内"""
+        for _ in range(500):
+            frame = sys._current_frames().get(thread.ident)
+            while frame is not None:
+                if frame.f_code.co_name == name:
+                    return True
+                frame = frame.f_back
+            time.sleep(0.01)
+        return False
+
+    def wait_stop(self):
+        reason, kwargs = self.events.get(timeout=10)
+        self.assertTrue(self.bdb.paused)
+        return reason, kwargs
+
+    def test_breakpoint(self):
+        self.bdb.set_breakpoint("main.py", mark_line("break"))
+        thread = self.start()
+
+        reason, kwargs = self.wait_stop()
+        self.assertEqual((reason, kwargs["line"], kwargs["file"]), ("breakpoint", mark_line("break"), "main.py"))
+        self.assertEqual(kwargs["merged_vars"]["x"]["value"], "1")
+        self.assertNotIn("y", kwargs["merged_vars"])
+
+        # 单步时退回bdb默认逻辑, 停在下一行
+        self.bdb.cmd_next()
+        reason, kwargs = self.wait_stop()
+        self.assertEqual((reason, kwargs["line"]), ("step", mark_line("next")))
+        self.assertEqual(kwargs["merged_vars"]["y"]["value"], "2")
+
+        self.bdb.cmd_continue()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(self.events.empty())
+        self.assertEqual(self.gv["res"], 3)
+
+        # 继续运行时只有包含断点的函数安装行跟踪, 并且只有断点行进入完整判断
+        self.assertNotIn("loop", self.bdb.lines)
+        self.assertNotIn("main", self.bdb.lines)
+        self.assertEqual(self.bdb.lines["target"], 2)
+
+    def test_no_breakpoint(self):
+        thread = self.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(self.events.empty())
+        self.assertEqual(self.gv["res"], 3)
+        self.assertEqual(set(self.bdb.lines), {"<module>"})
+
+    def test_clear_breakpoint(self):
+        self.bdb.set_breakpoint("main.py", mark_line("break"))
+        self.bdb.clear_breakpoint("main.py", mark_line("break"))
+        thread = self.start()
+        thread.join(10)
+        self.assertTrue(self.events.empty())
+        self.assertNotIn("target", self.bdb.lines)
+
+    def test_runtime_breakpoint(self):
+        # 运行中新增断点时, 已经在栈上的帧也能停下
+        evt = threading.Event()
+        thread = self.start(evt)
+        self.assertTrue(self.wait_frame(thread, "wait_then"))
+        self.assertNotIn("wait_then", self.bdb.lines)
+
+        self.bdb.set_breakpoint("main.py", mark_line("runtime"))
+        evt.set()
+        reason, kwargs = self.wait_stop()
+        self.assertEqual((reason, kwargs["line"]), ("breakpoint", mark_line("runtime")))
+
+        self.bdb.cmd_continue()
+        thread.join(10)
+        self.assertEqual(self.gv["res"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.executor.flow.cache import CodeCache
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("executor")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+FLOW = [{"key": "Dialog.message_box", "__line__": 1, "inputList": [{"key": "msg", "value": "a"}]}]
+
+
+class TestCodeCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def key(self, cache, flow=None, version="1"):
+        return cache.key("p1", "EDIT_PAGE", version, "process1", flow or FLOW, [], {})
+
+    def test_hit_and_miss(self):
+        cache = CodeCache(self.path)
+        key = self.key(cache)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.miss, 1)
+
+        cache.set(key, {"code": "print(1)", "map": "1:1", "cost": 0.5})
+        data = cache.get(key)
+        self.assertEqual(data["code"], "print(1)")
+        self.assertEqual(data["map"], "1:1")
+        self.assertEqual((cache.hit, cache.saved_time), (1, 0.5))
+
+        # 重新打开也能命中
+        cache = CodeCache(self.path)
+        self.assertEqual(cache.get(self.key(cache))["code"], "print(1)")
+
+    def test_invalidate(self):
+        cache = CodeCache(self.path)
+        key = self.key(cache)
+        cache.set(key, {"code": "old"})
+
+        # 流程内容变化时hash不同, 同一个流程只保留一个条目
+        flow = [dict(FLOW[0], inputList=[{"key": "msg", "value": "b"}])]
+        new_key = self.key(cache, flow)
+        self.assertEqual(new_key[0], key[0])
+        self.assertNotEqual(new_key[1], key[1])
+        self.assertIsNone(cache.get(new_key))
+        cache.set(new_key, {"code": "new"})
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.get(new_key)["code"], "new")
+        self.assertEqual(len(os.listdir(cache.cache_dir)), 1)
+
+        # 不同版本是不同的条目
+        self.assertNotEqual(self.key(cache, version="2")[0], key[0])
+
+    def test_corrupt_entry(self):
+        cache = CodeCache(self.path)
+        key = self.key(cache)
+        cache.set(key, {"code": "print(1)"})
+        with open(os.path.join(cache.cache_dir, "{}.json".format(key[0])), "w", encoding="utf-8") as f:
+            f.write("{")
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.miss, 1)
+
+    def test_disable(self):
+        cache = CodeCache(self.path, enable=False)
+        key = self.key(cache)
+        cache.set(key, {"code": "print(1)"})
+        self.assertIsNone(cache.get(key))
+        self.assertEqual((cache.hit, cache.miss), (0, 0))
+        self.assertFalse(os.path.exists(cache.cache_dir))
+
+        # 关闭缓存时总是写文件
+        cache.write("main.py", "a = 1")
+        cache.write("main.py", "a = 1")
+        self.assertEqual(cache.skip_write, 0)
+
+    def test_skip_write(self):
+        cache = CodeCache(self.path)
+        cache.write("main.py", "a = 1")
+        cache.write("main.map", "1:1")
+        cache.save()
+        self.assertEqual(cache.skip_write, 0)
+        self.assertTrue(os.listdir(os.path.join(self.path, "__pycache__")))
+
+        # 内容没有变化时跳过, 变化或文件被删除时重新写入
+        cache = CodeCache(self.path)
+        cache.write("main.py", "a = 1")
+        self.assertEqual(cache.skip_write, 1)
+        cache.write("main.map", "1:2")
+        os.remove(os.path.join(self.path, "main.py"))
+        cache.write("main.py", "a = 1")
+        self.assertEqual(cache.skip_write, 1)
+        with open(os.path.join(self.path, "main.map"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), "1:2")
+        self.assertTrue(os.path.exists(os.path.join(self.path, "main.py")))
+
+
+if __name__ == "__main__":
+    unittest.main()
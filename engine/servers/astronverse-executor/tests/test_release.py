@@ -0,0 +1,132 @@
+import importlib.util
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import unittest
+import uuid
+from types import SimpleNamespace
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.executor.debug.bdb import CustomBdb
+from astronverse.executor.debug.tools import PreloadTool
+from astronverse.executor.flow.cache import CodeCache
+
+MAIN = """import sys
+
+
+def main(args):
+    args["traced"] = sys.gettrace() is not None
+    args["value"] = VALUE
+"""
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("executor")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+class TestRelease(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        # 每个用例使用不同的包名, 避免 sys.modules 中的缓存
+        self.package = "project_{}".format(uuid.uuid4().hex)
+        self.project_dir = os.path.join(self.path, self.package)
+        os.makedirs(self.project_dir)
+        self.sys_path = list(sys.path)
+
+    def tearDown(self):
+        sys.path[:] = self.sys_path
+        for name in list(sys.modules):
+            if name.startswith(self.package):
+                del sys.modules[name]
+        shutil.rmtree(self.path)
+
+    def write(self, value: int):
+        cache = CodeCache(self.project_dir)
+        cache.write("main.py", MAIN.replace("VALUE", str(value)))
+        cache.save()
+        return cache
+
+    def test_precompile(self):
+        self.write(1)
+        main_file = os.path.join(self.project_dir, "main.py")
+        pyc_file = importlib.util.cache_from_source(main_file)
+        self.assertTrue(os.path.exists(pyc_file))
+        # 基于内容hash校验的pyc: flags = 0b11
+        with open(pyc_file, "rb") as f:
+            self.assertEqual(int.from_bytes(f.read(8)[4:8], "little"), 0b11)
+
+    def test_release_start(self):
+        self.write(1)
+        bdb = CustomBdb(self.project_dir, self.path, lambda *args, **kwargs: None, lambda func: func)
+        shared = {"_args": {}}
+        bdb.cmd_release_start(g_v=shared)
+
+        # 直接导入运行, 不安装trace函数
+        self.assertEqual(shared["_args"], {"traced": False, "value": 1})
+        self.assertEqual(set(bdb.timing), {"import", "run"})
+        self.assertEqual(os.getcwd(), log_dir)
+
+    def test_rewrite_same_size(self):
+        # 同一秒内重写相同大小的文件, 导入时不会用到旧的pyc
+        main_file = os.path.join(self.project_dir, "main.py")
+        self.write(1)
+        stat = os.stat(main_file)
+        # 之前按时间戳校验导入时留下的pyc
+        py_compile.compile(main_file, doraise=True, invalidation_mode=py_compile.PycInvalidationMode.TIMESTAMP)
+
+        self.write(2)
+        os.utime(main_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        bdb = CustomBdb(self.project_dir, self.path, lambda *args, **kwargs: None, lambda func: func)
+        shared = {"_args": {}}
+        bdb.cmd_release_start(g_v=shared)
+        self.assertEqual(shared["_args"]["value"], 2)
+
+    def test_release_error(self):
+        with open(os.path.join(self.project_dir, "main.py"), "w", encoding="utf-8") as f:
+            f.write("def main(args):\n    raise ValueError('robot error')\n")
+        events = []
+        bdb = CustomBdb(
+            self.project_dir, self.path, lambda *args, **kwargs: events.append((args, kwargs)), lambda func: func
+        )
+        bdb.cmd_release_start(g_v={"_args": {}})
+
+        # 异常同样上报行号
+        self.assertEqual(events[0][0], ("exception",))
+        self.assertEqual(events[0][1]["py_line"], 2)
+        self.assertIsInstance(events[0][1]["exc"], ValueError)
+
+
+class TestPreloadTool(unittest.TestCase):
+    def test_preload(self):
+        process_info = {
+            "p1": SimpleNamespace(import_python=["import json", "from os import path", "import not_exist_module"]),
+            "p2": SimpleNamespace(import_python=["import json", "import colorsys"]),
+        }
+        svc = SimpleNamespace(ast_globals=SimpleNamespace(process_info=process_info), timing={})
+        tool = PreloadTool(svc)
+        self.assertEqual(tool.modules(), ["colorsys", "json", "not_exist_module"])
+
+        # 导入失败只记录日志, 不影响其他模块
+        sys.modules.pop("colorsys", None)
+        tool.start()
+        tool.thread.join(10)
+        self.assertIn("colorsys", sys.modules)
+        self.assertIn("preload", svc.timing)
+
+
+if __name__ == "__main__":
+    unittest.main()
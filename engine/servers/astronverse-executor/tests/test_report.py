@@ -0,0 +1,182 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from queue import Queue
+from types import SimpleNamespace
+
+from astronverse.actionlib import ReportCode, ReportCodeStatus
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.executor.debug.report import Report, ReportFileWriter, TipMessage
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("executor")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class TestReportFileWriter(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.path, "e1.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_rotate(self):
+        writer = ReportFileWriter(self.file_path, max_size=100, flush_interval=60)
+        lines = ["{:039d}\n".format(i) for i in range(5)]
+        for line in lines:
+            writer.write(line)
+        writer.close()
+
+        # 每个文件不超过 max_size, 旧文件按顺序编号
+        files = [os.path.join(self.path, name) for name in ("e1.1.txt", "e1.2.txt", "e1.txt")]
+        self.assertEqual(sorted(os.listdir(self.path)), ["e1.1.txt", "e1.2.txt", "e1.txt"])
+        self.assertTrue(all(os.path.getsize(f) <= 100 for f in files))
+        self.assertEqual(b"".join(read(f) for f in files), "".join(lines).encode("utf-8"))
+
+    def test_rotate_large_line(self):
+        # 单行超过 max_size 时也完整写入, 不会产生空文件
+        writer = ReportFileWriter(self.file_path, max_size=10, flush_interval=60)
+        writer.write("a" * 20 + "\n")
+        writer.write("b\n")
+        writer.close()
+        self.assertEqual(read(os.path.join(self.path, "e1.1.txt")), b"a" * 20 + b"\n")
+        self.assertEqual(read(self.file_path), b"b\n")
+
+    def test_binary(self):
+        # 原样写入utf-8内容, 不转换换行, 记录的大小和文件大小一致
+        lines = ["中文日志\n", "a\r\nb\n", "emoji 😀\n"]
+        writer = ReportFileWriter(self.file_path, flush_interval=60)
+        for line in lines:
+            writer.write(line)
+        writer.flush()
+        self.assertEqual(writer.file_size, os.path.getsize(self.file_path))
+        writer.close()
+        self.assertEqual(read(self.file_path), "".join(lines).encode("utf-8"))
+
+    def test_flush_on_close(self):
+        writer = ReportFileWriter(self.file_path, flush_interval=60)
+        writer.write("a\n")
+        self.assertEqual(read(self.file_path), b"")
+        writer.close()
+        self.assertEqual(read(self.file_path), b"a\n")
+
+        # 关闭后的写入直接忽略
+        writer.write("b\n")
+        writer.flush()
+        self.assertEqual(read(self.file_path), b"a\n")
+        writer.thread.join(1)
+        self.assertFalse(writer.thread.is_alive())
+
+    def test_flush_size(self):
+        # 缓冲超过 flush_size 时由后台线程写入, 不用等到 flush_interval
+        writer = ReportFileWriter(self.file_path, flush_size=4, flush_interval=60)
+        writer.write("abcd\n")
+        for _ in range(50):
+            if read(self.file_path):
+                break
+            time.sleep(0.02)
+        self.assertEqual(read(self.file_path), b"abcd\n")
+        writer.close()
+
+
+class TestReport(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        conf = SimpleNamespace(
+            log_path=self.path,
+            project_id="p1",
+            exec_id="e1",
+            report_max_size=0,
+            report_flush_size=64 * 1024,
+            report_flush_interval=60,
+            open_log_ws=True,
+        )
+        self.report = Report(SimpleNamespace(conf=conf, ast_globals=SimpleNamespace(process_info={})))
+        self.report.queue = Queue(maxsize=3)
+
+    def tearDown(self):
+        self.report.close()
+        shutil.rmtree(self.path)
+
+    def drain(self):
+        items = []
+        while not self.report.queue.empty():
+            items.append(self.report.queue.get_nowait())
+            self.report.queue.task_done()
+        return items
+
+    def test_send(self):
+        self.report.info(ReportCode(process_id="p", status=ReportCodeStatus.START, msg_str="start"))
+        self.report.warning("warn")
+        self.report.close()
+
+        # 指令开始只发给ws, 作为低优先级消息; 其他消息同时写入文件
+        items = self.drain()
+        self.assertIsInstance(items[0], TipMessage)
+        self.assertNotIsInstance(items[1], TipMessage)
+        self.assertEqual(json.loads(items[1])["msg_str"], "warn")
+        with open(os.path.join(self.path, "report", "p1", "e1.txt"), encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["data"] for line in lines], [json.loads(items[1])])
+
+    def test_high_priority_not_dropped(self):
+        for i in range(3):
+            self.report.__put__("tip{}".format(i), low_priority=True)
+        # 队列满时低优先级消息直接丢弃
+        self.report.__put__("tip3", low_priority=True)
+        # 其他消息挤掉最早的低优先级消息
+        self.report.__put__("error1", low_priority=False)
+        self.report.__put__("error2", low_priority=False)
+        self.report.__put__("error3", low_priority=False)
+        self.assertEqual(self.report.drop_num, 4)
+        self.assertEqual(list(self.report.queue.queue), ["error1", "error2", "error3"])
+
+        # 全是高优先级消息时等待发送, 不丢弃
+        thread = threading.Thread(target=self.report.__put__, args=("error4", False))
+        thread.start()
+        thread.join(0.2)
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(self.drain(), ["error1", "error2", "error3"])
+        thread.join(1)
+        self.assertEqual(self.drain(), ["error4"])
+        self.assertEqual(self.report.drop_num, 4)
+
+    def test_join(self):
+        # 挤掉的消息也计入已完成, queue.join() 不会一直等待
+        for i in range(3):
+            self.report.__put__("tip{}".format(i), low_priority=True)
+        for i in range(3):
+            self.report.__put__("error{}".format(i), low_priority=False)
+        self.drain()
+        thread = threading.Thread(target=self.report.queue.join, daemon=True)
+        thread.start()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(self.report.queue.unfinished_tasks, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
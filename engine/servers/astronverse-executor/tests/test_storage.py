@@ -0,0 +1,274 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from types import SimpleNamespace
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.executor.flow.storage import HttpStorage, IStorage, SnapshotStorage
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("executor")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+class FakeGateway:
+    """
+    模拟网关接口, 替换 HttpStorage.__http__
+    calls 记录每个接口的请求次数, delay 为 {接口: 秒数}, fail 为 {接口: 失败次数}
+    """
+
+    def __init__(self):
+        self.calls = Counter()
+        self.atom_keys = []
+        self.delay = {}
+        self.fail = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, shot_url, params, data, meta="post"):
+        with self.lock:
+            self.calls[shot_url] += 1
+            fail = self.fail.get(shot_url, 0) > 0
+            if fail:
+                self.fail[shot_url] -= 1
+        time.sleep(self.delay.get(shot_url, 0))
+        if fail:
+            raise Exception("gateway error")
+        if shot_url == "/api/robot/module/processModuleList":
+            return [
+                {"resourceId": "p1", "resourceCategory": "process", "name": "main"},
+                {"resourceId": "p2", "resourceCategory": "process", "name": "sub"},
+                {"resourceId": "m1", "resourceCategory": "module", "name": "mod"},
+            ]
+        if shot_url == "/api/robot/process/process-json":
+            return json.dumps(
+                [
+                    {"key": "Dialog.message_box", "inputList": [{"key": "msg", "value": data["processId"]}]},
+                    {"key": "Code.Process"},
+                ]
+            )
+        if shot_url == "/api/robot/atom/getLatestAtomsByList":
+            self.atom_keys.append(sorted(data["atomKeyList"]))
+            return [
+                {"atomContent": json.dumps({"key": k, "title": "title {}".format(k), "inputList": []})}
+                for k in data["atomKeyList"]
+            ]
+        if shot_url == "/api/robot/module/open":
+            return {"moduleContent": "print({!r})".format(data["moduleId"])}
+        if shot_url == "/api/robot/global/all":
+            return [{"varName": "a", "varValue": "1", "varType": "Str"}]
+        return []
+
+
+class FakeStorage(IStorage):
+    """记录调用次数的存储"""
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def __call__(self, name, *args):
+        self.calls[name] += 1
+        return [{"name": name, "args": list(args)}]
+
+    def prefetch(self, project_id, mode, version):
+        self.calls["prefetch"] += 1
+
+    def process_list(self, project_id, mode, version):
+        return self("process_list", project_id)
+
+    def process_detail(self, project_id, mode, version, process_id):
+        return self("process_detail", process_id)
+
+    def module_detail(self, project_id, mode, version, module_id):
+        self.calls["module_detail"] += 1
+        return "print({!r})".format(module_id)
+
+    def param_list(self, project_id, mode, version, process_id):
+        return self("param_list", process_id)
+
+    def global_list(self, project_id, mode, version=""):
+        return self("global_list", project_id)
+
+    def component_list(self, project_id, mode, version=""):
+        return self("component_list", project_id)
+
+    def pip_list(self, project_id, mode, version=""):
+        return self("pip_list", project_id)
+
+
+class TestHttpStorage(unittest.TestCase):
+    def setUp(self):
+        self.gateway = FakeGateway()
+        self.storage = HttpStorage(SimpleNamespace(conf=SimpleNamespace(gateway_port=0, storage_max_workers=4)))
+        self.storage.__http__ = self.gateway
+
+    def test_prefetch(self):
+        self.storage.prefetch("r1", "EDIT_PAGE", "")
+        calls = dict(self.gateway.calls)
+        self.assertEqual(calls["/api/robot/process/process-json"], 2)
+        self.assertEqual(calls["/api/robot/param/all"], 2)
+        self.assertEqual(calls["/api/robot/module/open"], 1)
+        # 所有流程用到的原子能力合并成一次请求
+        self.assertEqual(self.gateway.atom_keys, [["Dialog.message_box", "Script.process"]])
+
+        # 预取后不再请求网关
+        flow_list = self.storage.process_detail("r1", "EDIT_PAGE", "", "p1")
+        self.assertEqual(self.storage.module_detail("r1", "EDIT_PAGE", "", "m1"), "print('m1')")
+        self.storage.param_list("r1", "EDIT_PAGE", "", "p2")
+        self.storage.global_list("r1", "EDIT_PAGE", "")
+        self.assertEqual(dict(self.gateway.calls), calls)
+
+        # 合并了原子能力的完整定义, 兼容旧的key
+        self.assertEqual(flow_list[0]["title"], "title Dialog.message_box")
+        self.assertEqual(flow_list[1]["key"], "Script.process")
+
+    def test_prefetch_error(self):
+        # 预取失败不影响之后的正常获取
+        self.gateway.fail["/api/robot/module/processModuleList"] = 1
+        self.storage.prefetch("r1", "EDIT_PAGE", "")
+        self.assertEqual(len(self.storage.process_list("r1", "EDIT_PAGE", "")), 3)
+        self.assertEqual(self.gateway.calls["/api/robot/module/processModuleList"], 2)
+
+    def test_memo_copy(self):
+        res = self.storage.global_list("r1", "EDIT_PAGE", "")
+        res[0]["varValue"] = "changed"
+        res.append({})
+        self.assertEqual(
+            self.storage.global_list("r1", "EDIT_PAGE", ""), [{"varName": "a", "varValue": "1", "varType": "Str"}]
+        )
+        self.assertEqual(self.gateway.calls["/api/robot/global/all"], 1)
+
+        # 不同参数分开缓存
+        self.storage.global_list("r1", "EDIT_PAGE", "2")
+        self.assertEqual(self.gateway.calls["/api/robot/global/all"], 2)
+
+    def test_inflight_dedupe(self):
+        # 请求还没返回时, 相同的请求等待同一个结果
+        self.gateway.delay["/api/robot/global/all"] = 0.2
+        results = []
+
+        def fetch():
+            results.append(self.storage.global_list("r1", "EDIT_PAGE", ""))
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.gateway.calls["/api/robot/global/all"], 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(res == results[0] for res in results))
+        self.assertEqual(len({id(res) for res in results}), 8)
+
+    def test_inflight_error(self):
+        # 失败时等待中的调用也收到异常, 失败不缓存
+        self.gateway.delay["/api/robot/global/all"] = 0.2
+        self.gateway.fail["/api/robot/global/all"] = 1
+        errors = []
+
+        def fetch():
+            try:
+                self.storage.global_list("r1", "EDIT_PAGE", "")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(errors), 4)
+        self.assertEqual(self.gateway.calls["/api/robot/global/all"], 1)
+
+        self.gateway.delay.clear()
+        self.assertEqual(len(self.storage.global_list("r1", "EDIT_PAGE", "")), 1)
+        self.assertEqual(self.gateway.calls["/api/robot/global/all"], 2)
+
+    def test_atom_cache(self):
+        self.storage.process_detail("r1", "EDIT_PAGE", "", "p1")
+        self.storage.process_detail("r1", "EDIT_PAGE", "", "p2")
+        self.assertEqual(self.gateway.calls["/api/robot/atom/getLatestAtomsByList"], 1)
+
+
+class TestSnapshotStorage(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.inner = FakeStorage()
+        self.storage = SnapshotStorage(self.inner, self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def fetch_all(self, storage, mode="CRONTAB", version="3"):
+        return [
+            storage.process_list("r1", mode, version),
+            storage.process_detail("r1", mode, version, "p1"),
+            storage.module_detail("r1", mode, version, "m1"),
+            storage.param_list("r1", mode, version, "p1"),
+            storage.global_list("r1", mode, version),
+            storage.component_list("r1", mode, version),
+            storage.pip_list("r1", mode, version),
+        ]
+
+    def test_snapshot(self):
+        res = self.fetch_all(self.storage)
+        self.assertEqual(sum(self.inner.calls.values()), 7)
+
+        # 已发布的版本只请求一次, 重新打开后直接读快照
+        storage = SnapshotStorage(self.inner, self.path)
+        self.assertEqual(self.fetch_all(storage), res)
+        storage.prefetch("r1", "CRONTAB", "3")
+        self.assertEqual(sum(self.inner.calls.values()), 7)
+
+        # 不同的流程和版本分开保存
+        storage.process_detail("r1", "CRONTAB", "3", "p2")
+        storage.process_list("r1", "CRONTAB", "4")
+        self.assertEqual(self.inner.calls["process_detail"], 2)
+        self.assertEqual(self.inner.calls["process_list"], 2)
+
+    def test_not_published(self):
+        # 编辑中的工程和没有版本号时内容可能变化, 不使用快照
+        for mode, version in [("EDIT_PAGE", "3"), ("CRONTAB", "")]:
+            self.fetch_all(self.storage, mode, version)
+            self.fetch_all(self.storage, mode, version)
+            self.storage.prefetch("r1", mode, version)
+        self.assertEqual(self.inner.calls["process_list"], 4)
+        self.assertEqual(self.inner.calls["prefetch"], 2)
+        self.assertEqual(os.listdir(self.path), [])
+
+    def test_prefetch(self):
+        self.storage.prefetch("r1", "CRONTAB", "3")
+        self.assertEqual(self.inner.calls["prefetch"], 1)
+        self.storage.process_list("r1", "CRONTAB", "3")
+        self.storage.prefetch("r1", "CRONTAB", "3")
+        self.assertEqual(self.inner.calls["prefetch"], 1)
+
+    def test_corrupt(self):
+        res = self.storage.process_list("r1", "CRONTAB", "3")
+        with open(self.storage.__file__("r1", "CRONTAB", "3", "process_list"), "w", encoding="utf-8") as f:
+            f.write("[")
+        # 快照损坏时重新获取并覆盖
+        self.assertEqual(self.storage.process_list("r1", "CRONTAB", "3"), res)
+        self.assertEqual(self.storage.process_list("r1", "CRONTAB", "3"), res)
+        self.assertEqual(self.inner.calls["process_list"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -287,7 +287,7 @@ class PickerRequestHandler:
         """处理拾取获取数据"""
         try:
             from astronverse.locator.locator import LocatorManager
-            from astronverse.picker.utils.table_filter import (
+            from astronverse.tablefilter.table_filter import (
                 DataFilter,
                 table_json_merge_values,
             )
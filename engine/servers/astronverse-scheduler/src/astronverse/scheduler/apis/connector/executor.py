@@ -1,18 +1,22 @@
+import asyncio
 import json
 import time
 from typing import Optional, Union
 
 from astronverse.scheduler.apis.connector.terminal import Terminal
 from astronverse.scheduler.apis.response import ResCode, res_msg
+from astronverse.scheduler.config import Config
 from astronverse.scheduler.core.executor.executor import (
     ExecuteStatus,
     ProjectExecPosition,
     TaskExecuteStatus,
 )
+from astronverse.scheduler.core.executor.slots import SlotBusyError
 from astronverse.scheduler.core.svc import Svc, get_svc
 from astronverse.scheduler.logger import logger
 from astronverse.scheduler.utils.utils import EmitType, emit_to_front, get_settings
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -32,6 +36,8 @@ class ExecutorProject(BaseModel):
     run_param: str = ""  # 执行器参数
     open_virtual_desk: bool = False  # 虚拟桌面
     version: Union[int, str] = ""  # 机器人版本
+    headless: bool = False  # 无界面机器人, 可以和其他无界面机器人并发
+    priority: int = 0  # 排队优先级
 
 
 class StopTask(BaseModel):
@@ -44,6 +50,7 @@ class RobotInfo(BaseModel):
     paramJson: str = ""
     version: str = ""
     sort: int = 1
+    headless: bool = False  # 无界面机器人
 
 
 class TaskInfo(BaseModel):
@@ -56,6 +63,21 @@ class TaskInfo(BaseModel):
     mode: ProjectExecPosition = ProjectExecPosition.EDIT_PAGE
     retry_num: int = 0
     open_virtual_desk: bool = False  # 虚拟桌面
+    priority: int = 0  # 排队优先级
+    wait_timeout: Optional[float] = None  # 排队等待秒数, 为空时使用默认配置
+
+
+def queue_timeout(task_info: TaskInfo) -> float:
+    """
+    排队最长等待秒数
+
+    手动/快捷键触发的任务是交互运行, 不排队, 槽位被占用时立即失败; 其他触发方式最多等待 executor_queue_timeout 秒
+    """
+    if task_info.task_type in ["manual", "hotKey"]:
+        return 0
+    if task_info.wait_timeout is None or task_info.wait_timeout < 0:
+        return Config.executor_queue_timeout
+    return min(task_info.wait_timeout, Config.executor_queue_timeout)
 
 
 def report_task_log(svc, status: TaskExecuteStatus, task_id: str = None, task_execute_id: str = None):
@@ -96,19 +118,23 @@ def report_task_log(svc, status: TaskExecuteStatus, task_id: str = None, task_ex
 
 
 @router.post("/run_list")
-def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
+async def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
     """
     运行和启动一组工程(计划任务), 同步
+
+    槽位被占用时在调度器的运行队列中排队等待, 手动触发的任务不排队; 排队和等待运行结束时不占用请求线程
     """
-    if svc.executor_mg.status():
-        return res_msg(code=ResCode.ERR, msg="已有实例在运行，无法启动")
-    svc.terminal_task_stop = False
-    settings = get_settings()
+    # 只清除本任务上一次运行遗留的停止请求
+    svc.stop_tasks.discard(task_info.trigger_id)
+    svc.running_tasks.add(task_info.trigger_id)
+    settings = await run_in_threadpool(get_settings)
     task_executor_id = ""
     try:
-        emit_to_front(EmitType.EDIT_SHOW_HIDE, msg={"type": "hide"})
+        await run_in_threadpool(emit_to_front, EmitType.EDIT_SHOW_HIDE, msg={"type": "hide"})
 
-        task_executor_id = report_task_log(svc, TaskExecuteStatus.EXECUTING, task_info.trigger_id)
+        task_executor_id = await run_in_threadpool(
+            report_task_log, svc, TaskExecuteStatus.EXECUTING, task_info.trigger_id
+        )
         if not task_executor_id:
             raise Exception("服务日志上报异常")
 
@@ -117,13 +143,14 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
             end_time = time.time() + (task_info.timeout * 60)
 
         temp_terminal_mod = svc.terminal_mod
+        wait_timeout = queue_timeout(task_info)
 
         # 循环每个机器人
         is_cancel = False
         for r in sorted(task_info.callback_project_ids, key=lambda x: x.sort):
             is_break = False
             for t in range(task_info.retry_num + 1):
-                executor = svc.executor_mg.create(
+                executor = await svc.executor_mg.create_async(
                     task_id=task_info.trigger_id,
                     task_name=task_info.trigger_name,
                     task_exec_id=task_executor_id,
@@ -136,15 +163,18 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
                     open_virtual_desk=settings.get("open_virtual_desk", False) or task_info.open_virtual_desk,
                     version=r.version,
                     is_send_log_event=False,
+                    headless=r.headless,
+                    priority=task_info.priority,
+                    wait_timeout=wait_timeout,
                 )
                 if svc.terminal_mod:
-                    svc.executor_mg.task_trigger_status()
+                    await run_in_threadpool(svc.executor_mg.task_trigger_status)
 
                 # 检查是否运行结束
-                while svc.executor_mg.status():
-                    time.sleep(1)
+                while svc.executor_mg.is_running(executor):
+                    await asyncio.sleep(1)
                     if 0 < end_time < time.time():
-                        svc.executor_mg.close(executor)
+                        await run_in_threadpool(svc.executor_mg.close, executor)
                         raise Exception("启动失败: 运行超时")
 
                 # 检查全局状态
@@ -154,8 +184,8 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
                     is_break = True
                     break
 
-                if svc.terminal_task_stop:
-                    svc.terminal_task_stop = False
+                if task_info.trigger_id in svc.stop_tasks:
+                    svc.stop_tasks.discard(task_info.trigger_id)
                     is_cancel = True
                     is_break = True
                     break
@@ -191,49 +221,54 @@ def executor_run_list(task_info: TaskInfo, svc: Svc = Depends(get_svc)):
                 break
         # 运行成功
         if task_info.task_type in ["manual", "hotKey"]:
-            emit_to_front(EmitType.EXECUTOR_END)
+            await run_in_threadpool(emit_to_front, EmitType.EXECUTOR_END)
         if task_executor_id:
             if is_cancel:
-                report_task_log(
+                await run_in_threadpool(
+                    report_task_log,
                     svc,
                     TaskExecuteStatus.CANCEL,
                     task_info.trigger_id,
                     task_executor_id,
                 )
             else:
-                report_task_log(
+                await run_in_threadpool(
+                    report_task_log,
                     svc,
                     TaskExecuteStatus.SUCCESS,
                     task_info.trigger_id,
                     task_executor_id,
                 )
         if svc.terminal_mod:
-            svc.executor_mg.task_trigger_status()
+            await run_in_threadpool(svc.executor_mg.task_trigger_status)
         return res_msg(code=ResCode.SUCCESS, msg="运行成功", data={})
     except Exception as e:
         # 运行失败
         if task_info.task_type in ["manual", "hotKey"]:
-            emit_to_front(EmitType.EXECUTOR_END)
+            await run_in_threadpool(emit_to_front, EmitType.EXECUTOR_END)
         if task_executor_id:
-            report_task_log(
+            await run_in_threadpool(
+                report_task_log,
                 svc,
                 TaskExecuteStatus.EXEC_ERROR,
                 task_info.trigger_id,
                 task_executor_id,
             )
         if svc.terminal_mod:
-            svc.executor_mg.task_trigger_status()
+            await run_in_threadpool(svc.executor_mg.task_trigger_status)
         return res_msg(code=ResCode.SUCCESS, msg=str(e), data={})
+    finally:
+        svc.running_tasks.discard(task_info.trigger_id)
+        svc.stop_tasks.discard(task_info.trigger_id)
 
 
 @router.post("/run_sync")
-def executor_run_sync(param: ExecutorProject, svc: Svc = Depends(get_svc)):
+async def executor_run_sync(param: ExecutorProject, svc: Svc = Depends(get_svc)):
     """
     运行和启动一个工程(远程调度), 同步，并获取返回值
-    """
 
-    if svc.executor_mg.status():
-        return res_msg(code=ResCode.ERR, msg="已有实例在运行，无法启动")
+    排队和等待运行结束时不占用请求线程
+    """
 
     recording_config = {}
     try:
@@ -243,24 +278,30 @@ def executor_run_sync(param: ExecutorProject, svc: Svc = Depends(get_svc)):
         # 录制功能不影响执行器
         pass
 
-    executor = svc.executor_mg.create(
-        project_id=param.project_id,
-        project_name=param.project_name,
-        process_id=param.process_id,
-        line=param.line,
-        end_line=param.end_line,
-        debug=param.debug,
-        exec_position=param.exec_position,
-        recording_config=recording_config,
-        hide_log_window=param.hide_log_window,
-        run_param=param.run_param,
-        open_virtual_desk=param.open_virtual_desk,
-        is_send_log_event=False,
-        version=param.version,
-    )
+    try:
+        executor = await svc.executor_mg.create_async(
+            project_id=param.project_id,
+            project_name=param.project_name,
+            process_id=param.process_id,
+            line=param.line,
+            end_line=param.end_line,
+            debug=param.debug,
+            exec_position=param.exec_position,
+            recording_config=recording_config,
+            hide_log_window=param.hide_log_window,
+            run_param=param.run_param,
+            open_virtual_desk=param.open_virtual_desk,
+            is_send_log_event=False,
+            version=param.version,
+            headless=param.headless,
+            priority=param.priority,
+            wait_timeout=Config.executor_queue_timeout,
+        )
+    except Exception as e:
+        return res_msg(code=ResCode.ERR, msg=str(e))
     # 检查是否运行结束
-    while svc.executor_mg.status():
-        time.sleep(1)
+    while svc.executor_mg.is_running(executor):
+        await asyncio.sleep(1)
     # 检测状态
     if executor is not None:
         execute_status = executor.execute_status
@@ -284,7 +325,7 @@ def executor_run(param: ExecutorProject, svc: Svc = Depends(get_svc)):
     # 初始化
     if not param.project_id:
         return res_msg(code=ResCode.ERR, msg="工程id为空", data=None)
-    if svc.executor_mg.status():
+    if not svc.executor_mg.can_create(param.project_id, param.headless):
         return res_msg(code=ResCode.ERR, msg="已有实例在运行，无法启动")
 
     recording_config = {}
@@ -295,21 +336,27 @@ def executor_run(param: ExecutorProject, svc: Svc = Depends(get_svc)):
         # 录制功能不影响执行器
         pass
 
-    executor = svc.executor_mg.create(
-        project_id=param.project_id,
-        project_name=param.project_name,
-        process_id=param.process_id,
-        line=param.line,
-        end_line=param.end_line,
-        debug=param.debug,
-        exec_position=param.exec_position,
-        recording_config=recording_config,
-        hide_log_window=param.hide_log_window,
-        run_param=param.run_param,
-        open_virtual_desk=param.open_virtual_desk,
-        is_send_log_event=True,
-        version=param.version,
-    )
+    try:
+        executor = svc.executor_mg.create(
+            project_id=param.project_id,
+            project_name=param.project_name,
+            process_id=param.process_id,
+            line=param.line,
+            end_line=param.end_line,
+            debug=param.debug,
+            exec_position=param.exec_position,
+            recording_config=recording_config,
+            hide_log_window=param.hide_log_window,
+            run_param=param.run_param,
+            open_virtual_desk=param.open_virtual_desk,
+            is_send_log_event=True,
+            version=param.version,
+            headless=param.headless,
+            priority=param.priority,
+        )
+    except SlotBusyError:
+        # 检查之后槽位被其他请求占用
+        return res_msg(code=ResCode.ERR, msg="已有实例在运行，无法启动")
     if executor is not None:
         return res_msg(msg="启动成功", data={"addr": "ws://127.0.0.1:{}/".format(executor.exec_port)})
     else:
@@ -320,9 +367,12 @@ def executor_run(param: ExecutorProject, svc: Svc = Depends(get_svc)):
 def executor_status(svc: Svc = Depends(get_svc)):
     """
     获取执行器状态
+
+    running: 是否有实例在运行; busy: 是否已经没有空闲槽位; 以及槽位使用和排队深度
     """
     status = svc.executor_mg.status()
-    return res_msg(msg="ok", data={"running": status})
+    busy = not svc.executor_mg.can_create("", headless=True)
+    return res_msg(msg="ok", data={"running": status, "busy": busy, **svc.executor_mg.queue_status()})
 
 
 @router.post("/stop")
@@ -340,7 +390,10 @@ def executor_stop(exe_pro: ExecutorProject, svc: Svc = Depends(get_svc)):
 @router.post("/stop_list")
 def executor_stop_list(stop_info: StopTask, svc: Svc = Depends(get_svc)):
     if svc.executor_mg:
-        if (stop_info.task_id and svc.executor_mg.curr_task_id == stop_info.task_id) or (not stop_info.task_id):
-            svc.terminal_task_stop = True
+        if not stop_info.task_id:
+            svc.stop_tasks.update(svc.running_tasks)
             svc.executor_mg.close_all()  # 关闭正在进行的任务
+        elif stop_info.task_id in svc.running_tasks:
+            svc.stop_tasks.add(stop_info.task_id)
+            svc.executor_mg.close_by_task(stop_info.task_id)  # 只关闭该任务的实例
     return res_msg(msg="停止成功", data=None)
@@ -52,6 +52,7 @@ def terminal_ping(svc: Svc = Depends(get_svc)):
                     "curr_task_name": "",  # 只有curr_status为true才有效
                     "curr_project_name": "",
                     "curr_log_name": "",
+                    "curr_tasks": [],  # 正在运行的全部实例
                     "base64": "",  # 渲染图片
                 },
             )
@@ -66,7 +67,9 @@ def terminal_ping(svc: Svc = Depends(get_svc)):
 
         # 转换为base64编码
         img_base64 = base64.b64encode(img_buffer.getvalue()).decode("utf-8")
-        curr_status = svc.executor_mg.status()
+        # 可以同时运行多个实例, curr_task_* 取最近启动的一个
+        curr_tasks = svc.executor_mg.curr_tasks()
+        curr = curr_tasks[-1] if curr_tasks else {}
         return res_msg(
             code=ResCode.SUCCESS,
             msg="pong",
@@ -75,10 +78,11 @@ def terminal_ping(svc: Svc = Depends(get_svc)):
                 "height": screenshot.height,  # 屏幕高
                 "terminal_mod": svc.terminal_mod,  # 模式
                 "vnc_port": svc.vnc_server.vnc_ws_port if svc.vnc_server else "",  # 端口
-                "curr_status": svc.executor_mg.status(),  # 当前状态
-                "curr_task_name": svc.executor_mg.curr_task_name if curr_status else "",  # 只有curr_status为true才有效
-                "curr_project_name": svc.executor_mg.curr_project_name if curr_status else "",
-                "curr_log_name": svc.executor_mg.curr_log_name if curr_status else "",
+                "curr_status": bool(curr_tasks),  # 当前状态
+                "curr_task_name": curr.get("task_name", ""),  # 只有curr_status为true才有效
+                "curr_project_name": curr.get("project_name", ""),
+                "curr_log_name": curr.get("log_name", ""),
+                "curr_tasks": curr_tasks,  # 正在运行的全部实例
                 "base64": f"data:image/png;base64,{img_base64}",  # 渲染图片
             },
         )
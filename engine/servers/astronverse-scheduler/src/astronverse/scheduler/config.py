@@ -22,3 +22,12 @@ class Config:
     python_base = sys.executable
     # 虚拟环境dir
     venv_base_dir = "venvs"
+
+    # 最多同时运行的执行器数量, 只有无界面(headless)的机器人之间可以并发
+    executor_slots: int = 1
+    # 计划任务/调度任务在运行队列中的最长等待秒数, 手动触发的任务不排队
+    executor_queue_timeout: float = 600
+    # 每个虚拟环境预热的执行器进程数量, 默认 0 不预热, 在配置文件中设置 executor_pool_size 开启
+    executor_pool_size: int = 0
+    # 预热进程空闲多久后退出(秒)
+    executor_pool_idle_timeout: int = 3600
@@ -1,4 +1,6 @@
+import asyncio
 import datetime
+import functools
 import json
 import os
 import sys
@@ -12,6 +14,15 @@ from typing import Union
 
 import requests
 import websocket
+from astronverse.scheduler.config import Config
+from astronverse.scheduler.core.executor.log_upload import (
+    LogUploader,
+    inline_log,
+    log_segments,
+    summarize_log,
+)
+from astronverse.scheduler.core.executor.pool import ExecutorPool, PoolWorker
+from astronverse.scheduler.core.executor.slots import SlotBusyError, SlotManager
 from astronverse.scheduler.core.executor.virtual_desk import (
     WindowVirtualDeskSubprocessAdapter,
     virtual_desk,
@@ -108,6 +119,22 @@ def read_status(file) -> (ExecuteStatus, str):
     return ExecuteStatus.FAIL, "运行日志为空", {}
 
 
+def summary_status(summary: dict) -> (ExecuteStatus, str):
+    """
+    从日志摘要中读取执行结果
+    """
+    data = summary.get("result", None)
+    if not data:
+        return ExecuteStatus.FAIL, "运行日志为空", {}
+    try:
+        execute_status = ExecuteStatus(data.get("result"))
+    except Exception as e:
+        logger.exception("summary_status error: {}".format(e))
+        return ExecuteStatus.FAIL, "运行日志为空", {}
+    execute_reason = data.get("msg_str", "") if execute_status != ExecuteStatus.SUCCESS else ""
+    return execute_status, execute_reason, data.get("data", "")
+
+
 class Executor:
     """执行器进程 句柄"""
 
@@ -125,6 +152,8 @@ class Executor:
         open_virtual_desk: bool = False,
         version: str = "",  # 版本号
         run_param: str = "",  # 执行参数
+        headless: bool = False,  # 是否无界面, 无界面的执行器之间可以并发
+        task_name: str = "",  # 计划任务名称
     ):
         # 配置数据
         self.project_id = project_id
@@ -135,16 +164,22 @@ class Executor:
         self.recording_path = recording_path
         self.exec_position = exec_position
         self.task_id = task_id
+        self.task_name = task_name
         self.task_exec_id = task_exec_id
         self.open_virtual_desk = open_virtual_desk
         self.version = version
         self.run_param = run_param
+        self.headless = headless
+        self.slot_id = ""  # 运行槽位id
+        self.log_name = ""  # 运行日志路径
+        self.start_time = 0  # 启动时间
         # 是否需要发送日志事件
         self.is_send_log_event = True
 
         # -流程状态
         self.open_async = False  # 是否开启回收逻辑
         self.kill_time = 0  # 强杀时间 0 不强杀 >0 强杀 <0 已经强杀
+        self.kill_timer = None  # 强杀定时器
         self.report_log_time = 0  # 上报 0 没上报 > 0 上报中 <0 上报结束
         self.run_param_file = None  # run_param临时文件路径
 
@@ -153,6 +188,9 @@ class Executor:
         self.execute_reason = None  # 执行原因
         self.execute_data = None  # 执行返回数据
 
+        # -生命周期时间点 spawn/ready/exit/reaped/reported
+        self.timing = {}
+
     @property
     def ins(self):
         return self.__ins__
@@ -167,6 +205,16 @@ class Executor:
             self.__ins__.run(env=virtual_desk.env)
         else:
             self.__ins__.run()
+        self.timing["spawn"] = time.time()
+
+    def lifecycle(self) -> dict:
+        """生命周期各阶段耗时(秒)"""
+        t = self.timing
+        stages = [("ready", "spawn"), ("exit", "ready"), ("reaped", "exit"), ("reported", "reaped")]
+        res = {k: round(t[k] - t[s], 3) for k, s in stages if k in t and s in t}
+        if "spawn" in t:
+            res["total"] = round(max(t.values()) - t["spawn"], 3)
+        return res
 
     def wait_start(self, time_out=5, interval=0.1) -> bool:
         """等待进程真正启动"""
@@ -176,10 +224,12 @@ class Executor:
 
             for i in range(int(time_out / interval)):
                 if not check_port(port=self.exec_port):
+                    self.timing["ready"] = time.time()
                     return True
                 time.sleep(interval)
             return False
         elif isinstance(self.__ins__, WindowVirtualDeskSubprocessAdapter):
+            self.timing["ready"] = time.time()
             return True
         else:
             raise NotImplementedError()
@@ -224,15 +274,12 @@ class ExecutorManager:
         self.report_log_lock = threading.Lock()
         # 正在执行队列
         self.executor_list = {}
-
-        # 一些统计数据
-        self.curr_task_name = ""
-        self.curr_project_name = ""
-        self.curr_log_name = ""
-        self.curr_task_id = ""
-
-        # 异步任务处理
-        threading.Thread(target=self.async_call, daemon=True).start()
+        # 运行槽位和排队
+        self.slots = SlotManager(Config.executor_slots)
+        # 预热的执行器进程
+        self.pool = ExecutorPool(svc, Config.executor_pool_size, Config.executor_pool_idle_timeout)
+        # 大日志流式上报
+        self.log_uploader = LogUploader(svc)
 
     def create(
         self,
@@ -252,6 +299,10 @@ class ExecutorManager:
         open_virtual_desk: bool = False,  # 虚拟桌面
         version: str = "",  # 版本号
         is_send_log_event: bool = True,  # 是否需要发送日志事件
+        headless: bool = False,  # 是否无界面
+        priority: int = 0,  # 排队优先级, 越大越优先
+        wait_timeout: float = 0,  # 排队最长等待秒数, <=0 不等待
+        slot_id: str = "",  # 已经获取的运行槽位, 为空时在这里获取
     ):
         """启动一个实例"""
         executor = Executor()
@@ -259,13 +310,90 @@ class ExecutorManager:
         executor.project_name = project_name
         executor.exec_position = exec_position
         executor.task_id = task_id
+        executor.task_name = task_name
         executor.task_exec_id = task_exec_id
         executor.open_virtual_desk = open_virtual_desk
         executor.version = version
         executor.run_param = run_param
         executor.is_send_log_event = is_send_log_event
+        # 编辑页调试需要界面交互, 总是独占
+        executor.headless = headless and exec_position != ProjectExecPosition.EDIT_PAGE
 
-        # 1. 日志上报
+        # 1. 获取运行槽位, 没有空闲槽位时按优先级排队
+        if slot_id:
+            executor.slot_id = slot_id
+        else:
+            executor.slot_id = str(uuid.uuid1())
+            if not self.slots.acquire(
+                executor.slot_id, project_id, executor.headless, priority, wait_timeout, task_name=task_name
+            ):
+                raise SlotBusyError("已有实例运行，启动失败...")
+        try:
+            return self.__create__(
+                executor,
+                process_id=process_id,
+                line=line,
+                end_line=end_line,
+                debug=debug,
+                recording_config=recording_config,
+                hide_log_window=hide_log_window,
+            )
+        except Exception:
+            self.slots.release(executor.slot_id)
+            raise
+
+    async def create_async(
+        self,
+        project_id: str = "",
+        exec_position: ProjectExecPosition = ProjectExecPosition.EDIT_PAGE,
+        headless: bool = False,
+        task_name: str = "",
+        priority: int = 0,
+        wait_timeout: float = 0,
+        **kwargs,
+    ):
+        """和 create 相同, 排队等待槽位时不占用线程, 参数见 create"""
+        slot_id = str(uuid.uuid1())
+        if not await self.slots.acquire_async(
+            slot_id,
+            project_id,
+            headless and exec_position != ProjectExecPosition.EDIT_PAGE,
+            priority,
+            wait_timeout,
+            task_name=task_name,
+        ):
+            raise SlotBusyError("已有实例运行，启动失败...")
+        create = functools.partial(
+            self.create,
+            project_id=project_id,
+            exec_position=exec_position,
+            headless=headless,
+            task_name=task_name,
+            slot_id=slot_id,
+            **kwargs,
+        )
+        return await asyncio.get_running_loop().run_in_executor(None, create)
+
+    def __create__(
+        self,
+        executor: Executor,
+        process_id: str = "",
+        line: int = 1,
+        end_line: int = 0,
+        debug: str = None,
+        recording_config: dict = None,
+        hide_log_window: bool = False,
+    ):
+        project_id = executor.project_id
+        project_name = executor.project_name
+        exec_position = executor.exec_position
+        task_id = executor.task_id
+        task_exec_id = executor.task_exec_id
+        run_param = executor.run_param
+        open_virtual_desk = executor.open_virtual_desk
+        version = executor.version
+
+        # 1.1 日志上报
         if exec_position in [
             ProjectExecPosition.DISPATCH,
             ProjectExecPosition.CRONTAB,
@@ -284,15 +412,9 @@ class ExecutorManager:
         if not executor.exec_id:
             executor.exec_id = str(uuid.uuid1())
 
-        # 2. 检查是否占用
-        if self.status():
-            raise Exception("已有实例运行，启动失败...")
-
-        # 2.1 统计数据
-        self.curr_task_name = task_name
-        self.curr_task_id = task_id
-        self.curr_project_name = project_name
-        self.curr_log_name = os.path.join(r"logs", "report", executor.project_id, "{}.txt".format(executor.exec_id))
+        # 2. 统计数据, 多个执行器可以同时运行, 记录在各自的执行器上
+        executor.start_time = time.time()
+        executor.log_name = os.path.join(r"logs", "report", executor.project_id, "{}.txt".format(executor.exec_id))
 
         # 3. 获取端口
         executor.exec_port = self.svc.get_validate_port(None)
@@ -302,8 +424,14 @@ class ExecutorManager:
 
         if open_virtual_desk and sys.platform == "win32":
             ins = WindowVirtualDeskSubprocessAdapter(self.svc, exec_python=exec_python)
-        else:
+        elif open_virtual_desk:
             ins = SubPopen(name="executor", cmd=[exec_python, "-m", "astronverse.executor"])
+        else:
+            # 优先使用预热好的执行器进程, 并在后台补充
+            ins = self.pool.take(exec_python)
+            if ins is None:
+                ins = SubPopen(name="executor", cmd=[exec_python, "-m", "astronverse.executor"])
+                self.pool.warm(exec_python)
 
         ins.set_param("port", executor.exec_port)
         ins.set_param("gateway_port", self.svc.rpa_route_port)
@@ -384,12 +512,26 @@ class ExecutorManager:
             virtual_desk.start(self.svc)
 
         try:
-            executor.run()
+            try:
+                executor.run()
+            except Exception as e:
+                if not isinstance(ins, PoolWorker):
+                    raise
+                # 预热进程分配失败, 冷启动
+                logger.warning("executor pool assign error: {}, fallback".format(e))
+                ins.kill()
+                cold = SubPopen(name="executor", cmd=[exec_python, "-m", "astronverse.executor"])
+                cold.params = ins.params
+                executor.ins = cold
+                executor.run()
         except Exception as e:
             logger.error("ExecutorManager error: {}".format(e))
+            self.slots.release(executor.slot_id)
             return None
         with self.thread_lock:
             self.executor_list[executor.exec_id] = executor
+        # 等待进程退出后立即回收
+        threading.Thread(target=self.watch, args=(executor,), daemon=True).start()
 
         # 7. 检查是否真启动完成
         if executor.wait_start(time_out=5):
@@ -401,69 +543,57 @@ class ExecutorManager:
             self.close(executor)
             return None
 
-    def async_call(self):
-        """异步任务：回收，强杀，上报等异步任务"""
-        while True:
-            time.sleep(0.1)
+    def watch(self, executor: Executor):
+        """等待进程退出(主动关闭、异常退出或用户手动关闭), 退出后立即回收"""
+        try:
+            executor.ins.wait()
+        except Exception as e:
+            logger.error("watch error: {} {}".format(executor.exec_id, e))
+        try:
+            self.reap(executor)
+        except Exception as e:
+            logger.error("reap error: {} {}".format(executor.exec_id, traceback.format_exc()))
+            with self.thread_lock:
+                self.executor_list.pop(executor.exec_id, None)
+            self.slots.release(executor.slot_id)
+
+    def reap(self, executor: Executor):
+        """回收: 取消强杀, 清理资源, 上报日志, 删除执行器"""
+
+        # 1. 进程已经结束, 取消强杀
+        executor.timing["exit"] = time.time()
+        executor.open_async = True
+        if executor.kill_timer:
+            executor.kill_timer.cancel()
+        executor.kill_time = -1
+        logger.info("step1: {}".format(executor.exec_id))
+
+        # 2. 资源清理
+        try:
+            if executor.open_virtual_desk:
+                with self.thread_lock:
+                    others = [v for k, v in self.executor_list.items() if k != executor.exec_id]
+                if not any(v.open_virtual_desk for v in others):
+                    virtual_desk.stop()
+        except Exception as e:
+            pass
+        if executor.run_param_file and os.path.exists(executor.run_param_file):
             try:
-                if len(self.executor_list) == 0:
-                    time.sleep(3)  # 执行器至少执行3s，延迟越长给其他任务更多时间
-                    continue
-
-                # 每.1秒检查一次是否进程死亡，需要回收
-                for key in list(self.executor_list.keys()):
-                    executor = self.executor_list[key]
-
-                    # 任务1：检测他的进程是否关闭(可能是主动也可能是异常关闭或用户手动关闭)，并标记需要回收，不重复标记
-                    try:
-                        if not executor.open_async and not executor.ins.is_alive():
-                            # 启动回收逻辑
-                            logger.info("step1: {}".format(executor.exec_id))
-                            executor.open_async = True
-                            continue
-                    except Exception as e:
-                        logger.errr("step1 error: {}".format(e))
-                        continue
-
-                    # 任务2: 强杀逻辑, 如果标记回收，且标记了强杀时间[大于0]，到了强杀时间就回收[强杀结束后kill_time会设置成-1]
-                    try:
-                        if executor.open_async and 0 < executor.kill_time <= time.time():
-                            logger.info("step2: {} {}".format(executor.exec_id, executor.kill_time))
-                            executor.kill()
-                    except Exception as e:
-                        logger.errr("step2 error: {}".format(e))
-                        continue
-
-                    # 任务3: 日志上报，如果标记回收，没有标记强杀时间，或已经被强杀了，所有尘埃落地后，去上报状态，并标记上报状态 上报 0 没上报 > 0 上报中 <0 上报结束
-                    try:
-                        if executor.open_async and executor.kill_time <= 0 and executor.report_log_time == 0:
-                            logger.info("step3: {}".format(executor.exec_id))
-                            self.report_app_log(executor)
-                    except Exception as e:
-                        logger.errr("step3 error: {} ".format(e))
-                        continue
-
-                    # 任务4: 全部完成，上报也结束后，删除执行器
-                    try:
-                        if executor.open_async and executor.kill_time <= 0 and executor.report_log_time < 0:
-                            logger.info("step4: {}".format(executor.exec_id))
-                            try:
-                                if executor.open_virtual_desk:
-                                    virtual_desk.stop()
-                            except Exception as e:
-                                pass
-                            if executor.run_param_file and os.path.exists(executor.run_param_file):
-                                try:
-                                    os.remove(executor.run_param_file)
-                                except Exception:
-                                    pass
-                            del self.executor_list[executor.exec_id]
-                    except Exception as e:
-                        logger.info("step4 error: {}".format(e))
-                        continue
-            except Exception as e:
-                logger.error("async_call error: {} {}".format(e, traceback.format_exc()))
+                os.remove(executor.run_param_file)
+            except Exception:
                 pass
+        executor.timing["reaped"] = time.time()
+
+        # 3. 日志上报
+        logger.info("step3: {}".format(executor.exec_id))
+        self.report_app_log(executor)
+        executor.timing["reported"] = time.time()
+
+        # 4. 全部完成，上报也结束后，删除执行器
+        logger.info("step4: {} lifecycle: {}".format(executor.exec_id, executor.lifecycle()))
+        with self.thread_lock:
+            self.executor_list.pop(executor.exec_id, None)
+        self.slots.release(executor.slot_id)
 
     def close(self, executor: Executor):
         """用户主动结束, 不包括进程自己关闭"""
@@ -472,9 +602,21 @@ class ExecutorManager:
         try:
             executor.close()  # 用户主动结束
             executor.open_async = True  # 再设置他关闭状态
+            if executor.kill_time > 0 and executor.kill_timer is None:
+                # 到强杀时间还没退出就强杀, 退出后定时器会被取消
+                executor.kill_timer = threading.Timer(max(0.0, executor.kill_time - time.time()), executor.kill)
+                executor.kill_timer.daemon = True
+                executor.kill_timer.start()
         except Exception as e:
             logger.exception("close error: {}".format(e))
 
+    def close_by_task(self, task_id: str):
+        """关闭某个计划任务下正在运行的实例"""
+        for _, v in list(self.executor_list.items()):
+            if v.task_id == task_id:
+                self.close(v)
+        return True
+
     def close_by_project(self, project_id: int):
         """用户主动结束, 不包括进程自己关闭"""
         if len(self.executor_list) > 0:
@@ -498,6 +640,36 @@ class ExecutorManager:
                 return False
         return True
 
+    def curr_tasks(self) -> list:
+        """正在运行的实例信息, 按启动时间排序"""
+        with self.thread_lock:
+            executors = sorted(self.executor_list.values(), key=lambda v: v.start_time)
+        return [
+            {
+                "task_id": v.task_id,
+                "task_name": v.task_name,
+                "project_id": v.project_id,
+                "project_name": v.project_name,
+                "log_name": v.log_name,
+            }
+            for v in executors
+        ]
+
+    def is_running(self, executor: Executor) -> bool:
+        """某个实例是否还没有回收完成"""
+        return executor is not None and executor.exec_id in self.executor_list
+
+    def can_create(self, project_id: str, headless: bool = False) -> bool:
+        """是否可以不排队立即启动"""
+        return self.slots.can_acquire(project_id, headless)
+
+    def queue_status(self) -> dict:
+        """运行槽位和排队状态, 以及运行中实例的生命周期耗时"""
+        res = self.slots.status()
+        with self.thread_lock:
+            res["executors"] = {k: v.lifecycle() for k, v in self.executor_list.items()}
+        return res
+
     def task_trigger_status(self):
         """通知触发"""
 
@@ -580,19 +752,25 @@ class ExecutorManager:
                         },
                     )
 
-                # 2.3 读取日志
-                log_path_size = os.path.getsize(log_file)
+                # 2.3 读取日志, 包括滚动出去的分段
+                log_files = log_segments(log_file)
+                log_path_size = sum(os.path.getsize(f) for f in log_files)
                 if log_path_size < 10 * 1024 * 1024:
-                    # 小于10M的才读取
-                    with open(log_file, encoding="utf-8") as f:
-                        log_content = f.readlines()
-                    log_content = [json.loads(item.strip()) for item in log_content]
-                    log_content = json.dumps(log_content)
+                    # 小于10M的直接上报
+                    log_content = inline_log(log_files)
+                    execute_status, execute_reason, execute_data = read_status(log_file)
                 else:
-                    logger.warning(f"{log_file} size is {log_path_size / (10 * 1024 * 1024)}, will ignore report.")
-
-                # 2.4 状态收集
-                execute_status, execute_reason, execute_data = read_status(log_file)
+                    # 大日志只上报摘要, 原始日志压缩后分块流式上报
+                    summary = summarize_log(log_files)
+                    log_content = json.dumps(summary["events"], ensure_ascii=False)
+                    execute_status, execute_reason, execute_data = summary_status(summary)
+                    logger.info(f"{log_file} size is {log_path_size}, lines {summary['total']}, upload by stream.")
+                    if executor.exec_position in [
+                        ProjectExecPosition.CRONTAB,
+                        ProjectExecPosition.DISPATCH,
+                        ProjectExecPosition.EXECUTOR,
+                    ]:
+                        self.log_uploader.submit(executor.project_id, executor.exec_id, log_files)
 
             # 3. 视频路径收集
             video_path = os.path.join(
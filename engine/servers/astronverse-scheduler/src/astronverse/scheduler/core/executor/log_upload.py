@@ -0,0 +1,227 @@
+import glob
+import gzip
+import json
+import os
+import re
+import threading
+from collections import deque
+
+import requests
+from astronverse.scheduler.logger import logger
+
+
+def log_segments(log_file: str) -> list:
+    """
+    运行日志的全部分段, 按写入顺序返回
+
+    执行器日志超过大小后会滚动成 {exec_id}.1.txt, {exec_id}.2.txt ..., 最新的日志始终在 {exec_id}.txt
+    """
+    name, ext = os.path.splitext(log_file)
+    pattern = re.compile(r"^{}\.(\d+){}$".format(re.escape(os.path.basename(name)), re.escape(ext)))
+    segments = []
+    for path in glob.glob("{}.*{}".format(glob.escape(name), ext)):
+        match = pattern.match(os.path.basename(path))
+        if match:
+            segments.append((int(match.group(1)), path))
+    res = [path for _, path in sorted(segments)]
+    if os.path.exists(log_file):
+        res.append(log_file)
+    return res
+
+
+def iter_lines(files: list):
+    """逐行读取多个文件, 不把文件整体读入内存"""
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def inline_log(files: list) -> str:
+    """
+    小日志直接拼成json数组上报
+
+    日志每一行已经是json, 直接拼接, 不再逐行loads/dumps; 进程异常退出时可能残留的半行会被丢弃
+    """
+    return "[{}]".format(",".join(line for line in iter_lines(files) if line.startswith("{") and line.endswith("}")))
+
+
+def summarize_log(files: list, last_n: int = 200, max_errors: int = 100) -> dict:
+    """
+    单次遍历计算日志摘要: 执行结果, 错误行, 最后N条日志
+
+    只对可能包含结果或错误的行做json解析
+    """
+    last = deque(maxlen=last_n)
+    errors = []
+    result = None
+    total = 0
+    for line in iter_lines(files):
+        total += 1
+        last.append(line)
+        if '"error"' not in line and '"result"' not in line:
+            continue
+        try:
+            item = json.loads(line)
+        except Exception:
+            continue
+        data = item.get("data", {})
+        if data.get("result", None) is not None:
+            result = data
+        if data.get("log_level") == "error" and len(errors) < max_errors:
+            errors.append(line)
+
+    # 错误行和最后N条合并, 去重且保持顺序
+    events = []
+    seen = set()
+    for line in errors + list(last):
+        if line in seen:
+            continue
+        seen.add(line)
+        try:
+            events.append(json.loads(line))
+        except Exception:
+            continue
+    return {"total": total, "result": result, "events": events}
+
+
+class LogUploader:
+    """
+    运行日志流式上报
+
+    1. 大日志按块读取原始jsonl, gzip压缩后分块上传网关, 每块成功后记录字节偏移
+    2. 上传任务和偏移持久化到本地spool目录, 调度器重启后从上次的偏移继续
+    3. 依赖 robot-service 的 /robot-record/upload-log 接口
+    """
+
+    api = "/api/robot/robot-record/upload-log"
+    chunk_size = 1024 * 1024
+    retry_interval = 10
+    max_retry = 30
+
+    def __init__(self, svc, spool_path: str = os.path.join("logs", "report_spool")):
+        self.svc = svc
+        self.spool_path = spool_path
+        self.lock = threading.Lock()
+        self.event = threading.Event()
+        self.session = requests.Session()
+        threading.Thread(target=self.loop, daemon=True).start()
+
+    def submit(self, project_id: str, exec_id: str, files: list):
+        """添加上传任务"""
+        os.makedirs(self.spool_path, exist_ok=True)
+        job = {
+            "project_id": project_id,
+            "exec_id": exec_id,
+            "files": files,
+            "size": sum(os.path.getsize(f) for f in files),
+            "offset": 0,
+            "retry": 0,
+        }
+        self.__save__(job)
+        self.event.set()
+
+    def __job_path__(self, exec_id: str) -> str:
+        return os.path.join(self.spool_path, "{}.json".format(exec_id))
+
+    def __save__(self, job: dict):
+        path = self.__job_path__(job["exec_id"])
+        tmp_path = "{}.tmp".format(path)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def __remove__(self, job: dict):
+        try:
+            os.remove(self.__job_path__(job["exec_id"]))
+        except Exception:
+            pass
+
+    def loop(self):
+        while True:
+            self.event.wait(self.retry_interval)
+            self.event.clear()
+            if not os.path.exists(self.spool_path):
+                continue
+            for path in glob.glob(os.path.join(self.spool_path, "*.json")):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        job = json.load(f)
+                except Exception as e:
+                    logger.warning("log upload spool broken {}: {}".format(path, e))
+                    try:
+                        os.remove(path)
+                    except Exception as e:
+                        logger.warning("log upload spool remove error {}: {}".format(path, e))
+                    continue
+                with self.lock:
+                    self.upload(job)
+
+    def __read__(self, files: list, offset: int, size: int) -> bytes:
+        """从多个分段拼接的字节流中读取 [offset, offset+size)"""
+        buf = bytearray()
+        for path in files:
+            file_size = os.path.getsize(path)
+            if offset >= file_size:
+                offset -= file_size
+                continue
+            with open(path, "rb") as f:
+                f.seek(offset)
+                buf += f.read(size - len(buf))
+            offset = 0
+            if len(buf) >= size:
+                break
+        return bytes(buf)
+
+    def upload(self, job: dict) -> bool:
+        """上传一个任务, 失败时保留偏移等待下次重试"""
+        if not all(os.path.exists(f) for f in job["files"]):
+            logger.warning("log upload file missing, drop: {}".format(job["exec_id"]))
+            self.__remove__(job)
+            return False
+
+        url = "http://127.0.0.1:{}{}".format(self.svc.rpa_route_port, self.api)
+        try:
+            while job["offset"] < job["size"]:
+                chunk = self.__read__(job["files"], job["offset"], self.chunk_size)
+                if not chunk:
+                    break
+                final = job["offset"] + len(chunk) >= job["size"]
+                response = self.session.post(
+                    url=url,
+                    params={
+                        "robotId": job["project_id"],
+                        "executeId": job["exec_id"],
+                        "offset": job["offset"],
+                        "size": job["size"],
+                        "final": int(final),
+                    },
+                    data=gzip.compress(chunk),
+                    headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+                    timeout=30,
+                )
+                if response.status_code != 200:
+                    raise Exception("upload error status_code: {}".format(response.status_code))
+
+                res = response.json()
+                if res.get("code") != "000000":
+                    raise Exception("upload error: {}".format(res.get("message")))
+
+                # 服务端返回已接收的偏移, 偏移不一致时从该位置重传
+                job["offset"] = int(res.get("data", {}).get("offset", job["offset"] + len(chunk)))
+                job["retry"] = 0
+                self.__save__(job)
+            self.__remove__(job)
+            logger.info("log upload done: {} {}".format(job["exec_id"], job["size"]))
+            return True
+        except Exception as e:
+            job["retry"] += 1
+            if job["retry"] >= self.max_retry:
+                logger.error("log upload failed, drop: {} {}".format(job["exec_id"], e))
+                self.__remove__(job)
+            else:
+                logger.warning("log upload error, retry later: {} {} {}".format(job["exec_id"], job["offset"], e))
+                self.__save__(job)
+            return False
@@ -0,0 +1,103 @@
+import json
+import os
+import socket
+import threading
+from typing import Optional
+
+from astronverse.scheduler.logger import logger
+from astronverse.scheduler.utils.subprocess import SubPopen
+from astronverse.scheduler.utils.utils import check_port
+
+
+class PoolWorker(SubPopen):
+    """
+    预热的执行器进程
+
+    提前启动并导入依赖, run 时不再创建进程, 而是通过本地端口把启动参数发送给已经启动的进程
+    """
+
+    def __init__(self, exec_python: str, assign_port: int, idle_timeout: int):
+        super().__init__(name="executor_worker", cmd=[exec_python, "-m", "astronverse.executor.worker"])
+        self.exec_python = exec_python
+        self.assign_port = assign_port
+        self.idle_timeout = idle_timeout
+
+    def spawn(self):
+        """启动预热进程"""
+        self.params = {"assign_port": self.assign_port, "idle_timeout": self.idle_timeout, "parent_pid": os.getpid()}
+        SubPopen.run(self)
+        self.params = {}
+
+    def is_ready(self) -> bool:
+        """依赖导入完成, 已经在等待分配"""
+        return self.is_alive() and not check_port(port=self.assign_port)
+
+    def run(self, *args, **kwargs) -> "PoolWorker":
+        """分配任务"""
+        with socket.create_connection(("127.0.0.1", self.assign_port), timeout=5) as conn:
+            f = conn.makefile("rwb")
+            f.write(json.dumps(self.params, ensure_ascii=False).encode("utf-8") + b"\n")
+            f.flush()
+            if f.readline().strip() != b"ok":
+                raise Exception("executor worker assign failed")
+        return self
+
+
+class ExecutorPool:
+    """
+    执行器预热进程池
+
+    每个虚拟环境(python解释器)保留 size 个已经导入依赖的执行器进程, 启动机器人时直接分配, 用掉后在后台补充
+    """
+
+    def __init__(self, svc, size: int = 0, idle_timeout: int = 3600):
+        self.svc = svc
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.idle = {}  # exec_python -> [PoolWorker]
+
+    def warm(self, exec_python: str):
+        """后台补充预热进程"""
+        if self.size <= 0:
+            return
+        threading.Thread(target=self.__fill__, args=(exec_python,), daemon=True).start()
+
+    def __fill__(self, exec_python: str):
+        with self.lock:
+            workers = [w for w in self.idle.get(exec_python, []) if w.is_alive()]
+            self.idle[exec_python] = workers
+            need = self.size - len(workers)
+            for _ in range(need):
+                try:
+                    worker = PoolWorker(exec_python, self.svc.get_validate_port(None), self.idle_timeout)
+                    worker.spawn()
+                    workers.append(worker)
+                except Exception as e:
+                    logger.error("executor pool spawn error: {}".format(e))
+                    break
+
+    def take(self, exec_python: str) -> Optional[PoolWorker]:
+        """取出一个已经就绪的预热进程, 没有时返回None"""
+        if self.size <= 0:
+            return None
+        res = None
+        with self.lock:
+            workers = self.idle.get(exec_python, [])
+            for worker in list(workers):
+                if not worker.is_alive():
+                    workers.remove(worker)
+                elif worker.is_ready():
+                    workers.remove(worker)
+                    res = worker
+                    break
+        self.warm(exec_python)
+        return res
+
+    def close(self):
+        """关闭所有空闲的预热进程"""
+        with self.lock:
+            for workers in self.idle.values():
+                for worker in workers:
+                    worker.kill()
+            self.idle = {}
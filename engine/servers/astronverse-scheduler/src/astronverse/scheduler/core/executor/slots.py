@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import threading
+import time
+
+
+class SlotBusyError(Exception):
+    """等待超时仍没有空闲槽位"""
+
+
+class SlotTicket:
+    """运行队列中的一个排队请求"""
+
+    def __init__(self, seq: int, project_id: str, headless: bool, priority: int, task_name: str = ""):
+        self.seq = seq
+        self.project_id = project_id
+        self.headless = headless
+        self.priority = priority
+        self.task_name = task_name
+        self.enqueue_time = time.time()
+        # 异步排队时用于唤醒
+        self.loop = None
+        self.event = None
+
+    def sort_key(self):
+        return -self.priority, self.seq
+
+    def __json__(self):
+        return {
+            "project_id": self.project_id,
+            "headless": self.headless,
+            "priority": self.priority,
+            "task_name": self.task_name,
+            "wait": round(time.time() - self.enqueue_time, 3),
+        }
+
+
+class SlotManager:
+    """
+    执行器槽位和运行队列
+
+    1. 最多同时运行 slots 个执行器, 同一个机器人同时只能运行一个
+    2. 需要界面的执行器独占整个机器, 只有无界面(headless)的执行器之间可以并发
+    3. 排队按优先级高到低、先到先得; 排在前面的独占请求会挡住后面的请求, 避免被饿死
+    """
+
+    def __init__(self, slots: int = 1):
+        self.slots = max(1, slots)
+        self.cond = threading.Condition()
+        self.seq = itertools.count()
+        self.running = {}  # exec_id -> SlotTicket
+        self.waiting = []  # SlotTicket, 按 sort_key 排序
+
+    def __can_run__(self, ticket: SlotTicket) -> bool:
+        if len(self.running) >= self.slots:
+            return False
+        for v in self.running.values():
+            if v.project_id == ticket.project_id:
+                return False
+            if not v.headless or not ticket.headless:
+                return False
+        return True
+
+    def __is_turn__(self, ticket: SlotTicket) -> bool:
+        for v in self.waiting:
+            if v is ticket:
+                return True
+            if not v.headless or v.project_id == ticket.project_id:
+                # 前面还有独占或同机器人的请求在等待
+                return False
+        return True
+
+    def __notify__(self):
+        """唤醒所有排队的请求, 调用时需持有 cond"""
+        self.cond.notify_all()
+        for v in self.waiting:
+            if v.loop is not None:
+                v.loop.call_soon_threadsafe(v.event.set)
+
+    def can_acquire(self, project_id: str, headless: bool = False) -> bool:
+        """当前是否可以立刻运行, 不占用槽位"""
+        with self.cond:
+            ticket = SlotTicket(-1, project_id, headless, 0)
+            return not self.waiting and self.__can_run__(ticket)
+
+    def acquire(
+        self, exec_id: str, project_id: str, headless: bool = False, priority: int = 0, timeout: float = 0, task_name=""
+    ) -> bool:
+        """
+        获取槽位, 超时返回False
+
+        timeout: 最长等待秒数, <=0 不等待
+        """
+        with self.cond:
+            ticket = SlotTicket(next(self.seq), project_id, headless, priority, task_name)
+            self.waiting.append(ticket)
+            self.waiting.sort(key=SlotTicket.sort_key)
+            end_time = time.time() + timeout
+            try:
+                while not (self.__is_turn__(ticket) and self.__can_run__(ticket)):
+                    remaining = end_time - time.time()
+                    if remaining <= 0:
+                        return False
+                    self.cond.wait(remaining)
+                self.running[exec_id] = ticket
+                return True
+            finally:
+                self.waiting.remove(ticket)
+                self.__notify__()
+
+    async def acquire_async(
+        self, exec_id: str, project_id: str, headless: bool = False, priority: int = 0, timeout: float = 0, task_name=""
+    ) -> bool:
+        """和 acquire 相同, 排队时不占用线程"""
+        with self.cond:
+            ticket = SlotTicket(next(self.seq), project_id, headless, priority, task_name)
+            ticket.loop = asyncio.get_running_loop()
+            ticket.event = asyncio.Event()
+            self.waiting.append(ticket)
+            self.waiting.sort(key=SlotTicket.sort_key)
+        end_time = time.time() + timeout
+        try:
+            while True:
+                with self.cond:
+                    if self.__is_turn__(ticket) and self.__can_run__(ticket):
+                        self.running[exec_id] = ticket
+                        return True
+                    ticket.event.clear()
+                remaining = end_time - time.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(ticket.event.wait(), remaining)
+                except TimeoutError:
+                    pass
+        finally:
+            with self.cond:
+                self.waiting.remove(ticket)
+                self.__notify__()
+
+    def release(self, exec_id: str):
+        with self.cond:
+            if self.running.pop(exec_id, None) is not None:
+                self.__notify__()
+
+    def status(self) -> dict:
+        with self.cond:
+            return {
+                "slots": self.slots,
+                "used": len(self.running),
+                "queue_depth": len(self.waiting),
+                "running": {k: v.__json__() for k, v in self.running.items()},
+                "waiting": [v.__json__() for v in self.waiting],
+            }
@@ -158,6 +158,11 @@ class WindowVirtualDeskSubprocessAdapter:
             self.live_cache = False
         return self.live_cache
 
+    def wait(self, interval=1):
+        """等待虚拟桌面中的任务结束, 只能通过接口轮询"""
+        while self.is_alive():
+            time.sleep(interval)
+
     def kill(self):
         try:
             logger.info("检查虚拟桌面任务关闭")
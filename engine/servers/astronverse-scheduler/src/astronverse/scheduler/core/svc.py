@@ -60,7 +60,9 @@ class Svc:
 
         # 是否是终端模式
         self.terminal_mod = False
-        self.terminal_task_stop = False
+        # 正在运行的计划任务id, 以及收到停止请求的计划任务id, 每个任务只检查和清除自己的停止请求
+        self.running_tasks = set()
+        self.stop_tasks = set()
 
         # 是否是在虚拟环境中运行[虚拟环境中运行，执行器不会创建虚拟环境]
         self.is_venv = False
@@ -71,6 +73,11 @@ class Svc:
     def set_config(self, config):
         self.config = config
         self.is_venv = True if "venv" in self.config.python_base else False
+        self.executor_mg.slots.slots = max(1, self.config.executor_slots)
+        self.executor_mg.pool.size = self.config.executor_pool_size
+        if self.is_venv and self.config.executor_pool_size > 0:
+            # 开启预热时, 所有工程共用一个解释器, 启动时就预热
+            self.executor_mg.pool.warm(self.config.python_base)
         self.picker.init()
 
     def get_validate_port(self, component_type: ComponentType = None) -> int:
@@ -44,6 +44,8 @@ def start():
 
         Config.conf_file = conf_path
         Config.remote_addr = conf_data.get("remote_addr")
+        Config.executor_slots = int(conf_data.get("executor_slots", Config.executor_slots))
+        Config.executor_pool_size = int(conf_data.get("executor_pool_size", Config.executor_pool_size))
         svc = get_svc()
         svc.set_config(Config)
 
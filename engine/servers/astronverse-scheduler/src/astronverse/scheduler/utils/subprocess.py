@@ -172,6 +172,13 @@ class SubPopen:
         """
         return self.proc is not None and self.proc.poll() is None
 
+    def wait(self, timeout=None):
+        """
+        阻塞等待子进程退出
+        """
+        if self.proc is not None:
+            return self.proc.wait(timeout=timeout)
+
     def kill(self):
         if self.proc:
             try:
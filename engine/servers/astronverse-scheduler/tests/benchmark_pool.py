@@ -0,0 +1,65 @@
+"""
+执行器冷启动和预热进程池的启动耗时对比
+
+两种方式都用 --help 让执行器解析完参数后立即退出, 只比较"收到启动请求 -> 进入执行器入口"的耗时
+运行: python tests/benchmark_pool.py [次数] [python解释器]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+from astronverse.scheduler.core.executor.pool import PoolWorker
+from astronverse.scheduler.utils.utils import check_port
+
+
+def free_port(start: int = 23158) -> int:
+    port = start
+    while not check_port(port):
+        port += 1
+    return port
+
+
+def cold(exec_python: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [exec_python, "-m", "astronverse.executor", "--help"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def pooled(exec_python: str, port: int) -> float:
+    worker = PoolWorker(exec_python, port, idle_timeout=60)
+    worker.spawn()
+    while not worker.is_ready():
+        if not worker.is_alive():
+            raise Exception("executor worker exited")
+        time.sleep(0.01)
+
+    start = time.perf_counter()
+    worker.set_param("help", "")
+    worker.run()
+    worker.wait()
+    return time.perf_counter() - start
+
+
+def main(number: int = 10, exec_python: str = sys.executable):
+    cold_times = [cold(exec_python) for _ in range(number)]
+    pooled_times = [pooled(exec_python, free_port(23158 + i)) for i in range(number)]
+
+    for name, times in [("cold", cold_times), ("pooled", pooled_times)]:
+        print(
+            "{:8s} median {:8.1f}ms  min {:8.1f}ms  max {:8.1f}ms".format(
+                name, statistics.median(times) * 1000, min(times) * 1000, max(times) * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 10,
+        sys.argv[2] if len(sys.argv) > 2 else sys.executable,
+    )
@@ -0,0 +1,201 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.scheduler.core.executor import pool
+from astronverse.scheduler.core.executor.pool import ExecutorPool, PoolWorker
+from astronverse.scheduler.utils.utils import check_port
+
+# 模拟预热进程: 按 astronverse.executor.worker 的协议等待分配, 把收到的参数写到文件后回复
+WORKER = """
+import argparse, json, socket, sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--assign_port", type=int)
+parser.add_argument("--reply", default="ok")
+parser.add_argument("--output")
+args, _ = parser.parse_known_args()
+server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+if sys.platform != "win32":
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+server.bind(("127.0.0.1", args.assign_port))
+server.listen(1)
+server.settimeout(30)
+while True:
+    conn, _ = server.accept()
+    f = conn.makefile("rwb")
+    line = f.readline().strip()
+    if line:
+        break
+with open(args.output, "w", encoding="utf-8") as out:
+    out.write(line.decode("utf-8"))
+f.write(args.reply.encode("utf-8") + b"\\n")
+f.flush()
+conn.close()
+"""
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("scheduler")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def free_port(start: int = 23258) -> int:
+    port = start
+    while not check_port(port):
+        port += 1
+    return port
+
+
+class FakeWorker:
+    """预热进程的替身, 记录启动和关闭"""
+
+    spawn_error = False
+
+    def __init__(self, exec_python="python", assign_port=0, idle_timeout=0, alive=True, ready=True):
+        self.exec_python = exec_python
+        self.assign_port = assign_port
+        self.alive = alive
+        self.ready = ready
+        self.spawned = False
+
+    def spawn(self):
+        if FakeWorker.spawn_error:
+            raise Exception("spawn error")
+        self.spawned = True
+
+    def is_alive(self):
+        return self.alive
+
+    def is_ready(self):
+        return self.alive and self.ready
+
+    def kill(self):
+        self.alive = False
+
+
+class TestExecutorPool(unittest.TestCase):
+    def setUp(self):
+        self.ports = iter(range(30000, 31000))
+        self.svc = SimpleNamespace(get_validate_port=lambda _: next(self.ports))
+        FakeWorker.spawn_error = False
+
+    def test_disabled(self):
+        # 默认不预热, 不启动任何进程
+        executor_pool = ExecutorPool(self.svc, size=0)
+        with mock.patch.object(pool, "PoolWorker", FakeWorker):
+            executor_pool.warm("python")
+            self.assertIsNone(executor_pool.take("python"))
+        self.assertEqual(executor_pool.idle, {})
+
+    def test_take(self):
+        executor_pool = ExecutorPool(self.svc, size=3)
+        warmed = []
+        executor_pool.warm = warmed.append
+        dead = FakeWorker(alive=False)
+        starting = FakeWorker(ready=False)
+        ready = FakeWorker()
+        executor_pool.idle["python"] = [dead, starting, ready]
+
+        # 取出就绪的进程, 去掉已经退出的, 还在启动的继续保留, 并在后台补充
+        self.assertIs(executor_pool.take("python"), ready)
+        self.assertEqual(executor_pool.idle["python"], [starting])
+        self.assertEqual(warmed, ["python"])
+
+        # 没有就绪的进程时返回None, 由调用方冷启动
+        self.assertIsNone(executor_pool.take("python"))
+        self.assertIsNone(executor_pool.take("other"))
+        self.assertEqual(warmed, ["python", "python", "other"])
+
+    def test_fill(self):
+        executor_pool = ExecutorPool(self.svc, size=2)
+        with mock.patch.object(pool, "PoolWorker", FakeWorker):
+            executor_pool.__fill__("python")
+            workers = list(executor_pool.idle["python"])
+            self.assertEqual(len(workers), 2)
+            self.assertTrue(all(w.spawned for w in workers))
+            self.assertEqual(len({w.assign_port for w in workers}), 2)
+
+            # 已满时不再启动, 退出的进程被替换
+            executor_pool.__fill__("python")
+            self.assertEqual(executor_pool.idle["python"], workers)
+            workers[0].alive = False
+            executor_pool.__fill__("python")
+            self.assertEqual(len(executor_pool.idle["python"]), 2)
+            self.assertNotIn(workers[0], executor_pool.idle["python"])
+
+            # 启动失败时停止补充, 不影响调用方
+            FakeWorker.spawn_error = True
+            executor_pool.__fill__("other")
+            self.assertEqual(executor_pool.idle["other"], [])
+
+        executor_pool.close()
+        self.assertFalse(any(w.alive for w in workers))
+        self.assertEqual(executor_pool.idle, {})
+
+
+class TestPoolWorker(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.script = os.path.join(self.path, "worker.py")
+        self.output = os.path.join(self.path, "params.json")
+        with open(self.script, "w", encoding="utf-8") as f:
+            f.write(WORKER)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def spawn(self, reply: str = "ok") -> PoolWorker:
+        worker = PoolWorker(sys.executable, free_port(), idle_timeout=60)
+        worker.cmd = [sys.executable, self.script, "--reply={}".format(reply), "--output={}".format(self.output)]
+        worker.spawn()
+        # SubPopen.kill 只结束运行目录下的进程, 这里直接结束
+        self.addCleanup(worker.proc.wait)
+        self.addCleanup(worker.proc.kill)
+        for _ in range(500):
+            if worker.is_ready():
+                break
+            self.assertTrue(worker.is_alive())
+            time.sleep(0.01)
+        self.assertTrue(worker.is_ready())
+        # 启动参数不带到分配阶段
+        self.assertEqual(worker.params, {})
+        return worker
+
+    def test_assign(self):
+        worker = self.spawn()
+        worker.set_param("port", 13160)
+        worker.set_param("project_id", "中文")
+        self.assertIs(worker.run(), worker)
+        worker.wait(timeout=10)
+        with open(self.output, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), {"port": 13160, "project_id": "中文"})
+
+    def test_assign_fail(self):
+        # 没有收到确认时抛出异常, 由调用方改为冷启动
+        worker = self.spawn(reply="no")
+        worker.set_param("port", 13160)
+        with self.assertRaises(Exception):
+            worker.run()
+
+
+if __name__ == "__main__":
+    unittest.main()
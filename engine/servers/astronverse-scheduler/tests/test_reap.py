@@ -0,0 +1,108 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.scheduler.core.executor.executor import Executor, ExecutorManager
+from astronverse.scheduler.core.executor.slots import SlotManager
+from astronverse.scheduler.utils.subprocess import SubPopen
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("scheduler")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+class TestReap(unittest.TestCase):
+    def setUp(self):
+        self.manager = ExecutorManager(SimpleNamespace())
+        self.manager.slots = SlotManager(1)
+
+    def start(self, seconds: float) -> Executor:
+        """模拟 __create__ 启动一个运行 seconds 秒后退出的进程, 并开始监听退出"""
+        ins = SubPopen(name="executor", cmd=[sys.executable, "-c", "import time; time.sleep({})".format(seconds)])
+        executor = Executor(project_id="p1", exec_id="e1", ins=ins)
+        executor.is_send_log_event = False
+        executor.slot_id = "s1"
+        self.assertTrue(self.manager.slots.acquire(executor.slot_id, executor.project_id))
+        executor.run()
+        self.manager.executor_list[executor.exec_id] = executor
+        threading.Thread(target=self.manager.watch, args=(executor,), daemon=True).start()
+        return executor
+
+    def wait_reaped(self, executor: Executor, timeout: float = 10):
+        end_time = time.time() + timeout
+        while self.manager.is_running(executor):
+            if time.time() > end_time:
+                executor.ins.proc.kill()
+                self.fail("executor not reaped")
+            time.sleep(0.01)
+
+    def test_reap_on_exit(self):
+        executor = self.start(0.2)
+        fd, executor.run_param_file = tempfile.mkstemp()
+        os.close(fd)
+        self.assertTrue(self.manager.is_running(executor))
+        self.assertFalse(self.manager.can_create("p2"))
+
+        self.wait_reaped(executor)
+        # 进程退出后回收: 释放槽位, 清理临时文件, 上报日志
+        self.assertTrue(self.manager.can_create("p2"))
+        self.assertFalse(os.path.exists(executor.run_param_file))
+        self.assertEqual(executor.report_log_time, -1)
+        self.assertTrue({"spawn", "exit", "reaped", "reported"} <= set(executor.timing))
+        self.assertIn("total", executor.lifecycle())
+        # 退出后立即回收, 不需要等待轮询
+        self.assertLess(executor.timing["exit"] - executor.timing["spawn"], 5)
+        self.assertLess(executor.timing["reported"] - executor.timing["exit"], 1)
+
+    def test_cancel_kill_timer(self):
+        # 已经安排强杀的进程自己退出时取消强杀
+        executor = self.start(0.2)
+        executor.kill_time = time.time() + 60
+        executor.kill_timer = threading.Timer(60, executor.kill)
+        executor.kill_timer.daemon = True
+        executor.kill_timer.start()
+
+        self.wait_reaped(executor)
+        self.assertTrue(executor.kill_timer.finished.is_set())
+        self.assertEqual(executor.kill_time, -1)
+
+    def test_killed(self):
+        # 进程被外部关闭(如用户在任务管理器中结束)时同样回收
+        executor = self.start(60)
+        time.sleep(0.1)
+        executor.ins.proc.kill()
+        self.wait_reaped(executor)
+        self.assertTrue(self.manager.can_create("p2"))
+        self.assertFalse(executor.ins.is_alive())
+
+    def test_reap_error(self):
+        # 回收出错时也删除执行器并释放槽位
+        def report_app_log(executor):
+            raise Exception("report error")
+
+        self.manager.report_app_log = report_app_log
+        executor = self.start(0.1)
+        self.wait_reaped(executor)
+        self.assertTrue(self.manager.can_create("p2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
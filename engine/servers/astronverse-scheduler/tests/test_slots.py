@@ -0,0 +1,167 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.scheduler.core.executor.executor import ExecutorManager
+from astronverse.scheduler.core.executor.slots import SlotBusyError, SlotManager
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("scheduler")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def acquire_later(slots, exec_id, project_id, order, **kwargs):
+    """在线程中排队获取槽位, 获取成功后记录到 order"""
+
+    def run():
+        if slots.acquire(exec_id, project_id, **kwargs):
+            order.append(exec_id)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_queue(slots, depth):
+    for _ in range(100):
+        if slots.status()["queue_depth"] == depth:
+            return
+        time.sleep(0.01)
+    raise AssertionError("queue depth {} != {}".format(slots.status()["queue_depth"], depth))
+
+
+class TestSlotManager(unittest.TestCase):
+    def test_acquire_release(self):
+        slots = SlotManager(1)
+        self.assertTrue(slots.can_acquire("p1"))
+        self.assertTrue(slots.acquire("e1", "p1"))
+        self.assertFalse(slots.can_acquire("p2"))
+        self.assertFalse(slots.acquire("e2", "p2"))
+        self.assertEqual(slots.status()["used"], 1)
+
+        slots.release("e1")
+        # 重复释放没有影响
+        slots.release("e1")
+        self.assertTrue(slots.acquire("e2", "p2"))
+        self.assertEqual(list(slots.status()["running"]), ["e2"])
+
+    def test_timeout(self):
+        slots = SlotManager(1)
+        slots.acquire("e1", "p1")
+        start = time.time()
+        self.assertFalse(slots.acquire("e2", "p2", timeout=0.2))
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        # 超时后不留在队列里
+        self.assertEqual(slots.status()["queue_depth"], 0)
+
+        # 等待期间释放时立即获取
+        threading.Timer(0.1, slots.release, args=("e1",)).start()
+        start = time.time()
+        self.assertTrue(slots.acquire("e2", "p2", timeout=5))
+        self.assertLess(time.time() - start, 2)
+
+    def test_headless(self):
+        # 无界面的执行器之间可以并发, 同一个机器人不能同时运行
+        slots = SlotManager(3)
+        self.assertTrue(slots.acquire("e1", "p1", headless=True))
+        self.assertTrue(slots.acquire("e2", "p2", headless=True))
+        self.assertFalse(slots.acquire("e3", "p1", headless=True))
+        # 需要界面的执行器独占
+        self.assertFalse(slots.acquire("e3", "p3"))
+        self.assertTrue(slots.acquire("e3", "p3", headless=True))
+        self.assertFalse(slots.acquire("e4", "p4", headless=True))
+
+        slots = SlotManager(3)
+        self.assertTrue(slots.acquire("e1", "p1"))
+        self.assertFalse(slots.acquire("e2", "p2", headless=True))
+
+    def test_priority(self):
+        slots = SlotManager(1)
+        slots.acquire("e0", "p0")
+        order = []
+        threads = [acquire_later(slots, "low", "p1", order, priority=0, timeout=5)]
+        wait_queue(slots, 1)
+        threads.append(acquire_later(slots, "first", "p2", order, priority=1, timeout=5))
+        wait_queue(slots, 2)
+        threads.append(acquire_later(slots, "second", "p3", order, priority=1, timeout=5))
+        wait_queue(slots, 3)
+
+        # 优先级高的先运行, 相同优先级先到先得
+        self.assertEqual([v["project_id"] for v in slots.status()["waiting"]], ["p2", "p3", "p1"])
+        for i, exec_id in enumerate(["e0", "first", "second"]):
+            slots.release(exec_id)
+            wait_queue(slots, 2 - i)
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(order, ["first", "second", "low"])
+
+    def test_no_starve(self):
+        # 排在前面的独占请求挡住后面的无界面请求, 避免一直有无界面的请求插队
+        slots = SlotManager(2)
+        slots.acquire("e1", "p1", headless=True)
+        order = []
+        thread = acquire_later(slots, "e2", "p2", order, timeout=5)
+        wait_queue(slots, 1)
+        self.assertFalse(slots.acquire("e3", "p3", headless=True))
+        self.assertFalse(slots.can_acquire("p3", headless=True))
+
+        slots.release("e1")
+        thread.join(5)
+        self.assertEqual(order, ["e2"])
+
+    def test_acquire_async(self):
+        async def run():
+            slots = SlotManager(1)
+            self.assertTrue(await slots.acquire_async("e1", "p1"))
+            self.assertFalse(await slots.acquire_async("e2", "p2", timeout=0.1))
+
+            # 其他线程释放时唤醒事件循环里的等待
+            threading.Timer(0.1, slots.release, args=("e1",)).start()
+            self.assertTrue(await slots.acquire_async("e2", "p2", timeout=5))
+
+            # 排队时不阻塞事件循环
+            task = asyncio.ensure_future(slots.acquire_async("e3", "p3", timeout=5))
+            await asyncio.sleep(0.05)
+            self.assertEqual(slots.status()["queue_depth"], 1)
+            slots.release("e2")
+            self.assertTrue(await task)
+            self.assertEqual(slots.status()["queue_depth"], 0)
+
+        asyncio.run(run())
+
+
+class TestExecutorManagerSlots(unittest.TestCase):
+    def test_busy(self):
+        # 没有空闲槽位时抛出 SlotBusyError, 由接口返回"已有实例在运行"
+        manager = ExecutorManager(SimpleNamespace())
+        manager.slots = SlotManager(1)
+        manager.slots.acquire("e1", "p1")
+        with self.assertRaises(SlotBusyError):
+            manager.create(project_id="p2")
+        with self.assertRaises(SlotBusyError):
+            asyncio.run(manager.create_async(project_id="p2"))
+        self.assertEqual(manager.slots.status()["queue_depth"], 0)
+        self.assertEqual(list(manager.slots.status()["running"]), ["e1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -78,6 +78,8 @@ class QueueConfigInput(BaseModel):
     max_length: int
     max_wait_minutes: int
     deduplicate: bool
+    retry_interval: Optional[int] = None  # 下发失败后首次重试间隔（秒），为空时不修改
+    retry_max_interval: Optional[int] = None  # 最大重试间隔（秒），为空时不修改
 
 
 class TaskFutureExecInput(BaseModel):
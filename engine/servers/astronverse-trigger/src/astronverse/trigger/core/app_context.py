@@ -1,10 +1,11 @@
+import asyncio
 import threading
-from collections import deque
 from typing import Optional
 
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
 from astronverse.trigger.core.queue_manager import TaskQueueManager
+from astronverse.trigger.core.task_store import TaskStore
 from astronverse.trigger.terminal import Terminal
 from astronverse.trigger.trigger import Trigger
 
@@ -17,19 +18,21 @@ class AppContext:
         self.trigger: Optional[Trigger] = None
         self.terminal: Optional[Terminal] = None
         self.task_queue_mgr: Optional[TaskQueueManager] = None
+        # 持久化的任务队列，存储排队、下发中、重试中的任务
+        self.task_store: Optional[TaskStore] = None
 
         # 队列配置
         self.queue_config = {
             "max_length": 500,  # 最大队列长度
             "max_wait_minutes": 30,  # 最大等待时间（分钟）
             "deduplicate": False,  # 是否去重
+            "retry_interval": 6,  # 下发失败后首次重试间隔（秒），之后每次翻倍
+            "retry_max_interval": 300,  # 最大重试间隔（秒）
         }
 
-        # 用于监控的队列，存储当前正在排队的任务信息
-        self.task_queue_monitor = deque(maxlen=1000)  # 设置最大长度为1000，防止内存溢出
-
         # 线程管理
         self._threads = []
+        self._process_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """初始化应用程序上下文"""
@@ -57,21 +60,20 @@ class AppContext:
         if not self.trigger:
             raise RuntimeError("trigger必须在task_queue_manager之前初始化")
 
+        self.task_store = TaskStore(config.QUEUE_DB_PATH)
         self.task_queue_mgr = TaskQueueManager(
-            self.task_queue_monitor,
+            self.task_store,
             self.trigger.queue,
             self,  # 传入 self (app_context)
         )
         self.task_queue_mgr.set_trigger(self.trigger)
+        self.task_queue_mgr.recover()
 
-        # 启动任务队列管理线程
+        # 入队线程阻塞读取触发队列，处理协程运行在当前事件循环中
         fetch_thread = threading.Thread(target=self.task_queue_mgr.fetch_tasks, daemon=True)
-        process_thread = threading.Thread(target=self.task_queue_mgr.process_tasks, daemon=True)
-
         fetch_thread.start()
-        process_thread.start()
-
-        self._threads.extend([fetch_thread, process_thread])
+        self._threads.append(fetch_thread)
+        self._process_task = asyncio.create_task(self.task_queue_mgr.process_tasks())
         logger.info("任务队列管理器初始化成功")
 
     async def _init_terminal(self):
@@ -82,7 +84,7 @@ class AppContext:
         self.trigger.delete_all_tasks()
 
         if not self.terminal:
-            self.terminal = Terminal(self.task_queue_monitor, self.trigger.queue, self.trigger.scheduler)
+            self.terminal = Terminal(self.task_store, self.trigger.queue, self.trigger.scheduler)
             logger.info("terminal初始化成功")
 
         self.terminal.start_poll()  # 启动terminal轮询线程
@@ -98,7 +100,7 @@ class AppContext:
 
         if config.TERMINAL_MODE:
             if not self.terminal:
-                self.terminal = Terminal(self.task_queue_monitor, self.trigger.queue, self.trigger.scheduler)
+                self.terminal = Terminal(self.task_store, self.trigger.queue, self.trigger.scheduler)
                 logger.info("terminal重新初始化成功")
             self.terminal.start_poll()
         else:
@@ -1,3 +1,6 @@
+import os
+
+
 class Config:
     PORT: int = 0
 
@@ -7,5 +10,11 @@ class Config:
 
     TERMINAL_ID: str = ""
 
+    # 触发任务队列的持久化文件
+    QUEUE_DB_PATH: str = os.path.join("logs", "trigger_queue.db")
+
+    # 邮件触发的增量位置(UIDVALIDITY/最后的UID)
+    MAIL_STATE_PATH: str = os.path.join("logs", "trigger_mail.db")
+
 
 config = Config()
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class MailState:
+    """
+    邮件触发的增量位置, sqlite 持久化
+
+    按 任务 + 账号 + 文件夹 记录 UIDVALIDITY 和已经检查过的最大 UID, 进程重启后从这里继续
+    POP3 没有 UID, uidvalidity 记为 0, last_uid 为已经检查过的邮件数量
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mail_state (
+                task_id TEXT NOT NULL,
+                account TEXT NOT NULL,
+                folder TEXT NOT NULL,
+                uidvalidity INTEGER NOT NULL,
+                last_uid INTEGER NOT NULL,
+                updated REAL NOT NULL,
+                PRIMARY KEY (task_id, account, folder)
+            )
+            """
+        )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def get(self, task_id: str, account: str, folder: str):
+        """返回 (uidvalidity, last_uid), 没有记录时返回 None"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT uidvalidity, last_uid FROM mail_state WHERE task_id = ? AND account = ? AND folder = ?",
+                (task_id, account, folder),
+            ).fetchone()
+
+    def set(self, task_id: str, account: str, folder: str, uidvalidity: int, last_uid: int):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO mail_state (task_id, account, folder, uidvalidity, last_uid, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, account, folder, uidvalidity, last_uid, time.time()),
+            )
@@ -1,20 +1,44 @@
-import copy
+import asyncio
+import threading
 import time
 import uuid
-from collections import deque
+from queue import Empty
 
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
-from astronverse.trigger.server.gateway_client import execute_multiple_projects
+from astronverse.trigger.core.task_store import TaskStatus, TaskStore
 
 
 class TaskQueueManager:
-    def __init__(self, task_queue_monitor: deque, trigger_queue, app_context):
-        self.task_queue_monitor = task_queue_monitor
+    """
+    触发任务队列
+
+    1. 触发的任务先写入持久化队列再下发, 入队、下发、重试、完成的状态都记录在 TaskStore 中, 进程重启后继续
+    2. 有新任务或重试到期时通过 asyncio.Event 唤醒处理协程, 不轮询
+    3. 下发失败按指数退避重试, 超过最大等待时间后不再重试
+    4. 同时下发的任务数不超过 max_dispatch, 其余任务留在队列中, 有任务下发结束时再唤醒处理
+    """
+
+    # 一次事务最多写入的任务数
+    batch_size = 500
+    # 清理已结束任务的间隔
+    purge_interval = 3600
+    # 同时下发(等待调度器返回)的最大任务数, 小于调度器的请求线程数, 避免占满调度器
+    max_dispatch = 16
+
+    def __init__(self, task_store: TaskStore, trigger_queue, app_context):
+        self.task_store = task_store
         self.trigger_queue = trigger_queue
         self.app_context = app_context  # 直接引用 app_context
         self.trigger = None
 
+        # 处理协程所在的事件循环和唤醒事件, 在 process_tasks 中创建
+        self.loop = None
+        self.wakeup = None
+
+        # 下发名额
+        self.dispatch_slots = threading.BoundedSemaphore(self.max_dispatch)
+
     def set_trigger(self, trigger):
         """设置trigger实例"""
         self.trigger = trigger
@@ -28,96 +52,185 @@ class TaskQueueManager:
     def is_task_timeout(task):
         """检查任务是否超时"""
         try:
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
             expire_time = task.get("expire_time", "")
-            # 判断是否超时
-            return time.mktime(time.strptime(current_time, "%Y-%m-%d %H:%M:%S")) > time.mktime(
-                time.strptime(expire_time, "%Y-%m-%d %H:%M:%S")
-            )
+            return time.time() > time.mktime(time.strptime(expire_time, "%Y-%m-%d %H:%M:%S"))
         except Exception as e:
             logger.error(f"检查任务是否超时失败: {e}")
             return False
 
-    def fetch_tasks(self):
-        """获取任务并添加到监控队列"""
-        while True:
-            if not self.trigger:
-                time.sleep(1)
-                continue
-            task_info = self.trigger.queue.get()  # 会等待直到有为止
-            if not task_info:
-                time.sleep(1)
-                continue
-            logger.info(f"接收到触发任务, task_info: {task_info}")
+    def backoff(self, attempts: int) -> float:
+        """第 attempts 次下发失败后的等待秒数: retry_interval * 2^(attempts-1), 不超过 retry_max_interval"""
+        interval = self.queue_config.get("retry_interval", 6)
+        max_interval = self.queue_config.get("retry_max_interval", 300)
+        return min(interval * 2 ** max(0, attempts - 1), max_interval)
 
-            if len(self.task_queue_monitor) >= self.queue_config["max_length"]:
-                logger.warning(f"任务队列已满，任务已丢弃: {task_info.get('trigger_id')}")
-                continue
-
-            # 使用深拷贝避免修改原始任务对象
-            task_copy = copy.deepcopy(task_info)
-
-            if not config.TERMINAL_MODE:
-                # 检查是否需要去重
-                if self.queue_config["deduplicate"]:
-                    # 检查是否已存在相同trigger_id的任务
-                    for task in self.task_queue_monitor:
-                        if task.get("trigger_id") == task_copy.get("trigger_id"):
-                            logger.info(f"任务已存在，跳过: {task_copy.get('trigger_id')}")
-                            continue
-
-            # 将任务信息添加到监控队列，并记录入队时间和过期时间
-            current_time = time.strftime("%Y-%m-%d %H:%M:%S")
+    def notify(self):
+        """唤醒处理协程, 可以在任意线程调用"""
+        if self.loop is None or self.wakeup is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def recover(self):
+        """进程启动时恢复上次未完成的任务"""
+        retry, failed = self.task_store.recover()
+        if retry or failed:
+            logger.info(f"恢复任务队列: 重新下发{retry}个, 已交给调度器但未拿到结果{failed}个")
+
+    def enqueue(self, tasks: list) -> list:
+        """任务写入持久化队列, 返回每个任务的入队结果, 见 TaskStore.enqueue"""
+        now = time.time()
+        current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        # 计算过期时间
+        expire_time = time.strftime(
+            "%Y-%m-%d %H:%M:%S", time.localtime(now + self.queue_config["max_wait_minutes"] * 60)
+        )
+        records = []
+        for task_info in tasks:
+            # 只添加顶层字段, 浅拷贝即可避免修改原始任务对象
+            task_copy = dict(task_info)
+            # 触发方没有提供触发时间时, 以入队时间作为触发时间
+            task_copy.setdefault("fire_time", current_time)
             task_copy["enqueue_time"] = current_time
-            # 计算过期时间
-            expire_time = time.strftime(
-                "%Y-%m-%d %H:%M:%S",
-                time.localtime(
-                    time.mktime(time.strptime(current_time, "%Y-%m-%d %H:%M:%S"))
-                    + self.queue_config["max_wait_minutes"] * 60
-                ),
-            )
             task_copy["expire_time"] = expire_time
             # 添加唯一ID
             task_copy["unique_id"] = str(uuid.uuid4())
-            self.task_queue_monitor.append(task_copy)
+            records.append(task_copy)
+
+        logger.info(f"接收到触发任务: {[(task.get('trigger_id'), task.get('fire_time')) for task in records]}")
+
+        # 检查是否需要去重
+        deduplicate = self.queue_config["deduplicate"] and not config.TERMINAL_MODE
+        res = self.task_store.enqueue(records, self.queue_config["max_length"], deduplicate)
+        for task_copy, flag in zip(records, res):
+            if flag == "full":
+                logger.warning(f"任务队列已满，任务已丢弃: {task_copy.get('trigger_id')}")
+            elif flag == "duplicate":
+                logger.info(f"任务已存在，跳过: {task_copy.get('trigger_id')} {task_copy.get('fire_time')}")
+        if "ok" in res:
+            self.notify()
+        return res
 
-    def process_tasks(self):
-        """处理监控队列中的任务"""
+    def fetch_tasks(self):
+        """从触发队列取出任务, 批量写入持久化队列"""
         while True:
-            if not self.task_queue_monitor:
-                time.sleep(1)
+            tasks = [self.trigger_queue.get()]  # 会等待直到有为止
+            while len(tasks) < self.batch_size:
+                try:
+                    tasks.append(self.trigger_queue.get_nowait())
+                except Empty:
+                    break
+            tasks = [task for task in tasks if task]
+            if not tasks:
                 continue
-
-            task_info = self.task_queue_monitor[0]  # 只查看不移除
+            try:
+                self.enqueue(tasks)
+            except Exception as e:
+                logger.error(f"任务写入队列失败: {e}")
+
+    async def process_tasks(self):
+        """处理队列中的任务, 没有到期任务时等待唤醒"""
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        last_purge = 0
+        while True:
+            self.wakeup.clear()
+            try:
+                timeout = self.dispatch_due()
+                if time.time() - last_purge > self.purge_interval:
+                    last_purge = time.time()
+                    self.task_store.purge()
+            except Exception as e:
+                logger.error(f"处理任务队列失败: {e}")
+                timeout = 1
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except TimeoutError:
+                pass
+
+    def dispatch_due(self):
+        """下发所有到期的任务, 返回距离下一次重试的秒数, 没有等待重试的任务时返回 None"""
+        for task_info in self.task_store.due(time.time()):
+            unique_id = task_info["unique_id"]
 
             # 检查任务是否是当前mode的
             if task_info.get("mode") == "DISPATCH" and not config.TERMINAL_MODE:
-                self.task_queue_monitor.popleft()  # 下发前就移除第一个元素
+                self.task_store.remove([unique_id])
                 logger.info(f"任务模式为本地计划任务，已移除远程调度任务: {task_info.get('trigger_id')}")
                 continue
             if task_info.get("mode") != "DISPATCH" and config.TERMINAL_MODE:
-                self.task_queue_monitor.popleft()  # 下发前就移除第一个元素
+                self.task_store.remove([unique_id])
                 logger.info(f"任务模式为远程调度任务，已移除本地计划任务: {task_info.get('trigger_id')}")
                 continue
 
             # 检查任务是否超时
             if self.is_task_timeout(task_info):
-                self.task_queue_monitor.popleft()  # 移除超时任务
+                self.task_store.remove([unique_id], TaskStatus.EXPIRED)
                 logger.info(
                     f"任务等待时间超过{self.queue_config['max_wait_minutes']}分钟，已移除: {task_info.get('trigger_id')}"
                 )
                 continue
 
-            self.task_queue_monitor.popleft()  # 下发前就移除第一个元素
-            i = 0
-            while True:
-                success_flag = execute_multiple_projects(task_info)  # 调度调度器
-                if not success_flag:
-                    if i < 10:
-                        i += 1
-                    time.sleep(6 * i)  # 等待6*i秒后，重新下发【这里表示下发失败】
-                    logger.info(f"重新下发, task_info: {task_info}")
-                    continue
-                # 任务执行完成后，从监控队列中移除
+            if not self.dispatch_slots.acquire(blocking=False):
+                # 下发名额已满, 剩余任务等下发结束时唤醒再处理
                 break
+            if not self.task_store.dispatching(unique_id):
+                # 已经被删除
+                self.dispatch_slots.release()
+                continue
+            task_info["attempts"] += 1
+            # 剩余的等待时间交给调度器的运行队列, 由调度器按槽位排队
+            try:
+                task_info["wait_timeout"] = max(
+                    0, time.mktime(time.strptime(task_info["expire_time"], "%Y-%m-%d %H:%M:%S")) - time.time()
+                )
+            except Exception:
+                pass
+            threading.Thread(target=self.dispatch, args=(task_info,), daemon=True).start()
+
+        next_time = self.task_store.next_time()
+        if next_time is None:
+            return None
+        return max(0, next_time - time.time())
+
+    def dispatch(self, task_info):
+        """下发任务到调度器, 结束后归还下发名额并唤醒处理协程"""
+        try:
+            self._dispatch(task_info)
+        finally:
+            self.dispatch_slots.release()
+            self.notify()
+
+    def _dispatch(self, task_info):
+        """下发任务到调度器, 同步等待任务结束, 下发失败时按退避时间放回队列"""
+        # server 包会导入 app_context, 在这里导入避免循环导入
+        from astronverse.trigger.server.gateway_client import execute_multiple_projects
+
+        unique_id = task_info["unique_id"]
+        sent = False
+
+        def on_sent():
+            nonlocal sent
+            sent = True
+            self.task_store.set_status(unique_id, TaskStatus.SENT)
+
+        try:
+            success_flag = execute_multiple_projects(task_info, on_sent)  # 调度调度器
+        except Exception as e:
+            logger.error(f"下发任务异常: {task_info.get('trigger_id')} {e}")
+            if sent:
+                # 已经交给调度器, 重新下发可能重复运行
+                self.task_store.set_status(unique_id, TaskStatus.FAILED)
+                return
+            success_flag = False
+
+        if success_flag:
+            self.task_store.set_status(unique_id, TaskStatus.DONE)
+            return
+
+        delay = self.backoff(task_info["attempts"])
+        self.task_store.set_status(unique_id, TaskStatus.RETRY, time.time() + delay)
+        logger.info(f"下发失败, {delay}秒后重新下发, task_info: {task_info}")
@@ -0,0 +1,297 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class TaskStatus:
+    PENDING = "pending"  # 排队中
+    DISPATCHING = "dispatching"  # 已取出, 请求发送中
+    SENT = "sent"  # 已发送到调度器, 等待运行结束
+    RETRY = "retry"  # 下发失败, 等待重试
+    DONE = "done"  # 运行结束
+    FAILED = "failed"  # 已发送但没有拿到结果(连接断开/进程重启), 不再重发, 避免重复运行
+    EXPIRED = "expired"  # 等待超时
+    REMOVED = "removed"  # 手动删除/模式不匹配/超出队列长度
+
+    # 等待下发的状态, 队列长度、去重、状态查询都只看这两种
+    WAITING = (PENDING, RETRY)
+
+
+class TaskStore:
+    """
+    触发任务的持久化队列, sqlite + WAL
+
+    1. 一次触发由 trigger_id + fire_time 唯一标识, 同一次触发只会入队一次
+    2. 下发分两步记录: 取出时为 dispatching, 请求发送完成后为 sent
+       进程重启时 dispatching 的任务重新下发, sent 的任务已经交给调度器, 不再重发
+    3. synchronous=NORMAL, 进程崩溃不会丢失已提交的数据, 断电时可能丢失最后几次提交
+    """
+
+    synchronous = "NORMAL"
+    # 已结束的任务保留时间, 用于同一次触发的去重
+    keep_seconds = 24 * 3600
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous={}".format(self.synchronous))
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS task_queue (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                unique_id TEXT NOT NULL UNIQUE,
+                trigger_id TEXT NOT NULL,
+                fire_time TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_time REAL NOT NULL DEFAULT 0,
+                enqueue_time TEXT NOT NULL,
+                expire_time TEXT NOT NULL,
+                info TEXT NOT NULL,
+                updated REAL NOT NULL,
+                UNIQUE (trigger_id, fire_time)
+            );
+            CREATE INDEX IF NOT EXISTS idx_task_queue_status ON task_queue (status, next_time);
+            """
+        )
+        # 等待中的任务数量, 只有当前进程写入, 在内存中计数, 入队时不再 COUNT
+        self.waiting_count = self.conn.execute(
+            "SELECT COUNT(*) FROM task_queue WHERE status IN (?, ?)", TaskStatus.WAITING
+        ).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _query(self, sql: str, params=()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _update(self, sql: str, params=()) -> int:
+        with self.lock:
+            return self.conn.execute(sql, params).rowcount
+
+    def _transaction(self, func):
+        """在一个写事务中执行 func(conn), 失败时回滚"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                res = func(self.conn)
+                self.conn.execute("COMMIT")
+                return res
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _task(row) -> dict:
+        task = json.loads(row[0])
+        task["status"] = row[1]
+        task["attempts"] = row[2]
+        task["next_time"] = row[3]
+        return task
+
+    def enqueue(self, tasks: list, max_length: int, deduplicate: bool = False) -> list:
+        """
+        批量入队, 一个事务内完成, 每个任务返回结果:
+        "ok" 入队成功, "duplicate" 同一次触发已存在或开启去重时同一任务已在排队, "full" 队列已满
+        """
+
+        def insert(conn):
+            waiting = self.waiting_count
+            now = time.time()
+            res = []
+            for task in tasks:
+                if waiting >= max_length:
+                    res.append("full")
+                    continue
+                if (
+                    deduplicate
+                    and conn.execute(
+                        "SELECT 1 FROM task_queue WHERE trigger_id = ? AND status IN (?, ?) LIMIT 1",
+                        (task["trigger_id"], *TaskStatus.WAITING),
+                    ).fetchone()
+                ):
+                    res.append("duplicate")
+                    continue
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO task_queue "
+                    "(unique_id, trigger_id, fire_time, status, enqueue_time, expire_time, info, updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        task["unique_id"],
+                        task["trigger_id"],
+                        task["fire_time"],
+                        TaskStatus.PENDING,
+                        task["enqueue_time"],
+                        task["expire_time"],
+                        json.dumps(task, ensure_ascii=False),
+                        now,
+                    ),
+                )
+                if cursor.rowcount:
+                    waiting += 1
+                    res.append("ok")
+                else:
+                    res.append("duplicate")
+            return res, waiting
+
+        res, self.waiting_count = self._transaction(insert)
+        return res
+
+    def due(self, now: float) -> list:
+        """到期需要下发的任务, 按入队顺序"""
+        rows = self._query(
+            "SELECT info, status, attempts, next_time FROM task_queue "
+            "WHERE status = ? OR (status = ? AND next_time <= ?) ORDER BY seq",
+            (TaskStatus.PENDING, TaskStatus.RETRY, now),
+        )
+        return [self._task(row) for row in rows]
+
+    def next_time(self):
+        """最早的重试时间, 没有等待重试的任务时返回 None"""
+        return self._query("SELECT MIN(next_time) FROM task_queue WHERE status = ?", (TaskStatus.RETRY,))[0][0]
+
+    def waiting(self) -> list:
+        """等待下发的任务(排队中、等待重试), 按入队顺序"""
+        rows = self._query(
+            "SELECT info, status, attempts, next_time FROM task_queue WHERE status IN (?, ?) ORDER BY seq",
+            TaskStatus.WAITING,
+        )
+        return [self._task(row) for row in rows]
+
+    def count_waiting(self) -> int:
+        return self.waiting_count
+
+    def get(self, unique_id: str):
+        rows = self._query("SELECT info, status, attempts, next_time FROM task_queue WHERE unique_id = ?", (unique_id,))
+        return self._task(rows[0]) if rows else None
+
+    def dispatching(self, unique_id: str) -> bool:
+        """取出任务准备下发, 只有等待中的任务可以取出, 返回是否成功"""
+        with self.lock:
+            count = self.conn.execute(
+                "UPDATE task_queue SET status = ?, attempts = attempts + 1, updated = ? "
+                "WHERE unique_id = ? AND status IN (?, ?)",
+                (TaskStatus.DISPATCHING, time.time(), unique_id, *TaskStatus.WAITING),
+            ).rowcount
+            self.waiting_count -= count
+        return count > 0
+
+    def set_status(self, unique_id: str, status: str, next_time: float = 0):
+        """更新下发中的任务的状态"""
+        with self.lock:
+            count = self.conn.execute(
+                "UPDATE task_queue SET status = ?, next_time = ?, updated = ? WHERE unique_id = ? AND status IN (?, ?)",
+                (status, next_time, time.time(), unique_id, TaskStatus.DISPATCHING, TaskStatus.SENT),
+            ).rowcount
+            if status in TaskStatus.WAITING:
+                self.waiting_count += count
+
+    def remove(self, unique_ids: list, status: str = TaskStatus.REMOVED) -> int:
+        """等待中的任务标记为删除, 返回删除的数量"""
+
+        def update(conn):
+            count = 0
+            for unique_id in unique_ids:
+                count += conn.execute(
+                    "UPDATE task_queue SET status = ?, updated = ? WHERE unique_id = ? AND status IN (?, ?)",
+                    (status, time.time(), unique_id, *TaskStatus.WAITING),
+                ).rowcount
+            self.waiting_count -= count
+            return count
+
+        return self._transaction(update)
+
+    def update_expire(self, max_wait_minutes: int):
+        """按入队时间重新计算等待中任务的过期时间"""
+
+        def update(conn):
+            rows = conn.execute(
+                "SELECT unique_id, enqueue_time, info FROM task_queue WHERE status IN (?, ?)", TaskStatus.WAITING
+            ).fetchall()
+            for unique_id, enqueue_time, info in rows:
+                expire_time = time.strftime(
+                    "%Y-%m-%d %H:%M:%S",
+                    time.localtime(
+                        time.mktime(time.strptime(enqueue_time, "%Y-%m-%d %H:%M:%S")) + max_wait_minutes * 60
+                    ),
+                )
+                task = json.loads(info)
+                task["expire_time"] = expire_time
+                conn.execute(
+                    "UPDATE task_queue SET expire_time = ?, info = ? WHERE unique_id = ?",
+                    (expire_time, json.dumps(task, ensure_ascii=False), unique_id),
+                )
+
+        self._transaction(update)
+
+    def trim(self, max_length: int) -> list:
+        """等待中的任务超过 max_length 时, 删除最后入队的任务, 返回删除的 unique_id"""
+
+        def update(conn):
+            rows = conn.execute(
+                "SELECT unique_id FROM task_queue WHERE status IN (?, ?) ORDER BY seq LIMIT -1 OFFSET ?",
+                (*TaskStatus.WAITING, max_length),
+            ).fetchall()
+            for (unique_id,) in rows:
+                conn.execute(
+                    "UPDATE task_queue SET status = ?, updated = ? WHERE unique_id = ?",
+                    (TaskStatus.REMOVED, time.time(), unique_id),
+                )
+            self.waiting_count -= len(rows)
+            return [unique_id for (unique_id,) in rows]
+
+        return self._transaction(update)
+
+    def deduplicate(self) -> list:
+        """同一任务有多个等待中的触发时, 只保留最早入队的一个, 返回删除的 unique_id"""
+
+        def update(conn):
+            rows = conn.execute(
+                "SELECT unique_id FROM task_queue WHERE status IN (?, ?) AND seq NOT IN "
+                "(SELECT MIN(seq) FROM task_queue WHERE status IN (?, ?) GROUP BY trigger_id)",
+                (*TaskStatus.WAITING, *TaskStatus.WAITING),
+            ).fetchall()
+            for (unique_id,) in rows:
+                conn.execute(
+                    "UPDATE task_queue SET status = ?, updated = ? WHERE unique_id = ?",
+                    (TaskStatus.REMOVED, time.time(), unique_id),
+                )
+            self.waiting_count -= len(rows)
+            return [unique_id for (unique_id,) in rows]
+
+        return self._transaction(update)
+
+    def purge(self) -> int:
+        """清理超过保留时间的已结束任务"""
+        return self._update(
+            "DELETE FROM task_queue WHERE status NOT IN (?, ?, ?, ?) AND updated < ?",
+            (*TaskStatus.WAITING, TaskStatus.DISPATCHING, TaskStatus.SENT, time.time() - self.keep_seconds),
+        )
+
+    def recover(self) -> tuple:
+        """
+        进程重启后恢复: dispatching 的任务请求还没有发出, 重新下发; sent 的任务已经交给调度器, 标记为 failed
+        返回 (重新下发的数量, 标记为 failed 的数量)
+        """
+
+        def update(conn):
+            now = time.time()
+            retry = conn.execute(
+                "UPDATE task_queue SET status = ?, next_time = 0, updated = ? WHERE status = ?",
+                (TaskStatus.RETRY, now, TaskStatus.DISPATCHING),
+            ).rowcount
+            self.waiting_count += retry
+            failed = conn.execute(
+                "UPDATE task_queue SET status = ?, updated = ? WHERE status = ?",
+                (TaskStatus.FAILED, now, TaskStatus.SENT),
+            ).rowcount
+            return retry, failed
+
+        return self._transaction(update)
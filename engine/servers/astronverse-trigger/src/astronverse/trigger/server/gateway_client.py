@@ -1,3 +1,4 @@
+import http.client
 import json
 
 import requests
@@ -6,14 +7,30 @@ from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
 
 
-def execute_multiple_projects(project_info: dict):
-    url = "http://127.0.0.1:{}/scheduler/executor/run_list".format(config.GATEWAY_PORT)
-    headers = {"Content-Type": "application/json"}
-    logger.info(f"当前调度器请求的Json是：{project_info}")
-    response = requests.post(url, headers=headers, data=json.dumps(project_info))
+def execute_multiple_projects(project_info: dict, on_sent=None):
+    """
+    下发计划任务, 同步等待运行结束
 
-    logger.info(f"当前调度器返回的结果的Json是：{response.json()}")
-    if int(response.status_code) == 200 and response.json()["code"] == "0000":
+    on_sent: 请求完整发出后、等待结果前回调, 用于区分"请求没有发出"和"已交给调度器"
+    """
+    logger.info(f"当前调度器请求的Json是：{project_info}")
+    conn = http.client.HTTPConnection("127.0.0.1", int(config.GATEWAY_PORT))
+    try:
+        conn.request(
+            "POST",
+            "/scheduler/executor/run_list",
+            body=json.dumps(project_info).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        if on_sent:
+            on_sent()
+        response = conn.getresponse()
+        body = response.read()
+    finally:
+        conn.close()
+
+    logger.info(f"当前调度器返回的结果的Json是：{body.decode('utf-8', errors='replace')}")
+    if int(response.status) == 200 and json.loads(body)["code"] == "0000":
         return True
     else:
         return False
@@ -35,7 +52,9 @@ def get_executor_status():
     url = "http://127.0.0.1:{}/scheduler/executor/status".format(config.GATEWAY_PORT)
     response = requests.post(url)
     logger.info(f"当前调度器返回的结果的Json是：{response.json()}")
-    if int(response.status_code) == 200 and response.json().get("data", {}).get("running", False):
+    data = response.json().get("data", {}) or {}
+    # 调度器支持多槽位并发时以busy(没有空闲槽位)为准
+    if int(response.status_code) == 200 and data.get("busy", data.get("running", False)):
         return True
     else:
         return False
@@ -1,5 +1,4 @@
 import asyncio
-import copy
 import threading
 import time
 
@@ -16,6 +15,7 @@ from astronverse.trigger import (
 from astronverse.trigger.core.app_context import app_context
 from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
+from astronverse.trigger.core.task_store import TaskStatus
 from astronverse.trigger.server.gateway_client import (
     execute_single_project,
     get_executor_status,
@@ -274,10 +274,10 @@ async def get_queue_status(pageNo: int = 1, pageSize: int = 10, name: str = None
         end_idx = start_idx + pageSize
 
         # 一次遍历完成过滤和分页
-        for task in app_context.task_queue_monitor:
+        for task in app_context.task_store.waiting():
             # 检查是否超时
             if app_context.task_queue_mgr.is_task_timeout(task):
-                app_context.task_queue_monitor.remove(task)
+                app_context.task_store.remove([task["unique_id"]], TaskStatus.EXPIRED)
                 logger.info(
                     f"任务等待时间超过{app_context.queue_config['max_wait_minutes']}分钟，已移除: {task.get('trigger_id')}"
                 )
@@ -294,10 +294,8 @@ async def get_queue_status(pageNo: int = 1, pageSize: int = 10, name: str = None
 
             # 只收集当前页的数据
             if start_idx <= total - 1 < end_idx:
-                # 使用深拷贝避免修改原始任务对象
-                task_copy = copy.deepcopy(task)
-                task_copy["status_index"] = total
-                filtered_tasks.append(task_copy)
+                task["status_index"] = total
+                filtered_tasks.append(task)
 
         return {
             "code": 200,
@@ -328,16 +326,8 @@ async def remove_queue_task(task_info: RemoveQueueTaskInput):
     :return:
     """
     try:
-        removed_count = 0
-        # 遍历要删除的unique_id列表
-        for unique_id in task_info.unique_id:
-            # 在队列中查找对应的任务
-            for task in list(app_context.task_queue_monitor):
-                if task.get("unique_id") == unique_id:
-                    app_context.task_queue_monitor.remove(task)
-                    removed_count += 1
-                    logger.info(f"从队列中删除任务: {unique_id}")
-                    break
+        removed_count = app_context.task_store.remove(task_info.unique_id)
+        logger.info(f"从队列中删除任务: {task_info.unique_id} {removed_count}")
 
         if removed_count > 0:
             return {
@@ -367,40 +357,19 @@ async def update_queue_config(config: QueueConfigInput):
     try:
         # 如果最大等待时间发生变化，更新所有任务的过期时间
         if config.max_wait_minutes != app_context.queue_config["max_wait_minutes"]:
-            for task in app_context.task_queue_monitor:
-                enqueue_time = task.get("enqueue_time", "")
-                if enqueue_time:
-                    # 重新计算过期时间
-                    expire_time = time.strftime(
-                        "%Y-%m-%d %H:%M:%S",
-                        time.localtime(
-                            time.mktime(time.strptime(enqueue_time, "%Y-%m-%d %H:%M:%S")) + config.max_wait_minutes * 60
-                        ),
-                    )
-                    task["expire_time"] = expire_time
-
-        # 如果队列最大长度变小了，删除超出限制的任务
+            app_context.task_store.update_expire(config.max_wait_minutes)
+
+        # 如果队列最大长度变小了，删除超出限制的任务（保留最早的任务）
         if config.max_length < app_context.queue_config["max_length"]:
-            current_size = len(app_context.task_queue_monitor)
-            if current_size > config.max_length:
-                # 删除超出限制的任务（从队列末尾删除，保留最早的任务）
-                tasks_to_remove = current_size - config.max_length
-                for _ in range(tasks_to_remove):
-                    if app_context.task_queue_monitor:
-                        removed_task = app_context.task_queue_monitor.pop()
-                        logger.info(f"队列长度超限，删除任务: {removed_task.get('unique_id')}")
+            for unique_id in app_context.task_store.trim(config.max_length):
+                logger.info(f"队列长度超限，删除任务: {unique_id}")
 
         if config.deduplicate and not app_context.queue_config["deduplicate"]:
             # 开启去重，需要重新检查所有任务是否重复
-            trigger_ids = set()
-            for task in app_context.task_queue_monitor:
-                if task.get("trigger_id") in trigger_ids:
-                    app_context.task_queue_monitor.remove(task)
-                    logger.info(f"任务已存在，跳过: {task.get('unique_id')}")
-                    continue
-                trigger_ids.add(task.get("trigger_id"))
-
-        app_context.queue_config.update(config.model_dump())
+            for unique_id in app_context.task_store.deduplicate():
+                logger.info(f"任务已存在，跳过: {unique_id}")
+
+        app_context.queue_config.update(config.model_dump(exclude_none=True))
         logger.info(f"更新队列配置: {app_context.queue_config}")
         return {
             "code": 200,
@@ -111,6 +111,12 @@ class Task:
     def __dict__(self):
         return self.kwargs
 
+    def fire_info(self) -> dict:
+        """本次触发放入队列的任务信息, trigger_id + fire_time 标识一次触发, 同一秒内的重复触发只运行一次"""
+        info = dict(self.kwargs)
+        info["fire_time"] = datetime.now(tz=get_localzone()).strftime("%Y-%m-%d %H:%M:%S")
+        return info
+
 
 class AsyncSchedulerTask(Task):
     def __init__(self, scheduler: AsyncIOScheduler, **kwargs):
@@ -130,7 +136,7 @@ class AsyncSchedulerTask(Task):
         # 第一种条件是判断不添加队列的情况
         # 第二种条件是队列可用
         if (not self.queue_enable and not status) or self.queue_enable:
-            self.queue.put(self.__dict__())
+            self.queue.put(self.fire_info())
             return True
         else:
             send_msg(
@@ -224,7 +230,7 @@ class AsyncOneCallTask(Task):
             status = get_executor_status()
             # 没开排队且空闲 和 开了排队
             if (not self.queue_enable and not status) or self.queue_enable:
-                self.queue.put(self.__dict__())
+                self.queue.put(self.fire_info())
             else:
                 send_msg(
                     {
@@ -276,8 +282,10 @@ class AsyncImmediateTask(Task):
             status = get_executor_status()
             # 检测队列里是否存在待排队工程，若存在则不投放入队列
             # 若处于调度模式，全排队
-            if (self.enable and len(app_context.task_queue_monitor) == 0 and not status) or (self.mode == "DISPATCH"):
-                self.queue.put(self.__dict__())
+            if (self.enable and app_context.task_store.count_waiting() == 0 and not status) or (
+                self.mode == "DISPATCH"
+            ):
+                self.queue.put(self.fire_info())
                 return True
             return False
         except Exception as e:
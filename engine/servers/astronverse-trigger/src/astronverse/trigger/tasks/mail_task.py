@@ -1,17 +1,60 @@
+import asyncio
+import base64
 import email
 import imaplib
+import itertools
 import poplib
+import quopri
+import re
+import select
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 
 from apscheduler.triggers.interval import IntervalTrigger
+from astronverse.trigger.core.config import config
 from astronverse.trigger.core.logger import logger
-
-global_mail_ids = {}
+from astronverse.trigger.core.mail_state import MailState
 
 CONDITION_OR = "or"
 CONDITION_AND = "and"
 CONDITION_ALL = "all"
 
+# 部分邮箱(如163)要求登录后发送 ID 命令才能选择文件夹
+imaplib.Commands.setdefault("ID", ("AUTH", "SELECTED"))
+
+# 邮箱的网络操作都是阻塞的, 放到线程池中执行, 不使用事件循环默认的线程池
+mail_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="mail_task")
+# 等待推送会长时间占用线程, 放到单独的线程池; 同时等待推送的任务最多 idle_limit 个, 超过的任务按检查间隔轮询
+idle_limit = 16
+idle_executor = ThreadPoolExecutor(max_workers=idle_limit, thread_name_prefix="mail_idle")
+idle_slots = threading.BoundedSemaphore(idle_limit)
+
+# 账号 -> MailSession, 同一账号的任务共用一个连接
+mail_sessions = {}
+mail_lock = threading.Lock()
+mail_state = None
+
+
+def get_mail_state() -> MailState:
+    """邮件触发的增量位置, 第一次使用时打开"""
+    global mail_state
+    with mail_lock:
+        if mail_state is None:
+            mail_state = MailState(config.MAIL_STATE_PATH)
+        return mail_state
+
+
+def get_session(host: str, port: int, use_ssl: bool, user: str, authorization: str) -> "MailSession":
+    key = (host, int(port), bool(use_ssl), user, authorization)
+    with mail_lock:
+        session = mail_sessions.get(key)
+        if session is None:
+            session = mail_sessions[key] = MailSession(*key)
+        return session
+
 
 def decode_data(bytes, added_encode=None):
     """
@@ -36,7 +79,334 @@ def decode_data(bytes, added_encode=None):
     return None
 
 
+_FETCH_TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|([^\s()"]+))')
+_FILENAME_PARAM = re.compile(rb"^(?:FILE)?NAME(?:\*\d*)?\*?$", re.IGNORECASE)
+_EXISTS = re.compile(rb"^\* \d+ EXISTS", re.IGNORECASE)
+
+
+def _tokenize(data: bytes, tokens: list):
+    pos = 0
+    while True:
+        m = _FETCH_TOKEN.match(data, pos)
+        if not m:
+            return
+        pos = m.end()
+        if m.group(1):
+            tokens.append(("(", None))
+        elif m.group(2):
+            tokens.append((")", None))
+        elif m.group(3) is not None:
+            tokens.append(("str", re.sub(rb"\\(.)", rb"\1", m.group(3))))
+        else:
+            tokens.append(("atom", m.group(4)))
+
+
+def parse_fetch(data: list) -> list:
+    """
+    解析 imaplib 的 FETCH 返回, data 中的 tuple 为 (以 {长度} 结尾的前缀, 字面量)
+    返回每封邮件的 {数据项: 值}, 数据项为大写且去掉了 <起始位置>, 列表解析为 list, NIL 为 None
+    """
+    tokens = []
+    for item in data:
+        if isinstance(item, tuple):
+            _tokenize(item[0], tokens)
+            if tokens and tokens[-1][0] == "atom" and tokens[-1][1].startswith(b"{"):
+                tokens[-1] = ("str", item[1])
+        elif item:
+            _tokenize(item, tokens)
+
+    def value(pos: int):
+        kind, val = tokens[pos]
+        if kind == "(":
+            items = []
+            pos += 1
+            while pos < len(tokens) and tokens[pos][0] != ")":
+                val, pos = value(pos)
+                items.append(val)
+            return items, pos + 1
+        if kind == "atom" and val.upper() == b"NIL":
+            return None, pos + 1
+        return val, pos + 1
+
+    messages = []
+    pos = 0
+    while pos < len(tokens):
+        # "* n FETCH (...)" 在 imaplib 中为 "n (...)"
+        val, pos = value(pos)
+        if isinstance(val, list):
+            messages.append(
+                {
+                    re.sub(rb"<\d+>$", b"", val[i]).upper().decode(): val[i + 1]
+                    for i in range(0, len(val) - 1, 2)
+                    if isinstance(val[i], bytes)
+                }
+            )
+    return messages
+
+
+def has_attachment(structure) -> bool:
+    """BODYSTRUCTURE 中任一部分有文件名(Content-Type 的 name 或 Content-Disposition 的 filename)即有附件"""
+    if not isinstance(structure, list):
+        return False
+    if (
+        len(structure) % 2 == 0
+        and all(isinstance(item, bytes) for item in structure)
+        and any(_FILENAME_PARAM.match(name) for name in structure[::2])
+    ):
+        return True
+    return any(has_attachment(item) for item in structure)
+
+
+def text_parts(structure, section: str = "") -> list:
+    """BODYSTRUCTURE 中 text/plain 部分的 [(段号, 传输编码, 字符集)]"""
+    if not isinstance(structure, list) or not structure:
+        return []
+    if isinstance(structure[0], list):
+        parts = []
+        children = itertools.takewhile(lambda item: isinstance(item, list), structure)
+        for i, child in enumerate(children, 1):
+            parts += text_parts(child, "{}.{}".format(section, i) if section else str(i))
+        return parts
+    if len(structure) > 5 and (structure[0] or b"").upper() == b"TEXT" and (structure[1] or b"").upper() == b"PLAIN":
+        params = structure[2] if isinstance(structure[2], list) else []
+        charset = dict(zip([name.upper() for name in params[::2]], params[1::2])).get(b"CHARSET")
+        return [(section or "1", structure[5], charset)]
+    return []
+
+
+def decode_part(data: bytes, encoding: bytes, charset: bytes) -> str:
+    """按传输编码和字符集解码一个部分, 只下载了前面一段时丢弃最后不完整的 base64"""
+    encoding = (encoding or b"").upper()
+    if encoding == b"BASE64":
+        data = re.sub(rb"\s", b"", data)
+        data = base64.b64decode(data[: len(data) // 4 * 4])
+    elif encoding == b"QUOTED-PRINTABLE":
+        data = quopri.decodestring(data)
+    return decode_data(data, charset.decode("ascii", "ignore") if charset else None) or ""
+
+
+def uid_set(uids: list) -> str:
+    """[1, 2, 3, 5] -> "1:3,5" """
+    ranges = []
+    for uid in sorted(uids):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else "{}:{}".format(a, b) for a, b in ranges)
+
+
+class MailSession:
+    """
+    一个邮箱账号的 IMAP 连接, 同一账号的任务共用, 连接断开后下次使用时重新登录
+
+    1. 检查邮件前通过 use() 独占连接, 正在 IDLE 的连接会尽快结束 IDLE 让出
+    2. 多个任务等待推送时只有一个任务在连接上 IDLE, 收到新邮件后唤醒所有等待的任务
+    """
+
+    timeout = 30
+    # IDLE 中检查是否需要让出连接的间隔
+    idle_poll = 0.5
+    # 服务器可能断开超过 30 分钟的 IDLE
+    idle_max = 25 * 60
+
+    def __init__(self, host: str, port: int, use_ssl: bool, user: str, authorization: str):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.user = user
+        self.authorization = authorization
+        self.account = "{}@{}:{}".format(user, host, port)
+
+        self.client = None
+        self.capabilities = ()
+        self.selected = None
+
+        self.lock = threading.Lock()
+        self.cond = threading.Condition()
+        self.waiting = 0  # 等待使用连接的检查数
+        self.idling = False  # 是否有任务正在 IDLE
+        self.pushed = 0  # 收到新邮件推送的次数
+
+    @contextmanager
+    def use(self):
+        """独占连接"""
+        with self.cond:
+            self.waiting += 1
+        try:
+            self.lock.acquire()
+        finally:
+            with self.cond:
+                self.waiting -= 1
+        try:
+            yield self
+        finally:
+            self.lock.release()
+
+    def connect(self):
+        """没有连接时登录"""
+        if self.client is not None:
+            return
+        if self.use_ssl:
+            client = imaplib.IMAP4_SSL(host=self.host, port=self.port, timeout=self.timeout)
+        else:
+            client = imaplib.IMAP4(host=self.host, port=self.port, timeout=self.timeout)
+        try:
+            client.login(self.user, self.authorization)
+            typ, data = client.capability()
+            capabilities = data[-1].upper().split() if typ == "OK" and data[-1] else ()
+            args = ("name", self.user.split("@")[0], "contact", self.user, "version", "1.0.0", "vendor", "myclient")
+            try:
+                client._simple_command("ID", '("' + '" "'.join(args) + '")')
+            except imaplib.IMAP4.abort:
+                raise
+            except imaplib.IMAP4.error:
+                # 不支持 ID 命令的服务器
+                pass
+        except BaseException:
+            self._shutdown(client)
+            raise
+        self.client = client
+        self.capabilities = capabilities
+        self.selected = None
+        logger.info(f"【AsyncMailTask callback】IMAP登录成功：{self.account}")
+
+    def close(self):
+        client, self.client, self.selected = self.client, None, None
+        if client is not None:
+            self._shutdown(client)
+
+    @staticmethod
+    def _shutdown(client):
+        try:
+            client.shutdown()
+        except OSError:
+            pass
+
+    def _readline(self) -> bytes:
+        line = self.client.readline()
+        if not line or line.upper().startswith(b"* BYE"):
+            raise imaplib.IMAP4.abort("连接已断开: {}".format(line))
+        return line
+
+    @staticmethod
+    def _check(typ: str, data, command: str):
+        if typ != "OK":
+            raise imaplib.IMAP4.error("{} 失败: {} {}".format(command, typ, data))
+
+    def examine(self, folder: str) -> tuple:
+        """只读打开文件夹, 返回 (UIDVALIDITY, UIDNEXT), 服务器没有返回时为 0"""
+        typ, data = self.client.select(folder, readonly=True)
+        self._check(typ, data, "EXAMINE")
+        self.selected = folder
+
+        def code(name: str) -> int:
+            try:
+                return int(self.client.response(name)[1][-1])
+            except (TypeError, ValueError, IndexError):
+                return 0
+
+        return code("UIDVALIDITY"), code("UIDNEXT")
+
+    def search_from(self, uid: int) -> list:
+        """UID 不小于 uid 的邮件, 从小到大"""
+        typ, data = self.client.uid("SEARCH", "UID", "{}:*".format(uid))
+        self._check(typ, data, "UID SEARCH")
+        # 没有不小于 uid 的邮件时 n:* 会返回最大的 UID
+        return sorted(u for u in map(int, b" ".join(d for d in data if d).split()) if u >= uid)
+
+    def last_uid(self) -> int:
+        typ, data = self.client.uid("SEARCH", "UID", "*")
+        self._check(typ, data, "UID SEARCH")
+        return max(map(int, b" ".join(d for d in data if d).split()), default=0)
+
+    def fetch(self, uids: list, items: str) -> list:
+        typ, data = self.client.uid("FETCH", uid_set(uids), items)
+        self._check(typ, data, "UID FETCH")
+        return parse_fetch(data)
+
+    def wait_push(self, folder: str, timeout: float) -> bool:
+        """等待新邮件推送, 返回 timeout 秒内是否有新邮件, 服务器不支持 IDLE 或连接出错时返回 False"""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            seen = self.pushed
+        while True:
+            with self.cond:
+                # 其他任务正在 IDLE 时等待它的结果
+                while self.idling and self.pushed == seen and deadline > time.monotonic():
+                    self.cond.wait(deadline - time.monotonic())
+                if self.pushed != seen:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.idling = True
+            pushed = False
+            try:
+                with self.lock:
+                    try:
+                        self.connect()
+                        if b"IDLE" not in self.capabilities:
+                            return False
+                        pushed = self._idle(folder, remaining)
+                    except (imaplib.IMAP4.error, OSError) as e:
+                        logger.info(f"【AsyncMailTask callback】IDLE 失败：{e}")
+                        self.close()
+                        return False
+            finally:
+                with self.cond:
+                    self.idling = False
+                    if pushed:
+                        self.pushed += 1
+                    self.cond.notify_all()
+            if pushed:
+                return True
+
+    def _idle(self, folder: str, timeout: float) -> bool:
+        """IDLE 直到收到新邮件、超时或有检查需要使用连接, 返回是否收到新邮件"""
+        if self.selected != folder:
+            self.examine(folder)
+        client = self.client
+        tag = client._new_tag()
+        client.tagged_commands.pop(tag, None)
+        client.send(tag + b" IDLE\r\n")
+        pushed = False
+        while True:
+            line = self._readline()
+            if line.startswith(b"+"):
+                break
+            if line.startswith(tag + b" "):
+                # 服务器拒绝 IDLE
+                return pushed
+            pushed = pushed or bool(_EXISTS.match(line))
+
+        end = time.monotonic() + min(timeout, self.idle_max)
+        while not pushed and not self.waiting and end > time.monotonic():
+            sock = client.sock
+            pending = getattr(sock, "pending", None)  # SSL 已解密未读取的数据
+            if not (pending and pending()):
+                if not select.select([sock], [], [], min(end - time.monotonic(), self.idle_poll))[0]:
+                    continue
+            pushed = bool(_EXISTS.match(self._readline()))
+
+        client.send(b"DONE\r\n")
+        while True:
+            line = self._readline()
+            if line.startswith(tag + b" "):
+                return pushed
+            pushed = pushed or bool(_EXISTS.match(line))
+
+
 class MailTask:
+    # 检查的文件夹
+    folder = "INBOX"
+    # 一次 FETCH 的邮件数
+    fetch_batch = 200
+    # 按正文过滤时, 每个文本部分最多下载的字节数
+    text_limit = 1024 * 1024
+    # 支持 IDLE 时, 等待推送到下一次检查前的秒数
+    idle_reserve = 5
+
     def __init__(
         self,
         task_id: str,
@@ -88,6 +458,7 @@ class MailTask:
         self.custom_mail_ssl: bool = kwargs.get("custom_mail_ssl", True)
         self.user_mail: str = kwargs.get("user_mail")
         self.user_authorization: str = kwargs.get("user_authorization")
+        self._session = None
 
         self.mail_server_dict = {
             # IMAP SSL
@@ -141,193 +512,171 @@ class MailTask:
         except Exception as e:
             return False
 
-    async def aconnect(self):
-        """
-        异步方法，连接邮箱客户端并返回
-        :return:
-        """
-        try:
-            used_mail_server, used_mail_port, used_mail_protocol, used_mail_ssl = self.mail_server_dict[self.mail_flag]
-
-            # 统一使用同步方式，在异步函数中运行
-            if used_mail_protocol == "IMAP":
-                if used_mail_ssl:
-                    client = imaplib.IMAP4_SSL(host=used_mail_server, port=int(used_mail_port))
-                else:
-                    client = imaplib.IMAP4(host=used_mail_server, port=int(used_mail_port))
-
-                # 登录
-                client.login(self.user_mail, self.user_authorization)
-                imaplib.Commands["ID"] = "AUTH"
-                args = (
-                    "name",
-                    self.user_mail.split("@")[0],
-                    "contact",
-                    self.user_mail,
-                    "version",
-                    "1.0.0",
-                    "vendor",
-                    "myclient",
-                )
-                client._simple_command("ID", '("' + '" "'.join(args) + '")')
-                logger.info("【AsyncMailTask callback】IMAP登录成功")
-
-                return client
-            elif used_mail_protocol == "POP3":
-                if used_mail_ssl:
-                    client = poplib.POP3_SSL(host=used_mail_server, port=int(used_mail_port))
-                else:
-                    client = poplib.POP3(host=used_mail_server, port=int(used_mail_port))
-
-                client.user(self.user_mail)
-                client.pass_(self.user_authorization)
-                logger.info("【AsyncMailTask callback】POP3登录成功")
-
-                return client
-            else:
-                raise ValueError(f"不支持的邮件协议: {used_mail_protocol}")
-
-        except Exception as e:
-            logger.info(f"【AsyncMailTask callback】连接邮箱时报错：{str(e)}")
-            import traceback
-
-            logger.info(f"【AsyncMailTask callback】详细错误信息：{traceback.format_exc()}")
-            return None
+    def _server(self) -> tuple:
+        """(地址, 端口, 协议, 是否SSL)"""
+        used_mail_server, used_mail_port, used_mail_protocol, used_mail_ssl = self.mail_server_dict[self.mail_flag]
+        return used_mail_server, int(used_mail_port), used_mail_protocol, used_mail_ssl
 
-    async def search_all(self, client, condition: str = "ALL"):
-        """搜索邮件"""
-        # 根据协议类型处理
-        if self.custom_mail_protocol == "IMAP":
-            # IMAP协议 - 需要先选择邮箱，再搜索
-            try:
-                # 先选择INBOX
-                status, data = client.select("INBOX")
-                if status != "OK":
-                    logger.error(f"【AsyncMailTask callback】选择INBOX失败：{status} - {data}")
-                    return False
-
-                # 然后搜索邮件
-                status, data = client.search(None, condition)
-                if status != "OK":
-                    logger.error(f"【AsyncMailTask callback】搜索邮件失败：{status} - {data}")
-                    return False
-                return data
-            except Exception as e:
-                logger.error(f"【AsyncMailTask callback】IMAP搜索邮件异常：{str(e)}")
-                return False
-        elif self.custom_mail_protocol == "POP3":
-            # POP3协议 - 获取所有邮件数量
-            try:
-                num_messages = len(client.list()[1])
-                # 返回邮件ID列表（POP3使用数字ID）
-                return [str(i + 1).encode() for i in range(num_messages)]
-            except Exception as e:
-                logger.info(f"【AsyncMailTask callback】POP3获取邮件列表失败：{str(e)}")
-                return False
-        else:
-            logger.error(f"【AsyncMailTask callback】不支持的协议：{self.custom_mail_protocol}")
-            return False
+    @property
+    def session(self) -> MailSession:
+        if self._session is None:
+            host, port, _, use_ssl = self._server()
+            self._session = get_session(host, port, use_ssl, self.user_mail, self.user_authorization)
+        return self._session
 
     async def callback(self) -> bool:
         """
         检查回调
 
+        IMAP 只检查上次之后的新邮件, 没有符合条件的邮件且服务器支持 IDLE 时, 在下一次检查之前等待服务器推送,
+        收到新邮件后立即检查; 等待推送的任务已经有 idle_limit 个时不等待, 按检查间隔轮询
+
         :return
             `bool`, 标识是否调度成功
         """
-
-        # 邮箱连接
-        logger.info("【AsyncMailTask callback】准备开始连接邮箱...")
+        loop = asyncio.get_running_loop()
         try:
-            client = await self.aconnect()
-            if not client:
-                logger.error("【AsyncMailTask callback】邮箱Client链接失败")
+            _, _, protocol, _ = self._server()
+            if protocol == "POP3":
+                return await loop.run_in_executor(mail_executor, self._check_pop3)
+            if protocol != "IMAP":
+                logger.error(f"【AsyncMailTask callback】不支持的协议：{protocol}")
                 return False
-        except Exception as e:
-            logger.error(f"【AsyncMailTask callback】连接邮箱异常：{str(e)}")
-            return False
 
-        # 查询当前邮筒的所有邮件（search_all会自动选择INBOX）
-        try:
-            data = await self.search_all(client)
-            if not data:
-                logger.info("【AsyncMailTask callback】获取邮件列表失败")
+            if await loop.run_in_executor(mail_executor, self._check_imap):
+                return True
+            if not idle_slots.acquire(blocking=False):
+                return False
+            try:
+                deadline = time.monotonic() + self.interval_time * 60 - self.idle_reserve
+                while deadline > time.monotonic():
+                    remaining = deadline - time.monotonic()
+                    if not await loop.run_in_executor(idle_executor, self.session.wait_push, self.folder, remaining):
+                        return False
+                    if await loop.run_in_executor(mail_executor, self._check_imap):
+                        return True
                 return False
+            finally:
+                idle_slots.release()
         except Exception as e:
-            logger.error(f"【AsyncMailTask callback】搜索邮件异常：{str(e)}")
+            logger.error(f"【AsyncMailTask callback】检查邮件异常：{str(e)}")
             return False
 
-        # 处理邮件ID列表
-        if self.custom_mail_protocol == "IMAP":
-            # if len(data) > 1 and data[1] == b'SEARCH completed':
-            #     # IMAP返回格式：(b'1 2 3 4 5...', b'SEARCH completed')
-            #     email_ids = data[0].split()
-            # else:
-            email_ids = data[0].split()
-        elif self.custom_mail_protocol == "POP3":
-            # POP3返回的是列表
-            email_ids = data
-
-        cache_ids = global_mail_ids.get(self.task_id, [])
-        logger.info(f"【AsyncMailTask callback】获取邮筒当前邮件成功：{len(email_ids)} 封邮件")
-
-        # 智能处理大量邮件：只检查新增的邮件
-        if not cache_ids:
-            cache_ids = email_ids
-            global_mail_ids[self.task_id] = cache_ids
-            return False  # 首次运行不触发，只建立基准
-
-        # 判断邮件序列是否新增
-        if len(cache_ids) >= len(email_ids):
-            # 邮件数量没有增加，更新缓存为最新的邮件ID
-            global_mail_ids[self.task_id] = email_ids
+    def _check_imap(self) -> bool:
+        """检查新邮件, 连接断开时重新登录重试一次"""
+        session = self.session
+        with session.use():
+            for retry in (False, True):
+                try:
+                    session.connect()
+                    return self._check_new_mail(session)
+                except (imaplib.IMAP4.abort, OSError) as e:
+                    session.close()
+                    if retry:
+                        raise
+                    logger.info(f"【AsyncMailTask callback】邮箱连接断开，重新连接：{str(e)}")
+
+    def _check_new_mail(self, session: MailSession) -> bool:
+        """
+        按 UID 增量检查: 只取上次检查之后的邮件, 只下载邮件头和 BODYSTRUCTURE, 正文在需要时才下载
+        首次运行或 UIDVALIDITY 变化时只建立基准, 不触发
+        """
+        state = get_mail_state()
+        uidvalidity, uidnext = session.examine(self.folder)
+        saved = state.get(self.task_id, session.account, self.folder)
+        if saved is None or saved[0] != uidvalidity:
+            last_uid = uidnext - 1 if uidnext else session.last_uid()
+            state.set(self.task_id, session.account, self.folder, uidvalidity, last_uid)
+            if saved is None:
+                logger.info(f"【AsyncMailTask callback】建立邮件基准：UIDVALIDITY={uidvalidity} UID={last_uid}")
+            else:
+                logger.warning(
+                    f"【AsyncMailTask callback】UIDVALIDITY 变化 {saved[0]} -> {uidvalidity}，"
+                    f"原有 UID 失效，重新建立基准：UID={last_uid}"
+                )
             return False
 
-        # 计算新增的邮件数量
-        distance = len(email_ids) - len(cache_ids)
-        if distance > 0:
-            # 只检查新增的邮件
-            updated_ids = email_ids[-distance:]
-            logger.info(f"【AsyncMailTask callback】发现{distance}封新邮件，开始检查")
-        else:
-            # 邮件数量没有变化，但可能邮件ID有变化（邮件被删除等）
-            global_mail_ids[self.task_id] = email_ids
+        last_uid = saved[1]
+        if uidnext and uidnext <= last_uid + 1:
             return False
-        # 如果有过滤条件，则逐封判断
-        logger.info("【AsyncMailTask callback】准备开始进行循环判断新邮件...")
-        processed_count = 0
-        for email_id in updated_ids:
-            try:
-                # 根据协议类型获取邮件内容
-                if self.custom_mail_protocol == "IMAP":
-                    # IMAP协议
-                    status, data = client.fetch(email_id.decode(), "RFC822")
-                elif self.custom_mail_protocol == "POP3":
-                    # POP3协议
-                    email_id_str = email_id.decode() if isinstance(email_id, bytes) else str(email_id)
-                    data = client.retr(int(email_id_str))
-                    # POP3返回的是元组 (response, lines, octets)
-                    data = [data[1]]  # 转换为与IMAP相同的格式
-                else:
-                    logger.error(f"【AsyncMailTask callback】不支持的协议：{self.custom_mail_protocol}")
+        uids = session.search_from(last_uid + 1)
+        if not uids:
+            return False
+        logger.info(f"【AsyncMailTask callback】发现{len(uids)}封新邮件，开始检查")
+
+        matched = False
+        for i in range(0, len(uids), self.fetch_batch):
+            for item in session.fetch(uids[i : i + self.fetch_batch], "(UID BODYSTRUCTURE BODY.PEEK[HEADER])"):
+                if "UID" not in item or "BODY[HEADER]" not in item:
                     continue
+                if self._check_mail_conditions(self._header_mail_info(session, item)):
+                    logger.info(f"【AsyncMailTask callback】进入条件{self.condition}")
+                    matched = True
+                    break
+            if matched:
+                break
+        # 本次发现的新邮件都不再检查
+        state.set(self.task_id, session.account, self.folder, uidvalidity, uids[-1])
+        return matched
+
+    def _header_mail_info(self, session: MailSession, item: dict) -> dict:
+        """由邮件头和 BODYSTRUCTURE 构建邮件信息, 正文通过 load_body 在需要时下载"""
+        msg = email.message_from_string(decode_data(item["BODY[HEADER]"]) or "")
+        mail_info = self._header_info(msg)
+        mail_info["has_attachment"] = has_attachment(item.get("BODYSTRUCTURE"))
+        logger.info(f"【AsyncMailTask callback】已读取邮件信息完毕，准备开始判断：{mail_info}...")
+
+        uid = int(item["UID"])
+        parts = text_parts(item.get("BODYSTRUCTURE"))
+        mail_info["load_body"] = lambda: self._fetch_text(session, uid, parts)
+        return mail_info
+
+    def _fetch_text(self, session: MailSession, uid: int, parts: list) -> str:
+        """只下载 text/plain 部分, 每部分最多 text_limit 字节"""
+        if not parts:
+            return ""
+        items = " ".join("BODY.PEEK[{}]<0.{}>".format(section, self.text_limit) for section, _, _ in parts)
+        for item in session.fetch([uid], "({})".format(items)):
+            if "BODY[{}]".format(parts[0][0]) in item:
+                return "".join(
+                    decode_part(item.get("BODY[{}]".format(section)) or b"", encoding, charset)
+                    for section, encoding, charset in parts
+                )
+        return ""
 
-                mail_info = self._extract_info(data, self.custom_mail_protocol)
-                processed_count += 1
-                logger.info(f"【AsyncMailTask callback】已读取邮件信息完毕，准备开始判断：{mail_info}...")
+    def _check_pop3(self) -> bool:
+        """POP3 要重新登录才能看到新邮件, 每次检查单独连接, 按邮件数量增量检查"""
+        host, port, _, use_ssl = self._server()
+        if use_ssl:
+            client = poplib.POP3_SSL(host=host, port=port, timeout=MailSession.timeout)
+        else:
+            client = poplib.POP3(host=host, port=port, timeout=MailSession.timeout)
+        try:
+            client.user(self.user_mail)
+            client.pass_(self.user_authorization)
+            count = client.stat()[0]
+
+            state = get_mail_state()
+            account = "{}@{}:{}".format(self.user_mail, host, port)
+            saved = state.get(self.task_id, account, self.folder)
+            state.set(self.task_id, account, self.folder, 0, count)
+            # 首次运行只建立基准, 邮件数量没有增加时不检查
+            if saved is None or count <= saved[1]:
+                return False
 
+            logger.info(f"【AsyncMailTask callback】发现{count - saved[1]}封新邮件，开始检查")
+            for i in range(saved[1] + 1, count + 1):
+                mail_info = self._extract_info([client.retr(i)[1]], "POP3")
+                logger.info(f"【AsyncMailTask callback】已读取邮件信息完毕，准备开始判断：{mail_info}...")
                 if self._check_mail_conditions(mail_info):
                     logger.info(f"【AsyncMailTask callback】进入条件{self.condition}")
-                    global_mail_ids[self.task_id] = email_ids
                     return True
-
-            except Exception as e:
-                logger.error(f"【AsyncMailTask callback】读取邮件失败：{str(e)}")
-                continue
-
-        logger.info(f"【AsyncMailTask callback】处理了 {processed_count} 封新邮件，没有符合的邮件信息，直接返回")
-        global_mail_ids[self.task_id] = email_ids
-        return False
+            return False
+        finally:
+            try:
+                client.quit()
+            except Exception:
+                pass
 
     def _check_mail_conditions(self, mail_info):
         """
@@ -354,14 +703,19 @@ class MailTask:
             subject_match = self._check_subject(mail_info)
             conditions.append(("subject", subject_match))
 
-        if self.content_text:
-            content_match = self._check_content(mail_info)
-            conditions.append(("content", content_match))
-
         if self.attachment is not None:  # 附件条件特殊处理，None表示不限制
             attachment_match = self._check_attachment(mail_info)
             conditions.append(("attachment", attachment_match))
 
+        # 正文可能需要单独下载, 放在最后, 其他条件已经能决定结果时不再检查
+        matches = [match for _, match in conditions]
+        decided = (self.condition == CONDITION_OR and any(matches)) or (
+            self.condition == CONDITION_AND and not all(matches)
+        )
+        if self.content_text and not decided and self.condition != CONDITION_ALL:
+            content_match = self._check_content(mail_info)
+            conditions.append(("content", content_match))
+
         # 记录匹配结果
         condition_logs = [f"{name}: {match}" for name, match in conditions]
         logger.info(f"【AsyncMailTask callback】条件匹配结果: {', '.join(condition_logs)}")
@@ -404,7 +758,9 @@ class MailTask:
         return self.theme_text in mail_info["subject"]
 
     def _check_content(self, mail_info):
-        """检查内容是否匹配"""
+        """检查内容是否匹配, IMAP 的正文在这里才下载"""
+        if mail_info.get("body") is None and mail_info.get("load_body"):
+            mail_info["body"] = mail_info["load_body"]()
         if not mail_info.get("body"):
             return False
         return self.content_text in mail_info["body"]
@@ -414,12 +770,8 @@ class MailTask:
         return self.attachment == mail_info.get("has_attachment", False)
 
     @staticmethod
-    def _extract_info(data, mail_type="IMAP"):
-        """
-        返回邮件的解析后信息部分
-        返回列表包含（主题，纯文本正文部分，html的正文部分，发件人元组，收件人元组，附件列表）
-
-        """
+    def _header_info(msg) -> dict:
+        """邮件头中的发件人、收件人、主题、发送时间"""
 
         def get_sender_info(msg):
             name = email.utils.parseaddr(msg["from"])[0]
@@ -458,6 +810,20 @@ class MailTask:
                 formatted_time = None
             return formatted_time
 
+        return {
+            "from": get_sender_info(msg),  # 发送人
+            "to": get_receiver_info(msg),  # 接收人
+            "subject": get_subject_content(msg),  # 主题
+            "time": get_mail_time(msg),  # 发送时间
+        }
+
+    @staticmethod
+    def _extract_info(data, mail_type="IMAP"):
+        """
+        返回邮件的解析后信息部分
+        返回列表包含（主题，纯文本正文部分，html的正文部分，发件人元组，收件人元组，附件列表）
+
+        """
         body = None
         html = None
         has_attachment = False
@@ -494,15 +860,11 @@ class MailTask:
                 if name:
                     has_attachment = True
 
-        return {
-            "from": get_sender_info(msg),  # 发送人
-            "to": get_receiver_info(msg),  # 接收人
-            "subject": get_subject_content(msg),  # 主题
-            "body": decode_data(body),  # 文字内容
-            "html": decode_data(html),  # （正文）html信息
-            "time": get_mail_time(msg),  # 发送时间
-            "has_attachment": has_attachment,  # 是否包含附件
-        }
+        mail_info = MailTask._header_info(msg)
+        mail_info["body"] = decode_data(body)  # 文字内容
+        mail_info["html"] = decode_data(html)  # （正文）html信息
+        mail_info["has_attachment"] = has_attachment  # 是否包含附件
+        return mail_info
 
     def to_trigger(self):
         """获取该类任务的触发器模型"""
@@ -13,8 +13,8 @@ from astronverse.trigger.tasks.base_task import AsyncImmediateTask, AsyncSchedul
 
 
 class Terminal:
-    def __init__(self, global_deque, global_queue, global_scheduler):
-        self.task_queue_monitor = global_deque
+    def __init__(self, task_store, global_queue, global_scheduler):
+        self.task_store = task_store
         self.queue = global_queue
         self.scheduler: AsyncIOScheduler = global_scheduler
         self.tasks = {}
@@ -0,0 +1,74 @@
+"""
+触发任务持久化队列的入队吞吐, 目标 10k/s
+
+1. 逐个入队: 每个任务一次事务
+2. 触发队列: 触发方放入 Queue, 入队线程批量写入, 从第一个任务放入到全部落盘的耗时
+
+运行: python tests/benchmark_queue.py [--count 100000]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+from queue import Queue
+from types import SimpleNamespace
+
+from astronverse.trigger.core.queue_manager import TaskQueueManager
+from astronverse.trigger.core.task_store import TaskStore
+
+
+def make_tasks(count: int, prefix: str) -> list:
+    return [
+        {
+            "trigger_id": "{}-{}".format(prefix, i % 100),
+            "trigger_name": "task",
+            "mode": "EXECUTOR",
+            "fire_time": str(i),
+            "callback_project_ids": [{"robotId": "robot", "robotName": "robot", "sort": 1}],
+        }
+        for i in range(count)
+    ]
+
+
+def new_manager(path: str, count: int) -> TaskQueueManager:
+    queue_config = {"max_length": count * 2, "max_wait_minutes": 30, "deduplicate": False}
+    return TaskQueueManager(TaskStore(path), Queue(), SimpleNamespace(queue_config=queue_config))
+
+
+def report(name: str, count: int, cost: float):
+    print("  {:30s} {:8.2f} s {:10.0f} /s".format(name, cost, count / cost))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp()
+    try:
+        mgr = new_manager(os.path.join(temp_dir, "single.db"), args.count)
+        tasks = make_tasks(args.count, "single")
+        start = time.perf_counter()
+        for task in tasks:
+            mgr.enqueue([task])
+        report("enqueue one by one", args.count, time.perf_counter() - start)
+        mgr.task_store.close()
+
+        mgr = new_manager(os.path.join(temp_dir, "queue.db"), args.count)
+        tasks = make_tasks(args.count, "queue")
+        threading.Thread(target=mgr.fetch_tasks, daemon=True).start()
+        start = time.perf_counter()
+        for task in tasks:
+            mgr.trigger_queue.put(task)
+        while mgr.task_store.count_waiting() < args.count:
+            time.sleep(0.01)
+        report("trigger queue, batched", args.count, time.perf_counter() - start)
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == "__main__":
+    main()
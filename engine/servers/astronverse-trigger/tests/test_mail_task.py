@@ -0,0 +1,504 @@
+import asyncio
+import base64
+import email
+import email.policy
+import imaplib
+import os
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from email.message import EmailMessage
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.trigger.core.config import config
+from astronverse.trigger.tasks import mail_task
+from astronverse.trigger.tasks.mail_task import MailTask, parse_fetch
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("trigger")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def make_mail(sender: str, subject: str = "hello", body: str = "body", attachment: bytes = None) -> bytes:
+    msg = EmailMessage()
+    msg["From"] = sender
+    msg["To"] = "me@example.com"
+    msg["Subject"] = subject
+    msg.set_content(body, charset="utf-8", cte="base64")
+    if attachment is not None:
+        msg.add_attachment(attachment, maintype="application", subtype="pdf", filename="report.pdf")
+    return msg.as_bytes(policy=email.policy.SMTP)
+
+
+def bodystructure(part) -> str:
+    if part.is_multipart():
+        children = "".join(bodystructure(child) for child in part.get_payload())
+        return '({} "{}")'.format(children, part.get_content_subtype().upper())
+
+    def params(items) -> str:
+        return "({})".format(" ".join('"{}" "{}"'.format(k.upper(), v) for k, v in items)) if items else "NIL"
+
+    payload = part.get_payload()
+    fields = '"{}" "{}" {} NIL NIL "{}" {}'.format(
+        part.get_content_maintype().upper(),
+        part.get_content_subtype().upper(),
+        params(part.get_params()[1:]),
+        part.get("Content-Transfer-Encoding", "7BIT").upper(),
+        len(payload.encode()),
+    )
+    if part.get_content_maintype() == "text":
+        fields += " {}".format(payload.count("\n"))
+    if part.get_content_disposition():
+        disposition = part.get_params(header="content-disposition")
+        fields += ' NIL ("{}" {})'.format(part.get_content_disposition().upper(), params(disposition[1:]))
+    return "({})".format(fields)
+
+
+class FakeImapServer(socketserver.ThreadingTCPServer):
+    """
+    内存中的 IMAP 服务器, 只实现邮件触发用到的命令
+    commands 记录收到的命令, sent 为发送的字节数, connections 为建立过的连接数
+    drop_on 为 {命令: 次数}, 收到这些命令时直接断开连接
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, idle: bool = True):
+        super().__init__(("127.0.0.1", 0), FakeImapHandler)
+        self.idle = idle
+        self.uidnext_code = True
+        self.uidvalidity = 1
+        self.uidnext = 1
+        self.messages = {}
+        self.lock = threading.Lock()
+        self.handlers = set()
+        self.commands = []
+        self.sent = 0
+        self.connections = 0
+        self.drop_on = {}
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def append(self, raw: bytes) -> int:
+        with self.lock:
+            uid = self.uidnext
+            self.uidnext += 1
+            self.messages[uid] = raw
+            handlers = [handler for handler in self.handlers if handler.idling]
+        for handler in handlers:
+            handler.write("* {} EXISTS\r\n".format(len(self.messages)).encode())
+        return uid
+
+    def bulk(self, count: int):
+        with self.lock:
+            for i in range(count):
+                raw = "From: user{0}@example.com\r\nSubject: mail {0}\r\n\r\nbody {0}\r\n".format(i).encode()
+                self.messages[self.uidnext] = raw
+                self.uidnext += 1
+
+    def reset(self, uidvalidity: int):
+        """重建文件夹, UID 从 1 开始"""
+        with self.lock:
+            self.uidvalidity = uidvalidity
+            self.uidnext = 1
+            self.messages = {}
+
+    def drop(self):
+        """断开所有连接"""
+        with self.lock:
+            handlers = list(self.handlers)
+        for handler in handlers:
+            handler.close()
+
+    def fetched(self, name: str) -> int:
+        return sum(1 for command in self.commands if command.startswith("UID FETCH") and name in command)
+
+
+class FakeImapHandler(socketserver.StreamRequestHandler):
+    def write(self, data: bytes):
+        with self.write_lock:
+            try:
+                self.wfile.write(data)
+            except OSError:
+                return
+        with self.server.lock:
+            self.server.sent += len(data)
+
+    def close(self):
+        try:
+            self.connection.shutdown(2)
+        except OSError:
+            pass
+
+    def handle(self):
+        self.write_lock = threading.Lock()
+        self.idling = False
+        server = self.server
+        with server.lock:
+            server.connections += 1
+            server.handlers.add(self)
+        try:
+            self.write(b"* OK fake imap ready\r\n")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+                command, _, args = rest.partition(" ")
+                command = command.upper()
+                if command == "UID":
+                    sub, _, args = args.partition(" ")
+                    command = "UID " + sub.upper()
+                server.commands.append("{} {}".format(command, args))
+                if server.drop_on.get(command):
+                    server.drop_on[command] -= 1
+                    self.close()
+                    return
+                if not self.command(tag, command, args):
+                    return
+        finally:
+            with server.lock:
+                server.handlers.discard(self)
+
+    def command(self, tag: str, command: str, args: str) -> bool:
+        server = self.server
+        if command == "CAPABILITY":
+            self.write("* CAPABILITY IMAP4rev1{}\r\n".format(" IDLE" if server.idle else "").encode())
+        elif command in ("SELECT", "EXAMINE"):
+            with server.lock:
+                lines = ["* {} EXISTS".format(len(server.messages)), "* OK [UIDVALIDITY {}]".format(server.uidvalidity)]
+                if server.uidnext_code:
+                    lines.append("* OK [UIDNEXT {}]".format(server.uidnext))
+            self.write(("\r\n".join(lines) + "\r\n").encode())
+        elif command == "UID SEARCH":
+            self.write("* SEARCH {}\r\n".format(" ".join(map(str, self.search(args)))).encode())
+        elif command == "UID FETCH":
+            self.fetch(args)
+        elif command == "IDLE":
+            self.idling = True
+            self.write(b"+ idling\r\n")
+            line = self.rfile.readline()
+            self.idling = False
+            if line.strip().upper() != b"DONE":
+                return False
+        elif command == "LOGOUT":
+            self.write(b"* BYE\r\n")
+            self.write("{} OK\r\n".format(tag).encode())
+            return False
+        elif command not in ("LOGIN", "ID", "NOOP"):
+            self.write("{} BAD unknown command\r\n".format(tag).encode())
+            return True
+        self.write("{} OK {} completed\r\n".format(tag, command).encode())
+        return True
+
+    def search(self, args: str) -> list:
+        criteria = args.split()
+        assert criteria[0].upper() == "UID", args
+        with self.server.lock:
+            uids = sorted(self.server.messages)
+        if not uids:
+            return []
+        start = criteria[1].split(":")[0]
+        if start == "*":
+            return [uids[-1]]
+        # 和真实服务器一样, n:* 在没有更大的 UID 时返回最大的 UID
+        return [uid for uid in uids if uid >= int(start)] or [uids[-1]]
+
+    def fetch(self, args: str):
+        uid_set, _, items = args.partition(" ")
+        with self.server.lock:
+            messages = dict(self.server.messages)
+        seqs = {uid: i for i, uid in enumerate(sorted(messages), 1)}
+        uids = []
+        for part in uid_set.split(","):
+            a, _, b = part.partition(":")
+            uids += [uid for uid in seqs if int(a) <= uid <= int(b or a)]
+        for uid in uids:
+            raw = messages[uid]
+            msg = email.message_from_bytes(raw)
+            out = [b"UID %d" % uid]
+            for item in items.strip("()").split():
+                name = item.upper()
+                if name == "UID":
+                    continue
+                if name == "BODYSTRUCTURE":
+                    out.append(b"BODYSTRUCTURE " + bodystructure(msg).encode())
+                    continue
+                section = name.replace(".PEEK", "")
+                if section == "BODY[HEADER]":
+                    data = raw.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+                elif section in ("RFC822", "BODY[]"):
+                    data = raw
+                else:
+                    section, _, partial = section.partition("<")
+                    part = msg
+                    for i in section[5:-1].split("."):
+                        if part.is_multipart():
+                            part = part.get_payload()[int(i) - 1]
+                    data = part.get_payload().encode()
+                    if partial:
+                        start, length = map(int, partial.rstrip(">").split("."))
+                        data = data[start : start + length]
+                        section += "<{}>".format(start)
+                out.append(b"%s {%d}\r\n%s" % (section.encode(), len(data), data))
+            self.write(b"* %d FETCH (%s)\r\n" % (seqs[uid], b" ".join(out)))
+
+
+class TestMailTask(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        config.MAIL_STATE_PATH = os.path.join(self.temp_dir, "mail.db")
+        mail_task.mail_state = None
+        self.server = FakeImapServer()
+
+    def tearDown(self):
+        self.restart()
+        if mail_task.mail_state:
+            mail_task.mail_state.close()
+        mail_task.mail_state = None
+        self.server.shutdown()
+        self.server.drop()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def restart(self):
+        """模拟进程重启: 丢弃所有连接"""
+        for session in mail_task.mail_sessions.values():
+            session.close()
+        mail_task.mail_sessions.clear()
+
+    def new_task(self, task_id: str = "mail", **kwargs) -> MailTask:
+        params = {
+            "mail_flag": "advance",
+            "custom_mail_server": "127.0.0.1",
+            "custom_mail_port": str(self.server.port),
+            "custom_mail_protocol": "IMAP",
+            "custom_mail_ssl": False,
+            "user_mail": "me@example.com",
+            "user_authorization": "secret",
+            "attachment": None,
+        }
+        params.update(kwargs)
+        return MailTask(task_id, **params)
+
+    def check(self, task: MailTask) -> bool:
+        return task._check_imap()
+
+    def test_incremental_and_persist(self):
+        for i in range(3):
+            self.server.append(make_mail("boss@example.com", "old {}".format(i)))
+        task = self.new_task(sender_text="boss")
+
+        # 首次只建立基准, 不下载任何邮件
+        self.assertFalse(self.check(task))
+        self.assertEqual(self.server.fetched(""), 0)
+
+        self.server.append(make_mail("other@example.com"))
+        self.assertFalse(self.check(task))
+        self.server.append(make_mail("boss@example.com"))
+        self.assertTrue(self.check(task))
+        self.assertFalse(self.check(task))
+        # 只取新邮件的邮件头, 不下载正文, 不搜索全部邮件, 共用一个连接
+        self.assertEqual(self.server.fetched("BODY.PEEK[HEADER]"), 2)
+        self.assertEqual(self.server.fetched("RFC822") + self.server.fetched("BODY.PEEK[1]"), 0)
+        self.assertFalse([c for c in self.server.commands if c.startswith("UID SEARCH") and "ALL" in c])
+        self.assertEqual(self.server.connections, 1)
+
+        # 重启后从上次的位置继续: 停机期间的新邮件会触发, 已检查过的不会
+        self.restart()
+        self.server.append(make_mail("boss@example.com", "while down"))
+        task = self.new_task(sender_text="boss")
+        self.assertTrue(self.check(task))
+        self.assertFalse(self.check(task))
+        self.assertEqual(self.server.connections, 2)
+
+    def test_uidvalidity_reset(self):
+        self.server.append(make_mail("boss@example.com"))
+        task = self.new_task(sender_text="boss")
+        self.assertFalse(self.check(task))
+
+        # 文件夹重建后原来的 UID 失效, 重新建立基准, 不把已有邮件当作新邮件
+        self.server.reset(2)
+        for i in range(3):
+            self.server.append(make_mail("boss@example.com", "rebuilt {}".format(i)))
+        self.assertFalse(self.check(task))
+        self.assertEqual(self.server.fetched(""), 0)
+        self.server.append(make_mail("boss@example.com"))
+        self.assertTrue(self.check(task))
+
+        # 服务器不返回 UIDNEXT 时用最大的 UID 作为基准
+        self.server.uidnext_code = False
+        self.server.reset(3)
+        self.server.append(make_mail("boss@example.com"))
+        self.assertFalse(self.check(task))
+        self.server.append(make_mail("boss@example.com"))
+        self.assertTrue(self.check(task))
+        self.assertFalse(self.check(task))
+
+    def test_disconnect(self):
+        task = self.new_task(sender_text="boss")
+        self.assertFalse(self.check(task))
+
+        # 连接在两次检查之间断开
+        self.server.drop()
+        self.server.append(make_mail("boss@example.com"))
+        self.assertTrue(self.check(task))
+        self.assertEqual(self.server.connections, 2)
+
+        # 连接在下载邮件头时断开, 重新登录后重新下载
+        self.server.drop_on["UID FETCH"] = 1
+        self.server.append(make_mail("boss@example.com"))
+        self.assertTrue(self.check(task))
+        self.assertEqual(self.server.connections, 3)
+
+        # 重新登录后仍然断开时本次检查失败, 位置不变, 下一次检查不会漏掉
+        self.server.append(make_mail("boss@example.com"))
+        self.server.drop_on["EXAMINE"] = 2
+        with self.assertRaises((imaplib.IMAP4.abort, OSError)):
+            self.check(task)
+        self.assertTrue(self.check(task))
+        self.assertEqual(self.server.connections, 5)
+
+    def test_large_mailbox(self):
+        self.server.bulk(50000)
+        task = self.new_task(theme_text="invoice")
+        start = time.perf_counter()
+        self.assertFalse(self.check(task))
+        baseline = time.perf_counter() - start
+
+        self.server.append(make_mail("a@example.com", "news"))
+        self.server.append(make_mail("b@example.com", "invoice 42"))
+        self.server.append(make_mail("c@example.com", "news"))
+        sent = self.server.sent
+        start = time.perf_counter()
+        self.assertTrue(self.check(task))
+        cost = time.perf_counter() - start
+
+        # 没有新邮件时只需要 EXAMINE
+        commands = len(self.server.commands)
+        self.assertFalse(self.check(task))
+        self.assertEqual([c.split()[0] for c in self.server.commands[commands:]], ["EXAMINE"])
+
+        self.assertLess(self.server.sent - sent, 10000)
+        self.assertLess(baseline, 1)
+        self.assertLess(cost, 1)
+
+        # 服务器不返回 UIDNEXT 时, 基准只取最大的 UID
+        self.server.uidnext_code = False
+        sent = self.server.sent
+        self.assertFalse(self.check(self.new_task("mail2", theme_text="invoice")))
+        self.assertLess(self.server.sent - sent, 1000)
+
+    def test_content_and_attachment(self):
+        task = self.new_task(content_text="合同", attachment=True, condition="and")
+        other = self.new_task("other", sender_text="boss", content_text="合同", condition="or")
+        self.assertFalse(self.check(task))
+        self.assertFalse(self.check(other))
+
+        pdf = os.urandom(200 * 1024)
+        self.server.append(make_mail("boss@example.com", body="没有附件: 合同"))
+        self.server.append(make_mail("a@example.com", body="请查收合同", attachment=pdf))
+        sent = self.server.sent
+        self.assertTrue(self.check(task))
+        # 没有附件的邮件不下载正文, 有附件的只下载文本部分
+        self.assertEqual(self.server.fetched("BODY.PEEK[1]"), 1)
+        self.assertLess(self.server.sent - sent, len(pdf) / 10)
+
+        # OR 条件中发件人已经匹配时不下载正文
+        self.assertTrue(self.check(other))
+        self.assertEqual(self.server.fetched("BODY.PEEK[1]"), 1)
+
+    def test_parse_fetch(self):
+        data = [
+            (b"1 (UID 7 BODY[HEADER] {12}", b"Subject: a\r\n"),
+            (
+                b' BODYSTRUCTURE (("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "BASE64" 8 1)'
+                b'("APPLICATION" "PDF" ("NAME" {5}',
+                b'a b"c',
+            ),
+            b') NIL NIL "BASE64" 10) "MIXED"))',
+            b"2 (FLAGS (\\Seen))",
+        ]
+        first, second = parse_fetch(data)
+        self.assertEqual(first["UID"], b"7")
+        self.assertEqual(first["BODY[HEADER]"], b"Subject: a\r\n")
+        self.assertEqual(first["BODYSTRUCTURE"][1][2], [b"NAME", b'a b"c'])
+        self.assertTrue(mail_task.has_attachment(first["BODYSTRUCTURE"]))
+        self.assertEqual(mail_task.text_parts(first["BODYSTRUCTURE"]), [("1", b"BASE64", b"utf-8")])
+        self.assertEqual(second, {"FLAGS": [b"\\Seen"]})
+        self.assertEqual(mail_task.decode_part(base64.b64encode("合同".encode()), b"BASE64", b"utf-8"), "合同")
+
+    def test_idle(self):
+        task = self.new_task(sender_text="boss", interval_time=0.5)
+        report = self.new_task("report", theme_text="report", interval_time=0.5)
+        task.idle_reserve = report.idle_reserve = 0
+        self.assertFalse(self.check(task))
+        self.assertFalse(self.check(report))
+
+        def deliver():
+            time.sleep(0.5)
+            self.server.append(make_mail("boss@example.com"))
+            time.sleep(0.5)
+            self.server.append(make_mail("other@example.com", "report"))
+
+        async def main():
+            threading.Thread(target=deliver, daemon=True).start()
+            start = time.monotonic()
+            results = await asyncio.gather(task.callback(), report.callback())
+            return results, time.monotonic() - start
+
+        # 两个任务共用一个 IDLE 连接, 收到推送后立即检查, 不等到下一次检查
+        results, cost = asyncio.run(main())
+        self.assertEqual(results, [True, True])
+        self.assertLess(cost, 5)
+        self.assertEqual(self.server.connections, 1)
+        self.assertIn("IDLE ", self.server.commands)
+
+    def test_idle_limit(self):
+        task = self.new_task(sender_text="boss", interval_time=0.5)
+        task.idle_reserve = 0
+        self.assertFalse(self.check(task))
+        slots = mail_task.idle_slots
+        mail_task.idle_slots = threading.BoundedSemaphore(1)
+        try:
+            # 等待推送的任务已满时不占用线程等待, 直接等下一次检查
+            mail_task.idle_slots.acquire()
+            start = time.monotonic()
+            self.assertFalse(asyncio.run(task.callback()))
+            self.assertLess(time.monotonic() - start, 2)
+            self.assertNotIn("IDLE ", self.server.commands)
+        finally:
+            mail_task.idle_slots = slots
+
+    def test_no_idle(self):
+        self.server.idle = False
+        task = self.new_task(sender_text="boss", interval_time=0.5)
+        task.idle_reserve = 0
+        self.assertFalse(self.check(task))
+        start = time.monotonic()
+        self.assertFalse(asyncio.run(task.callback()))
+        self.assertLess(time.monotonic() - start, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Queue
+from types import SimpleNamespace
+
+from astronverse.baseline.logger.logger import base_logger
+from astronverse.trigger.core.config import config
+from astronverse.trigger.core.queue_manager import TaskQueueManager
+from astronverse.trigger.core.task_store import TaskStatus, TaskStore
+
+
+def setUpModule():
+    """日志写在当前目录的 logs 下, 测试期间切到临时目录, 避免写进包目录"""
+    global log_cwd, log_dir
+    log_cwd = os.getcwd()
+    log_dir = tempfile.mkdtemp()
+    os.chdir(log_dir)
+    base_logger.init("trigger")
+
+
+def tearDownModule():
+    base_logger.get_log().remove()
+    base_logger.get_log().add(sys.stderr)
+    os.chdir(log_cwd)
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+
+# 子进程中运行的队列管理器, 参数: 数据库路径 调度器端口 需要入队的任务(json)
+CHILD = """
+import asyncio, json, sys
+from types import SimpleNamespace
+from astronverse.trigger.core.config import config
+from astronverse.trigger.core.queue_manager import TaskQueueManager
+from astronverse.trigger.core.task_store import TaskStore
+
+config.GATEWAY_PORT = int(sys.argv[2])
+queue_config = {"max_length": 500, "max_wait_minutes": 30, "deduplicate": False}
+queue_config.update(retry_interval=1, retry_max_interval=2)
+mgr = TaskQueueManager(TaskStore(sys.argv[1]), None, SimpleNamespace(queue_config=queue_config))
+mgr.recover()
+mgr.enqueue(json.loads(sys.argv[3]))
+asyncio.run(mgr.process_tasks())
+"""
+
+
+class FakeScheduler(ThreadingHTTPServer):
+    """
+    模拟调度器的 run_list 接口, 按 trigger_id 设置行为:
+    ok 直接成功, block 运行中(等待 release), error 返回500(没有运行)
+    accepted 记录实际运行的 (trigger_id, fire_time)
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeHandler)
+        self.modes = {}
+        self.accepted = []
+        self.refused = []
+        self.release = threading.Event()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        task = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        mode = self.server.modes.get(task["trigger_id"], "ok")
+        if mode == "error":
+            self.server.refused.append(task["trigger_id"])
+            self.send_response(500)
+            self.end_headers()
+            return
+        self.server.accepted.append((task["trigger_id"], task["fire_time"]))
+        if mode == "block":
+            self.server.release.wait()
+        body = json.dumps({"code": "0000", "msg": "", "data": {}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_task(trigger_id: str, fire_time: str = "2025-01-01 00:00:00", **kwargs) -> dict:
+    task = {"trigger_id": trigger_id, "trigger_name": trigger_id, "mode": "EXECUTOR", "fire_time": fire_time}
+    task.update(kwargs)
+    return task
+
+
+def wait_until(func, timeout: float = 30):
+    end = time.time() + timeout
+    while time.time() < end:
+        if func():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestTaskQueue(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "queue.db")
+        self.scheduler = FakeScheduler()
+        config.GATEWAY_PORT = self.scheduler.port
+        config.TERMINAL_MODE = False
+        self.queue_config = {
+            "max_length": 3,
+            "max_wait_minutes": 30,
+            "deduplicate": False,
+            "retry_interval": 0.2,
+            "retry_max_interval": 1,
+        }
+        self.store = TaskStore(self.db_path)
+        self.mgr = TaskQueueManager(self.store, Queue(), SimpleNamespace(queue_config=self.queue_config))
+        self.thread = None
+
+    def tearDown(self):
+        if self.thread:
+            self.mgr.loop.call_soon_threadsafe(self.process_task.cancel)
+            self.thread.join()
+        self.scheduler.release.set()
+        self.scheduler.shutdown()
+        self.scheduler.server_close()
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def start(self):
+        """后台线程运行处理协程"""
+
+        def run():
+            async def main():
+                self.process_task = asyncio.current_task()
+                await self.mgr.process_tasks()
+
+            try:
+                asyncio.run(main())
+            except asyncio.CancelledError:
+                pass
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        self.assertTrue(wait_until(lambda: self.mgr.wakeup is not None))
+
+    def status(self, trigger_id: str) -> list:
+        return [task["status"] for task in self.store.waiting() if task["trigger_id"] == trigger_id]
+
+    def test_enqueue_dedup(self):
+        self.assertEqual(self.mgr.enqueue([make_task("a"), make_task("a")]), ["ok", "duplicate"])
+        # 同一任务不同触发时间可以排队, 开启去重后同一任务只保留一个等待中的触发
+        self.assertEqual(self.mgr.enqueue([make_task("a", "2025-01-01 00:00:01")]), ["ok"])
+        self.queue_config["deduplicate"] = True
+        self.assertEqual(self.mgr.enqueue([make_task("a", "2025-01-01 00:00:02")]), ["duplicate"])
+        self.assertEqual(self.mgr.enqueue([make_task("b"), make_task("c")]), ["ok", "full"])
+        self.assertEqual([task["trigger_id"] for task in self.store.waiting()], ["a", "a", "b"])
+
+        # 已结束的触发不会再次入队
+        unique_id = self.store.waiting()[0]["unique_id"]
+        self.assertTrue(self.store.dispatching(unique_id))
+        self.store.set_status(unique_id, TaskStatus.DONE)
+        self.queue_config["deduplicate"] = False
+        self.assertEqual(self.mgr.enqueue([make_task("a"), make_task("c")]), ["duplicate", "ok"])
+
+    def test_backoff(self):
+        self.queue_config.update({"retry_interval": 6, "retry_max_interval": 60})
+        self.assertEqual([self.mgr.backoff(i) for i in range(1, 6)], [6, 12, 24, 48, 60])
+
+    def test_recover(self):
+        self.queue_config["max_length"] = 10
+        self.mgr.enqueue([make_task("a"), make_task("b"), make_task("c")])
+        a, b, c = [task["unique_id"] for task in self.store.waiting()]
+        self.store.dispatching(a)
+        self.store.dispatching(b)
+        self.store.set_status(b, TaskStatus.SENT)
+        self.store.close()
+
+        # 重启: 请求没有发出的重新下发, 已经交给调度器的不再下发
+        self.store = TaskStore(self.db_path)
+        self.assertEqual(self.store.recover(), (1, 1))
+        self.assertEqual([task["unique_id"] for task in self.store.due(time.time())], [a, c])
+        self.assertEqual(self.store.get(a)["attempts"], 1)
+        self.assertEqual(self.store.get(b)["status"], TaskStatus.FAILED)
+
+    def test_wakeup_and_retry(self):
+        self.queue_config["max_length"] = 10
+        self.start()
+        self.mgr.trigger_queue.put(make_task("a"))
+        threading.Thread(target=self.mgr.fetch_tasks, daemon=True).start()
+        self.assertTrue(wait_until(lambda: self.scheduler.accepted, 5))
+        # 入队后立即下发, 不等待轮询
+        start = time.time()
+        self.mgr.trigger_queue.put(make_task("a", "2025-01-01 00:00:01"))
+        self.assertTrue(wait_until(lambda: len(self.scheduler.accepted) == 2, 5))
+        self.assertLess(time.time() - start, 0.5)
+
+        # 下发失败按退避时间重试
+        self.scheduler.modes["b"] = "error"
+        self.mgr.trigger_queue.put(make_task("b"))
+        self.assertTrue(wait_until(lambda: self.status("b") == [TaskStatus.RETRY], 5))
+        self.scheduler.modes["b"] = "ok"
+        self.assertTrue(wait_until(lambda: ("b", "2025-01-01 00:00:00") in self.scheduler.accepted, 5))
+        self.assertEqual(self.status("b"), [])
+
+        # 其他模式的任务直接移除
+        self.mgr.trigger_queue.put(make_task("c", mode="DISPATCH"))
+        self.mgr.trigger_queue.put(make_task("d"))
+        self.assertTrue(wait_until(lambda: ("d", "2025-01-01 00:00:00") in self.scheduler.accepted, 5))
+        self.assertEqual([trigger_id for trigger_id, _ in self.scheduler.accepted], ["a", "a", "b", "d"])
+
+    def test_max_dispatch(self):
+        """同时下发的任务数不超过 max_dispatch, 有任务结束后继续下发剩余任务"""
+        self.queue_config["max_length"] = 10
+        self.mgr.dispatch_slots = threading.BoundedSemaphore(2)
+        for i in range(5):
+            self.scheduler.modes["t{}".format(i)] = "block"
+        self.mgr.enqueue([make_task("t{}".format(i)) for i in range(5)])
+        self.start()
+        self.assertTrue(wait_until(lambda: len(self.scheduler.accepted) == 2, 5))
+        time.sleep(0.3)
+        self.assertEqual(len(self.scheduler.accepted), 2)
+
+        self.scheduler.release.set()
+        self.assertTrue(wait_until(lambda: len(self.scheduler.accepted) == 5, 5))
+        self.assertTrue(wait_until(lambda: self.store.waiting() == [], 5))
+
+    def test_crash_recovery(self):
+        """下发过程中杀掉进程, 重启后没有丢失也没有重复运行"""
+        self.store.close()
+        self.scheduler.modes.update({"t0": "block", "t1": "error"})
+        tasks = [make_task("t{}".format(i)) for i in range(4)]
+
+        def run(tasks: list) -> subprocess.Popen:
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+            return subprocess.Popen(
+                [sys.executable, "-c", CHILD, self.db_path, str(self.scheduler.port), json.dumps(tasks)],
+                cwd=self.temp_dir,
+                env=env,
+            )
+
+        def statuses() -> dict:
+            store = TaskStore(self.db_path)
+            try:
+                rows = store._query("SELECT trigger_id, status FROM task_queue")
+            finally:
+                store.close()
+            return dict(rows)
+
+        # t0 运行中, t1 下发失败等待重试, t2 t3 运行完成
+        process = run(tasks)
+        try:
+            self.assertTrue(
+                wait_until(
+                    lambda: (
+                        statuses() == {"t0": "sent", "t1": "retry", "t2": "done", "t3": "done"}
+                        and len(self.scheduler.refused) >= 2
+                    )
+                )
+            )
+        finally:
+            process.send_signal(signal.SIGKILL)
+            process.wait()
+
+        # 重启后再次提交相同的触发, 不会重复入队
+        self.scheduler.modes["t1"] = "ok"
+        process = run(tasks)
+        try:
+            self.assertTrue(
+                wait_until(lambda: statuses() == {"t0": "failed", "t1": "done", "t2": "done", "t3": "done"})
+            )
+            time.sleep(0.5)
+        finally:
+            process.send_signal(signal.SIGKILL)
+            process.wait()
+        self.assertEqual(sorted(trigger_id for trigger_id, _ in self.scheduler.accepted), ["t0", "t1", "t2", "t3"])
+        self.store = TaskStore(self.db_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -377,6 +377,7 @@ class ReportFlow:
     data: Any = None  # 主流程的返回数据
     error_traceback: Any = None
     msg_str: str = None
+    timing: dict = None  # 耗时统计(秒) preload/import/run
 
 
 @dataclass
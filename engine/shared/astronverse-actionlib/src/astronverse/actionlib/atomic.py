@@ -2,8 +2,10 @@ import inspect
 import json
 import os
 import re
+import threading
 import time
 import traceback
+from collections import OrderedDict
 from enum import Enum
 from functools import wraps
 from typing import Any
@@ -31,8 +33,9 @@ class AtomicManager:
 
     def __init__(self):
         self.atomic_dict = {}
-        self.model_cache = {}
+        self.model_cache = OrderedDict()
         self.model_cache_max_size = 1000
+        self.model_lock = threading.Lock()
 
     @staticmethod
     def cfg() -> dict:
@@ -143,15 +146,7 @@ class AtomicManager:
         # 基础参数验证+转换
         if not self.atomic_dict[key].__end__:
             self._update_atomic_param(key, func)
-
-        if key not in self.model_cache:
-            if len(self.model_cache) > self.model_cache_max_size:
-                # gc回收
-                self.model_cache = {}
-            model = utils.ParamModel(self.atomic_dict[key].inputList, key)
-            self.model_cache[key] = model
-        else:
-            model = self.model_cache[key]
+        model = self._get_model(key)
 
         # 2. 高级参数处理
         has_result = True
@@ -243,6 +238,22 @@ class AtomicManager:
             time.sleep(delay_after)
         return res
 
+    def _get_model(self, key: str) -> utils.ParamModel:
+        """获取参数转换模型, LRU淘汰, 原子能力可能在多个线程中调用"""
+        with self.model_lock:
+            model = self.model_cache.get(key)
+            if model is not None:
+                self.model_cache.move_to_end(key)
+                return model
+        # 编译不持锁, 并发编译同一个key时保留先写入的
+        model = utils.ParamModel(self.atomic_dict[key].inputList, key)
+        with self.model_lock:
+            model = self.model_cache.setdefault(key, model)
+            self.model_cache.move_to_end(key)
+            if len(self.model_cache) > self.model_cache_max_size:
+                self.model_cache.popitem(last=False)
+        return model
+
     @staticmethod
     def _inspect_param(inspect_item, user_item):
         options = None
@@ -336,6 +347,11 @@ class AtomicManager:
         self.atomic_dict[key].__has_kwargs__ = __has_kwargs__
         self.atomic_dict[key].__end__ = True
 
+        # 注册时编译参数转换
+        with self.model_lock:
+            self.model_cache.pop(key, None)
+        self._get_model(key)
+
     def register(self, cls: Any, group_key: str = "", version: str = "1"):
         # group_key
         if not group_key:
@@ -0,0 +1,130 @@
+import atexit
+import threading
+import time
+from collections.abc import Callable
+
+
+class ConnectionPool:
+    """
+    连接池, 按 key 复用空闲连接, 数据库、邮件等原子能力共用
+
+    每个机器人在单独的执行器进程中运行, 连接池是进程内全局的, 即每个机器人一个连接池;
+    归还时放入空闲列表, 下次获取同一个 key 时直接复用. 子类按需重写 ping(检查连接) 和 reset(归还前清理连接)
+    """
+
+    max_idle = 4  # 每个key最多保留的空闲连接
+    idle_timeout = 300  # 空闲超过该时间(秒)的连接直接关闭, 避免使用已被服务端断开的连接
+    check_after = 0  # 空闲超过该时间(秒)的连接复用前先检查
+    keepalive_interval = None  # 空闲连接保活的间隔(秒), None 为不保活
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = {}  # key -> [(conn, 上次使用时间)]
+        self.in_use = {}  # id(conn) -> (key, conn)
+        self.keepalive_thread = None
+        atexit.register(self.close_all)
+
+    def ping(self, conn) -> bool:
+        """检查空闲连接是否可用"""
+        return True
+
+    def reset(self, conn):
+        """归还前清理连接状态, 抛出异常时关闭连接"""
+
+    def acquire(self, key, factory: Callable, ping: Callable = None):
+        """
+        获取连接, 优先复用空闲连接
+        @:param factory: 新建连接
+        @:param ping: 检查空闲连接是否可用, 不可用时关闭并重新获取, 默认使用 self.ping
+        """
+        ping = ping or self.ping
+        while True:
+            with self.lock:
+                conns = self.idle.get(key)
+                if not conns:
+                    break
+                conn, last_used = conns.pop()
+            idle_time = time.time() - last_used
+            if idle_time > self.idle_timeout or (idle_time > self.check_after and not ping(conn)):
+                self._close(conn)
+                continue
+            self._use(key, conn)
+            return conn
+
+        conn = factory()
+        self._use(key, conn)
+        return conn
+
+    def release(self, conn) -> bool:
+        """归还连接, 不是从池中获取的连接直接关闭"""
+        with self.lock:
+            item = self.in_use.pop(id(conn), None)
+        if item is None:
+            self._close(conn)
+            return False
+
+        try:
+            self.reset(conn)
+        except Exception:
+            self._close(conn)
+            return False
+
+        with self.lock:
+            conns = self.idle.setdefault(item[0], [])
+            if len(conns) < self.max_idle:
+                conns.append((conn, time.time()))
+                if self.keepalive_interval is not None:
+                    self._start_keepalive()
+                return True
+        self._close(conn)
+        return False
+
+    def close_all(self):
+        with self.lock:
+            conns = [conn for items in self.idle.values() for conn, _ in items]
+            conns.extend(conn for _, conn in self.in_use.values())
+            self.idle.clear()
+            self.in_use.clear()
+        for conn in conns:
+            self._close(conn)
+
+    def keepalive(self):
+        """空闲连接保活: 超时的关闭, 超过保活间隔的检查一次, 失败的关闭"""
+        now = time.time()
+        checks = []
+        with self.lock:
+            for key, conns in self.idle.items():
+                checks += [
+                    (key, conn, last_used) for conn, last_used in conns if now - last_used >= self.keepalive_interval
+                ]
+                conns[:] = [(conn, last_used) for conn, last_used in conns if now - last_used < self.keepalive_interval]
+        for key, conn, last_used in checks:
+            if now - last_used > self.idle_timeout or not self.ping(conn):
+                self._close(conn)
+                continue
+            with self.lock:
+                # 保活不算使用, 空闲时间仍从上次使用开始计算, 放在最前面, 优先复用最近使用的连接
+                self.idle.setdefault(key, []).insert(0, (conn, last_used))
+
+    def _start_keepalive(self):
+        if self.keepalive_thread is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.keepalive_interval)
+                self.keepalive()
+
+        self.keepalive_thread = threading.Thread(target=run, daemon=True)
+        self.keepalive_thread.start()
+
+    def _use(self, key, conn):
+        with self.lock:
+            self.in_use[id(conn)] = (key, conn)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -2,6 +2,7 @@ import ast
 import inspect
 import os
 from enum import Enum
+from typing import Any, Callable, Optional
 
 from astronverse.actionlib.error import *
 from astronverse.actionlib.logger import logger
@@ -86,9 +87,107 @@ def handle_existence(file_path, exist_type):
 
 
 class ParamModel:
+    """
+    原子能力参数转换
+
+    inputList 的类型分派在创建时一次性完成, 每个参数编译成一个转换函数, 调用时只做转换
+    """
+
     def __init__(self, inputList: list, key: str = ""):
         self.inputList = inputList
         self.key = key
+        self.converters = [(i.name, self.compile_converter(i)) for i in inputList or []]
+
+    @staticmethod
+    def compile_converter(i) -> Optional[Callable[[Any], Any]]:
+        """根据参数类型生成转换函数, 不需要转换时返回None"""
+
+        annotation = i.__annotation__
+        name = i.name
+        types = i.types
+
+        def convert_error(value, e, msg="{}的值转换成{}失败{}, error:{}"):
+            return ParamException(
+                PARAM_CONVERT_ERROR_FORMAT.format(name, types, value),
+                msg.format(name, types, value, e),
+            )
+
+        if annotation is None or annotation == inspect.Parameter.empty:
+            # 忽略
+            return None
+        elif annotation in [str, list, tuple, int, float, dict, bool]:
+            if annotation is bool:
+
+                def to_base(value):
+                    if isinstance(value, str):
+                        if value.lower() in ["false", "none", "undefined", ""]:
+                            return False
+                    return bool(value)
+
+            elif annotation in [int, float]:
+
+                def to_base(value):
+                    if isinstance(value, str) and value.lower() == "":
+                        return 0
+                    return annotation(value)
+
+            elif annotation in [list, dict]:
+                start, end = ("[", "]") if annotation is list else ("{", "}")
+
+                def to_base(value):
+                    if isinstance(value, str) and value.startswith(start) and value.endswith(end):
+                        return ast.literal_eval(value)
+                    return annotation(value)
+
+            else:
+
+                def to_base(value):
+                    return annotation(value)
+
+            def base_converter(value):
+                try:
+                    return to_base(value)
+                except Exception as e:
+                    raise convert_error(value, e) from e
+
+            return base_converter
+        elif isinstance(annotation, str) or str(annotation).startswith("typing.") or not inspect.isclass(annotation):
+            # 忽略
+            return None
+        elif issubclass(annotation, Enum):
+            # 转换
+            members = list(annotation)
+            try:
+                value_map = {a.value: a for a in members}
+            except TypeError:
+                value_map = None
+
+            def enum_converter(value):
+                if value_map is not None:
+                    try:
+                        return value_map.get(value, value)
+                    except TypeError:
+                        pass
+                for a in members:
+                    if a.value == value:
+                        value = a
+                return value
+
+            return enum_converter
+        elif hasattr(annotation, "__validate__"):
+            # 转换
+            validate = annotation.__validate__
+
+            def validate_converter(value):
+                try:
+                    return validate(name, value)  # noqa
+                except Exception as e:
+                    raise convert_error(value, e, "{}的值装换成{}失败{}, error:{}") from e
+
+            return validate_converter
+        else:
+            # 忽略
+            return None
 
     @staticmethod
     def parse_conditional(conditional, kwargs) -> bool:
@@ -129,66 +228,11 @@ class ParamModel:
 
     def __call__(self, **kwargs) -> dict:
         res_list = {}
-        for i in self.inputList:
-            if i.name in kwargs:
-                value = kwargs[i.name]
-            else:
+        for name, converter in self.converters:
+            if name not in kwargs:
                 continue
-
-            # 类型处理
-            if i.__annotation__ == inspect.Parameter.empty:
-                # 忽略
-                pass
-            elif i.__annotation__ in [str, list, tuple, int, float, dict, bool]:
-                try:
-                    if i.__annotation__ == bool and isinstance(value, str):
-                        if value.lower() in ["false", "none", "undefined", ""]:
-                            value = False
-                        else:
-                            value = i.__annotation__(value)
-                    elif i.__annotation__ in [int, float] and isinstance(value, str):
-                        if value.lower() == "":
-                            value = 0
-                        else:
-                            value = i.__annotation__(value)
-                    elif (
-                        i.__annotation__ == list
-                        and isinstance(value, str)
-                        and value.startswith("[")
-                        and value.endswith("]")
-                    ) or (
-                        i.__annotation__ == dict
-                        and isinstance(value, str)
-                        and value.startswith("{")
-                        and value.endswith("}")
-                    ):
-                        value = ast.literal_eval(value)
-                    else:
-                        value = i.__annotation__(value)
-                except Exception as e:
-                    raise ParamException(
-                        PARAM_CONVERT_ERROR_FORMAT.format(i.name, i.types, value),
-                        "{}的值转换成{}失败{}, error:{}".format(i.name, i.types, value, e),
-                    ) from e
-            elif isinstance(i.__annotation__, str) or str(i.__annotation__).startswith("typing."):
-                # 忽略
-                pass
-            elif issubclass(i.__annotation__, Enum):
-                # 转换
-                for a in i.__annotation__:
-                    if a.value == value:
-                        value = a
-            elif hasattr(i.__annotation__, "__validate__"):
-                # 转换
-                try:
-                    value = i.__annotation__.__validate__(i.name, value)  # noqa
-                except Exception as e:
-                    raise ParamException(
-                        PARAM_CONVERT_ERROR_FORMAT.format(i.name, i.types, value),
-                        "{}的值装换成{}失败{}, error:{}".format(i.name, i.types, value, e),
-                    ) from e
-            else:
-                # 忽略
-                pass
-            res_list[i.name] = value
+            value = kwargs[name]
+            if converter is not None:
+                value = converter(value)
+            res_list[name] = value
         return res_list
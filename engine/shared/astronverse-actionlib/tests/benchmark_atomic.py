@@ -0,0 +1,63 @@
+"""
+原子能力调度开销的微基准
+
+运行: python tests/benchmark_atomic.py [次数]
+"""
+
+import sys
+import timeit
+from enum import Enum
+
+from astronverse.actionlib.atomic import AtomicManager
+from astronverse.actionlib.report import IReport, report
+from astronverse.actionlib.types import Int
+
+
+class _SilentReport(IReport):
+    def info(self, message):
+        pass
+
+    def warning(self, message):
+        pass
+
+    def error(self, message):
+        pass
+
+
+class Mode(Enum):
+    FAST = "fast"
+    SLOW = "slow"
+
+
+def main(number: int = 100000):
+    report.set_code(_SilentReport())
+    mg = AtomicManager()
+
+    @mg.atomic("Bench")
+    def empty():
+        return None
+
+    @mg.atomic("Bench")
+    def typed(a: int = 0, b: str = "", c: bool = False, d: list = None, e: Mode = Mode.FAST, f: Int = 0):
+        return a
+
+    info = [1, "bench"]
+    typed_kwargs = {"a": "1", "b": "x", "c": "true", "d": "[1]", "e": "slow", "f": "2"}
+    mg._update_atomic_param("Bench.typed", typed.__wrapped__)
+    model = mg._get_model("Bench.typed")
+
+    cases = [
+        ("raw function", lambda: typed.__wrapped__(**typed_kwargs)),
+        ("atomic without __info__", lambda: typed(**typed_kwargs)),
+        ("atomic empty with __info__", lambda: empty(__info__=info)),
+        ("atomic typed with __info__", lambda: typed(__info__=info, **typed_kwargs)),
+        ("ParamModel only", lambda: model(**typed_kwargs)),
+    ]
+    print("{:<30}{:>12}".format("case", "us/call"))
+    for name, func in cases:
+        cost = min(timeit.repeat(func, number=number, repeat=3))
+        print("{:<30}{:>12.3f}".format(name, cost / number * 1e6))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,132 @@
+import threading
+import unittest
+from enum import Enum
+
+from astronverse.actionlib.atomic import AtomicManager
+from astronverse.actionlib.error import ParamException
+from astronverse.actionlib.report import IReport, report
+from astronverse.actionlib.types import Int
+
+
+class _SilentReport(IReport):
+    def info(self, message):
+        pass
+
+    def warning(self, message):
+        pass
+
+    def error(self, message):
+        pass
+
+
+class Color(Enum):
+    RED = "red"
+    BLUE = "blue"
+
+
+class TestAtomicManager(unittest.TestCase):
+    """AtomicManager参数转换与模型缓存的测试用例"""
+
+    def setUp(self):
+        report.set_code(_SilentReport())
+        self.mg = AtomicManager()
+
+        @self.mg.atomic("Demo")
+        def convert(a: int = 0, b: bool = False, c: list = None, d: Color = Color.RED, e: Int = 0, f="x"):
+            return a, b, c, d, e, f
+
+        self.convert = convert
+        self.info = [1, "p1"]
+
+    def tearDown(self):
+        report.set_code(None)
+
+    def test_convert_base_types(self):
+        """测试基础类型转换"""
+        res = self.convert(a="12", b="false", c="[1, 2]", __info__=self.info)
+        self.assertEqual(res[0], 12)
+        self.assertIs(res[1], False)
+        self.assertEqual(res[2], [1, 2])
+
+    def test_convert_empty_str(self):
+        """测试空字符串转换成数字0"""
+        res = self.convert(a="", __info__=self.info)
+        self.assertEqual(res[0], 0)
+
+    def test_convert_enum_and_validate(self):
+        """测试枚举和扩展类型转换"""
+        res = self.convert(d="blue", e="3", f=5, __info__=self.info)
+        self.assertIs(res[3], Color.BLUE)
+        self.assertEqual(res[4], 3)
+        self.assertEqual(res[5], 5)
+
+    def test_convert_enum_unknown_value(self):
+        """测试未知的枚举值保持原值"""
+        res = self.convert(d="green", __info__=self.info)
+        self.assertEqual(res[3], "green")
+
+    def test_convert_error(self):
+        """测试转换失败抛出ParamException"""
+        self.mg._update_atomic_param("Demo.convert", self.convert.__wrapped__)
+        model = self.mg._get_model("Demo.convert")
+        with self.assertRaises(ParamException):
+            model(a="abc")
+
+    def test_direct_call_without_info(self):
+        """测试不带__info__直接调用不做转换"""
+        res = self.convert(a="12")
+        self.assertEqual(res[0], "12")
+
+    def test_model_compiled_at_register(self):
+        """测试注册时已经编译参数模型"""
+        self.mg._update_atomic_param("Demo.convert", self.convert.__wrapped__)
+        self.assertIn("Demo.convert", self.mg.model_cache)
+
+    def test_model_cache_lru(self):
+        """测试模型缓存按LRU淘汰"""
+        self.mg.model_cache_max_size = 2
+        for name in ("k1", "k2", "k3"):
+
+            @self.mg.atomic("Lru", key="Lru.{}".format(name))
+            def func(a: int = 0):
+                return a
+
+            func(a="1", __info__=self.info)
+            if name == "k2":
+                # 访问k1, 使k2成为最久未使用
+                self.mg._get_model("Lru.k1")
+        self.assertIn("Lru.k1", self.mg.model_cache)
+        self.assertNotIn("Lru.k2", self.mg.model_cache)
+        self.assertIn("Lru.k3", self.mg.model_cache)
+
+    def test_model_cache_threads(self):
+        """测试多线程并发获取模型时LRU淘汰不出错"""
+        self.mg.model_cache_max_size = 3
+        keys = []
+        for i in range(8):
+
+            @self.mg.atomic("Mt", key="Mt.k{}".format(i))
+            def func(a: int = 0):
+                return a
+
+            keys.append("Mt.k{}".format(i))
+        errors = []
+
+        def worker(n):
+            try:
+                for j in range(2000):
+                    self.mg._get_model(keys[(n + j) % len(keys)])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(self.mg.model_cache), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
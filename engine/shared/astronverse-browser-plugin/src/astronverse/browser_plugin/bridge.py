@@ -0,0 +1,70 @@
+import threading
+
+import requests
+
+
+class BridgeClient:
+    """
+    浏览器桥接服务(browser_bridge)的http客户端
+
+    每个线程复用一个会话, 保持长连接, 避免每次操作都重新建立tcp连接;
+    多个连续的插件命令可以通过 transition_batch 一次请求发送
+    """
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.local = threading.local()
+
+    def session(self) -> requests.Session:
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            # 默认不压缩, 本机通信压缩反而更慢
+            session.headers["Accept-Encoding"] = "identity"
+            self.local.session = session
+        return session
+
+    def post(self, path: str, req: dict, timeout: float = None, compress: bool = False) -> requests.Response:
+        headers = {"Accept-Encoding": "gzip"} if compress else None
+        return self.session().post(self.url + path, json=req, timeout=timeout, headers=headers)
+
+    def transition(self, req: dict, timeout: float = None, compress: bool = False) -> requests.Response:
+        """
+        单个命令
+        @:param req: {"browser_type": "", "key": "", "data": {}, "data_path": ""}
+        """
+        return self.post("/browser/transition", req, timeout, compress)
+
+    def transition_batch(
+        self,
+        browser_type: str,
+        commands: list,
+        timeout: float = None,
+        stop_on_error: bool = True,
+        compress: bool = False,
+    ) -> requests.Response:
+        """
+        多个命令按顺序执行, 一次返回全部结果
+        @:param commands: [{"key": "", "data": {}, "data_path": "", "time_out": 10}]
+        @:param stop_on_error: 通信失败后是否停止执行后续命令
+        """
+        req = {"browser_type": browser_type, "commands": commands, "stop_on_error": stop_on_error}
+        return self.post("/browser/transition_batch", req, timeout, compress)
+
+    def close(self):
+        session = getattr(self.local, "session", None)
+        if session is not None:
+            session.close()
+            self.local.session = None
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url: str) -> BridgeClient:
+    """同一个地址共用一个客户端"""
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = BridgeClient(url)
+        return _clients[url]
@@ -3,9 +3,12 @@ from typing import Any, Optional, Union
 import requests
 import uiautomation as auto
 from astronverse.baseline.logger.logger import logger
+from astronverse.browser_plugin.bridge import get_client
 from astronverse.locator import LIKE_CHROME_BROWSER_TYPES, BrowserType, ILocator, Rect
 from astronverse.locator.utils.window import top_browser
 
+BRIDGE_URL = "http://127.0.0.1:9082"
+
 
 class WEBLocator(ILocator):
     def __init__(self, rect=None, rects=None):
@@ -64,19 +67,15 @@ class WebFactory:
     @classmethod
     def __get_rect_from_browser_plugin__(cls, element: dict, app: str, scroll_into_view=True):
         """通过浏览器插件获取rect"""
-        url = "http://127.0.0.1:9082/browser/transition"
         browser_type = app
         path_data = element.get("path", {})
         try:
-            # 如果需要滚动到视图中
+            # 滚动到视图中和检查元素在一次请求中按顺序执行
+            commands = [{"key": "checkElement", "data": path_data}]
             if scroll_into_view:
-                requests.post(
-                    url, json={"browser_type": browser_type, "data": path_data, "key": "scrollIntoView"}, timeout=10
-                )
-
-            # 检查元素
-            response = requests.post(
-                url, json={"browser_type": browser_type, "data": path_data, "key": "checkElement"}, timeout=10
+                commands.insert(0, {"key": "scrollIntoView", "data": path_data})
+            response = get_client(BRIDGE_URL).transition_batch(
+                browser_type, commands, timeout=10 * len(commands), stop_on_error=False
             )
 
             if response.status_code != 200:
@@ -84,6 +83,9 @@ class WebFactory:
 
             logger.info(f"浏览器插件返回结果: {response.text}")
             res_json = response.json()
+            if res_json and res_json.get("code", "") == "0000":
+                # 只关心检查元素的结果
+                res_json = res_json.get("data")[-1]
 
             if not res_json or res_json.get("code", "") != "0000":  # 通信错误
                 raise Exception("浏览器插件通信失败, 请检查插件是否安装并启用")
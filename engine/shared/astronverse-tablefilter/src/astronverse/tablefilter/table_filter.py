@@ -0,0 +1,595 @@
+import json
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from astronverse.baseline.logger.logger import logger
+
+# 抓取文本清理: 去掉换行、制表符、首尾空白和不间断空格
+CLEAN_PATTERN = r"[\n\t]|^\s+|\s+$|\xa0"
+
+chinese_to_number = {
+    "一": "1",
+    "初一": "1",
+    "二": "2",
+    "初二": "2",
+    "三": "3",
+    "初三": "3",
+    "四": "4",
+    "初四": "4",
+    "五": "5",
+    "初五": "5",
+    "六": "6",
+    "初六": "6",
+    "七": "7",
+    "初七": "7",
+    "八": "8",
+    "初八": "8",
+    "九": "9",
+    "初九": "9",
+    "零": "0",
+    "十": "10",
+    "初十": "10",
+    "十一": "11",
+    "十二": "12",
+    "十三": "13",
+    "十四": "14",
+    "十五": "15",
+    "十六": "16",
+    "十七": "17",
+    "十八": "18",
+    "十九": "19",
+    "二十": "20",
+    "二十一": "21",
+    "廿一": "21",
+    "二十二": "22",
+    "廿二": "22",
+    "二十三": "23",
+    "廿三": "23",
+    "二十四": "24",
+    "廿四": "24",
+    "二十五": "25",
+    "廿五": "25",
+    "二十六": "26",
+    "廿六": "26",
+    "二十七": "27",
+    "廿七": "27",
+    "二十八": "28",
+    "廿八": "28",
+    "二十九": "29",
+    "廿九": "29",
+    "三十": "30",
+    "三十一": "31",
+}
+
+# 中文日期格式的正则表达式
+chinese_date_formats = [
+    (re.compile(pattern), format_str)
+    for pattern, format_str in {
+        r"^(\d{4})-(\d{1,2})-(\d{1,2})\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%Y-%m-%d %H:%M:%S",
+        r"^(\d{4})/(\d{1,2})/(\d{1,2})\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%Y/%m/%d %H:%M:%S",
+        r"^(\d{4})\.(\d{1,2})\.(\d{1,2})\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%Y.%m.%d %H:%M:%S",
+        r"^(\d{4})年(\d{1,2})月(\d{1,2})日\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%Y年%m月%d日 %H:%M:%S",
+        r"^(\d{4})-(\d{1,2})-(\d{1,2})T(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%Y-%m-%dT%H:%M:%S",
+        r"^(\d{4})年(\d{1,2})月(\d{1,2})日\s(\d{1,2})时(\d{1,2})分(\d{1,2})秒$": "%Y年%m月%d日 %H时%M分%S秒",
+        r"^(\d{4})-(\d{1,2})-(\d{1,2})\s(\d{1,2}):(\d{1,2})$": "%Y-%m-%d %H:%M",
+        r"^(\d{4})/(\d{1,2})/(\d{1,2})\s(\d{1,2}):(\d{1,2})$": "%Y/%m/%d %H:%M",
+        r"^(\d{4})\.(\d{1,2})\.(\d{1,2})\s(\d{1,2}):(\d{1,2})$": "%Y.%m.%d %H:%M",
+        r"^(\d{4})年(\d{1,2})月(\d{1,2})日\s(\d{1,2}):(\d{1,2})$": "%Y年%m月%d日 %H:%M",
+        r"^(\d{4})年(\d{1,2})月(\d{1,2})日\s(\d{1,2})时(\d{1,2})分$": "%Y年%m月%d日 %H时%M分",
+        r"^(\d{1,2})-(\d{1,2})\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%m-%d %H:%M:%S",
+        r"^(\d{1,2})/(\d{1,2})\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%m/%d %H:%M:%S",
+        r"^(\d{1,2})\.(\d{1,2})\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%m.%d %H:%M:%S",
+        r"^(\d{1,2})月(\d{1,2})日\s(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%m月%d日 %H:%M:%S",
+        r"^(\d{1,2})月(\d{1,2})日\s(\d{1,2}):(\d{1,2})$": "%m月%d日 %H:%M",
+        r"^(\d{1,2})月(\d{1,2})日\s(\d{1,2})时(\d{1,2})分(\d{1,2})秒$": "%m月%d日 %H时%M分%S秒",
+        r"^(\d{4})-(\d{1,2})-(\d{1,2})$": "%Y-%m-%d",
+        r"^(\d{4})/(\d{1,2})/(\d{1,2})$": "%Y/%m/%d",
+        r"^(\d{4})\.(\d{1,2})\.(\d{1,2})$": "%Y.%m.%d",
+        r"^(\d{4})年(\d{1,2})月(\d{1,2})日$": "%Y年%m月%d日",
+        r"^(\d{4})-(\d{1,2})$": "%Y-%m",
+        r"^(\d{4})/(\d{1,2})$": "%Y/%m",
+        r"^(\d{4})\.(\d{1,2})$": "%Y.%m",
+        r"^(\d{4})年(\d{1,2})月$": "%Y年%m月",
+        r"^(\d{1,2})-(\d{1,2})$": "%m-%d",
+        r"^(\d{1,2})/(\d{1,2})$": "%m/%d",
+        r"^(\d{1,2})\.(\d{1,2})$": "%m.%d",
+        r"^(\d{1,2})月(\d{1,2})日$": "%m月%d日",
+        r"^(\d{1,2}):(\d{1,2}):(\d{1,2})$": "%H:%M:%S",
+        r"^(\d{1,2})时(\d{1,2})分(\d{1,2})秒$": "%H时%M分%S秒",
+        r"^(\d{1,2}):(\d{1,2})$": "%H:%M",
+        r"^(\d{1,2})时(\d{1,2})分$": "%H时%M分",
+    }.items()
+]
+
+
+def parse_datetime(date_string):
+    """parse datetime in chinese"""
+    if not date_string:
+        return ""
+    date_format = None
+    for pattern, format_str in chinese_date_formats:
+        if pattern.match(date_string):
+            for chinese, number in chinese_to_number.items():
+                date_string = date_string.replace(chinese, number)
+            date_format = datetime.strptime(date_string, format_str)
+
+    if not date_format:
+        date_format = date_string
+    return date_format
+
+
+def as_str(col: pd.Series) -> pd.Series:
+    """转为字符串列, 空值转为空字符串"""
+    return col.astype(object).where(col.notna(), "").astype(str)
+
+
+def as_mask(mask: pd.Series) -> pd.Series:
+    """布尔条件中的空值视为不满足"""
+    return mask.fillna(False).astype(bool)
+
+
+def literal(parameter):
+    """解析列表类型的筛选参数, 例如 "['a', 'b']" """
+    if isinstance(parameter, str):
+        try:
+            parameter = json.loads(parameter)
+        except ValueError:
+            try:
+                parameter = json.loads(parameter.replace("'", '"'))
+            except ValueError:
+                raise ValueError("条件异常，请输入正确的条件！")
+    if not isinstance(parameter, (list, tuple)):
+        raise ValueError("条件异常，请输入正确的条件！")
+    return list(parameter)
+
+
+def number(parameter):
+    try:
+        return int(parameter) if parameter.isdigit() else float(parameter)
+    except ValueError:
+        raise ValueError("比较条件需要输入数字: {}".format(parameter))
+
+
+def filter_compare(col: pd.Series, logical: str, parameter):
+    """==, !=, >, <, >=, <=; 等于/不等于的参数是数字时按数字比较"""
+    if logical in ["==", "!="] and not parameter.isdigit():
+        value = parameter
+    else:
+        col = pd.to_numeric(col, errors="coerce")
+        value = number(parameter)
+    mask = {
+        "==": col.__eq__,
+        "!=": col.__ne__,
+        ">": col.__gt__,
+        "<": col.__lt__,
+        ">=": col.__ge__,
+        "<=": col.__le__,
+    }[logical](value)
+    return mask, col
+
+
+def filter_text(col: pd.Series, logical: str, parameter):
+    """startswith, endswith, contains 及其 not_ 取反"""
+    negate = logical.startswith("not_")
+    method = logical[4:] if negate else logical
+    text = as_str(col).str
+    if method == "contains":
+        mask = text.contains(parameter, regex=False)
+    else:
+        mask = getattr(text, method)(parameter)
+    mask = as_mask(mask)
+    return (~mask if negate else mask), col
+
+
+def filter_null(col: pd.Series, logical: str, parameter):
+    mask = as_str(col) == ""
+    return (mask if logical == "isnull" else ~mask), col
+
+
+def filter_time(col: pd.Series, logical: str, parameter):
+    """按时间字符串比较"""
+    col = as_str(col)
+    if logical == "time_befor":
+        return col < parameter, col
+    if logical == "time_after":
+        return col > parameter, col
+    start, end = literal(parameter)[:2]
+    return (col >= str(start)) & (col <= str(end)), col
+
+
+def filter_regular(col: pd.Series, logical: str, parameter):
+    return as_mask(as_str(col).str.contains(parameter, regex=True)), col
+
+
+def filter_enumerate(col: pd.Series, logical: str, parameter):
+    return col.isin(literal(parameter)), col
+
+
+FILTERS = {
+    "==": filter_compare,
+    "!=": filter_compare,
+    ">": filter_compare,
+    "<": filter_compare,
+    ">=": filter_compare,
+    "<=": filter_compare,
+    "startswith": filter_text,
+    "endswith": filter_text,
+    "contains": filter_text,
+    "not_startswith": filter_text,
+    "not_endswith": filter_text,
+    "not_contains": filter_text,
+    "isnull": filter_null,
+    "notnull": filter_null,
+    "time_befor": filter_time,
+    "time_after": filter_time,
+    "time_between": filter_time,
+    "regular": filter_regular,
+    "enumerate": filter_enumerate,
+}
+
+
+def compile_filter(conditions: list):
+    """
+    将一列的筛选配置编译为函数 func(col) -> (mask, col)
+
+    条件按顺序组合, and 的优先级高于 or; 比较类条件会把列转为数字, 时间类条件会把列转为字符串, 返回转换后的列
+    """
+    steps = []
+    for condition in conditions:
+        logical = condition.get("logical")
+        if logical not in FILTERS:
+            raise ValueError("暂不支持该筛选条件：{}".format(logical))
+        parameter = condition.get("parameter")
+        if parameter is not None and not isinstance(parameter, (list, tuple)):
+            parameter = re.sub(CLEAN_PATTERN, "", str(parameter))
+        steps.append((condition.get("filterAssociation"), FILTERS[logical], logical, parameter))
+
+    def func(col: pd.Series):
+        groups, current = [], None
+        for i, (association, filter_func, logical, parameter) in enumerate(steps):
+            mask, col = filter_func(col, logical, parameter)
+            mask = as_mask(mask)
+            if i == 0:
+                current = mask
+            elif association == "or":
+                groups.append(current)
+                current = mask
+            else:
+                current = current & mask
+        for group in groups:
+            current = group | current
+        return current, col
+
+    return func
+
+
+def process_trim(col: pd.Series, parameters):
+    """去除首尾空格"""
+    return as_str(col).str.replace(r"^\s+|\s+?$", "", regex=True).str.replace(r"[\t\n]+", "", regex=True)
+
+
+def process_format_time(col: pd.Series, parameters):
+    """格式化时间"""
+    val = parameters[0].get("val")
+    if val == "":
+        return col
+    # 相同的文本只解析一次
+    parsed = col.map({v: parse_datetime(v) for v in col.dropna().unique()})
+    parsed = pd.to_datetime(as_str(parsed), errors="coerce")
+    formatted = parsed.dt.strftime(val.encode("unicode-escape").decode())
+    return as_str(formatted).map(lambda x: x.encode().decode("unicode-escape"))
+
+
+def process_regular(col: pd.Series, parameters):
+    """正则筛选, 同一单元格的多个匹配用空格连接"""
+    val = parameters[0].get("val")
+    extracted = as_str(col).str.extractall(f"({val})")[0]
+    if extracted.empty:
+        return pd.Series(np.nan, index=col.index, dtype=object)
+    return extracted.groupby(level=0).agg(" ".join).reindex(col.index)
+
+
+def process_replace(col: pd.Series, parameters):
+    """字符替换"""
+    col = as_str(col)
+    for parameter in parameters:
+        col = col.str.replace(parameter.get("text"), parameter.get("replaceText"), regex=False)
+    return col
+
+
+def process_extract_num(col: pd.Series, parameters):
+    """提取数字"""
+    return as_str(col).str.findall(r"\d+").str.join("")
+
+
+def process_prefix(col: pd.Series, parameters):
+    """添加前缀"""
+    return parameters[0].get("val") + as_str(col)
+
+
+def process_suffix(col: pd.Series, parameters):
+    """添加后缀"""
+    return as_str(col) + parameters[0].get("val")
+
+
+# 数据处理按该顺序执行
+PROCESSES = {
+    "Trim": process_trim,
+    "FormatTime": process_format_time,
+    "Regular": process_regular,
+    "Replace": process_replace,
+    "ExtractNum": process_extract_num,
+    "Prefix": process_prefix,
+    "Suffix": process_suffix,
+}
+PROCESS_NEED_PARAMETERS = ["Replace", "Prefix", "Suffix", "FormatTime", "Regular"]
+
+
+def compile_process(index: int, configs: list):
+    """将一列的数据处理配置编译为函数 func(col) -> col"""
+    steps = []
+    for process_type, process_func in PROCESSES.items():
+        enabled = [x for x in configs if x["processType"] == process_type and x["isEnable"]]
+        if not enabled:
+            continue
+        parameters = enabled[0]["parameters"]
+        if process_type in PROCESS_NEED_PARAMETERS and not parameters:
+            raise ValueError(f"第{index + 1}列数据处理缺少参数")
+        steps.append((process_type, process_func, parameters))
+
+    def func(col: pd.Series):
+        for process_type, process_func, parameters in steps:
+            try:
+                col = process_func(col, parameters)
+            except Exception as e:
+                raise ValueError(f"参数异常，请输入正确的参数！{process_type}{e}")
+        return col
+
+    return func
+
+
+class DataFilter:
+    """
+    抓取数据的筛选和处理
+
+    筛选和处理配置先编译为基于 pandas 列运算的函数, 再作用到整列, 不逐个单元格处理
+    """
+
+    def __init__(self, data_json):
+        self.data_json = data_json
+        self.produceType = data_json.get("produceType")
+        self.data_values = data_json.get("values")
+        self.value_types = [x.get("value_type") for x in self.data_values]
+        self.data_list = [x["value"] for x in self.data_values]
+        self.cell_filterConfig_list = [x.get("colFilterConfig") for x in self.data_values]
+        self.filterConfig_list = [x.get("filterConfig") for x in self.data_values]
+        self.dataProcessConfig_list = [x.get("colDataProcessConfig") for x in self.data_values]
+        self.hightLightIndex_list = []
+        self.dataProcess_state = 0
+        self.data_table = self.get_table()
+        self.filter_mian = self.data_filter_main()
+
+    def get_table(self):
+        """
+        将数据转为 DataFrame, 每列一个抓取字段, 另有 index 列记录原始行号
+        """
+        columns = []
+        if self.produceType == "similar":
+            max_length = max((len(sublist) for sublist in self.data_list), default=0)
+            for i, item_list in enumerate(self.data_list):
+                item_list.extend({"attrs": {}, "text": ""} for _ in range(max_length - len(item_list)))
+                value_type = self.value_types[i]
+                texts = pd.Series([item["attrs"].get(value_type) or "" for item in item_list], dtype=object)
+                texts = texts.str.replace(CLEAN_PATTERN, "", regex=True)
+                for item, text in zip(item_list, texts.tolist()):
+                    item["text"] = text
+                columns.append(texts.tolist())
+        elif self.produceType == "table":
+            for i, item_list in enumerate(self.data_list):
+                texts = pd.Series(item_list, dtype=object).str.replace(CLEAN_PATTERN, "", regex=True)
+                self.data_list[i] = texts.tolist()
+                columns.append(self.data_list[i])
+
+        max_length = max((len(x) for x in columns), default=0)
+        data_table = pd.DataFrame(
+            {i: pd.Series(col + [None] * (max_length - len(col)), dtype=object) for i, col in enumerate(columns)}
+        )
+        data_table.reset_index(inplace=True)
+        self.hightLightIndex_list = [list(range(max_length)) for _ in range(len(columns))]
+        return data_table
+
+    def cell_filter(self):
+        """
+        单元格过滤
+        针对单列操作，筛选后，不改变其它列; 保留的单元格依次上移, 其余置空
+        """
+        for index, conditions in enumerate(self.cell_filterConfig_list):
+            if not conditions:
+                continue
+            try:
+                mask, col = compile_filter(conditions)(self.data_table[index])
+            except Exception as e:
+                logger.error(f"cell_filter: {str(e)}")
+                raise ValueError(f"暂不支持该筛选条件：{str(e)}")
+            self.hightLightIndex_list[index] = self.data_table["index"][mask].tolist()
+            kept = col[mask]
+            kept = kept.astype(object).where(kept.notna(), "").tolist()
+            self.data_table[index] = pd.Series(kept + [""] * (len(col) - len(kept)), index=col.index, dtype=object)
+
+    def table_filter(self):
+        """
+        整张表过滤
+        针对整张表操作，筛选后，保留符合条件的整行数据
+        """
+        for index, conditions in enumerate(self.filterConfig_list):
+            if not conditions:
+                continue
+            try:
+                mask, col = compile_filter(conditions)(self.data_table[index])
+            except Exception as e:
+                logger.error(f"table_filter: {str(e)}")
+                raise ValueError(f"暂不支持该筛选条件：{str(e)}")
+            self.data_table[index] = col
+            self.data_table = self.data_table[mask].copy()
+        rows = self.data_table["index"].to_numpy()
+        for index in range(len(self.hightLightIndex_list)):
+            self.hightLightIndex_list[index] = np.asarray(self.hightLightIndex_list[index])[rows].tolist()
+
+    def dataProcess(self):
+        """
+        数据处理：提取数字，去除首尾空格，字符替换，添加前缀，添加后缀，格式化时间，正则筛选
+        """
+        self.dataProcess_state = 1
+        for index, configs in enumerate(self.dataProcessConfig_list):
+            if configs:
+                self.data_table[index] = compile_process(index, configs)(self.data_table[index])
+
+    def data_filter_main(self):
+        """data filter"""
+        if any(self.cell_filterConfig_list):
+            # 单元格过滤
+            self.cell_filter()
+        if any(self.dataProcessConfig_list):
+            # 数据处理
+            self.dataProcess()
+        if any(self.filterConfig_list):
+            # 数据筛选
+            self.table_filter()
+        if (
+            not any(self.cell_filterConfig_list)
+            and not any(self.filterConfig_list)
+            and not any(self.dataProcessConfig_list)
+        ):
+            for i in range(len(self.data_values)):
+                self.data_json["values"][i]["filterConfig"] = []
+                self.data_json["values"][i]["cellFilterConfig"] = []
+                self.data_json["values"][i]["dataProcessConfig"] = []
+
+        return self.data_table
+
+    def get_filtered_data(self):
+        """
+        获取筛选过滤后数据
+        """
+        for list_index, rows in enumerate(self.hightLightIndex_list):
+            values = self.data_values[list_index].get("value")
+            self.data_json["values"][list_index].update({"value": [values[i] for i in rows]})
+
+        if self.dataProcess_state == 1:
+            for index, item in enumerate(self.data_json["values"]):
+                col = self.data_table[index]
+                texts = col.astype(object).where(col.notna(), "").tolist()
+                if self.produceType == "similar":
+                    for cell, text in zip(item["value"], texts):
+                        cell.update({"text": text})
+                else:
+                    item["value"][: len(texts)] = texts[: len(item["value"])]
+
+        return self.data_json
+
+    def get_hightLightIndex(self):
+        """
+        获取高亮的索引
+        """
+        return self.hightLightIndex_list
+
+
+def table_json_merge_values(data_json, values):
+    """
+    合并获取的 table_list 到 data_json 中组装新的抓取数据
+    @:param data_json: 抓取对象
+    @:param values: 抓取数据
+    """
+    logger.info(f"table_data_merge_values columns: {len(values)}")
+    for index, item in enumerate(data_json["values"]):
+        item["value"] = values[index]["value"]
+    return data_json
+
+
+def table_df_to_out(data_json):
+    """
+    将 data_json 转换成 table 数据用于输出
+    @:param data_json: 抓取对象
+    """
+    produce_type = data_json["produceType"]
+    table_head = [item["title"] for item in data_json["values"]]  # 表头
+    if produce_type == "table":
+        # values: [{"value": ["A", "B", "C"]}, {"value": ["D", "E", "F"]}]
+        rows = list(zip(*[item["value"] for item in data_json["values"]]))  # 数据行
+    else:
+        # values: [{ “value”: [{"text" : “xxx”, "attrs": {}}] }], 按行取出text
+        rows = list(zip(*[[val_item["text"] for val_item in item["value"]] for item in data_json["values"]]))
+
+    df = pd.DataFrame(rows, columns=table_head)
+    return df
+
+
+def table_values_to_table_dict(values, produce_type):
+    """
+    将 values 转换成 table dict
+    """
+    table_head = [item["title"] for item in values]
+    table_data = {}
+    max_length = max(len(item["value"]) for item in values)
+
+    if produce_type == "table":
+        table_data = {item["title"]: item["value"] for item in values}
+    else:
+        for item in values:
+            val_items = [val_item["text"] for val_item in item["value"]]
+            if len(val_items) < max_length:
+                val_items += [""] * (max_length - len(val_items))
+            table_data[item["title"]] = val_items
+    logger.info(f"table_values_to_table_dict: {len(table_head)} columns, {max_length} rows")
+    table_df = pd.DataFrame(table_data, columns=table_head)
+    return table_df.to_dict("list")
+
+
+def values_to_row_list(values, produce_type):
+    """
+    将 values 转换成行二维数组
+    @:param values: 抓取数组，以列为单元
+    @:param produce_type: 抓取类型
+    """
+    table_head = [item["title"] for item in values]
+    table_data = {}
+    max_length = max(len(item["value"]) for item in values)
+
+    if produce_type == "table":
+        table_data = {item["title"]: item["value"] for item in values}
+    else:
+        for item in values:
+            val_items = list(item["value"])
+            if len(val_items) < max_length:
+                val_items += [{"text": "", "attrs": {}} for _ in range(max_length - len(val_items))]
+            table_data[item["title"]] = val_items
+    logger.info(f"values_to_row_list: {len(table_head)} columns, {max_length} rows")
+    table_df = pd.DataFrame(table_data, columns=table_head)
+    return table_df.values.tolist()
+
+
+def page_values_merge(preValues: list, values: list, produce_type: str):
+    """
+    将 values 转换成行二维数组
+    @:param values: 抓取数组，以列为单元
+    @:param produce_type: 抓取类型
+    """
+    # 1, 先补齐values 的每一项内value 的长度
+    max_length = max(len(item["value"]) for item in values)
+    logger.info(f"page_values_merge: {len(values)} columns, {max_length} rows")
+    for item in values:
+        if len(item["value"]) < max_length:
+            if produce_type == "table":
+                item["value"] += [""] * (max_length - len(item["value"]))
+            else:
+                item["value"] += [{"text": "", "attrs": {}} for _ in range(max_length - len(item["value"]))]
+
+    # 2, 将preValues 的value 和 values 的value 合并
+    if len(preValues) == 0:
+        return values
+
+    for i in range(len(preValues)):
+        preValues[i]["value"] += values[i]["value"]
+    return preValues
@@ -0,0 +1,141 @@
+import csv
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+
+def fingerprint(data) -> str:
+    """数据指纹, 用于判断翻页后表格内容是否已经变化, 以及抓取配置是否一致"""
+    text = json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+
+class TableStreamWriter:
+    """
+    分页抓取结果的增量写入
+
+    每页数据追加到临时csv并记录检查点(已完成页数), 中途失败重新运行时从检查点之后继续;
+    全部完成后生成目标文件(.xlsx/.csv), 删除临时文件和检查点
+    """
+
+    def __init__(self, path: str, key: str = "", output_head: bool = True):
+        if not path.endswith((".xlsx", ".csv")):
+            raise ValueError("{}表格文件路径错误，仅支持 .xlsx/.csv 文件".format(path))
+        self.path = path
+        self.key = key  # 抓取配置的指纹, 配置变化后不能续抓
+        self.output_head = output_head
+        self.part_path = path + ".part.csv"
+        self.checkpoint_path = path + ".checkpoint.json"
+
+        self.page = 0  # 已完成的页数
+        self.rows = 0
+        self.fingerprint = ""  # 最后一页的内容指纹
+        self.header = None
+        self.not_empty = None  # 每列是否存在非空值, 用于过滤空列
+
+    def resume(self) -> int:
+        """读取检查点, 返回已完成的页数; 没有检查点或配置不一致时从头开始"""
+        checkpoint = {}
+        if os.path.exists(self.checkpoint_path) and os.path.exists(self.part_path):
+            try:
+                with open(self.checkpoint_path, encoding="utf-8") as f:
+                    checkpoint = json.load(f)
+            except (OSError, ValueError):
+                checkpoint = {}
+        if checkpoint.get("key") != self.key or checkpoint.get("path") != self.path:
+            self.clean()
+            return 0
+
+        self.page = checkpoint["page"]
+        self.rows = checkpoint["rows"]
+        self.fingerprint = checkpoint["fingerprint"]
+        self.header = checkpoint["header"]
+        self.not_empty = checkpoint["not_empty"]
+        # 丢弃检查点之后写了一半的数据
+        with open(self.part_path, "r+b") as f:
+            f.truncate(checkpoint["size"])
+        return self.page
+
+    def write(self, table_df: pd.DataFrame, page_fingerprint: str = ""):
+        """追加一页数据并更新检查点"""
+        if self.header is None:
+            self.header = [str(col) for col in table_df.columns]
+            self.not_empty = [False] * len(self.header)
+        self.not_empty = [a or bool(b) for a, b in zip(self.not_empty, table_df.notna().any().tolist())]
+        rows = table_df.astype(object).where(table_df.notna(), "").values.tolist()
+
+        with open(self.part_path, "a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(self.header)
+            writer.writerows(rows)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+
+        self.page += 1
+        self.rows += len(rows)
+        self.fingerprint = page_fingerprint
+        self.__save__(size)
+
+    def __save__(self, size: int):
+        checkpoint = {
+            "key": self.key,
+            "path": self.path,
+            "page": self.page,
+            "rows": self.rows,
+            "fingerprint": self.fingerprint,
+            "header": self.header,
+            "not_empty": self.not_empty,
+            "size": size,
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def __iter_rows__(self, filter_empty_col: bool):
+        """逐行读取临时文件, 按需去掉表头和空列"""
+        if not os.path.exists(self.part_path):
+            if self.output_head and self.header:
+                yield self.header
+            return
+        keep = None
+        if filter_empty_col and self.not_empty:
+            keep = [i for i, v in enumerate(self.not_empty) if v]
+        with open(self.part_path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            head = next(reader, None)
+            if head is not None and self.output_head:
+                yield head if keep is None else [head[i] for i in keep]
+            for row in reader:
+                yield row if keep is None else [row[i] for i in keep]
+
+    def finish(self, filter_empty_col: bool = False) -> str:
+        """生成目标文件并清理临时文件, 返回文件路径"""
+        tmp_path = self.path + ".tmp"
+        if self.path.endswith(".csv"):
+            with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f).writerows(self.__iter_rows__(filter_empty_col))
+        else:
+            from openpyxl import Workbook
+
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet("Sheet1")
+            for row in self.__iter_rows__(filter_empty_col):
+                sheet.append(row)
+            with open(tmp_path, "wb") as f:
+                workbook.save(f)
+        os.replace(tmp_path, self.path)
+        self.clean()
+        return self.path
+
+    def clean(self):
+        """删除临时文件和检查点"""
+        for path in [self.part_path, self.checkpoint_path]:
+            if os.path.exists(path):
+                os.remove(path)
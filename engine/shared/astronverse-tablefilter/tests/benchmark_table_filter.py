@@ -0,0 +1,70 @@
+"""
+网页表格抓取数据的筛选/处理耗时
+
+运行: python tests/benchmark_table_filter.py [行数...]
+"""
+
+import random
+import sys
+import time
+
+from astronverse.tablefilter.table_filter import DataFilter, table_df_to_out
+
+
+def make_table(rows: int, produce_type: str = "table", seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    names = ["\n {}-{}\xa0".format(rng.choice(["apple", "banana", "cherry", "date"]), i) for i in range(rows)]
+    prices = ["￥{}.{:02d}".format(rng.randint(1, 999), rng.randint(0, 99)) for _ in range(rows)]
+    times = ["2024年{}月{}日".format(rng.randint(1, 12), rng.randint(1, 28)) for _ in range(rows)]
+    columns = {"name": names, "price": prices, "time": times}
+    if produce_type == "similar":
+        columns = {k: [{"attrs": {"text": v}, "text": ""} for v in cells] for k, cells in columns.items()}
+    return {
+        "produceType": produce_type,
+        "values": [{"title": k, "value": v, "value_type": "text"} for k, v in columns.items()],
+    }
+
+
+def configure(data_json: dict) -> dict:
+    name, price, time_col = data_json["values"]
+    name["filterConfig"] = [
+        {"logical": "startswith", "parameter": "b"},
+        {"logical": "contains", "parameter": "cherry", "filterAssociation": "or"},
+    ]
+    name["colDataProcessConfig"] = [
+        {"processType": "Trim", "isEnable": True, "parameters": []},
+        {"processType": "Suffix", "isEnable": True, "parameters": [{"val": "!"}]},
+    ]
+    price["colDataProcessConfig"] = [{"processType": "ExtractNum", "isEnable": True, "parameters": []}]
+    price["filterConfig"] = [{"logical": ">", "parameter": "10000"}]
+    time_col["colDataProcessConfig"] = [
+        {"processType": "FormatTime", "isEnable": True, "parameters": [{"val": "%Y-%m-%d"}]}
+    ]
+    return data_json
+
+
+def bench(rows: int, produce_type: str):
+    plain = make_table(rows, produce_type)
+    start = time.perf_counter()
+    table_df_to_out(DataFilter(plain).get_filtered_data())
+    plain_cost = time.perf_counter() - start
+
+    data_json = configure(make_table(rows, produce_type))
+    start = time.perf_counter()
+    out = table_df_to_out(DataFilter(data_json).get_filtered_data())
+    cost = time.perf_counter() - start
+    print(
+        "{:7d} rows {:8s} no config {:8.3f}s  filter+process {:8.3f}s  -> {} rows".format(
+            rows, produce_type, plain_cost, cost, len(out)
+        )
+    )
+
+
+def main(sizes):
+    for rows in sizes:
+        for produce_type in ["table", "similar"]:
+            bench(rows, produce_type)
+
+
+if __name__ == "__main__":
+    main([int(x) for x in sys.argv[1:]] or [10000, 100000])
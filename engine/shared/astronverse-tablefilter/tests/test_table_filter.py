@@ -0,0 +1,118 @@
+import unittest
+
+from astronverse.tablefilter.table_filter import DataFilter, page_values_merge, table_df_to_out
+
+
+def table_json(columns: dict, produce_type="table", **configs):
+    """构造抓取数据, configs: {列名: {"filterConfig": [...], ...}}"""
+    values = []
+    for title, cells in columns.items():
+        if produce_type == "similar":
+            cells = [{"attrs": {"text": cell}, "text": ""} for cell in cells]
+        item = {"title": title, "value": cells, "value_type": "text"}
+        item.update(configs.get(title, {}))
+        values.append(item)
+    return {"produceType": produce_type, "values": values}
+
+
+def cond(logical, parameter="", association="and"):
+    return {"logical": logical, "parameter": parameter, "filterAssociation": association}
+
+
+def process(process_type, *parameters):
+    return {"processType": process_type, "isEnable": True, "parameters": list(parameters)}
+
+
+class TestDataFilter(unittest.TestCase):
+    def setUp(self):
+        self.columns = {
+            "name": ["apple", "banana", "cherry", "date", "(egg)"],
+            "price": ["10", "25", "7", "abc", "30"],
+            "time": ["2024-01-05", "2024-02-10", "2024-03-15", "", "2024-05-01"],
+        }
+
+    def output(self, data_json):
+        return table_df_to_out(DataFilter(data_json).get_filtered_data()).values.tolist()
+
+    def test_clean(self):
+        # 筛选使用清理后的文本, 相似元素的text也会被清理
+        columns = {"name": [" apple\n", "banana", "cherry\xa0"]}
+        data_json = table_json(columns, name={"filterConfig": [cond("endswith", "y")]})
+        self.assertEqual(self.output(data_json), [["cherry\xa0"]])
+
+        data = DataFilter(table_json(columns, "similar")).get_filtered_data()
+        self.assertEqual([cell["text"] for cell in data["values"][0]["value"]], ["apple", "banana", "cherry"])
+
+    def test_table_filter(self):
+        data_json = table_json(self.columns, price={"filterConfig": [cond(">", "8")]})
+        self.assertEqual([row[0] for row in self.output(data_json)], ["apple", "banana", "(egg)"])
+
+    def test_and_or(self):
+        # a or b and c => a or (b and c)
+        conditions = [cond("startswith", "a"), cond("contains", "e", "or"), cond("endswith", ")", "and")]
+        data_json = table_json(self.columns, name={"filterConfig": conditions})
+        self.assertEqual([row[0] for row in self.output(data_json)], ["apple", "(egg)"])
+
+    def test_text_filters(self):
+        cases = [
+            ([cond("contains", "(e")], ["(egg)"]),
+            ([cond("not_contains", "an")], ["apple", "cherry", "date", "(egg)"]),
+            ([cond("==", "date")], ["date"]),
+            ([cond("regular", "^[a-c]")], ["apple", "banana", "cherry"]),
+            ([cond("enumerate", "['date', 'apple']")], ["apple", "date"]),
+        ]
+        for conditions, expect in cases:
+            data_json = table_json(self.columns, name={"filterConfig": conditions})
+            self.assertEqual([row[0] for row in self.output(data_json)], expect, conditions)
+
+    def test_time_and_null(self):
+        between = cond("time_between", "['2024-02-01', '2024-04-01']")
+        data_json = table_json(self.columns, time={"filterConfig": [between]})
+        self.assertEqual([row[0] for row in self.output(data_json)], ["banana", "cherry"])
+
+        data_json = table_json(self.columns, time={"filterConfig": [cond("isnull")]})
+        self.assertEqual([row[0] for row in self.output(data_json)], ["date"])
+
+    def test_unsupported_condition(self):
+        with self.assertRaises(ValueError):
+            DataFilter(table_json(self.columns, price={"filterConfig": [cond("<", "abc")]}))
+        with self.assertRaises(ValueError):
+            DataFilter(table_json(self.columns, price={"filterConfig": [cond("__import__", "os")]}))
+
+    def test_cell_filter(self):
+        data_json = table_json(self.columns, price={"colFilterConfig": [cond(">=", "25")]})
+        data_filter = DataFilter(data_json)
+        self.assertEqual(data_filter.get_hightLightIndex()[1], [1, 4])
+        self.assertEqual(data_filter.get_filtered_data()["values"][1]["value"], ["25", "30"])
+
+    def test_process(self):
+        configs = {
+            "name": {
+                "colDataProcessConfig": [
+                    process("Prefix", {"val": "#"}),
+                    process("Replace", {"text": "(", "replaceText": "["}),
+                ]
+            },
+            "price": {"colDataProcessConfig": [process("ExtractNum")]},
+            "time": {"colDataProcessConfig": [process("FormatTime", {"val": "%Y年%m月"})]},
+        }
+        rows = self.output(table_json(self.columns, **configs))
+        self.assertEqual(rows[0], ["#apple", "10", "2024年01月"])
+        self.assertEqual(rows[3], ["#date", "", ""])
+        self.assertEqual(rows[4], ["#[egg)", "30", "2024年05月"])
+
+    def test_process_regular(self):
+        configs = {"name": {"colDataProcessConfig": [process("Regular", {"val": "an"})]}}
+        rows = self.output(table_json(self.columns, **configs))
+        self.assertEqual([row[0] for row in rows], ["", "an an", "", "", ""])
+
+    def test_similar(self):
+        data_json = table_json(self.columns, "similar", price={"filterConfig": [cond("<", "20")]})
+        data = DataFilter(data_json).get_filtered_data()
+        self.assertEqual([cell["text"] for cell in data["values"][0]["value"]], ["apple", "cherry"])
+
+    def test_page_values_merge(self):
+        page1 = [{"value": ["a", "b"]}, {"value": ["1"]}]
+        page2 = [{"value": ["c"]}, {"value": ["2", "3"]}]
+        merged = page_values_merge(page_values_merge([], page1, "table"), page2, "table")
+        self.assertEqual([item["value"] for item in merged], [["a", "b", "c", ""], ["1", "", "2", "3"]])
@@ -0,0 +1,88 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+from astronverse.tablefilter.table_stream import TableStreamWriter, fingerprint
+from openpyxl import load_workbook
+
+
+def page(start, size=3):
+    return pd.DataFrame(
+        {
+            "name": ["n{}".format(i) for i in range(start, start + size)],
+            "price": [str(i) for i in range(size)],
+            "empty": None,
+        }
+    )
+
+
+class TestTableStreamWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "out.xlsx")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_xlsx(self, path):
+        return [list(row) for row in load_workbook(path, read_only=True).active.iter_rows(values_only=True)]
+
+    def test_xlsx(self):
+        writer = TableStreamWriter(self.path, key="k")
+        self.assertEqual(writer.resume(), 0)
+        writer.write(page(0), "fp0")
+        writer.write(page(3), "fp1")
+        self.assertEqual(writer.finish(filter_empty_col=True), self.path)
+
+        rows = self.read_xlsx(self.path)
+        self.assertEqual(rows[0], ["name", "price"])
+        self.assertEqual([row[0] for row in rows[1:]], ["n{}".format(i) for i in range(6)])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["out.xlsx"])
+
+    def test_csv_without_head(self):
+        path = os.path.join(self.tmp.name, "out.csv")
+        writer = TableStreamWriter(path, output_head=False)
+        writer.resume()
+        writer.write(page(0, 2))
+        writer.finish()
+        with open(path, encoding="utf-8", newline="") as f:
+            self.assertEqual(list(csv.reader(f)), [["n0", "0", ""], ["n1", "1", ""]])
+
+    def test_resume(self):
+        writer = TableStreamWriter(self.path, key="k")
+        writer.resume()
+        writer.write(page(0), "fp0")
+        writer.write(page(3), "fp1")
+        # 模拟第3页写了一半后中断
+        with open(writer.part_path, "a", encoding="utf-8") as f:
+            f.write("n6,0,\nn7,")
+
+        writer = TableStreamWriter(self.path, key="k")
+        self.assertEqual(writer.resume(), 2)
+        self.assertEqual((writer.rows, writer.fingerprint), (6, "fp1"))
+        writer.write(page(6), "fp2")
+        writer.finish()
+        rows = self.read_xlsx(self.path)
+        self.assertEqual([row[0] for row in rows[1:]], ["n{}".format(i) for i in range(9)])
+
+    def test_resume_config_changed(self):
+        writer = TableStreamWriter(self.path, key="k")
+        writer.resume()
+        writer.write(page(0), "fp0")
+        with open(writer.checkpoint_path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["page"], 1)
+
+        writer = TableStreamWriter(self.path, key="other")
+        self.assertEqual(writer.resume(), 0)
+        self.assertFalse(os.path.exists(writer.part_path))
+
+    def test_invalid_path(self):
+        with self.assertRaises(ValueError):
+            TableStreamWriter(os.path.join(self.tmp.name, "out.xls"))
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint([{"value": ["a"]}]), fingerprint([{"value": ["a"]}]))
+        self.assertNotEqual(fingerprint([{"value": ["a"]}]), fingerprint([{"value": ["b"]}]))
@@ -1,9 +1,11 @@
+import asyncio
 import copy
 import json
 import logging
 import time
 import uuid as uid
 from abc import ABC, abstractmethod
+from collections import deque
 from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import datetime, timedelta
@@ -43,6 +45,88 @@ def default_log(msg, *args, **kwargs):
     logging.info(msg, *args, **kwargs)
 
 
+class SendQueue:
+    """
+    SendQueue 连接的发送队列
+
+    所有消息由一个协程按顺序写入连接, 避免多个协程同时写同一个连接;
+    带 key 的消息还未发送时, 同 key 的新消息替换旧消息(只发送最新的), 新消息排到队尾, 不会越过之前放入的其他消息;
+    队列满时 put 等待, 连接出错后 put 抛出异常
+    """
+
+    def __init__(self, ws: IWebSocket, maxsize: int = 1000):
+        self.ws = ws
+        self.maxsize = maxsize
+        self.items: deque = deque()  # [key, data]
+        self.keys: dict = {}  # key -> [key, data]
+        self.ready = asyncio.Event()  # 有待发送的消息
+        self.space = asyncio.Event()  # 队列有空位
+        self.space.set()
+        self.idle = asyncio.Event()  # 全部发送完成
+        self.idle.set()
+        self.error: Union[Exception, None] = None
+        self.task: Union[asyncio.Task, None] = None
+
+    async def put(self, data: str, key: str = None):
+        if key is not None and key in self.keys:
+            self.items.remove(self.keys[key])
+            item = self.keys[key] = [key, data]
+            self.items.append(item)
+            return
+        while len(self.items) >= self.maxsize and self.error is None:
+            self.space.clear()
+            await self.space.wait()
+        if self.error is not None:
+            raise WsException("send error, {}".format(self.error))
+
+        item = [key, data]
+        self.items.append(item)
+        if key is not None:
+            self.keys[key] = item
+        self.idle.clear()
+        self.ready.set()
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.items:
+                key, data = self.items.popleft()
+                if key is not None:
+                    self.keys.pop(key, None)
+                self.space.set()
+                try:
+                    await self.ws.send(data)
+                except Exception as e:
+                    self._stop(e)
+                    return
+            self.idle.set()
+
+    def _stop(self, e: Exception):
+        self.error = e
+        self.items.clear()
+        self.keys.clear()
+        self.space.set()
+        self.idle.set()
+
+    async def join(self, timeout: float = 5):
+        """等待已放入的消息发送完成"""
+        try:
+            await asyncio.wait_for(self.idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def close(self, timeout: float = 1):
+        """发送剩余消息后停止发送协程"""
+        await self.join(timeout)
+        if self.error is None:
+            self._stop(WsException("conn closed"))
+        if self.task is not None:
+            self.task.cancel()
+
+
 @dataclass
 class Conn:
     """
@@ -55,9 +139,24 @@ class Conn:
     uuid: str = ""
     # 最后一次ping的时间
     last_ping: int = 0
+    # 发送队列
+    queue: SendQueue = None
+
+    async def send_text(self, data: str, key: str = None) -> None:
+        """放入发送队列, key 相同且还未发送的消息只发送最新的"""
+        if self.queue is None:
+            self.queue = SendQueue(self.ws)
+        await self.queue.put(data, key)
+
+    async def flush(self, timeout: float = 5):
+        """等待发送队列中的消息发送完成"""
+        if self.queue is not None:
+            await self.queue.join(timeout)
 
-    async def send_text(self, data: str) -> None:
-        await self.ws.send(data)
+    async def close_queue(self):
+        """停止发送队列"""
+        if self.queue is not None:
+            await self.queue.close()
 
 
 @dataclass
@@ -120,6 +219,8 @@ class Route:
     key: str = ""
     # 回调
     func: Callable[[BaseMsg, Any], Any] = None
+    # 同一个连接的消息是否按接收顺序逐个处理
+    ordered: bool = False
 
 
 @dataclass
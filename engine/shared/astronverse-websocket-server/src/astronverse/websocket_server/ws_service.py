@@ -18,6 +18,7 @@ from astronverse.websocket_server.ws import (
     PingTimeoutError,
     PongMsg,
     Route,
+    SendQueue,
     Watch,
     WatchRetry,
     WatchTimeout,
@@ -65,10 +66,20 @@ class WsManager:
         ping_close_time: int = 90,
         error_format: Callable[[Exception], dict] = default_error_format,
         log: Callable[..., Any] = default_log,
+        max_in_flight: int = 32,
+        send_queue_size: int = 1000,
+        log_max_len: int = 1000,
     ):
         # 统一处理事件
         self.error_format = error_format
         self.log = log
+        # 消息日志最大长度, 超出部分截断, 0 不打印消息内容
+        self.log_max_len = log_max_len
+
+        # 单个连接同时处理的消息数, 达到上限后暂停读取
+        self.max_in_flight = max_in_flight
+        # 单个连接发送队列长度
+        self.send_queue_size = send_queue_size
 
         # ping_check
         self.ping_check_time = ping_check_time
@@ -91,9 +102,17 @@ class WsManager:
         self.clear_watch_once = AsyncOnce()
         self.clear_ack_once = AsyncOnce()
 
-    async def _send_text(self, conn: Conn, msg: str):
-        self.log(">>>{}".format(msg))
-        await conn.send_text(msg)
+    def _log_text(self, prefix: str, text: str):
+        """打印消息, 过长的消息截断"""
+        if not self.log_max_len:
+            return
+        if len(text) > self.log_max_len:
+            text = "{}...({} chars)".format(text[: self.log_max_len], len(text))
+        self.log(prefix + text)
+
+    async def _send_text(self, conn: Conn, msg: str, key: str = None):
+        self._log_text(">>>", msg)
+        await conn.send_text(msg, key)
 
     async def _call_route(self, channel: str, key: str, *args, **kwargs):
         """
@@ -111,20 +130,22 @@ class WsManager:
         if watch.callback:
             await call(watch.callback, *args, **kwargs)
 
-    def _add_route(self, channel: str, key: str, func: Callable[[BaseMsg, Any], Any]):
+    def _add_route(self, channel: str, key: str, func: Callable[[BaseMsg, Any], Any], ordered: bool = False):
         """
         _add_route 路由添加
         """
         name = "{}$${}".format(channel, key)
-        self.routes[name] = Route(channel=channel, key=key, func=func)
+        self.routes[name] = Route(channel=channel, key=key, func=func, ordered=ordered)
 
-    def event(self, channel: str, key: str) -> Callable[..., Any]:
+    def event(self, channel: str, key: str, ordered: bool = False) -> Callable[..., Any]:
         """
         event 路由添加装饰器
+
+        ordered: 同一个连接上的 ordered 消息按接收顺序逐个处理, 用于有先后依赖的命令
         """
 
         def decorator(func: Callable[..., Any]):
-            self._add_route(channel, key, func)
+            self._add_route(channel, key, func, ordered)
             return func
 
         return decorator
@@ -135,6 +156,8 @@ class WsManager:
         """
         self.log("_add_conn {}".format(uuid))
         conn.last_ping = int(time.time())
+        if conn.queue is None:
+            conn.queue = SendQueue(conn.ws, self.send_queue_size)
         conn.uuid = uuid
         if not uuid:
             self.no_login_conns.append(conn)
@@ -166,25 +189,19 @@ class WsManager:
     async def listen(self, uuid: str, conn: Conn, svc: Any = None):
         """
         listen 启动消息监听
+
+        ping 直接处理, 其他消息并发处理, 单个连接最多同时处理 max_in_flight 个消息, 慢的路由不会阻塞其他消息;
+        ordered 路由的消息在同一个连接上按接收顺序逐个处理
         """
 
-        async def _listen():
-            # 拦截特殊消息
-            if msg.channel == PingMsg.channel:
-                conn.last_ping = int(time.time())
-                await self._send_text(conn, PongMsg.tojson())
-                return
-            elif msg.channel == AckMsg.channel:
+        async def _listen(msg: BaseMsg):
+            if msg.channel == AckMsg.channel:
                 name = "{}$${}".format("ack", msg.event_id)
                 if name in self.watch_msg:
                     watch = self.watch_msg[name]
                     await self._call_wait(watch, msg, None)
                     del self.watch_msg[name]
                 return
-            elif msg.channel == ExitMsg.channel:
-                # ExitMsg 只作为打印使用
-                self.log("error ExitMsg: {}".format(msg))
-                return
 
             # 拦截reply消息
             if msg.reply_event_id:
@@ -216,11 +233,28 @@ class WsManager:
             except Exception as e:
                 self.log("error: _call_route {}".format(e))
 
+        async def _run(msg: BaseMsg):
+            try:
+                route = self.routes.get("{}$${}".format(msg.channel, msg.key))
+                if route is not None and route.ordered and not msg.reply_event_id:
+                    # asyncio.Lock 按等待顺序唤醒, 任务按接收顺序创建, 所以按接收顺序执行
+                    async with ordered_lock:
+                        await _listen(msg)
+                else:
+                    await _listen(msg)
+            except Exception as e:
+                self.log("error: _listen {}".format(e))
+            finally:
+                in_flight.release()
+
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+        ordered_lock = asyncio.Lock()
+        tasks = set()
         self._add_conn(uuid, conn)
         try:
             while True:
                 text = await conn.ws.receive_text()
-                self.log("<<<{}".format(text))
+                self._log_text("<<<", text)
                 # 验证
                 try:
                     data = json.loads(text)
@@ -239,11 +273,26 @@ class WsManager:
                     await self._send_exit(conn, MsgUnlawfulnessError("msg unlawfulness, {}".format(text)))
                     continue
 
-                # 处理
-                await asyncio.create_task(_listen())
+                # 拦截特殊消息
+                if msg.channel == PingMsg.channel:
+                    conn.last_ping = int(time.time())
+                    await self._send_text(conn, PongMsg.tojson(), key=PongMsg.channel)
+                    continue
+                elif msg.channel == ExitMsg.channel:
+                    # ExitMsg 只作为打印使用
+                    self.log("error ExitMsg: {}".format(msg))
+                    continue
+
+                # 处理, 达到并发上限时等待
+                await in_flight.acquire()
+                task = asyncio.create_task(_run(msg))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
         except Exception as e:
             self.log("listen error {}".format(uuid))
             await self._send_exit(conn, e)
+        finally:
+            await conn.close_queue()
 
     async def _send_exit(self, conn: Conn, e: Exception = None):
         """
@@ -255,6 +304,7 @@ class WsManager:
                     err_msg = self.error_format(e)
                     if err_msg:
                         await self._send_text(conn, gen_exit_msg(err_msg).tojson())
+                        await conn.flush(1)
                 except Exception as e:
                     pass
                 try:
@@ -344,11 +394,12 @@ class WsManager:
             self.log("uuid empty {} {}".format(msg.send_uuid, self.conns))
             raise WsException("send uuid empty")
 
-        try:
-            tasks = [asyncio.create_task(self._send_text(v, msg.tojson())) for v in self.conns[msg.send_uuid]]
-            await asyncio.gather(*tasks)
-        except Exception as e:
-            pass
+        text = msg.tojson()
+        for v in list(self.conns[msg.send_uuid]):
+            try:
+                await self._send_text(v, text)
+            except Exception as e:
+                pass
 
     async def send_reply(self, msg: BaseMsg, timeout, callback_func=None):
         msg.need_reply = True
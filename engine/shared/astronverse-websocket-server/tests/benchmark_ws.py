@@ -0,0 +1,216 @@
+"""
+websocket 服务压测: 吞吐(消息/秒)和延迟(p50/p99)
+
+运行: python tests/benchmark_ws.py [manager|executor|bridge ...] [--connections 4] [--messages 2000] [--window 50]
+    manager:  WsManager + 测试路由(每20个消息有1个同步慢路由, 耗时50ms)
+    executor: 执行器调试服务的 wsmg 和路由(svc 为空)
+    bridge:   浏览器桥接服务, 模拟插件回复, 并发 http 转发请求
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import websockets
+from astronverse.websocket_server.ws import BaseMsg, Conn, IWebSocket
+from astronverse.websocket_server.ws_service import WsManager
+
+ENGINE = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def report(name: str, total: int, cost: float, latencies: list):
+    latencies = sorted(latencies)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+
+    print(
+        "{:10s} {:6d} msgs {:8.0f} msg/s  p50 {:7.2f} ms  p99 {:7.2f} ms".format(
+            name, total, total / cost, pct(0.5), pct(0.99)
+        )
+    )
+
+
+class WsSocket(IWebSocket):
+    def __init__(self, ws):
+        self.ws = ws
+
+    async def receive_text(self) -> str:
+        return str(await self.ws.recv())
+
+    async def send(self, message) -> None:
+        return await self.ws.send(message)
+
+    async def close(self) -> None:
+        return await self.ws.close()
+
+
+async def load_ws(url: str, make_msg, connections: int, messages: int, window: int) -> tuple:
+    """多个连接并发发送消息, 每个连接最多 window 个未回复的消息, 返回 (耗时, 延迟列表)"""
+    latencies = []
+
+    async def one():
+        async with websockets.connect(url, max_size=None) as ws:
+            pending = {}
+            window_sem = asyncio.Semaphore(window)
+            finished = asyncio.Event()
+            replied = 0
+
+            async def reader():
+                nonlocal replied
+                async for text in ws:
+                    event_id = json.loads(text).get("reply_event_id")
+                    if event_id in pending:
+                        latencies.append(time.perf_counter() - pending.pop(event_id))
+                        window_sem.release()
+                        replied += 1
+                        if replied == messages:
+                            finished.set()
+
+            reader_task = asyncio.create_task(reader())
+            for i in range(messages):
+                await window_sem.acquire()
+                msg = make_msg(i).init()
+                pending[msg.event_id] = time.perf_counter()
+                await ws.send(msg.tojson())
+            await finished.wait()
+            reader_task.cancel()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(connections)])
+    return time.perf_counter() - start, latencies
+
+
+async def serve_manager(wsmg: WsManager, uuid: str, make_msg, args):
+    count = 0
+
+    async def handler(ws):
+        # 同一个uuid的连接会收到广播, 每个连接单独的uuid
+        nonlocal count
+        count += 1
+        await wsmg.listen("{}{}".format(uuid, count), Conn(ws=WsSocket(ws)), None)
+
+    port = free_port()
+    url = "ws://127.0.0.1:{}".format(port)
+    async with websockets.serve(handler, "127.0.0.1", port, max_size=None):
+        # 预热: 线程池等在第一次压测时创建
+        await load_ws(url, make_msg, args.connections, args.messages // 4, args.window)
+        return await load_ws(url, make_msg, args.connections, args.messages, args.window)
+
+
+def bench_manager(args):
+    wsmg = WsManager(log=lambda msg: None)
+
+    @wsmg.event("bench", "fast")
+    async def fast(msg, svc):
+        return {"i": msg.data["i"]}
+
+    @wsmg.event("bench", "slow")
+    def slow(msg, svc):
+        time.sleep(0.05)
+        return {"i": msg.data["i"]}
+
+    def make_msg(i):
+        return BaseMsg(channel="bench", key="slow" if i % 20 == 0 else "fast", data={"i": i})
+
+    cost, latencies = asyncio.run(serve_manager(wsmg, "$bench$", make_msg, args))
+    report("manager", len(latencies), cost, latencies)
+
+
+def bench_executor(args):
+    sys.path.insert(0, os.path.join(ENGINE, "servers", "astronverse-executor", "src"))
+    from astronverse.executor.debug.apis import apis  # noqa: F401 注册路由
+    from astronverse.executor.debug.apis.ws import wsmg
+
+    wsmg.log = lambda msg: None
+
+    def make_msg(i):
+        if i % 2:
+            return BaseMsg(channel="flow", key="variable", data={"name": "a"})
+        return BaseMsg(channel="flow", key="add_break", data={"break_list": []})
+
+    cost, latencies = asyncio.run(serve_manager(wsmg, "$executor$", make_msg, args))
+    report("executor", len(latencies), cost, latencies)
+
+
+def bench_bridge(args):
+    sys.path.insert(0, os.path.join(ENGINE, "servers", "astronverse-browser-bridge", "src"))
+    import uvicorn
+    from astronverse.browser_bridge.apis.ws_route import wsmg
+    from astronverse.browser_bridge.start import app
+    from astronverse.browser_plugin.bridge import BridgeClient
+
+    wsmg.log = lambda msg: None
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    async def extension():
+        # 模拟插件: 每个请求回复 data
+        token = base64.b64encode(b"$chrome$").decode("utf-8")
+        async with websockets.connect("ws://127.0.0.1:{}/ws?token={}".format(port, token), max_size=None) as ws:
+            async for text in ws:
+                msg = json.loads(text)
+                if msg.get("need_reply"):
+                    reply = {
+                        "reply_event_id": msg["event_id"],
+                        "channel": msg["channel"],
+                        "key": msg["key"],
+                        "uuid": msg["send_uuid"],
+                        "send_uuid": msg["uuid"],
+                        "data": {"code": "0000", "msg": "", "data": msg["data"]},
+                    }
+                    await ws.send(json.dumps(reply))
+
+    threading.Thread(target=lambda: asyncio.run(extension()), daemon=True).start()
+    client = BridgeClient("http://127.0.0.1:{}".format(port))
+    req = {"browser_type": "chrome", "key": "checkElement", "data": {"xpath": "//div"}}
+    while not client.transition(req, 5).json().get("data"):
+        time.sleep(0.05)
+
+    latencies = []
+
+    def worker(count):
+        for _ in range(count):
+            start = time.perf_counter()
+            client.transition(req, 10)
+            latencies.append(time.perf_counter() - start)
+
+    total = args.messages
+    with ThreadPoolExecutor(args.connections) as pool:
+        list(pool.map(worker, [total // args.connections // 4] * args.connections))
+    latencies.clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.connections) as pool:
+        list(pool.map(worker, [total // args.connections] * args.connections))
+    report("bridge", len(latencies), time.perf_counter() - start, latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("targets", nargs="*", default=["manager", "executor", "bridge"])
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=50)
+    args = parser.parse_args()
+    for target in args.targets:
+        {"manager": bench_manager, "executor": bench_executor, "bridge": bench_bridge}[target](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import time
+import unittest
+
+from astronverse.websocket_server.ws import BaseMsg, Conn, IWebSocket, SendQueue
+from astronverse.websocket_server.ws_service import WsManager
+
+
+class MemorySocket(IWebSocket):
+    """内存中的连接, receive_text 读取 incoming, send 写入 sent"""
+
+    def __init__(self, send_delay: float = 0):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.send_delay = send_delay
+        self.received = asyncio.Event()
+
+    async def receive_text(self) -> str:
+        text = await self.incoming.get()
+        if text is None:
+            raise ConnectionError("closed")
+        return text
+
+    async def send(self, message) -> None:
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.sent.append(message)
+        self.received.set()
+
+    async def close(self) -> None:
+        pass
+
+    def push(self, key: str, data: dict = None):
+        self.incoming.put_nowait(BaseMsg(channel="test", key=key, data=data or {}).init().tojson())
+
+    async def wait_replies(self, count: int, timeout: float = 5):
+        end = time.time() + timeout
+        while len(self.replies()) < count and time.time() < end:
+            self.received.clear()
+            try:
+                await asyncio.wait_for(self.received.wait(), end - time.time())
+            except asyncio.TimeoutError:
+                break
+        return self.replies()
+
+    def replies(self):
+        return [json.loads(text) for text in self.sent if "reply_event_id" in json.loads(text)]
+
+
+class TestWsManager(unittest.IsolatedAsyncioTestCase):
+    def new_manager(self, **kwargs):
+        logs = []
+        wsmg = WsManager(log=logs.append, **kwargs)
+        running = {"now": 0, "max": 0}
+
+        @wsmg.event("test", "fast")
+        async def fast(msg, svc):
+            return {"key": "fast", "i": msg.data.get("i")}
+
+        @wsmg.event("test", "slow")
+        async def slow(msg, svc):
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.2)
+            running["now"] -= 1
+            return {"key": "slow"}
+
+        @wsmg.event("test", "sync")
+        def sync(msg, svc):
+            time.sleep(0.2)
+            return {"key": "sync"}
+
+        return wsmg, logs, running
+
+    async def listen(self, wsmg, ws):
+        task = asyncio.create_task(wsmg.listen("$test$", Conn(ws=ws)))
+        self.addAsyncCleanup(self.stop, ws, task)
+        return task
+
+    @staticmethod
+    async def stop(ws, task):
+        ws.incoming.put_nowait(None)
+        await asyncio.wait_for(task, 5)
+
+    async def test_slow_route_not_blocking(self):
+        wsmg, _, _ = self.new_manager()
+        ws = MemorySocket()
+        await self.listen(wsmg, ws)
+        ws.push("slow")
+        ws.push("sync")
+        ws.push("fast", {"i": 1})
+        replies = await ws.wait_replies(3)
+        self.assertEqual([r["data"]["key"] for r in replies][0], "fast")
+        self.assertEqual(sorted(r["data"]["key"] for r in replies), ["fast", "slow", "sync"])
+
+    async def test_in_flight_limit(self):
+        wsmg, _, running = self.new_manager(max_in_flight=2)
+        ws = MemorySocket()
+        await self.listen(wsmg, ws)
+        for _ in range(5):
+            ws.push("slow")
+        replies = await ws.wait_replies(5)
+        self.assertEqual(len(replies), 5)
+        self.assertEqual(running["max"], 2)
+
+    async def test_reply_order(self):
+        wsmg, _, _ = self.new_manager()
+        ws = MemorySocket()
+        await self.listen(wsmg, ws)
+        for i in range(50):
+            ws.push("fast", {"i": i})
+        replies = await ws.wait_replies(50)
+        self.assertEqual(sorted(r["data"]["i"] for r in replies), list(range(50)))
+
+    async def test_ordered_route(self):
+        wsmg, _, _ = self.new_manager()
+        done = []
+
+        @wsmg.event("test", "step", ordered=True)
+        def step(msg, svc):
+            # 先到的消息处理得更慢, 并发处理时会乱序
+            time.sleep((5 - msg.data["i"]) * 0.02)
+            done.append(msg.data["i"])
+            return {"key": "step"}
+
+        ws = MemorySocket()
+        await self.listen(wsmg, ws)
+        for i in range(5):
+            ws.push("step", {"i": i})
+        ws.push("fast", {"i": 9})
+        replies = await ws.wait_replies(6)
+        self.assertEqual(done, list(range(5)))
+        # 非 ordered 的消息不用等待 ordered 消息
+        self.assertEqual(replies[0]["data"]["key"], "fast")
+
+    async def test_log_truncated(self):
+        wsmg, logs, _ = self.new_manager(log_max_len=100)
+        ws = MemorySocket()
+        await self.listen(wsmg, ws)
+        ws.push("fast", {"i": "x" * 10000})
+        await ws.wait_replies(1)
+        msg_logs = [log for log in logs if log.startswith(("<<<", ">>>"))]
+        self.assertEqual(len(msg_logs), 2)
+        self.assertTrue(all(len(log) < 150 for log in msg_logs))
+
+        wsmg, logs, _ = self.new_manager(log_max_len=0)
+        ws = MemorySocket()
+        await self.listen(wsmg, ws)
+        ws.push("fast", {"i": 1})
+        await ws.wait_replies(1)
+        self.assertFalse([log for log in logs if log.startswith(("<<<", ">>>"))])
+
+
+class TestSendQueue(unittest.IsolatedAsyncioTestCase):
+    async def test_order_and_coalesce(self):
+        ws = MemorySocket(send_delay=0.05)
+        queue = SendQueue(ws)
+        await queue.put("a")
+        await queue.put("tip-1", key="tip")
+        await queue.put("b")
+        await queue.put("tip-2", key="tip")
+        await queue.put("tip-3", key="tip")
+        await queue.join()
+        # "a" 已经在发送, tip-1 还在队列中被 tip-3 替换, 替换后排在 "b" 之后, 不越过其他消息
+        self.assertEqual(ws.sent, ["a", "b", "tip-3"])
+        await queue.close()
+
+    async def test_backpressure(self):
+        ws = MemorySocket(send_delay=0.01)
+        queue = SendQueue(ws, maxsize=2)
+        for i in range(10):
+            await queue.put(str(i))
+            self.assertLessEqual(len(queue.items), 2)
+        await queue.join()
+        self.assertEqual(ws.sent, [str(i) for i in range(10)])
+        await queue.close()
+
+    async def test_send_error(self):
+        class BrokenSocket(MemorySocket):
+            async def send(self, message):
+                raise ConnectionError("closed")
+
+        queue = SendQueue(BrokenSocket())
+        await queue.put("a")
+        await queue.join()
+        with self.assertRaises(Exception):
+            await queue.put("b")